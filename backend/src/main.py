@@ -1,17 +1,38 @@
+import math
 import os
 import sys
 import argparse
+import subprocess
 # DON\'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, request, send_from_directory
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
-from src.models.evaluation import db
-from src.routes.evaluation import evaluation_bp
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.models.evaluation import db, upgrade_schema
+from src.routes.evaluation import evaluation_bp, verify_admin_token, verify_voter_token, voter_session
+from src.services.uploads import (
+    collect_garbage, GC_GRACE_SECONDS, UPLOAD_SESSION_TTL, DEFAULT_PHOTO_MAX_BYTES, DEFAULT_BATCH_FILES
+)
+from src.services.socket_queue import build_socketio_options
+from src.services.assets import HTML_PAGES, init_assets, render_page
+from src.services.jobs import ADMIN_ROOM
+from src.services.ledger import DEFAULT_SNAPSHOT_INTERVAL, recover_tallies, snapshot_courses
+from src.services.qrcodes import DEFAULT_QR_WORKERS
+from src.services.shards import DEFAULT_IDLE_SECONDS, init_shards, use_row
+from src.services.rooms import (
+    GROUP_ROOM, COURSE_ROOM, room_name, get_room_registry, join_exclusive, leave_kind, release_client,
+    broadcast_vote_stats
+)
+from src.services.http_cache import bump_generation
+from src.services.ratelimit import admitted
+from src.services.voting import VoteError, cast_vote, parse_idempotency_key, verify_identity
 
 DEFAULT_ADMIN_PASSWORD = 'tiandatiankai2025'
 ADMIN_PASSWORD_ENV_KEY = 'EVALUATION_ADMIN_PASSWORD'
+SOCKETIO_QUEUE_ENV_KEY = 'EVALUATION_SOCKETIO_QUEUE'
+DEFAULT_PORT = 5001
 
 
 def resolve_admin_password():
@@ -32,16 +53,70 @@ def resolve_admin_password():
 
     return DEFAULT_ADMIN_PASSWORD
 
+
+def resolve_server_options():
+    """解析端口与工作进程数参数"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--port', dest='port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', dest='workers', type=int, default=1)
+    args, remaining = parser.parse_known_args()
+
+    if remaining != sys.argv[1:]:
+        sys.argv = [sys.argv[0], *remaining]
+
+    return args.port, max(1, args.workers)
+
+
+def default_socketio_queue_url():
+    """多进程部署时默认使用的本机SQLite消息队列"""
+    return f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'socketio_queue.db')}"
+
+
+def run_workers(port, workers):
+    """在连续端口上启动多个工作进程，共享同一个Socket.IO消息队列"""
+    env = dict(os.environ)
+    env.setdefault(SOCKETIO_QUEUE_ENV_KEY, default_socketio_queue_url())
+
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--port', str(port + index), *sys.argv[1:]], env=env)
+        for index in range(workers)
+    ]
+    print(f'已启动 {workers} 个工作进程，端口 {port}-{port + workers - 1}，消息队列 {env[SOCKETIO_QUEUE_ENV_KEY]}')
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'evaluation_system_secret_key_2024'
 app.config['ADMIN_USERNAME'] = 'super'
 app.config['ADMIN_PASSWORD'] = resolve_admin_password()
+SERVER_PORT, SERVER_WORKERS = resolve_server_options()
+
+# 单个请求体的上限（MB），超出时返回413；照片请改用分片上传接口，每个分片另有更小的上限
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('EVALUATION_MAX_REQUEST_MB', '64') or 64) * 1024 * 1024
+# 单张照片的大小上限（MB）与一次选择的照片数量上限
+app.config['PHOTO_MAX_BYTES'] = int(
+    os.environ.get('EVALUATION_PHOTO_MAX_MB', str(DEFAULT_PHOTO_MAX_BYTES // (1024 * 1024)))
+    or DEFAULT_PHOTO_MAX_BYTES // (1024 * 1024)
+) * 1024 * 1024
+app.config['PHOTO_BATCH_FILES'] = int(os.environ.get('EVALUATION_PHOTO_BATCH_FILES', str(DEFAULT_BATCH_FILES)) or DEFAULT_BATCH_FILES)
 
 # 启用CORS
 CORS(app, origins="*")
 
-# 初始化SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*")
+# 初始化SocketIO；配置消息队列后，多个工作进程之间共享房间广播
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get(SOCKETIO_QUEUE_ENV_KEY, '').strip()
+socketio = SocketIO(app, cors_allowed_origins="*", **build_socketio_options(app.config['SOCKETIO_MESSAGE_QUEUE']))
+
+# 部署在反向代理之后时设置可信代理层数，按 X-Forwarded-For 的最后N个地址识别客户端IP（限流按IP计数）；
+# 默认0表示直接使用连接地址，客户端伪造的转发头不起作用。在 SocketIO 之后包装，Socket 连接同样生效
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('EVALUATION_TRUSTED_PROXIES', '0') or 0)
+if app.config['TRUSTED_PROXIES'] > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
 
 # 注册蓝图
 app.register_blueprint(evaluation_bp, url_prefix='/api')
@@ -50,8 +125,90 @@ app.register_blueprint(evaluation_bp, url_prefix='/api')
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
+
+# 课程分库：设为1时新建的课程各自使用 src/database/courses/course_<ID>.db，主库只保存课程目录等全局数据
+app.config['COURSE_SHARDS'] = os.environ.get('EVALUATION_COURSE_SHARDS', '0').strip() == '1'
+app.config['COURSE_SHARD_IDLE_SECONDS'] = int(
+    os.environ.get('EVALUATION_COURSE_SHARD_IDLE_SECONDS', str(DEFAULT_IDLE_SECONDS)) or DEFAULT_IDLE_SECONDS
+)
+init_shards(app)
+
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+    # 由最新快照加回放其后的投票流水恢复各小组统计
+    recover_tallies()
+
+# 后台任务线程数（导入、归档、删除课程等耗时操作）
+app.config['JOB_WORKERS'] = int(os.environ.get('EVALUATION_JOB_WORKERS', '2') or 2)
+
+# 批量生成二维码打印页的渲染进程数（0表示在请求线程中渲染），以及支持中文的字体文件（默认按常见路径查找）
+app.config['QR_WORKERS'] = int(os.environ.get('EVALUATION_QR_WORKERS', str(DEFAULT_QR_WORKERS)) or 0)
+app.config['QR_SHEET_FONT'] = os.environ.get('EVALUATION_QR_FONT', '').strip() or None
+
+# 排名默认计分策略：net / normalized / pools / trimmed，可由 /api/ranking?strategy= 临时指定
+app.config['SCORING_STRATEGY'] = os.environ.get('EVALUATION_SCORING_STRATEGY', 'net').strip() or 'net'
+
+# 启动时把 static/js 下的脚本按页面角色打包、压缩并加上内容指纹（设为0时直接加载源文件，便于调试）
+app.config['ASSET_BUILD'] = os.environ.get('EVALUATION_ASSET_BUILD', '1').strip() != '0'
+init_assets(app)
+
+# 定时清理未被引用的上传文件（秒，0表示仅由管理员手动触发）
+app.config['UPLOAD_GC_INTERVAL'] = int(os.environ.get('EVALUATION_UPLOAD_GC_INTERVAL', '0') or 0)
+
+
+def run_upload_gc():
+    while True:
+        socketio.sleep(app.config['UPLOAD_GC_INTERVAL'])
+        with app.app_context():
+            try:
+                result = collect_garbage(
+                    app.config.get('UPLOAD_GC_GRACE_SECONDS', GC_GRACE_SECONDS),
+                    app.config.get('UPLOAD_SESSION_TTL', UPLOAD_SESSION_TTL)
+                )
+                if result['removed']:
+                    print(f"Upload GC removed {result['removed']} files")
+            except Exception as e:
+                print(f'Upload GC failed: {e}')
+
+
+if app.config['UPLOAD_GC_INTERVAL'] > 0:
+    socketio.start_background_task(run_upload_gc)
+
+# 定时为有新投票流水的课程写入统计快照（秒，0表示仅在启动时和管理员手动触发时写入）
+app.config['LEDGER_SNAPSHOT_INTERVAL'] = int(
+    os.environ.get('EVALUATION_LEDGER_SNAPSHOT_INTERVAL', str(DEFAULT_SNAPSHOT_INTERVAL)) or 0
+)
+
+
+def run_ledger_snapshots():
+    while True:
+        socketio.sleep(app.config['LEDGER_SNAPSHOT_INTERVAL'])
+        with app.app_context():
+            try:
+                snapshot_courses()
+            except Exception as e:
+                db.session.rollback()
+                print(f'Ledger snapshot failed: {e}')
+            finally:
+                db.session.remove()
+
+
+if app.config['LEDGER_SNAPSHOT_INTERVAL'] > 0:
+    socketio.start_background_task(run_ledger_snapshots)
+
+
+def run_shard_idle_close():
+    shards = app.extensions['course_shards']
+    while True:
+        socketio.sleep(max(shards.idle_seconds // 2, 1))
+        closed = shards.close_idle()
+        if closed:
+            print(f'Closed {closed} idle course databases')
+
+
+if app.config['COURSE_SHARDS'] or app.extensions['course_shards'].course_ids():
+    socketio.start_background_task(run_shard_idle_close)
 
 # WebSocket事件处理
 @socketio.on('connect')
@@ -62,22 +219,133 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected')
+    release_client()
+
+def parse_room_target(data, key):
+    try:
+        value = int((data or {}).get(key))
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
 
 @socketio.on('join_group')
 def handle_join_group(data):
-    """加入小组房间，用于接收该小组的实时更新"""
-    group_id = data.get('group_id')
-    if group_id:
+    """加入小组房间，用于接收该小组的实时更新；切换小组时自动离开之前的小组房间"""
+    group_id = parse_room_target(data, 'group_id')
+    if not group_id:
+        return
+    course_id = get_room_registry().course_of_group(group_id, refresh=True)
+    if not course_id:
+        emit('room_error', {'error': '小组不存在', 'group_id': group_id})
+        return
+    join_exclusive(GROUP_ROOM, group_id)
+    emit('joined_group', {'group_id': group_id, 'course_id': course_id})
+
+@socketio.on('leave_group')
+def handle_leave_group(data=None):
+    """离开当前所在的小组房间"""
+    room = leave_kind(GROUP_ROOM)
+    emit('left_group', {'room': room})
+
+@socketio.on('join_course')
+def handle_join_course(data):
+    """加入课程房间（排名页），用于接收课程内任意小组的得分变化"""
+    course_id = parse_room_target(data, 'course_id')
+    if course_id:
+        join_exclusive(COURSE_ROOM, course_id)
+        emit('joined_course', {'course_id': course_id})
+
+@socketio.on('leave_course')
+def handle_leave_course(data=None):
+    """离开当前所在的课程房间"""
+    room = leave_kind(COURSE_ROOM)
+    emit('left_course', {'room': room})
+
+@socketio.on('join_admin')
+def handle_join_admin(data):
+    """管理员加入后台任务进度推送房间"""
+    token = ((data or {}).get('token') or '').strip()
+    if token and verify_admin_token(token):
         from flask_socketio import join_room
-        join_room(f'group_{group_id}')
-        emit('joined_group', {'group_id': group_id})
+        join_room(ADMIN_ROOM)
+        emit('joined_admin', {'room': ADMIN_ROOM})
 
 @socketio.on('vote_update')
 def handle_vote_update(data):
-    """广播投票更新"""
-    group_id = data.get('group_id')
-    if group_id:
-        socketio.emit('vote_updated', data, room=f'group_{group_id}')
+    """广播投票更新：完整统计只发给正在展示该小组的客户端，课程房间只收到排名变化通知
+
+    投票接口已由服务端广播，保留该事件兼容仍在使用旧版页面的手机端。
+    """
+    group_id = parse_room_target(data, 'group_id')
+    if not group_id:
+        return
+    data['group_id'] = group_id
+    socketio.emit('vote_updated', data, room=room_name(GROUP_ROOM, group_id))
+
+    course_id = get_room_registry().course_of_group(group_id)
+    if course_id:
+        socketio.emit('ranking_changed', {'course_id': course_id, 'group_id': group_id},
+                      room=room_name(COURSE_ROOM, course_id))
+
+def vote_error_ack(message, status_code, **extra):
+    """Socket 事件的失败确认，与HTTP接口的错误响应相同，另附状态码"""
+    return dict(extra, error=message, status=status_code)
+
+def rate_limited_ack(retry_after):
+    return vote_error_ack('请求过于频繁，请稍后再试', 429, retry_after=max(1, math.ceil(retry_after)))
+
+@socketio.on('verify_voter')
+def handle_verify_voter(data):
+    """通过已建立的Socket连接验证评价人身份，确认内容与 /api/verify-voter 的响应相同"""
+    data = data if isinstance(data, dict) else {}
+    phone = str(data.get('phone') or '').strip() or None
+    with admitted('verify', phone) as retry_after:
+        if retry_after:
+            return rate_limited_ack(retry_after)
+        use_row(data.get('group_id'))
+        try:
+            voter = verify_identity(data.get('name'), data.get('phone'), data.get('group_id'))
+        except VoteError as e:
+            return vote_error_ack(e.message, e.status_code)
+        return voter_session(voter)
+
+@socketio.on('cast_vote')
+def handle_cast_vote(data):
+    """通过已建立的Socket连接投票，与 /api/vote 共用校验与写入逻辑；成功后由服务端广播统计，客户端无需再发送 vote_update"""
+    data = data if isinstance(data, dict) else {}
+    voter = verify_voter_token(data.get('voter_token'))
+    with admitted('vote', str(voter['voter_id']) if voter else None) as retry_after:
+        if retry_after:
+            return rate_limited_ack(retry_after)
+        if not voter:
+            return vote_error_ack('身份验证已失效，请重新验证', 401)
+        group_id = parse_room_target(data, 'group_id')
+        if not group_id:
+            return vote_error_ack('小组不存在', 404)
+
+        use_row(group_id)
+        try:
+            course_id, created, stats = cast_vote(
+                voter, group_id, data.get('vote_type'), parse_idempotency_key(data.get('idempotency_key'))
+            )
+        except VoteError as e:
+            return vote_error_ack(e.message, e.status_code)
+        if created:
+            bump_generation(course_id)
+            broadcast_vote_stats(course_id, {group_id: stats})
+        return {'message': '投票成功', 'stats': stats}
+
+# 内容不会变化的静态资源（第三方库、按内容哈希命名的上传文件）允许浏览器长期缓存
+IMMUTABLE_STATIC_PREFIXES = ('vendor/', 'uploads/', 'dist/')
+IMMUTABLE_STATIC_MAX_AGE = 30 * 24 * 60 * 60
+
+def serve_page(filename):
+    """返回页面，脚本地址替换为打包后带指纹的文件；页面本身每次校验，发布后立即使用新脚本"""
+    if not os.path.exists(os.path.join(app.static_folder, filename)):
+        return f"{filename} not found", 404
+    response = app.make_response(render_page(filename))
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -86,23 +354,22 @@ def serve(path):
     if static_folder_path is None:
             return "Static folder not configured", 404
 
-    # 特殊处理手机端路由
-    if path in ('mobile', 'm'):
-        mobile_path = os.path.join(static_folder_path, 'mobile.html')
-        if os.path.exists(mobile_path):
-            return send_from_directory(static_folder_path, 'mobile.html')
-        else:
-            return "mobile.html not found", 404
+    # 特殊处理手机端路由；扫码链接带小组参数访问首页时同样返回手机端页面，不加载大屏与后台脚本
+    if path in ('mobile', 'm') or (path == '' and (request.args.get('g') or request.args.get('group'))):
+        return serve_page('mobile.html')
+
+    if path in HTML_PAGES:
+        return serve_page(path)
 
     if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+        if path.startswith(IMMUTABLE_STATIC_PREFIXES):
+            return send_from_directory(static_folder_path, path, max_age=IMMUTABLE_STATIC_MAX_AGE)
         return send_from_directory(static_folder_path, path)
     else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
-
+        return serve_page('index.html')
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=5001, debug=True,  allow_unsafe_werkzeug=True)
+    if SERVER_WORKERS > 1:
+        run_workers(SERVER_PORT, SERVER_WORKERS)
+    else:
+        socketio.run(app, host='0.0.0.0', port=SERVER_PORT, debug=True,  allow_unsafe_werkzeug=True)
@@ -1,8 +1,146 @@
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Table, case, event, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.util import find_tables
 from datetime import datetime
 import json
+import sqlite3
 
-db = SQLAlchemy()
+
+def _statement_tables(mapper, clause):
+    if mapper is not None:
+        return [inspect(mapper).local_table]
+    if isinstance(clause, Table):
+        return [clause]
+    if isinstance(clause, UpdateBase):
+        return [clause.table]
+    if clause is not None:
+        return find_tables(clause, include_aliases=True, include_joins=True)
+    return []
+
+
+class CourseSession(Session):
+    """按当前课程选择数据库：课程有独立的SQLite文件时，课程数据表的读写路由到该文件，其余表（课程目录、任务等）仍使用主库
+
+    当前课程由 g.shard_course_id 指定（见 services/shards.py），未指定或课程没有独立文件时与默认行为一致。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            shards = current_app.extensions.get('course_shards')
+            course_id = g.get('shard_course_id')
+            if shards is not None and course_id and shards.has_shard(course_id):
+                if any(table.name in shards.tables for table in _statement_tables(mapper, clause)):
+                    return shards.engine(course_id)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': CourseSession})
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite默认不检查外键，每个连接都需要单独开启，ON DELETE CASCADE 才会生效"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+# 已有数据库需要补充的列（create_all不会修改已存在的表）：表名 -> [(列名, 列定义)]
+SCHEMA_UPGRADES = {
+    'votes': [('idempotency_key', 'VARCHAR(64)')],
+    'courses': [('archived_at', 'DATETIME')],
+}
+
+
+def _outdated_foreign_key_tables(inspector, metadata):
+    """找出外键删除规则与模型定义不一致的已有表"""
+    outdated = []
+    for table in metadata.sorted_tables:
+        if not table.foreign_keys or not inspector.has_table(table.name):
+            continue
+        expected = {
+            (fk.parent.name, (fk.ondelete or '').upper())
+            for fk in table.foreign_keys
+        }
+        existing = {
+            (column, (fk['options'].get('ondelete') or '').upper())
+            for fk in inspector.get_foreign_keys(table.name)
+            for column in fk['constrained_columns']
+        }
+        if expected != existing:
+            outdated.append(table)
+    return outdated
+
+
+def rebuild_sqlite_foreign_keys(engine=None, metadata=None):
+    """SQLite无法修改已有表的外键，按官方步骤重建表：建新表、复制数据、删旧表、改名"""
+    engine = engine or db.engine
+    if engine.dialect.name != 'sqlite':
+        return []
+
+    outdated = _outdated_foreign_key_tables(inspect(engine), metadata or db.metadata)
+    if not outdated:
+        return []
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        connection.commit()
+        try:
+            for table in outdated:
+                temp_name = f'{table.name}__rebuild'
+                existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+                columns = ', '.join(column.name for column in table.columns if column.name in existing)
+                ddl = str(CreateTable(table).compile(dialect=engine.dialect)).replace(
+                    f'CREATE TABLE {table.name} ', f'CREATE TABLE {temp_name} ', 1
+                )
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS {temp_name}')
+                connection.exec_driver_sql(ddl)
+                connection.exec_driver_sql(f'INSERT INTO {temp_name} ({columns}) SELECT {columns} FROM {table.name}')
+                connection.exec_driver_sql(f'DROP TABLE {table.name}')
+                connection.exec_driver_sql(f'ALTER TABLE {temp_name} RENAME TO {table.name}')
+            connection.commit()
+        finally:
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+            connection.commit()
+
+    return [table.name for table in outdated]
+
+
+def upgrade_schema(engine=None, metadata=None):
+    """为旧版本数据库补充新增的列、索引与外键删除规则；engine、metadata 默认为主库，也用于课程分库"""
+    engine = engine or db.engine
+    metadata = metadata or db.metadata
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, columns in SCHEMA_UPGRADES.items():
+            if not inspector.has_table(table_name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            for column_name, ddl in columns:
+                if column_name not in existing:
+                    connection.exec_driver_sql(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}')
+
+    rebuild_sqlite_foreign_keys(engine, metadata)
+
+    # 为已有的表补建新增的索引（重建的表也在这里恢复索引）
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if inspector.has_table(table.name):
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+
+def dialect_insert(table):
+    """返回当前数据库方言的INSERT构造器，支持ON CONFLICT子句"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
 
 
 class Course(db.Model):
@@ -13,12 +151,14 @@ class Course(db.Model):
     name = db.Column(db.String(120), nullable=False, unique=True)
     description = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=False, nullable=False)
+    archived_at = db.Column(db.DateTime)  # 归档时间，归档后投票明细被替换为最终统计
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    groups = db.relationship('Group', backref='course', lazy=True, cascade='all, delete-orphan')
-    roles = db.relationship('Role', backref='course', lazy=True, cascade='all, delete-orphan')
-    voters = db.relationship('Voter', backref='course', lazy=True, cascade='all, delete-orphan')
-    votes = db.relationship('Vote', backref='course', lazy=True, cascade='all, delete-orphan')
+    # 子表由数据库外键 ON DELETE CASCADE 删除，ORM不再逐行加载
+    groups = db.relationship('Group', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    roles = db.relationship('Role', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    voters = db.relationship('Voter', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    votes = db.relationship('Vote', backref='course', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -26,6 +166,7 @@ class Course(db.Model):
             'name': self.name,
             'description': self.description,
             'is_active': self.is_active,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -35,7 +176,7 @@ class Group(db.Model):
     __tablename__ = 'groups'
 
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     logo = db.Column(db.String(255))  # logo图片路径
     status = db.Column(db.Integer, default=0)  # 0=进行中, 1=已锁定
@@ -43,9 +184,12 @@ class Group(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # 关联关系
-    members = db.relationship('Member', backref='group', lazy=True, cascade='all, delete-orphan')
-    votes = db.relationship('Vote', backref='group', lazy=True, cascade='all, delete-orphan')
-    group_photos = db.relationship('GroupPhoto', backref='group', lazy=True, cascade='all, delete-orphan')
+    members = db.relationship('Member', backref='group', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    votes = db.relationship('Vote', backref='group', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    group_photos = db.relationship('GroupPhoto', backref='group', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    rollups = db.relationship('VoteRollup', backref='group', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    tally = db.relationship('GroupTally', backref='group', lazy=True, uselist=False, cascade='all, delete-orphan',
+                            passive_deletes=True)
     
     def get_photos(self):
         """获取照片列表"""
@@ -65,12 +209,19 @@ class Group(db.Model):
         self.photos = json.dumps(photo_list)
     
     def get_vote_stats(self):
-        """获取投票统计"""
-        likes = sum([vote.vote_weight for vote in self.votes if vote.vote_type == 1])
-        dislikes = sum([vote.vote_weight for vote in self.votes if vote.vote_type == -1])
+        """获取投票统计（聚合查询，不加载投票明细）；列表接口应改用 ledger 的课程统计一次算出全部小组"""
+        likes, dislikes = db.session.query(
+            func.coalesce(func.sum(case((Vote.vote_type == 1, Vote.vote_weight), else_=0)), 0),
+            func.coalesce(func.sum(case((Vote.vote_type == -1, Vote.vote_weight), else_=0)), 0),
+        ).filter(Vote.group_id == self.id).one()
+        # 已归档课程的投票明细被替换为最终统计
+        if self.tally:
+            likes += self.tally.likes
+            dislikes += self.tally.dislikes
         return {'likes': likes, 'dislikes': dislikes, 'total': likes - dislikes}
     
-    def to_dict(self):
+    def to_dict(self, vote_stats=None):
+        """vote_stats 为预先算好的统计，批量输出时由调用方传入，避免逐个小组查询"""
         return {
             'id': self.id,
             'course_id': self.course_id,
@@ -79,7 +230,7 @@ class Group(db.Model):
             'status': self.status,
             'photos': self.get_photos(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'vote_stats': self.get_vote_stats()
+            'vote_stats': vote_stats if vote_stats is not None else self.get_vote_stats()
         }
 
 class Role(db.Model):
@@ -87,7 +238,7 @@ class Role(db.Model):
     __tablename__ = 'roles'
 
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -111,11 +262,19 @@ class Member(db.Model):
     __tablename__ = 'members'
 
     id = db.Column(db.Integer, primary_key=True)
-    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(50), nullable=False)
     company = db.Column(db.String(100))  # 公司名称
     role_id = db.Column(db.Integer, db.ForeignKey('roles.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 支持按小组、职务及姓名/公司前缀检索
+    __table_args__ = (
+        db.Index('ix_members_group_id', 'group_id'),
+        db.Index('ix_members_role_id', 'role_id'),
+        db.Index('ix_members_name', 'name'),
+        db.Index('ix_members_company', 'company'),
+    )
     
     def to_dict(self):
         return {
@@ -134,17 +293,18 @@ class Voter(db.Model):
     __tablename__ = 'voters'
 
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(50), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     weight = db.Column(db.Integer, default=1)  # 评价权重
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # 关联关系
-    votes = db.relationship('Vote', backref='voter', lazy=True)
+    votes = db.relationship('Vote', backref='voter', lazy=True, passive_deletes=True)
 
     __table_args__ = (
         db.UniqueConstraint('course_id', 'phone', name='uq_voter_course_phone'),
+        db.Index('ix_voters_course_name', 'course_id', 'name'),
     )
 
     def has_voted_for_group(self, group_id):
@@ -166,15 +326,40 @@ class Vote(db.Model):
     __tablename__ = 'votes'
 
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
-    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
-    voter_id = db.Column(db.Integer, db.ForeignKey('voters.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id', ondelete='CASCADE'), nullable=False)
+    voter_id = db.Column(db.Integer, db.ForeignKey('voters.id', ondelete='CASCADE'), nullable=False)
     vote_type = db.Column(db.Integer, nullable=False)  # 1=赞, -1=踩
     vote_weight = db.Column(db.Integer, nullable=False)  # 投票时的权重
+    idempotency_key = db.Column(db.String(64))  # 客户端幂等键，用于识别重试请求
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 唯一约束：每个评价人对每个小组只能投一票
-    __table_args__ = (db.UniqueConstraint('group_id', 'voter_id', name='unique_vote_per_group'),)
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'voter_id', name='unique_vote_per_group'),
+        db.Index('ix_votes_course_id', 'course_id'),
+        db.Index('ix_votes_voter_id', 'voter_id'),
+    )
+
+    @classmethod
+    def insert_ignore_conflict(cls, **values):
+        """以单条INSERT ... ON CONFLICT DO NOTHING写入投票，返回是否实际插入"""
+        values.setdefault('created_at', datetime.utcnow())
+        statement = dialect_insert(cls.__table__).values(**values).on_conflict_do_nothing(
+            index_elements=['group_id', 'voter_id']
+        )
+        result = db.session.execute(statement)
+        return result.rowcount == 1
+
+    @classmethod
+    def insert_many_ignore_conflict(cls, rows):
+        """以单条多行INSERT ... ON CONFLICT DO NOTHING写入多张投票，返回实际插入的行数"""
+        if not rows:
+            return 0
+        statement = dialect_insert(cls.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=['group_id', 'voter_id']
+        )
+        return db.session.execute(statement).rowcount
     
     def to_dict(self):
         return {
@@ -195,7 +380,7 @@ class GroupPhoto(db.Model):
     __tablename__ = 'group_photos'
     
     id = db.Column(db.Integer, primary_key=True)
-    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id', ondelete='CASCADE'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     original_name = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -210,3 +395,181 @@ class GroupPhoto(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+
+class VoteRollup(db.Model):
+    """投票分钟级汇总表，用于绘制小组得分趋势"""
+    __tablename__ = 'vote_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id', ondelete='CASCADE'), nullable=False)
+    minute = db.Column(db.Integer, nullable=False)  # UTC时间戳对应的分钟数
+    likes = db.Column(db.Integer, nullable=False, default=0)  # 加权赞数
+    dislikes = db.Column(db.Integer, nullable=False, default=0)  # 加权踩数
+    vote_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'minute', name='uq_rollup_group_minute'),
+        db.Index('ix_rollup_course_minute', 'course_id', 'minute'),
+    )
+
+
+class VoteEvent(db.Model):
+    """投票流水表，只追加不修改：记录每次投票的新增、修改、删除及批量重建基线"""
+    __tablename__ = 'vote_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
+    # 小组、投票被删除后流水仍保留，因此不设外键
+    group_id = db.Column(db.Integer)
+    vote_id = db.Column(db.Integer)
+    voter_id = db.Column(db.Integer)
+    action = db.Column(db.String(10), nullable=False)  # create / update / delete / rebase
+    vote_type = db.Column(db.Integer)
+    vote_weight = db.Column(db.Integer)
+    # 本次变化对小组统计的增量，回放时直接累加
+    likes_delta = db.Column(db.Integer, nullable=False, default=0)
+    dislikes_delta = db.Column(db.Integer, nullable=False, default=0)
+    count_delta = db.Column(db.Integer, nullable=False, default=0)
+    actor = db.Column(db.String(20), nullable=False)  # voter / admin / system
+    reason = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_vote_events_course_id', 'course_id', 'id'),
+        # 流水号单调递增，删除课程后也不会复用
+        {'sqlite_autoincrement': True},
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'course_id': self.course_id,
+            'group_id': self.group_id,
+            'vote_id': self.vote_id,
+            'voter_id': self.voter_id,
+            'action': self.action,
+            'vote_type': self.vote_type,
+            'vote_weight': self.vote_weight,
+            'likes_delta': self.likes_delta,
+            'dislikes_delta': self.dislikes_delta,
+            'count_delta': self.count_delta,
+            'actor': self.actor,
+            'reason': self.reason,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class TallySnapshot(db.Model):
+    """各课程小组统计的快照，记录截至某条流水的累计值，恢复时只需回放其后的流水"""
+    __tablename__ = 'tally_snapshots'
+
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    tallies = db.Column(db.Text, nullable=False, default='{}')  # {小组ID: [赞, 踩, 票数]}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class GroupTally(db.Model):
+    """归档课程的小组最终统计，替代已清除的投票明细"""
+    __tablename__ = 'group_tallies'
+
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+    dislikes = db.Column(db.Integer, nullable=False, default=0)
+    vote_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'group_id': self.group_id,
+            'course_id': self.course_id,
+            'likes': self.likes,
+            'dislikes': self.dislikes,
+            'total': self.likes - self.dislikes,
+            'vote_count': self.vote_count
+        }
+
+
+class CacheGeneration(db.Model):
+    """数据版本计数器，写操作后递增，用于生成读接口的ETag"""
+    __tablename__ = 'cache_generations'
+
+    key = db.Column(db.String(40), primary_key=True)  # global / active / course:<id>
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Job(db.Model):
+    """后台任务表，记录耗时管理操作的状态、进度与结果"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)  # 任务类型，如 import_voters
+    title = db.Column(db.String(200))
+    course_id = db.Column(db.Integer)  # 关联课程（不设外键，课程删除后任务记录仍保留）
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending/running/succeeded/failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # 0-100
+    message = db.Column(db.String(255))
+    result = db.Column(db.Text)  # JSON格式的任务结果
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_jobs_created_at', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'title': self.title,
+            'course_id': self.course_id,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class UploadSession(db.Model):
+    """分片上传会话表，记录每个照片文件已接收的字节数，供断点续传"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    group_id = db.Column(db.Integer, nullable=False)  # 小组可能在课程库中，不设外键
+    course_id = db.Column(db.Integer, nullable=False)
+    original_name = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # 文件总字节数
+    received = db.Column(db.Integer, nullable=False, default=0)  # 已连续写入的字节数
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading/completed
+    filename = db.Column(db.String(255))  # 完成后按内容哈希保存的文件名
+    photo_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_upload_sessions_updated_at', 'updated_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'group_id': self.group_id,
+            'course_id': self.course_id,
+            'original_name': self.original_name,
+            'size': self.size,
+            'received': self.received,
+            'status': self.status,
+            'filename': self.filename,
+            'url': f'/uploads/{self.filename}' if self.filename else None,
+            'photo_id': self.photo_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
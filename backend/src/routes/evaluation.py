@@ -1,25 +1,72 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, g
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from src.models.evaluation import db, Course, Group, Role, Member, Voter, Vote, GroupPhoto
+from src.models.evaluation import db, Course, Group, Role, Member, Voter, Vote, GroupPhoto, Job, UploadSession
+from src.services.ratelimit import rate_limited
+from src.services import timeline, ledger
+from src.services.datagen import (
+    DEFAULT_COUNTS, DEFAULT_DURATION_MINUTES, DataGenerationError, generate_course, validate_counts
+)
+from src.services.scoring import ScoringError, build_ranking, resolve_strategy
+from src.services.deletion import delete_course_rows, delete_group_rows, delete_voter_rows
+from src.services.cloning import CloneError, clone_course
+from src.services.shards import (
+    get_shards, provision_course, release_course_storage, sync_course_storage, use_course, use_row
+)
+from src.services.jobs import get_job_runner
+from src.services.rooms import broadcast_vote_stats, get_room_registry
+from src.services.search import parse_pagination, search_voters, search_members
+from src.services.http_cache import bump_generation, etag_cached, gzip_response
+from src.services.archive import (
+    ArchiveError, archive_course, list_archives, load_archive, resolve_archive_path, restore_archive
+)
+from src.services.qrcodes import SHEET_FORMATS, encode_pages, qrcode_png, qrcode_pngs, render_sheet_pages
+from src.services.voting import VoteError, cast_vote, cast_votes, parse_idempotency_key, verify_identity
+from src.services.streams import get_stream_hub
+from src.services.uploads import (
+    spool_upload, open_spooled_upload, discard_spooled_uploads,
+    store_upload, release_uploads, filename_from_url, collect_garbage,
+    create_upload_sessions, write_chunk, finish_upload, cancel_upload, UploadError,
+    GC_GRACE_SECONDS, UPLOAD_SESSION_TTL, DEFAULT_PHOTO_MAX_BYTES, DEFAULT_BATCH_FILES,
+    DEFAULT_CHUNK_BYTES, DEFAULT_MAX_CHUNK_BYTES
+)
 import os
-from werkzeug.utils import secure_filename
-import uuid
 import pandas as pd
 import openpyxl
 from io import BytesIO
-from datetime import datetime
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
 from functools import wraps
 from urllib.parse import urljoin, urlparse
 
-import qrcode
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.exceptions import RequestEntityTooLarge
 
 evaluation_bp = Blueprint('evaluation', __name__)
 
+# 使用POST但不修改数据的接口，不触发数据版本递增
+READ_ONLY_POST_ENDPOINTS = {'evaluation.admin_login', 'evaluation.admin_logout', 'evaluation.verify_voter'}
+
+# 分片上传的各请求只改动上传会话，照片写入后由接口自行递增数据版本
+UPLOAD_SESSION_ENDPOINTS = {
+    'evaluation.create_photo_uploads', 'evaluation.upload_photo_chunk', 'evaluation.cancel_photo_upload'
+}
+
+# 投票接口只在写入了新投票时由接口自行递增数据版本：幂等重试与重复投票不改变数据，不应使缓存失效
+VOTE_ENDPOINTS = {'evaluation.submit_vote', 'evaluation.submit_votes_batch'}
+
 TOKEN_SALT = 'evaluation-admin-token'
 TOKEN_MAX_AGE = 12 * 60 * 60
 
+# 评价人身份验证通过后签发的投票令牌，只在短时间内有效
+VOTER_TOKEN_SALT = 'evaluation-voter-token'
+VOTER_TOKEN_MAX_AGE = 30 * 60
+
+# 手机端小组信息的缓存秒数
+MOBILE_INFO_MAX_AGE = 5
+
+# 路径或JSON中出现这些行ID时，据此定位课程所在的数据库
+ROW_ID_FIELDS = ('group_id', 'voter_id', 'vote_id', 'role_id')
+
 
 class CourseResolutionError(Exception):
     def __init__(self, message, status_code=400):
@@ -28,11 +75,59 @@ class CourseResolutionError(Exception):
         self.status_code = status_code
 
 
+class VoterImportError(Exception):
+    pass
+
+
+@evaluation_bp.before_request
+def route_course_storage():
+    """启用课程分库时，按请求涉及的课程或数据行选择数据库；只给出课程参数的请求由 resolve_course_from_request 处理"""
+    view_args = request.view_args or {}
+    if 'course_id' in view_args:
+        use_course(view_args['course_id'])
+        return
+
+    data = request.get_json(silent=True) if request.is_json else None
+    for source in (view_args, data if isinstance(data, dict) else {}):
+        for field in ROW_ID_FIELDS:
+            if source.get(field):
+                use_row(source[field])
+                return
+
+
+@evaluation_bp.after_request
+def finalize_response(response):
+    """写操作成功后递增数据版本，并压缩较大的JSON响应"""
+    if (
+        request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+        and response.status_code < 400
+        and request.endpoint not in READ_ONLY_POST_ENDPOINTS
+        and request.endpoint not in UPLOAD_SESSION_ENDPOINTS
+        and request.endpoint not in VOTE_ENDPOINTS
+    ):
+        bump_generation(g.get('generation_course_id'))
+    return gzip_response(response)
+
+
 @evaluation_bp.errorhandler(CourseResolutionError)
+@evaluation_bp.errorhandler(ArchiveError)
+@evaluation_bp.errorhandler(ScoringError)
+@evaluation_bp.errorhandler(CloneError)
+@evaluation_bp.errorhandler(UploadError)
 def handle_course_resolution_error(error):
     return jsonify({'error': error.message}), error.status_code
 
 
+@evaluation_bp.errorhandler(VoteError)
+def handle_vote_error(error):
+    return jsonify(error.to_dict()), error.status_code
+
+
+@evaluation_bp.errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(error):
+    return jsonify({'error': '上传内容超过大小限制'}), 413
+
+
 def ensure_active_course():
     """确保存在一个活动课程，没有则创建默认课程"""
     course = Course.query.filter_by(is_active=True).first()
@@ -44,11 +139,15 @@ def ensure_active_course():
         if not course.is_active:
             course.is_active = True
             db.session.commit()
+            bump_generation()
         return course
 
     default_course = Course(name='默认课程', is_active=True)
     db.session.add(default_course)
+    db.session.flush()
+    provision_course(default_course)
     db.session.commit()
+    bump_generation()
     return default_course
 
 
@@ -71,10 +170,15 @@ def resolve_course_from_request(data=None, allow_default=True):
         course = Course.query.get(course_id)
         if not course:
             raise CourseResolutionError('课程不存在', 404)
+        g.generation_course_id = course.id
+        use_course(course.id)
         return course
 
     if allow_default:
-        return ensure_active_course()
+        course = ensure_active_course()
+        g.generation_course_id = course.id
+        use_course(course.id)
+        return course
 
     raise CourseResolutionError('未指定课程', 400)
 
@@ -90,9 +194,9 @@ def set_active_course(course):
     return course
 
 
-def get_token_serializer():
+def get_token_serializer(salt=TOKEN_SALT):
     secret_key = current_app.config.get('SECRET_KEY', 'evaluation_system_secret_key_2024')
-    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+    return URLSafeTimedSerializer(secret_key, salt=salt)
 
 
 def generate_admin_token(username):
@@ -113,6 +217,42 @@ def verify_admin_token(token):
     return data
 
 
+def generate_voter_token(voter):
+    """签发投票令牌，携带评价人ID、课程ID与权重，投票时无需再查询评价人"""
+    serializer = get_token_serializer(VOTER_TOKEN_SALT)
+    return serializer.dumps({'voter_id': voter.id, 'course_id': voter.course_id, 'weight': voter.weight})
+
+
+def verify_voter_token(token):
+    """校验投票令牌，返回令牌内容，无效或过期时返回None"""
+    if not token or not isinstance(token, str):
+        return None
+
+    serializer = get_token_serializer(VOTER_TOKEN_SALT)
+    try:
+        data = serializer.loads(token, max_age=VOTER_TOKEN_MAX_AGE)
+    except (BadSignature, SignatureExpired):
+        return None
+    return data
+
+
+def voter_rate_identity(data):
+    """按令牌中的评价人限流：每次验证身份都会签发新令牌，不能用令牌字符串区分评价人"""
+    voter = verify_voter_token(data.get('voter_token'))
+    return str(voter['voter_id']) if voter else None
+
+
+def voter_session(voter):
+    """身份验证通过后返回给手机端的评价人信息与投票令牌"""
+    return {
+        'voter_id': voter.id,
+        'name': voter.name,
+        'weight': voter.weight,
+        'voter_token': generate_voter_token(voter),
+        'expires_in': VOTER_TOKEN_MAX_AGE
+    }
+
+
 def admin_required(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -135,9 +275,21 @@ def admin_required(func):
     return wrapper
 
 
+def wants_async(data=None):
+    """请求是否要求以后台任务方式执行（?async=1 或表单/JSON中的 async 字段）"""
+    value = request.args.get('async') or request.form.get('async') or (data or {}).get('async')
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+
+def job_accepted(job):
+    """后台任务已提交的响应"""
+    return jsonify({'message': '任务已提交', 'job': job.to_dict()}), 202
+
+
 # ==================== 课程管理API ====================
 
 @evaluation_bp.route('/courses', methods=['GET'])
+@etag_cached('courses')
 def list_courses():
     """获取课程列表"""
     if Course.query.count() == 0:
@@ -148,6 +300,7 @@ def list_courses():
 
 
 @evaluation_bp.route('/courses/active', methods=['GET'])
+@etag_cached('active-course')
 def get_active_course_info():
     """获取当前激活的课程信息"""
     course = ensure_active_course()
@@ -181,6 +334,8 @@ def create_course():
         db.session.rollback()
         return jsonify({'error': '课程名称已存在'}), 400
 
+    provision_course(course)
+
     if is_active:
         Course.query.filter(Course.id != course.id).update({'is_active': False})
 
@@ -215,6 +370,7 @@ def update_course(course_id):
 
     if 'is_active' in data and bool(data.get('is_active')):
         set_active_course(course)
+        sync_course_storage(course)
         return jsonify(course.to_dict())
 
     try:
@@ -223,6 +379,7 @@ def update_course(course_id):
         db.session.rollback()
         return jsonify({'error': '课程名称已存在'}), 400
 
+    sync_course_storage(course)
     return jsonify(course.to_dict())
 
 
@@ -234,13 +391,70 @@ def delete_course(course_id):
     if not course:
         return jsonify({'error': '课程不存在'}), 404
 
-    db.session.delete(course)
+    if wants_async(request.get_json(silent=True)):
+        return job_accepted(get_job_runner().submit(
+            'delete_course', run_delete_course, course.id, title=f'删除课程「{course.name}」'
+        ))
+
+    remove_course(course)
+    return '', 204
+
+
+def remove_course(course, job=None):
+    """删除课程及其全部数据，提交后清理不再被引用的上传文件"""
+    if job:
+        job.progress(10, message='正在删除课程数据')
+    course_id = course.id
+    use_course(course_id)
+    filenames = delete_course_rows(course_id)
     db.session.commit()
+    release_course_storage(course_id)
+
+    if job:
+        job.progress(80, message='正在清理上传文件')
+    release_uploads(filenames)
 
     if Course.query.count() > 0:
         ensure_active_course()
 
-    return '', 204
+
+def run_delete_course(job, course_id):
+    course = Course.query.get(course_id)
+    if not course:
+        raise ValueError('课程不存在')
+    name = course.name
+    remove_course(course, job)
+    bump_generation()
+    return {'message': f'课程「{name}」已删除', 'course_id': course_id}
+
+
+@evaluation_bp.route('/courses/<int:course_id>/clone', methods=['POST'])
+@admin_required
+def clone_course_data(course_id):
+    """复制课程的职务、小组和评价人，用于同一课程的新一期活动"""
+    source = Course.query.get(course_id)
+    if not source:
+        return jsonify({'error': '课程不存在'}), 404
+
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': '课程名称不能为空'}), 400
+    description = (data.get('description') or '').strip() or source.description
+
+    course, counts = clone_course(
+        source, name, description,
+        members=bool(data.get('members', True)),
+        media=bool(data.get('media', True)),
+        voters=bool(data.get('voters', True)),
+    )
+    if data.get('is_active'):
+        Course.query.filter(Course.id != course.id).update({'is_active': False})
+        course.is_active = True
+
+    db.session.commit()
+    g.generation_course_id = course.id
+    return jsonify({**course.to_dict(), 'counts': counts}), 201
 
 
 @evaluation_bp.route('/courses/<int:course_id>/activate', methods=['POST'])
@@ -255,6 +469,80 @@ def activate_course(course_id):
     return jsonify(activated_course.to_dict())
 
 
+@evaluation_bp.route('/courses/<int:course_id>/archive', methods=['POST'])
+@admin_required
+def archive_course_data(course_id):
+    """归档课程：导出完整数据并以最终统计替换投票明细"""
+    course = Course.query.get(course_id)
+    if not course:
+        return jsonify({'error': '课程不存在'}), 404
+
+    if wants_async(request.get_json(silent=True)):
+        if course.archived_at:
+            return jsonify({'error': '课程已归档'}), 400
+        return job_accepted(get_job_runner().submit(
+            'archive_course', run_archive_course, course.id, title=f'归档课程「{course.name}」', course_id=course.id
+        ))
+
+    result = archive_course(course)
+    result['course'] = course.to_dict()
+    result['message'] = f"课程已归档，共归档 {result['vote_count']} 条投票"
+    return jsonify(result)
+
+
+def run_archive_course(job, course_id):
+    course = Course.query.get(course_id)
+    if not course:
+        raise ValueError('课程不存在')
+    job.progress(10, message='正在导出并归档课程数据')
+    try:
+        result = archive_course(course)
+    except ArchiveError as e:
+        raise ValueError(e.message)
+    result['course'] = course.to_dict()
+    result['message'] = f"课程已归档，共归档 {result['vote_count']} 条投票"
+    return result
+
+
+@evaluation_bp.route('/archives', methods=['GET'])
+@admin_required
+def get_archives():
+    """获取课程归档文件列表"""
+    return jsonify(list_archives())
+
+
+@evaluation_bp.route('/archives/<path:filename>', methods=['GET'])
+@admin_required
+def download_archive(filename):
+    """下载课程归档文件"""
+    path = resolve_archive_path(filename)
+    return send_file(path, as_attachment=True, download_name=os.path.basename(path), mimetype='application/gzip')
+
+
+@evaluation_bp.route('/archives/restore', methods=['POST'])
+@admin_required
+def restore_course_archive():
+    """从归档文件恢复课程数据"""
+    if 'file' in request.files and request.files['file'].filename:
+        payload = load_archive(request.files['file'].stream)
+    else:
+        data = request.get_json(silent=True) or {}
+        with open(resolve_archive_path(data.get('filename')), 'rb') as source:
+            payload = load_archive(source)
+
+    try:
+        course, in_place = restore_archive(payload)
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': '恢复失败：课程中已存在冲突的数据'}), 400
+
+    return jsonify({
+        'message': '课程数据已恢复' if in_place else '已从归档创建新课程',
+        'in_place': in_place,
+        'course': course.to_dict()
+    })
+
+
 def _extract_forwarded_header(header_name):
     """获取首个转发头信息，忽略额外的代理层信息"""
     header_value = (request.headers.get(header_name) or '').strip()
@@ -263,6 +551,11 @@ def _extract_forwarded_header(header_name):
     return header_value.split(',')[0].strip()
 
 
+def _group_mobile_url(origin, group_id):
+    """小组手机端评价页的完整地址，即二维码内容"""
+    return urljoin(origin, f"m?g={group_id}")
+
+
 def _build_request_origin():
     """根据请求和转发头还原包含端口的请求源地址"""
     forwarded_proto = _extract_forwarded_header('X-Forwarded-Proto')
@@ -323,55 +616,95 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'xlsx', 'xls'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def ensure_upload_dir():
-    """确保上传目录存在"""
-    upload_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads')
-    if not os.path.exists(upload_path):
-        os.makedirs(upload_path)
-    return upload_path
-
 # ==================== 后台管理API ====================
 
 @evaluation_bp.route('/groups', methods=['GET'])
+@etag_cached('groups')
 def get_groups():
     """获取所有小组"""
     course = resolve_course_from_request()
-    groups = Group.query.filter_by(course_id=course.id).all() if course else []
-    return jsonify([group.to_dict() for group in groups])
+    if not course:
+        return jsonify([])
+    # 照片与归档统计各一次查询预先加载，投票统计取自课程的统计快照
+    groups = Group.query.filter_by(course_id=course.id).options(
+        selectinload(Group.group_photos), selectinload(Group.tally)
+    ).all()
+    tallies = ledger.get_tally_store().tallies(course.id)
+    return jsonify([group.to_dict(vote_stats=ledger.group_stats(group, tallies)) for group in groups])
+
+@evaluation_bp.route('/groups/<int:group_id>/mobile', methods=['GET'])
+def get_group_mobile_info(group_id):
+    """手机端评价页所需的最小小组信息"""
+    row = db.session.query(Group.id, Group.name, Group.status, Group.course_id, Course.name) \
+        .join(Course, Course.id == Group.course_id) \
+        .filter(Group.id == group_id) \
+        .first()
+    if not row:
+        return jsonify({'error': '小组不存在'}), 404
+
+    response = jsonify({
+        'id': row[0],
+        'name': row[1],
+        'status': row[2],
+        'course_id': row[3],
+        'course_name': row[4]
+    })
+    # 短时缓存：扫码高峰期同一小组的请求可由浏览器/代理直接命中
+    response.headers['Cache-Control'] = f'public, max-age={MOBILE_INFO_MAX_AGE}'
+    return response
 
 @evaluation_bp.route('/groups/<int:group_id>/qrcode', methods=['GET'])
+@rate_limited('qrcode')
 def get_group_qrcode(group_id):
     """生成指定小组的手机端访问二维码"""
     Group.query.get_or_404(group_id)
 
     requested_url = (request.args.get('url') or '').strip()
-    if requested_url:
-        target_url = requested_url
-    else:
-        mobile_path = f"m?g={group_id}"
-        base_origin = _build_request_origin()
-        target_url = urljoin(base_origin, mobile_path)
-
-    qr = qrcode.QRCode(
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=2,
-    )
-    qr.add_data(target_url)
-    qr.make(fit=True)
-
-    qr_image = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    qr_image.save(buffer, format='PNG')
-    buffer.seek(0)
+    target_url = requested_url or _group_mobile_url(_build_request_origin(), group_id)
 
-    response = send_file(buffer, mimetype='image/png')
+    response = send_file(BytesIO(qrcode_png(target_url)), mimetype='image/png')
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
     return response
 
+@evaluation_bp.route('/courses/<int:course_id>/qrcodes', methods=['GET'])
+@admin_required
+def get_course_qrcode_sheet(course_id):
+    """生成课程全部小组的二维码打印页：format=pdf（默认，全部页面）或 png（按 page 逐页）
+
+    二维码按链接缓存，未命中的在进程池中并行渲染。
+    """
+    sheet_format = (request.args.get('format') or 'pdf').strip().lower()
+    if sheet_format not in SHEET_FORMATS:
+        return jsonify({'error': '不支持的格式，可选 pdf 或 png'}), 400
+    try:
+        page_number = int(request.args.get('page') or 1)
+    except ValueError:
+        return jsonify({'error': '页码无效'}), 400
+
+    course = Course.query.get(course_id)
+    if not course:
+        return jsonify({'error': '课程不存在'}), 404
+
+    groups = db.session.query(Group.id, Group.name).filter_by(course_id=course.id).order_by(Group.id).all()
+    origin = _build_request_origin()
+    images = qrcode_pngs([_group_mobile_url(origin, group_id) for group_id, _ in groups])
+    pages = render_sheet_pages(course.name, [(name, png) for (_, name), png in zip(groups, images)])
+    if not 1 <= page_number <= len(pages):
+        return jsonify({'error': '页码超出范围'}), 400
+
+    content = encode_pages(pages, sheet_format, page_number)
+    if sheet_format == 'pdf':
+        response = send_file(BytesIO(content), mimetype='application/pdf', as_attachment=True,
+                             download_name=f'{course.name}-小组二维码.pdf')
+    else:
+        response = send_file(BytesIO(content), mimetype='image/png',
+                             download_name=f'{course.name}-小组二维码-{page_number}.png')
+    response.headers['X-Total-Pages'] = str(len(pages))
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @evaluation_bp.route('/groups', methods=['POST'])
 @admin_required
 def create_group():
@@ -401,6 +734,7 @@ def update_group(group_id):
 
     # 忽略课程变更
     data.pop('course_id', None)
+    previous_logo = group.logo
     
     group.name = data.get('name', group.name)
     group.logo = data.get('logo', group.logo)
@@ -409,6 +743,8 @@ def update_group(group_id):
         group.set_photos(data['photos'])
     
     db.session.commit()
+    if previous_logo != group.logo:
+        release_uploads([filename_from_url(previous_logo)])
     return jsonify(group.to_dict())
 
 @evaluation_bp.route('/groups/<int:group_id>', methods=['DELETE'])
@@ -416,8 +752,10 @@ def update_group(group_id):
 def delete_group(group_id):
     """删除小组"""
     group = Group.query.get_or_404(group_id)
-    db.session.delete(group)
+    g.generation_course_id = group.course_id
+    filenames = delete_group_rows(group.id)
     db.session.commit()
+    release_uploads(filenames)
     return '', 204
 
 @evaluation_bp.route('/groups/<int:group_id>/lock', methods=['POST'])
@@ -433,6 +771,7 @@ def lock_group(group_id):
 # ==================== 职务管理API ====================
 
 @evaluation_bp.route('/roles', methods=['GET'])
+@etag_cached('roles')
 def get_roles():
     """获取所有职务"""
     course = resolve_course_from_request()
@@ -466,6 +805,8 @@ def create_role():
 def delete_role(role_id):
     """删除职务"""
     role = Role.query.get_or_404(role_id)
+    if Member.query.filter_by(role_id=role.id).first():
+        return jsonify({'error': '该职务下仍有成员，无法删除'}), 400
     db.session.delete(role)
     db.session.commit()
     return '', 204
@@ -476,7 +817,7 @@ def delete_role(role_id):
 def get_group_members(group_id):
     """获取小组成员"""
     group = Group.query.get_or_404(group_id)
-    members = Member.query.filter_by(group_id=group_id).all()
+    members = Member.query.filter_by(group_id=group_id).options(joinedload(Member.role)).all()
     return jsonify([member.to_dict() for member in members])
 
 @evaluation_bp.route('/groups/<int:group_id>/members', methods=['POST'])
@@ -606,6 +947,21 @@ def bulk_replace_group_members(group_id):
         db.session.rollback()
         return jsonify({'error': f'批量保存失败: {str(e)}'}), 500
 
+@evaluation_bp.route('/members/search', methods=['GET'])
+@admin_required
+def search_course_members():
+    """分页检索课程成员（姓名、公司或职务前缀）"""
+    course = resolve_course_from_request()
+    try:
+        page, page_size = parse_pagination(request.args)
+        role_id = int(request.args.get('role_id') or 0) or None
+        group_id = int(request.args.get('group_id') or 0) or None
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的查询参数'}), 400
+
+    keyword = (request.args.get('q') or '').strip()
+    return jsonify(search_members(course.id, keyword, page, page_size, role_id=role_id, group_id=group_id))
+
 @evaluation_bp.route('/groups/<int:group_id>/members/<int:member_id>', methods=['PUT'])
 @admin_required
 def update_group_member(group_id, member_id):
@@ -654,6 +1010,19 @@ def get_voters():
     voters = Voter.query.filter_by(course_id=course.id).all() if course else []
     return jsonify([voter.to_dict() for voter in voters])
 
+@evaluation_bp.route('/voters/search', methods=['GET'])
+@admin_required
+def search_course_voters():
+    """分页检索评价人（姓名或手机号前缀）"""
+    course = resolve_course_from_request()
+    try:
+        page, page_size = parse_pagination(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    keyword = (request.args.get('q') or '').strip()
+    return jsonify(search_voters(course.id, keyword, page, page_size))
+
 @evaluation_bp.route('/voters', methods=['POST'])
 @admin_required
 def create_voter():
@@ -729,7 +1098,8 @@ def update_voter(voter_id):
 def delete_voter(voter_id):
     """删除评价人"""
     voter = Voter.query.get_or_404(voter_id)
-    db.session.delete(voter)
+    g.generation_course_id = voter.course_id
+    delete_voter_rows(voter.id)
     db.session.commit()
     return '', 204
 
@@ -747,69 +1117,93 @@ def import_voters():
     if not file or not allowed_file(file.filename):
         return jsonify({'error': '文件格式不支持，请上传Excel文件(.xlsx或.xls)'}), 400
 
-    try:
-        form_data = request.form.to_dict()
-        course = resolve_course_from_request(form_data)
+    form_data = request.form.to_dict()
+    course = resolve_course_from_request(form_data)
+
+    if wants_async(form_data):
+        return job_accepted(get_job_runner().submit(
+            'import_voters', run_import_voters, course.id, file.read(),
+            title=f'导入评价人（{file.filename}）', course_id=course.id
+        ))
 
+    try:
         # 读取Excel文件
         df = pd.read_excel(file)
-        
-        # 验证必需的列
-        required_columns = ['姓名', '手机号']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return jsonify({'error': f'Excel文件缺少必需的列: {", ".join(missing_columns)}'}), 400
-        
-        # 处理数据
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for index, row in df.iterrows():
-            try:
-                name = str(row['姓名']).strip()
-                phone = str(row['手机号']).strip()
-                weight = int(row.get('权重', 1))  # 默认权重为1
-                
-                if not name or not phone:
-                    errors.append(f'第{index+2}行: 姓名或手机号为空')
-                    error_count += 1
-                    continue
-                
-                # 检查是否已存在
-                existing_voter = Voter.query.filter_by(phone=phone, course_id=course.id).first()
-                if existing_voter:
-                    errors.append(f'第{index+2}行: 手机号{phone}已存在')
-                    error_count += 1
-                    continue
-
-                # 创建新评价人
-                voter = Voter(course_id=course.id, name=name, phone=phone, weight=weight)
-                db.session.add(voter)
-                success_count += 1
-                
-            except Exception as e:
-                errors.append(f'第{index+2}行: {str(e)}')
-                error_count += 1
-        
-        db.session.commit()
-        
-        result = {
-            'success_count': success_count,
-            'error_count': error_count,
-            'errors': errors[:10]  # 只返回前10个错误
-        }
-        
-        if error_count > 0:
-            result['message'] = f'导入完成，成功{success_count}条，失败{error_count}条'
-        else:
-            result['message'] = f'导入成功，共{success_count}条记录'
-        
-        return jsonify(result)
-        
+        return jsonify(import_voters_frame(course.id, df))
+    except VoterImportError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'文件处理失败: {str(e)}'}), 500
 
+
+def import_voters_frame(course_id, df, job=None):
+    """将Excel数据写入评价人表，返回导入结果"""
+    # 验证必需的列
+    required_columns = ['姓名', '手机号']
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise VoterImportError(f'Excel文件缺少必需的列: {", ".join(missing_columns)}')
+
+    # 处理数据
+    success_count = 0
+    error_count = 0
+    errors = []
+    # 一次取出课程已有的手机号，避免逐行查询
+    existing_phones = {phone for (phone,) in db.session.query(Voter.phone).filter_by(course_id=course_id)}
+    total = len(df.index)
+
+    for position, (index, row) in enumerate(df.iterrows()):
+        if job and position % 200 == 0:
+            job.progress(position, total, f'已处理 {position}/{total} 行')
+        try:
+            name = str(row['姓名']).strip()
+            phone = str(row['手机号']).strip()
+            weight = int(row.get('权重', 1))  # 默认权重为1
+
+            if not name or not phone:
+                errors.append(f'第{index+2}行: 姓名或手机号为空')
+                error_count += 1
+                continue
+
+            # 检查是否已存在
+            if phone in existing_phones:
+                errors.append(f'第{index+2}行: 手机号{phone}已存在')
+                error_count += 1
+                continue
+
+            # 创建新评价人
+            voter = Voter(course_id=course_id, name=name, phone=phone, weight=weight)
+            db.session.add(voter)
+            existing_phones.add(phone)
+            success_count += 1
+
+        except Exception as e:
+            errors.append(f'第{index+2}行: {str(e)}')
+            error_count += 1
+
+    db.session.commit()
+
+    result = {
+        'success_count': success_count,
+        'error_count': error_count,
+        'errors': errors[:10]  # 只返回前10个错误
+    }
+
+    if error_count > 0:
+        result['message'] = f'导入完成，成功{success_count}条，失败{error_count}条'
+    else:
+        result['message'] = f'导入成功，共{success_count}条记录'
+
+    return result
+
+
+def run_import_voters(job, course_id, content):
+    job.progress(0, message='正在读取Excel文件')
+    df = pd.read_excel(BytesIO(content))
+    return import_voters_frame(course_id, df, job)
+
 @evaluation_bp.route('/voters/template', methods=['GET'])
 @admin_required
 def download_voters_template():
@@ -859,82 +1253,65 @@ def download_voters_template():
 # ==================== 投票相关API ====================
 
 @evaluation_bp.route('/verify-voter', methods=['POST'])
+@rate_limited('verify', identity_field='phone')
 def verify_voter():
     """验证评价人身份"""
     data = request.get_json() or {}
-    name = (data.get('name') or '').strip()
-    phone = (data.get('phone') or '').strip()
-    group_id = data.get('group_id')
-
-    group = Group.query.get(group_id)
-    if not group:
-        return jsonify({'error': '小组不存在'}), 404
+    voter = verify_identity(data.get('name'), data.get('phone'), data.get('group_id'))
+    return jsonify(voter_session(voter))
 
-    voter = Voter.query.filter_by(name=name, phone=phone, course_id=group.course_id).first()
+@evaluation_bp.route('/vote', methods=['POST'])
+@rate_limited('vote', identity_from=voter_rate_identity)
+def submit_vote():
+    """提交投票，评价人身份取自 verify-voter 签发的令牌，不再查询评价人"""
+    data = request.get_json() or {}
+    voter = verify_voter_token(data.get('voter_token'))
     if not voter:
-        return jsonify({'error': '用户信息验证失败'}), 400
+        return jsonify({'error': '身份验证已失效，请重新验证'}), 401
 
-    if group.status == 1:
-        return jsonify({'error': '该小组评价已结束'}), 400
+    idempotency_key = parse_idempotency_key(request.headers.get('Idempotency-Key'), data.get('idempotency_key'))
+    course_id, created, stats = cast_vote(voter, data.get('group_id'), data.get('vote_type'), idempotency_key)
+    if created:
+        bump_generation(course_id)
+        # 手机端在Socket不可用时才改用HTTP，由服务端广播，不依赖客户端再发送 vote_update
+        broadcast_vote_stats(course_id, {int(data['group_id']): stats})
 
-    # 检查是否已投票
-    if voter.has_voted_for_group(group_id):
-        return jsonify({'error': '您已经为该小组投过票了'}), 400
-    
     return jsonify({
-        'voter_id': voter.id,
-        'name': voter.name,
-        'weight': voter.weight
+        'message': '投票成功',
+        'stats': stats
     })
 
-@evaluation_bp.route('/vote', methods=['POST'])
-def submit_vote():
-    """提交投票"""
+@evaluation_bp.route('/vote/batch', methods=['POST'])
+@rate_limited('vote', identity_from=voter_rate_identity)
+def submit_votes_batch():
+    """评价人凭投票令牌一次提交同一课程多个小组的投票，服务端为每个小组推送一次统计"""
     data = request.get_json() or {}
-    voter_id = data.get('voter_id')
-    group_id = data.get('group_id')
-    vote_type = data.get('vote_type')  # 1=赞, -1=踩
-
-    voter = Voter.query.get(voter_id)
-    group = Group.query.get(group_id)
-
-    if not voter or not group:
-        return jsonify({'error': '数据不存在'}), 404
-
-    if voter.course_id != group.course_id:
-        return jsonify({'error': '评价人与小组不在同一课程中'}), 400
-
-    if group.status == 1:
-        return jsonify({'error': '该小组评价已结束'}), 400
+    voter = verify_voter_token(data.get('voter_token'))
+    if not voter:
+        return jsonify({'error': '身份验证已失效，请重新验证'}), 401
 
-    if voter.has_voted_for_group(group_id):
-        return jsonify({'error': '您已经投过票了'}), 400
+    # 请求中没有可定位数据库的行ID，按令牌中的课程选择
+    use_course(voter['course_id'])
+    idempotency_key = parse_idempotency_key(request.headers.get('Idempotency-Key'), data.get('idempotency_key'))
+    results = cast_votes(voter, data.get('votes'), idempotency_key)
+    created_stats = {group_id: stats for group_id, created, stats in results if created}
+    if created_stats:
+        bump_generation(voter['course_id'])
+        broadcast_vote_stats(voter['course_id'], created_stats)
 
-    # 创建投票记录
-    vote = Vote(
-        course_id=group.course_id,
-        group_id=group_id,
-        voter_id=voter_id,
-        vote_type=vote_type,
-        vote_weight=voter.weight
-    )
-    
-    db.session.add(vote)
-    db.session.commit()
-    
-    # 获取更新后的统计数据
-    stats = group.get_vote_stats()
-    
     return jsonify({
         'message': '投票成功',
-        'stats': stats
+        'votes': [
+            {'group_id': group_id, 'created': created, 'stats': stats}
+            for group_id, created, stats in results
+        ]
     })
 
 @evaluation_bp.route('/groups/<int:group_id>/stats', methods=['GET'])
 def get_group_stats(group_id):
     """获取小组投票统计"""
     group = Group.query.get_or_404(group_id)
-    return jsonify(group.get_vote_stats())
+    return jsonify(ledger.group_stats(group))
 
 # ==================== 投票数据管理API ====================
 
@@ -946,7 +1323,7 @@ def get_votes():
 
     course = resolve_course_from_request()
 
-    query = Vote.query.filter_by(course_id=course.id)
+    query = Vote.query.filter_by(course_id=course.id).options(joinedload(Vote.voter), joinedload(Vote.group))
     if group_id:
         query = query.filter_by(group_id=group_id)
 
@@ -959,13 +1336,16 @@ def update_vote(vote_id):
     """更新投票数据"""
     vote = Vote.query.get_or_404(vote_id)
     data = request.get_json()
+    old_type, old_weight = vote.vote_type, vote.vote_weight
     
     # 更新投票类型和权重
     if 'vote_type' in data:
         vote.vote_type = data['vote_type']
     if 'vote_weight' in data:
         vote.vote_weight = data['vote_weight']
-    
+
+    timeline.apply_vote_change(vote, old_type, old_weight)
+    ledger.record_vote_changed(vote, old_type, old_weight)
     db.session.commit()
     return jsonify(vote.to_dict())
 
@@ -974,6 +1354,8 @@ def update_vote(vote_id):
 def delete_vote(vote_id):
     """删除投票数据"""
     vote = Vote.query.get_or_404(vote_id)
+    timeline.apply_vote_delta(vote.course_id, vote.group_id, vote.created_at, vote.vote_type, vote.vote_weight, sign=-1)
+    ledger.record_votes_deleted(Vote.id == vote.id)
     db.session.delete(vote)
     db.session.commit()
     return '', 204
@@ -988,12 +1370,16 @@ def batch_update_votes():
     try:
         for update in updates:
             vote_id = update.get('id')
+            use_row(vote_id)
             vote = Vote.query.get(vote_id)
             if vote:
+                old_type, old_weight = vote.vote_type, vote.vote_weight
                 if 'vote_type' in update:
                     vote.vote_type = update['vote_type']
                 if 'vote_weight' in update:
                     vote.vote_weight = update['vote_weight']
+                timeline.apply_vote_change(vote, old_type, old_weight)
+                ledger.record_vote_changed(vote, old_type, old_weight)
         
         db.session.commit()
         return jsonify({'message': f'成功更新 {len(updates)} 条投票数据'})
@@ -1005,31 +1391,101 @@ def batch_update_votes():
 # ==================== 排名API ====================
 
 @evaluation_bp.route('/ranking', methods=['GET'])
+@etag_cached('ranking')
 def get_ranking():
-    """获取排名"""
+    """获取排名，可通过 strategy 参数选择计分策略"""
     course = resolve_course_from_request()
-    groups = Group.query.filter_by(course_id=course.id).all() if course else []
-    ranking_data = []
-    
-    for group in groups:
-        stats = group.get_vote_stats()
-        ranking_data.append({
-            'id': group.id,
-            'name': group.name,
-            'logo': group.logo,
-            'likes': stats['likes'],
-            'dislikes': stats['dislikes'],
-            'total_score': stats['total']
-        })
-    
-    # 按总分排序
-    ranking_data.sort(key=lambda x: x['total_score'], reverse=True)
-    
-    # 添加排名
-    for i, item in enumerate(ranking_data):
-        item['rank'] = i + 1
-    
-    return jsonify(ranking_data)
+    return jsonify(build_ranking(course.id, resolve_strategy(request.args.get('strategy'))))
+
+@evaluation_bp.route('/courses/<int:course_id>/stream', methods=['GET'])
+def stream_course(course_id):
+    """以SSE推送课程的小组统计（tally）与排名（ranking），供无法使用Socket.IO的展示终端订阅
+
+    所有订阅者共用同一份事件，不各自查询；断线重连时按 Last-Event-ID 补发错过的事件。
+    """
+    if not db.session.query(Course.id).filter_by(id=course_id).first():
+        return jsonify({'error': '课程不存在'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    events = get_stream_hub().subscribe(course_id, last_event_id)
+    response = current_app.response_class(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # 禁止反向代理缓冲，事件立即送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# ==================== 得分趋势API ====================
+
+@evaluation_bp.route('/timeline', methods=['GET'])
+@admin_required
+def get_score_timeline():
+    """获取各小组得分随时间变化的曲线（基于分钟级汇总）"""
+    course = resolve_course_from_request()
+
+    try:
+        resolution = int(request.args.get('resolution') or 0)
+        max_points = int(request.args.get('points') or timeline.DEFAULT_MAX_POINTS)
+        group_id = int(request.args.get('group_id') or 0) or None
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的查询参数'}), 400
+
+    resolution = timeline.resolve_resolution(course.id, resolution, max_points)
+    return jsonify({
+        'course_id': course.id,
+        'resolution': resolution,
+        'groups': timeline.build_timeline(course.id, resolution, group_id)
+    })
+
+
+@evaluation_bp.route('/timeline/rebuild', methods=['POST'])
+@admin_required
+def rebuild_score_timeline():
+    """根据投票记录重建得分趋势汇总"""
+    data = request.get_json(silent=True) or {}
+    course = resolve_course_from_request(data)
+
+    count = timeline.rebuild_rollups(course.id)
+    db.session.commit()
+    return jsonify({'message': f'已重建 {count} 条汇总记录', 'count': count})
+
+# ==================== 投票流水API ====================
+
+@evaluation_bp.route('/vote-events', methods=['GET'])
+@admin_required
+def get_vote_events():
+    """按流水号倒序查询投票的新增、修改与删除记录"""
+    course = resolve_course_from_request()
+
+    try:
+        group_id = int(request.args.get('group_id') or 0) or None
+        vote_id = int(request.args.get('vote_id') or 0) or None
+        before = int(request.args.get('before') or 0) or None
+        limit = min(max(int(request.args.get('limit') or 50), 1), 500)
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的查询参数'}), 400
+
+    events = ledger.list_events(course.id, group_id=group_id, vote_id=vote_id, before=before, limit=limit)
+    return jsonify({
+        'course_id': course.id,
+        'events': [event.to_dict() for event in events],
+        'next_before': events[-1].id if len(events) == limit else None
+    })
+
+
+@evaluation_bp.route('/vote-events/snapshot', methods=['POST'])
+@admin_required
+def snapshot_vote_events():
+    """立即为课程写入统计快照；rebase 为真时改为按投票记录重新计算基线"""
+    data = request.get_json(silent=True) or {}
+    course = resolve_course_from_request(data)
+    g.generation_course_id = course.id
+
+    if data.get('rebase'):
+        event_id = ledger.rebase_course(course.id, 'admin')
+        db.session.commit()
+    else:
+        event_id = ledger.get_tally_store().snapshot(course.id)
+    return jsonify({'message': '统计快照已更新', 'course_id': course.id, 'last_event_id': event_id})
 
 # ==================== 小组照片管理API ====================
 
@@ -1037,58 +1493,178 @@ def get_ranking():
 @admin_required
 def upload_group_photos(group_id):
     """上传小组风采照片"""
+    group = Group.query.get_or_404(group_id)
+
+    if 'photos' not in request.files:
+        return jsonify({'error': '没有选择文件'}), 400
+
+    uploads = request.files.getlist('photos')
+    if not uploads or all(file.filename == '' for file in uploads):
+        return jsonify({'error': '没有选择文件'}), 400
+
+    # 只处理允许的图片类型
+    files = [file for file in uploads if file and file.filename and allowed_file(file.filename)]
+    limits = photo_upload_limits()
+    if len(files) > limits['max_files']:
+        return jsonify({'error': f"单次最多上传 {limits['max_files']} 个文件"}), 400
+
+    if wants_async():
+        # 请求结束后上传流即被关闭，先转存为临时文件，哈希与入库交给后台任务
+        spooled = [(spool_upload(file), file.filename) for file in files]
+        return job_accepted(get_job_runner().submit(
+            'upload_photos', run_store_group_photos, group.id, spooled, limits['max_file_bytes'],
+            title=f'上传「{group.name}」风采照片', course_id=group.course_id
+        ))
+
     try:
-        group = Group.query.get_or_404(group_id)
-        
-        if 'photos' not in request.files:
-            return jsonify({'error': '没有选择文件'}), 400
-        
-        files = request.files.getlist('photos')
-        if not files or all(file.filename == '' for file in files):
-            return jsonify({'error': '没有选择文件'}), 400
-        
-        uploaded_photos = []
-        upload_path = ensure_upload_dir()
-        
-        for file in files:
-            if file and file.filename:
-                # 检查文件类型
-                if not allowed_file(file.filename):
-                    continue
-                
-                # 生成安全的文件名
-                filename = secure_filename(file.filename)
-                timestamp = int(datetime.now().timestamp())
-                filename = f"group_{group_id}_{timestamp}_{filename}"
-                
-                # 保存文件
-                file_path = os.path.join(upload_path, filename)
-                file.save(file_path)
-                
-                # 保存到数据库
-                photo = GroupPhoto(
-                    group_id=group_id,
-                    filename=filename,
-                    original_name=file.filename
-                )
-                db.session.add(photo)
-                uploaded_photos.append({
-                    'filename': filename,
-                    'original_name': file.filename,
-                    'url': f'/uploads/{filename}'
-                })
-        
-        db.session.commit()
-        
+        uploaded_photos = store_group_photos(
+            group, [(file, file.filename) for file in files], max_bytes=limits['max_file_bytes']
+        )
         return jsonify({
             'message': f'成功上传 {len(uploaded_photos)} 张照片',
             'photos': uploaded_photos
         })
-        
+    except UploadError:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+def store_group_photos(group, files, job=None, max_bytes=None):
+    """保存照片文件并写入小组照片表，files 为 (FileStorage, 原始文件名) 列表"""
+    uploaded_photos = []
+    existing_filenames = {photo.filename for photo in group.group_photos}
+
+    for position, (file, original_name) in enumerate(files):
+        if job:
+            job.progress(position, len(files), f'正在处理第 {position + 1}/{len(files)} 张照片')
+
+        # 按内容哈希保存，相同照片只存一份
+        filename = store_upload(file, max_bytes)
+        if filename in existing_filenames:
+            continue
+        existing_filenames.add(filename)
+
+        # 保存到数据库
+        photo = GroupPhoto(
+            group_id=group.id,
+            filename=filename,
+            original_name=original_name
+        )
+        db.session.add(photo)
+        uploaded_photos.append({
+            'filename': filename,
+            'original_name': original_name,
+            'url': f'/uploads/{filename}'
+        })
+
+    db.session.commit()
+    return uploaded_photos
+
+
+def run_store_group_photos(job, group_id, spooled, max_bytes=None):
+    try:
+        group = Group.query.get(group_id)
+        if not group:
+            raise ValueError('小组不存在')
+        files = [(open_spooled_upload(path, original_name), original_name) for path, original_name in spooled]
+        try:
+            photos = store_group_photos(group, files, job, max_bytes)
+        finally:
+            for file, _ in files:
+                file.close()
+        return {'message': f'成功上传 {len(photos)} 张照片', 'photos': photos}
+    finally:
+        discard_spooled_uploads(path for path, _ in spooled)
+
+
+def photo_upload_limits():
+    """照片上传的大小与数量限制，分片接口的建议分片大小不超过单个分片请求的上限"""
+    config = current_app.config
+    max_chunk_bytes = config.get('PHOTO_MAX_CHUNK_BYTES', DEFAULT_MAX_CHUNK_BYTES)
+    return {
+        'max_file_bytes': config.get('PHOTO_MAX_BYTES', DEFAULT_PHOTO_MAX_BYTES),
+        'max_files': config.get('PHOTO_BATCH_FILES', DEFAULT_BATCH_FILES),
+        'chunk_size': min(config.get('PHOTO_CHUNK_BYTES', DEFAULT_CHUNK_BYTES), max_chunk_bytes),
+        'max_chunk_bytes': max_chunk_bytes,
+    }
+
+
+@evaluation_bp.route('/groups/<int:group_id>/photos/uploads', methods=['POST'])
+@admin_required
+def create_photo_uploads(group_id):
+    """为一批照片建立分片上传会话，之后按 chunk_size 分片 PUT 到 /api/photo-uploads/<ID>"""
+    group = Group.query.get_or_404(group_id)
+    data = request.get_json(silent=True) or {}
+    items = data.get('files')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': '没有选择文件'}), 400
+
+    files = []
+    for item in items:
+        name = str(item.get('name') or '').strip() if isinstance(item, dict) else ''
+        if not name or not allowed_file(name):
+            return jsonify({'error': f'文件类型不支持：{name}'}), 400
+        try:
+            size = int(item.get('size'))
+        except (TypeError, ValueError):
+            return jsonify({'error': f'文件「{name}」的大小无效'}), 400
+        files.append((name, size))
+
+    limits = photo_upload_limits()
+    uploads = create_upload_sessions(group, files, limits['max_file_bytes'], limits['max_files'])
+    return jsonify({'uploads': [upload.to_dict() for upload in uploads], **limits}), 201
+
+
+def get_upload_session_or_404(upload_id):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None:
+        raise UploadError('上传会话不存在或已过期', 404)
+    return upload
+
+
+@evaluation_bp.route('/photo-uploads/<upload_id>', methods=['GET'])
+@admin_required
+def get_photo_upload(upload_id):
+    """查询分片上传进度，断线后从 received 处继续上传"""
+    return jsonify(get_upload_session_or_404(upload_id).to_dict())
+
+
+@evaluation_bp.route('/photo-uploads/<upload_id>', methods=['PUT'])
+@admin_required
+def upload_photo_chunk(upload_id):
+    """写入一个分片（请求体为原始字节，offset 为其在文件中的位置）；最后一个分片写入后照片立即入库"""
+    upload = get_upload_session_or_404(upload_id)
+    if upload.status == 'completed':
+        return jsonify(upload.to_dict())
+
+    try:
+        offset = int(request.args.get('offset', ''))
+    except (TypeError, ValueError):
+        return jsonify({'error': '缺少分片位置'}), 400
+    if offset != upload.received:
+        return jsonify({'error': '分片位置与已接收的进度不一致', **upload.to_dict()}), 409
+
+    request.max_content_length = photo_upload_limits()['max_chunk_bytes']
+    use_course(upload.course_id)
+    received = write_chunk(upload, offset, request.stream)
+    if received < upload.size:
+        return jsonify(upload.to_dict())
+
+    photo = finish_upload(upload)
+    bump_generation(upload.course_id)
+    return jsonify({**upload.to_dict(), 'photo': photo.to_dict()})
+
+
+@evaluation_bp.route('/photo-uploads/<upload_id>', methods=['DELETE'])
+@admin_required
+def cancel_photo_upload(upload_id):
+    """取消分片上传；已完成的上传只删除会话记录，照片保留"""
+    cancel_upload(get_upload_session_or_404(upload_id))
+    return jsonify({'message': '已取消上传'})
+
 @evaluation_bp.route('/groups/<int:group_id>/photos', methods=['GET'])
 @admin_required
 def get_group_photos(group_id):
@@ -1105,16 +1681,14 @@ def delete_group_photo(group_id, photo_id):
     """删除小组风采照片"""
     try:
         photo = GroupPhoto.query.filter_by(id=photo_id, group_id=group_id).first_or_404()
-        
-        # 删除文件
-        upload_path = ensure_upload_dir()
-        file_path = os.path.join(upload_path, photo.filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        filename = photo.filename
         
         # 删除数据库记录
         db.session.delete(photo)
         db.session.commit()
+
+        # 文件不再被引用时才删除
+        release_uploads([filename])
         
         return jsonify({'message': '照片删除成功'})
         
@@ -1136,18 +1710,71 @@ def upload_file():
         return jsonify({'error': '没有选择文件'}), 400
     
     if file and allowed_file(file.filename):
-        upload_path = ensure_upload_dir()
-        filename = secure_filename(file.filename)
-        # 添加UUID前缀避免文件名冲突
-        filename = f"{uuid.uuid4().hex[:8]}_{filename}"
-        file_path = os.path.join(upload_path, filename)
-        file.save(file_path)
+        # 按内容哈希保存，重复上传同一文件不会产生副本
+        filename = store_upload(file, photo_upload_limits()['max_file_bytes'])
         
         # 返回相对路径
         return jsonify({'file_path': f'/uploads/{filename}'})
     
     return jsonify({'error': '文件类型不支持'}), 400
 
+@evaluation_bp.route('/uploads/gc', methods=['POST'])
+@admin_required
+def collect_upload_garbage():
+    """清理未被引用的上传文件"""
+    data = request.get_json(silent=True) or {}
+    try:
+        grace_seconds = int(data.get('grace_seconds', current_app.config.get('UPLOAD_GC_GRACE_SECONDS', GC_GRACE_SECONDS)))
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的保留时长'}), 400
+
+    result = collect_garbage(max(0, grace_seconds), current_app.config.get('UPLOAD_SESSION_TTL', UPLOAD_SESSION_TTL))
+    result['message'] = f"已清理 {result['removed']} 个未引用文件"
+    return jsonify(result)
+
+# ==================== 后台任务API ====================
+
+@evaluation_bp.route('/jobs', methods=['GET'])
+@admin_required
+def list_jobs():
+    """获取最近的后台任务"""
+    try:
+        limit = min(max(1, int(request.args.get('limit') or 50)), 200)
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的查询参数'}), 400
+
+    runner = get_job_runner()
+    jobs = Job.query.order_by(Job.created_at.desc()).limit(limit).all()
+    return jsonify([runner.status(job.id) or job.to_dict() for job in jobs])
+
+
+@evaluation_bp.route('/jobs/<job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    """获取后台任务的状态、进度与结果"""
+    status = get_job_runner().status(job_id)
+    if not status:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(status)
+
+# ==================== 实时连接API ====================
+
+@evaluation_bp.route('/socket/rooms', methods=['GET'])
+@admin_required
+def get_socket_rooms():
+    """查看本工作进程中各Socket房间的客户端数量"""
+    return jsonify(get_room_registry().snapshot())
+
+
+@evaluation_bp.route('/storage/shards', methods=['GET'])
+@admin_required
+def get_course_shards():
+    """查看课程分库的启用状态、已有的课程文件与本进程中打开的连接池"""
+    shards = get_shards()
+    if shards is None:
+        return jsonify({'enabled': False, 'courses': [], 'open': []})
+    return jsonify(shards.snapshot())
+
 # ==================== 初始化数据API ====================
 
 @evaluation_bp.route('/init-data', methods=['POST'])
@@ -1157,16 +1784,21 @@ def init_data():
     data = request.get_json() or {}
     course = resolve_course_from_request(data)
 
+    # 已存在的职务、小组与评价人各一次查出，只补充缺少的
+    existing_roles = {name for (name,) in db.session.query(Role.name).filter_by(course_id=course.id)}
+    existing_groups = {name for (name,) in db.session.query(Group.name).filter_by(course_id=course.id)}
+    existing_phones = {phone for (phone,) in db.session.query(Voter.phone).filter_by(course_id=course.id)}
+
     # 创建默认职务
     roles_data = ['组长', '副组长', '组员', '技术负责人', '产品经理']
     for role_name in roles_data:
-        if not Role.query.filter_by(name=role_name, course_id=course.id).first():
+        if role_name not in existing_roles:
             role = Role(name=role_name, course_id=course.id)
             db.session.add(role)
 
     # 创建示例小组
     for i in range(1, 7):
-        if not Group.query.filter_by(name=f'第{i}小组', course_id=course.id).first():
+        if f'第{i}小组' not in existing_groups:
             group = Group(name=f'第{i}小组', course_id=course.id)
             db.session.add(group)
 
@@ -1180,10 +1812,43 @@ def init_data():
     ]
 
     for voter_data in voters_data:
-        if not Voter.query.filter_by(phone=voter_data['phone'], course_id=course.id).first():
+        if voter_data['phone'] not in existing_phones:
             voter = Voter(course_id=course.id, **voter_data)
             db.session.add(voter)
 
     db.session.commit()
     return jsonify({'message': '初始化数据成功'})
 
+@evaluation_bp.route('/generate-data', methods=['POST'])
+@admin_required
+def generate_data():
+    """批量生成压测数据（新建课程）
+
+    默认规模达百万条投票，总是作为后台任务执行，立即返回任务ID，避免长时间占用请求线程。
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        options = {key: int(data.get(key, default)) for key, default in DEFAULT_COUNTS.items()}
+        options['duration_minutes'] = int(data.get('duration_minutes', DEFAULT_DURATION_MINUTES))
+        seed = data.get('seed')
+        options['seed'] = int(seed) if seed is not None else None
+        validate_counts(options['groups'], options['members'], options['voters'], options['votes'])
+    except (TypeError, ValueError):
+        return jsonify({'error': '无效的生成参数'}), 400
+    except DataGenerationError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return job_accepted(get_job_runner().submit(
+        'generate_data', run_generate_data, (data.get('name') or '').strip() or None, options,
+        title=f"生成测试数据（{options['groups']}个小组，{options['votes']}条投票）"
+    ))
+
+
+def run_generate_data(job, name, options):
+    try:
+        result = generate_course(name=name, job=job, **options)
+    except IntegrityError:
+        raise ValueError('课程名称已存在')
+    result['message'] = f"已生成课程「{result['course']['name']}」"
+    return result
+
@@ -0,0 +1,318 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, func
+
+from src.models.evaluation import db, Course, Group, Role, Member, Voter, Vote, GroupPhoto, GroupTally
+from src.services import timeline, ledger
+from src.services.shards import provision_course, use_course
+
+ARCHIVE_FORMAT = 'evaluation-course-archive'
+ARCHIVE_VERSION = 1
+ARCHIVE_SUFFIX = '.json.gz'
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'archives')
+
+# 批量写入时每批的行数
+INSERT_CHUNK_SIZE = 5000
+
+# 归档中包含的数据表，按恢复时的依赖顺序排列：(名称, 模型, 外键列 -> 引用的表名)
+ARCHIVE_TABLES = [
+    ('roles', Role, {}),
+    ('groups', Group, {}),
+    ('members', Member, {'group_id': 'groups', 'role_id': 'roles'}),
+    ('voters', Voter, {}),
+    ('votes', Vote, {'group_id': 'groups', 'voter_id': 'voters'}),
+    ('group_photos', GroupPhoto, {'group_id': 'groups'}),
+    ('group_tallies', GroupTally, {'group_id': 'groups'}),
+]
+
+
+class ArchiveError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def ensure_archive_dir():
+    """确保归档目录存在，可由 ARCHIVE_DIR 配置改为其他目录"""
+    archive_path = current_app.config.get('ARCHIVE_DIR') or DEFAULT_ARCHIVE_DIR
+    if not os.path.exists(archive_path):
+        os.makedirs(archive_path)
+    return archive_path
+
+
+def resolve_archive_path(filename):
+    """校验归档文件名并返回完整路径"""
+    filename = os.path.basename(filename or '')
+    if not filename.endswith(ARCHIVE_SUFFIX):
+        raise ArchiveError('无效的归档文件名')
+    path = os.path.join(ensure_archive_dir(), filename)
+    if not os.path.exists(path):
+        raise ArchiveError('归档文件不存在', 404)
+    return path
+
+
+def list_archives():
+    """列出归档目录中的归档文件"""
+    archive_path = ensure_archive_dir()
+    archives = []
+    for entry in sorted(os.scandir(archive_path), key=lambda item: item.name):
+        if entry.is_file() and entry.name.endswith(ARCHIVE_SUFFIX):
+            stat = entry.stat()
+            archives.append({
+                'filename': entry.name,
+                'size': stat.st_size,
+                'created_at': datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+            })
+    return archives
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _table_filter(model, course_id, group_ids):
+    if 'course_id' in model.__table__.c:
+        return model.__table__.c.course_id == course_id
+    return model.__table__.c.group_id.in_(group_ids)
+
+
+def _dump_table(model, course_id, group_ids):
+    table = model.__table__
+    columns = [column.name for column in table.columns]
+    result = db.session.execute(
+        db.select(table).where(_table_filter(model, course_id, group_ids)).order_by(*table.primary_key.columns)
+    )
+    return {'columns': columns, 'rows': [[_serialize(value) for value in row] for row in result]}
+
+
+def compute_final_tallies(course_id):
+    """统计课程各小组的最终结果（投票明细与已有归档统计之和）"""
+    rows = db.session.query(
+        Vote.group_id,
+        func.coalesce(func.sum(case((Vote.vote_type == 1, Vote.vote_weight), else_=0)), 0),
+        func.coalesce(func.sum(case((Vote.vote_type == -1, Vote.vote_weight), else_=0)), 0),
+        func.count(Vote.id),
+    ).filter(Vote.course_id == course_id).group_by(Vote.group_id).all()
+
+    tallies = {
+        group_id: {'likes': likes, 'dislikes': dislikes, 'vote_count': vote_count}
+        for group_id, likes, dislikes, vote_count in rows
+    }
+    for tally in GroupTally.query.filter_by(course_id=course_id).all():
+        current = tallies.setdefault(tally.group_id, {'likes': 0, 'dislikes': 0, 'vote_count': 0})
+        current['likes'] += tally.likes
+        current['dislikes'] += tally.dislikes
+        current['vote_count'] += tally.vote_count
+    return tallies
+
+
+def export_course(course):
+    """导出课程完整数据（含最终统计）"""
+    group_ids = [group_id for (group_id,) in db.session.query(Group.id).filter_by(course_id=course.id)]
+    group_names = dict(db.session.query(Group.id, Group.name).filter_by(course_id=course.id))
+    tallies = compute_final_tallies(course.id)
+
+    return {
+        'format': ARCHIVE_FORMAT,
+        'version': ARCHIVE_VERSION,
+        'exported_at': datetime.utcnow().isoformat(),
+        'course': {key: _serialize(value) for key, value in course.to_dict().items()},
+        'tables': {
+            name: _dump_table(model, course.id, group_ids)
+            for name, model, _ in ARCHIVE_TABLES
+        },
+        'final_tallies': [
+            {
+                'group_id': group_id,
+                'group_name': group_names.get(group_id),
+                'likes': tally['likes'],
+                'dislikes': tally['dislikes'],
+                'total': tally['likes'] - tally['dislikes'],
+                'vote_count': tally['vote_count']
+            }
+            for group_id, tally in sorted(tallies.items())
+        ],
+    }
+
+
+def write_archive(payload, course_id):
+    """将归档数据写入gzip压缩的JSON文件，返回文件名"""
+    archive_path = ensure_archive_dir()
+    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    filename = f'course_{course_id}_{timestamp}{ARCHIVE_SUFFIX}'
+    path = os.path.join(archive_path, filename)
+    temp_path = f'{path}.tmp'
+
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as output:
+        json.dump(payload, output, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+    return filename
+
+
+def vacuum_database(engine=None):
+    """回收SQLite文件中已删除数据占用的空间"""
+    engine = engine or db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('VACUUM')
+
+
+def archive_course(course):
+    """归档课程：写出归档文件，用最终统计替换投票明细并清除评价人，随后压缩数据库"""
+    if course.archived_at:
+        raise ArchiveError('课程已归档')
+
+    payload = export_course(course)
+    filename = write_archive(payload, course.id)
+
+    GroupTally.query.filter_by(course_id=course.id).delete(synchronize_session=False)
+    if payload['final_tallies']:
+        db.session.execute(GroupTally.__table__.insert(), [
+            {
+                'group_id': tally['group_id'],
+                'course_id': course.id,
+                'likes': tally['likes'],
+                'dislikes': tally['dislikes'],
+                'vote_count': tally['vote_count']
+            }
+            for tally in payload['final_tallies']
+        ])
+
+    Vote.query.filter_by(course_id=course.id).delete(synchronize_session=False)
+    Voter.query.filter_by(course_id=course.id).delete(synchronize_session=False)
+    Group.query.filter_by(course_id=course.id).update({'status': 1}, synchronize_session=False)
+    course.archived_at = datetime.utcnow()
+    ledger.rebase_course(course.id, 'archive')
+    db.session.commit()
+
+    # 课程数据在独立文件中时只压缩该文件
+    vacuum_database(db.session.get_bind(mapper=Vote))
+    return {
+        'filename': filename,
+        'final_tallies': payload['final_tallies'],
+        'vote_count': len(payload['tables']['votes']['rows']),
+        'voter_count': len(payload['tables']['voters']['rows'])
+    }
+
+
+def load_archive(fileobj):
+    """读取并校验归档文件"""
+    try:
+        with gzip.open(fileobj, 'rt', encoding='utf-8') as source:
+            payload = json.load(source)
+    except (OSError, ValueError, EOFError):
+        raise ArchiveError('归档文件无法解析')
+
+    if payload.get('format') != ARCHIVE_FORMAT or payload.get('version') != ARCHIVE_VERSION:
+        raise ArchiveError('不支持的归档文件版本')
+    return payload
+
+
+def _coerce(column, value):
+    if value is not None and isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _restore_table(model, data, course_id, id_maps, foreign_keys, table_name):
+    """按外键映射写回归档中的数据行，记录旧ID到新ID的映射"""
+    table = model.__table__
+    columns = data['columns']
+    primary_key = table.primary_key.columns.keys()
+    generate_ids = primary_key == ['id']
+    id_map = id_maps.setdefault(table_name, {})
+    pending = []
+
+    for values in data['rows']:
+        row = {name: _coerce(table.c[name], value) for name, value in zip(columns, values) if name in table.c}
+        if 'course_id' in row:
+            row['course_id'] = course_id
+        skip = False
+        for column_name, referenced in foreign_keys.items():
+            mapping = id_maps.get(referenced, {})
+            if row.get(column_name) not in mapping:
+                skip = True
+                break
+            row[column_name] = mapping[row[column_name]]
+        if skip:
+            continue
+
+        if not generate_ids:
+            pending.append(row)
+            continue
+
+        old_id = row.pop('id')
+        if table_name in ('roles', 'groups', 'voters'):
+            # 被其他表引用的行逐条插入以获得新ID
+            id_map[old_id] = db.session.execute(table.insert().values(**row)).inserted_primary_key[0]
+        else:
+            pending.append(row)
+
+        if len(pending) >= INSERT_CHUNK_SIZE:
+            db.session.execute(table.insert(), pending)
+            pending = []
+
+    if pending:
+        db.session.execute(table.insert(), pending)
+
+
+def _unique_course_name(name):
+    candidate = name
+    suffix = 1
+    while Course.query.filter_by(name=candidate).first():
+        suffix += 1
+        candidate = f'{name}（恢复{suffix - 1}）' if suffix > 2 else f'{name}（恢复）'
+    return candidate
+
+
+def restore_archive(payload):
+    """将归档数据恢复到数据库。原课程仍以归档状态存在时原地恢复评价人和投票，否则新建课程"""
+    course_data = payload['course']
+    tables = payload['tables']
+    archived_group_ids = {row[0] for row in tables['groups']['rows']}
+    archived_group_status = {row[0]: row[tables['groups']['columns'].index('status')] for row in tables['groups']['rows']}
+
+    course = Course.query.get(course_data['id'])
+    if course:
+        use_course(course.id)
+    in_place = bool(
+        course and course.archived_at and course.name == course_data['name']
+        and archived_group_ids <= {group_id for (group_id,) in db.session.query(Group.id).filter_by(course_id=course.id)}
+    )
+
+    id_maps = {}
+    if in_place:
+        # 小组与职务保持原样，仅恢复评价人、投票与小组状态
+        id_maps['groups'] = {group_id: group_id for group_id in archived_group_ids}
+        GroupTally.query.filter_by(course_id=course.id).delete(synchronize_session=False)
+        restore_names = ('voters', 'votes', 'group_tallies')
+        for group_id, status in archived_group_status.items():
+            Group.query.filter_by(id=group_id).update({'status': status}, synchronize_session=False)
+        course.archived_at = None
+    else:
+        course = Course(
+            name=_unique_course_name(course_data['name']),
+            description=course_data.get('description'),
+            is_active=False
+        )
+        db.session.add(course)
+        db.session.flush()
+        provision_course(course)
+        restore_names = tuple(name for name, _, _ in ARCHIVE_TABLES)
+
+    for name, model, foreign_keys in ARCHIVE_TABLES:
+        if name in restore_names and name in tables:
+            _restore_table(model, tables[name], course.id, id_maps, foreign_keys, name)
+
+    timeline.rebuild_rollups(course.id)
+    ledger.rebase_course(course.id, 'restore')
+    db.session.commit()
+    return course, in_place
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+
+from flask import current_app
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
+
+# 各页面角色的脚本包：common 与 display 随 index.html 加载，ranking、admin 在首次打开对应页面时加载，
+# mobile 只用于 mobile.html
+BUNDLES = {
+    'common': ('js/common.js',),
+    'display': ('js/display.js',),
+    'ranking': ('js/ranking.js',),
+    'admin': ('js/admin.js',),
+    'mobile': ('js/mobile.js',),
+}
+
+# 由 common.js 中的 loadBundle 按需加载的脚本包
+LAZY_BUNDLES = ('ranking', 'admin')
+
+# 打包输出目录（相对静态目录），文件名带内容指纹，可长期缓存
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+FINGERPRINT_LENGTH = 10
+
+# 由服务端改写脚本地址的页面
+HTML_PAGES = ('index.html', 'mobile.html')
+
+SCRIPT_TAG_PATTERN = re.compile(r'<script src="(js/[\w.-]+\.js)"></script>')
+
+# 出现在这些关键字之后的 / 是正则表达式的开始
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw', 'instanceof'}
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+
+# 换行前后是这些字符时可以安全删除换行（不会改变自动插入分号的结果）
+NEWLINE_SAFE_BEFORE = set('{[(,;:')
+NEWLINE_SAFE_AFTER = set('}]),;.')
+
+_lock = threading.Lock()
+
+
+class AssetBuildError(Exception):
+    pass
+
+
+def _is_word_char(char):
+    return char.isalnum() or char in '_$' or ord(char) > 127
+
+
+def _read_quoted(source, index, quote):
+    """返回字符串字面量结束后的位置"""
+    length = len(source)
+    index += 1
+    while index < length:
+        char = source[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == quote:
+            return index + 1
+        if char == '\n' and quote != '`':
+            break
+        if quote == '`' and source.startswith('${', index):
+            index = _read_template_expression(source, index + 2)
+            continue
+        index += 1
+    raise AssetBuildError('字符串未闭合')
+
+
+def _read_template_expression(source, index):
+    """跳过模板字符串中的 ${...}，返回 } 之后的位置"""
+    depth = 1
+    length = len(source)
+    while index < length:
+        char = source[index]
+        if char in '\'"`':
+            index = _read_quoted(source, index, char)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+    raise AssetBuildError('模板字符串未闭合')
+
+
+def _read_regex(source, index):
+    """返回正则表达式字面量（含修饰符）结束后的位置"""
+    length = len(source)
+    index += 1
+    in_class = False
+    while index < length:
+        char = source[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == '\n':
+            break
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            index += 1
+            while index < length and _is_word_char(source[index]):
+                index += 1
+            return index
+        index += 1
+    raise AssetBuildError('正则表达式未闭合')
+
+
+def _regex_allowed(output):
+    """根据已输出的最后一个记号判断 / 是否开始一个正则表达式"""
+    text = ''.join(output[-16:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in REGEX_PRECEDERS:
+        return True
+    match = re.search(r'[\w$]+$', text)
+    return bool(match) and match.group(0) in REGEX_KEYWORDS
+
+
+def minify_js(source):
+    """保守的脚本压缩：去掉注释、缩进和多余空白，保留字符串、模板字符串与正则表达式原样
+
+    换行只在确定不影响自动插入分号时才删除，因此不依赖源码中每条语句都写了分号。
+    """
+    output = []
+    index = 0
+    length = len(source)
+    pending_space = False
+    pending_newline = False
+
+    def last_char():
+        return output[-1][-1] if output else ''
+
+    def flush(next_char):
+        nonlocal pending_space, pending_newline
+        previous = last_char()
+        if pending_newline and previous and previous not in NEWLINE_SAFE_BEFORE and next_char not in NEWLINE_SAFE_AFTER:
+            output.append('\n')
+        elif (pending_space or pending_newline) and previous and (
+            (_is_word_char(previous) and _is_word_char(next_char))
+            or (previous in '+-' and next_char == previous)
+        ):
+            output.append(' ')
+        pending_space = pending_newline = False
+
+    while index < length:
+        char = source[index]
+
+        if char in ' \t\r\n':
+            if char == '\n':
+                pending_newline = True
+            else:
+                pending_space = True
+            index += 1
+            continue
+
+        if source.startswith('//', index):
+            end = source.find('\n', index)
+            index = length if end < 0 else end
+            continue
+
+        if source.startswith('/*', index):
+            end = source.find('*/', index + 2)
+            if end < 0:
+                raise AssetBuildError('注释未闭合')
+            block = source[index:end]
+            index = end + 2
+            if '\n' in block:
+                pending_newline = True
+            else:
+                pending_space = True
+            continue
+
+        if char in '\'"`':
+            end = _read_quoted(source, index, char)
+            flush(char)
+            output.append(source[index:end])
+            index = end
+            continue
+
+        if char == '/' and _regex_allowed(output):
+            end = _read_regex(source, index)
+            flush(char)
+            output.append(source[index:end])
+            index = end
+            continue
+
+        flush(char)
+        output.append(char)
+        index += 1
+
+    return ''.join(output) + '\n'
+
+
+def _fingerprint(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:FINGERPRINT_LENGTH]
+
+
+def _write_atomic(path, content):
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        handle.write(content)
+    os.replace(temp_path, path)
+
+
+def build_bundles(static_dir=STATIC_DIR, minify=True):
+    """合并、压缩各脚本包并按内容指纹命名，写入清单文件后清理旧版本，返回 {包名: 相对地址}"""
+    dist_path = os.path.join(static_dir, DIST_DIR)
+    os.makedirs(dist_path, exist_ok=True)
+
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_dir, source), encoding='utf-8') as handle:
+                parts.append(handle.read())
+        content = '\n'.join(parts)
+        if minify:
+            try:
+                content = minify_js(content)
+            except AssetBuildError as e:
+                raise AssetBuildError(f'{name} 压缩失败：{e}') from e
+
+        filename = f'{name}.{_fingerprint(content)}.js'
+        target = os.path.join(dist_path, filename)
+        if not os.path.exists(target):
+            _write_atomic(target, content)
+        manifest[name] = f'{DIST_DIR}/{filename}'
+
+    _write_atomic(os.path.join(dist_path, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True))
+
+    current = {os.path.basename(path) for path in manifest.values()}
+    for filename in os.listdir(dist_path):
+        stem = filename.split('.', 1)[0]
+        if filename.endswith('.js') and stem in BUNDLES and filename not in current:
+            try:
+                os.remove(os.path.join(dist_path, filename))
+            except OSError:
+                pass
+    return manifest
+
+
+def init_assets(app):
+    """启动时打包前端脚本；关闭打包或打包失败时页面直接加载 js/ 下的源文件"""
+    manifest = None
+    if app.config.get('ASSET_BUILD', True):
+        try:
+            manifest = build_bundles(app.static_folder or STATIC_DIR, minify=app.config.get('ASSET_MINIFY', True))
+        except (OSError, AssetBuildError) as e:
+            app.logger.warning('前端脚本打包失败，改为加载源文件: %s', e)
+    app.extensions['asset_manifest'] = manifest
+    app.extensions['asset_pages'] = {}
+    return manifest
+
+
+def _source_bundles():
+    return {sources[0]: name for name, sources in BUNDLES.items() if len(sources) == 1}
+
+
+def rewrite_page(html, manifest):
+    """把页面中的源脚本地址替换为打包文件，并写入按需加载所用的地址表"""
+    if not manifest:
+        return html
+
+    source_bundles = _source_bundles()
+
+    def replace(match):
+        name = source_bundles.get(match.group(1))
+        if name not in manifest:
+            return match.group(0)
+        return f'<script src="{manifest[name]}"></script>'
+
+    rewritten = SCRIPT_TAG_PATTERN.sub(replace, html)
+    if manifest.get('common') not in rewritten:
+        return rewritten
+
+    # 第一个脚本标签之前的内容没有变化，地址表插在它前面
+    position = SCRIPT_TAG_PATTERN.search(html).start()
+    lazy = {name: manifest[name] for name in LAZY_BUNDLES if name in manifest}
+    bundle_map = f'<script>window.ASSET_BUNDLES = {json.dumps(lazy, sort_keys=True)};</script>\n    '
+    return rewritten[:position] + bundle_map + rewritten[position:]
+
+
+def render_page(filename):
+    """返回改写过脚本地址的页面内容，按文件修改时间缓存"""
+    app = current_app._get_current_object()
+    path = os.path.join(app.static_folder, filename)
+    mtime = os.path.getmtime(path)
+    pages = app.extensions.setdefault('asset_pages', {})
+
+    with _lock:
+        cached = pages.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, encoding='utf-8') as handle:
+        html = rewrite_page(handle.read(), app.extensions.get('asset_manifest'))
+    with _lock:
+        pages[filename] = (mtime, html)
+    return html
+
+
+def main():
+    """命令行入口：在 backend 目录下执行 python -m src.services.assets，部署前预先打包"""
+    manifest = build_bundles()
+    for name, path in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(STATIC_DIR, path))
+        print(f'{name:<8} {path} ({size} 字节)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from sqlalchemy import MetaData, and_, func, literal, null
+from sqlalchemy.exc import IntegrityError
+
+from src.models.evaluation import db, Course, Group, Role, Member, Voter, GroupPhoto
+from src.services import ledger
+from src.services.shards import has_course_storage, provision_course, storage_path
+
+
+class CloneError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+# 源课程与新课程不在同一个SQLite文件时，把源文件以该名称附加到新课程的连接上
+SOURCE_SCHEMA = 'clone_source'
+
+SOURCE_TABLES = ('roles', 'groups', 'members', 'voters', 'group_photos')
+
+
+def _source_tables(schema=None):
+    """读取源课程数据所用的表，schema 为附加数据库的名称"""
+    metadata = MetaData() if schema else None
+    tables = {}
+    for name in SOURCE_TABLES:
+        table = db.metadata.tables[name]
+        if schema:
+            table = table.to_metadata(metadata, schema=schema)
+        tables[name] = table.alias(f'source_{name}')
+    return tables
+
+
+def _ranked_groups(group_id, course_id, label):
+    return db.select(
+        group_id.label(label), func.row_number().over(order_by=group_id).label('position')
+    ).where(group_id.table.c.course_id == course_id).subquery()
+
+
+def _copy_course(execute, source, source_id, target_id, members, media, voters):
+    """以 INSERT ... SELECT 把源课程的数据复制到新课程，返回各表的行数"""
+    created_at = datetime.utcnow()
+    counts = {'members': 0, 'photos': 0, 'voters': 0}
+
+    def insert_from_select(model, columns, select):
+        return execute(model.__table__.insert().from_select(columns, select)).rowcount
+
+    roles = source['roles']
+    counts['roles'] = insert_from_select(Role, ['course_id', 'name', 'created_at'], db.select(
+        literal(target_id), roles.c.name, literal(created_at)
+    ).where(roles.c.course_id == source_id).order_by(roles.c.id))
+
+    # 按原ID顺序整体复制小组：单条 INSERT ... SELECT ... ORDER BY 按顺序分配新ID，
+    # 两边按ID排序后序号相同的小组即互相对应
+    groups = source['groups']
+    counts['groups'] = insert_from_select(Group, ['course_id', 'name', 'logo', 'status', 'photos', 'created_at'], db.select(
+        literal(target_id), groups.c.name, groups.c.logo if media else null(), literal(0),
+        groups.c.photos if media else null(), literal(created_at)
+    ).where(groups.c.course_id == source_id).order_by(groups.c.id))
+
+    old_groups = _ranked_groups(groups.c.id, source_id, 'old_id')
+    new_groups = _ranked_groups(Group.__table__.c.id, target_id, 'new_id')
+    group_map = db.select(old_groups.c.old_id, new_groups.c.new_id).join_from(
+        old_groups, new_groups, old_groups.c.position == new_groups.c.position
+    ).subquery('group_map')
+
+    if counts['groups'] and members:
+        # 职务名称在课程内唯一，按名称对应新职务
+        member = source['members']
+        old_role = source['roles']
+        new_role = Role.__table__.alias('target_roles')
+        counts['members'] = insert_from_select(
+            Member, ['group_id', 'name', 'company', 'role_id', 'created_at'],
+            db.select(group_map.c.new_id, member.c.name, member.c.company, new_role.c.id, literal(created_at))
+            .select_from(member)
+            .join(group_map, group_map.c.old_id == member.c.group_id)
+            .join(old_role, old_role.c.id == member.c.role_id)
+            .join(new_role, and_(new_role.c.course_id == target_id, new_role.c.name == old_role.c.name))
+            .order_by(member.c.id)
+        )
+
+    if counts['groups'] and media:
+        photo = source['group_photos']
+        counts['photos'] = insert_from_select(
+            GroupPhoto, ['group_id', 'filename', 'original_name', 'created_at'],
+            db.select(group_map.c.new_id, photo.c.filename, photo.c.original_name, photo.c.created_at)
+            .select_from(photo)
+            .join(group_map, group_map.c.old_id == photo.c.group_id)
+            .order_by(photo.c.id)
+        )
+
+    if voters:
+        voter = source['voters']
+        counts['voters'] = insert_from_select(Voter, ['course_id', 'name', 'phone', 'weight', 'created_at'], db.select(
+            literal(target_id), voter.c.name, voter.c.phone, voter.c.weight, literal(created_at)
+        ).where(voter.c.course_id == source_id).order_by(voter.c.id))
+
+    return counts
+
+
+def clone_course(source, name, description=None, members=True, media=True, voters=True):
+    """以集合语句把课程的职务、小组（可选成员、logo与照片引用）和评价人复制到新课程
+
+    投票、统计与锁定状态不复制，照片文件按内容哈希共用，不复制文件本身。同一数据库内的复制在调用方的事务中完成；
+    新课程使用独立文件（启用课程分库）时，在新课程库的连接上附加源文件，于该库的一个事务中完成复制。
+    """
+    course = Course(name=name, description=description, is_active=False)
+    db.session.add(course)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        raise CloneError('课程名称已存在')
+
+    source_path = storage_path(source.id)
+    # 源课程在独立文件中时，新课程同样使用独立文件
+    provision_course(course, force=has_course_storage(source.id))
+
+    if storage_path(course.id) == source_path:
+        counts = _copy_course(db.session.execute, _source_tables(), source.id, course.id, members, media, voters)
+    else:
+        with db.session.get_bind(mapper=Group).connect() as connection:
+            connection.exec_driver_sql(f'ATTACH DATABASE ? AS {SOURCE_SCHEMA}', (source_path,))
+            try:
+                counts = _copy_course(connection.execute, _source_tables(SOURCE_SCHEMA), source.id, course.id,
+                                      members, media, voters)
+                connection.commit()
+            finally:
+                connection.rollback()
+                connection.exec_driver_sql(f'DETACH DATABASE {SOURCE_SCHEMA}')
+
+    # 新课程没有投票，直接写入空的统计基线
+    ledger.rebase_course(course.id, 'clone')
+    return course, counts
@@ -0,0 +1,251 @@
+import argparse
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.models.evaluation import db, Course, Group, Role, Member, Voter, Vote
+from src.services import timeline, ledger
+from src.services.http_cache import bump_generation
+from src.services.shards import provision_course
+
+# 默认生成规模，接近一次大型活动的数据量
+DEFAULT_COUNTS = {
+    'groups': 200,
+    'members': 10000,
+    'voters': 50000,
+    'votes': 1000000,
+}
+
+# 每批写入的行数
+INSERT_CHUNK_SIZE = 20000
+
+# 活动持续时长（分钟），各小组按顺序在其中依次展示
+DEFAULT_DURATION_MINUTES = 8 * 60
+
+# 老师（高权重评价人）所占比例
+TEACHER_RATIO = 0.02
+TEACHER_WEIGHT = 10
+
+ROLE_NAMES = ['组长', '副组长', '组员', '技术负责人', '产品经理']
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈'
+GIVEN_NAMES = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉萍红鹏辉建文斌宇浩凯健俊帆'
+COMPANIES = ['天达科技', '星河数据', '云启网络', '海纳软件', '远航智能', '金石咨询', '青禾教育', '中和医疗']
+
+
+class DataGenerationError(Exception):
+    pass
+
+
+def _random_name(rng):
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+
+
+def _insert_chunks(table, columns, rows):
+    """分批执行 executemany 写入元组行；直接使用DBAPI游标，跳过ORM与逐行参数编译的开销"""
+    placeholder = '?' if db.engine.dialect.paramstyle == 'qmark' else '%s'
+    statement = (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+    cursor = db.session.connection(bind_arguments={'clause': table}).connection.cursor()
+    count = 0
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, INSERT_CHUNK_SIZE))
+            if not chunk:
+                break
+            cursor.executemany(statement, chunk)
+            count += len(chunk)
+    finally:
+        cursor.close()
+    return count
+
+
+def _datetime_param(value):
+    """按当前数据库方言转换时间参数（SQLite中保存为字符串）"""
+    dialect = db.engine.dialect
+    processor = db.DateTime().dialect_impl(dialect).bind_processor(dialect)
+    return processor(value) if processor else value
+
+
+def _ids(model, course_id):
+    return [row_id for (row_id,) in db.session.query(model.id).filter_by(course_id=course_id).order_by(model.id)]
+
+
+def _unique_course_name(name):
+    candidate = name
+    suffix = 1
+    while Course.query.filter_by(name=candidate).first():
+        suffix += 1
+        candidate = f'{name}-{suffix}'
+    return candidate
+
+
+def validate_counts(groups, members, voters, votes):
+    """校验生成规模，每个评价人对每个小组最多投一票"""
+    for label, value in (('小组', groups), ('成员', members), ('评价人', voters), ('投票', votes)):
+        if value < 0:
+            raise DataGenerationError(f'{label}数量不能为负数')
+    if groups == 0 and members:
+        raise DataGenerationError('没有小组时无法生成成员')
+    if votes > groups * voters:
+        raise DataGenerationError('投票数不能超过 小组数 × 评价人数')
+
+
+def generate_course(name=None, groups=DEFAULT_COUNTS['groups'], members=DEFAULT_COUNTS['members'],
+                    voters=DEFAULT_COUNTS['voters'], votes=DEFAULT_COUNTS['votes'],
+                    duration_minutes=DEFAULT_DURATION_MINUTES, seed=None, started_at=None, job=None):
+    """生成一个包含大量小组、成员、评价人和投票的测试课程，job 为后台任务上下文时汇报进度"""
+    validate_counts(groups, members, voters, votes)
+    rng = random.Random(seed)
+    begin = time.perf_counter()
+    now = datetime.utcnow()
+    started_at = started_at or now - timedelta(minutes=duration_minutes)
+
+    course = Course(
+        name=_unique_course_name(name or f"压测课程{now.strftime('%Y%m%d%H%M%S')}"),
+        description=f'自动生成：{groups}个小组，{members}名成员，{voters}名评价人，{votes}条投票'
+    )
+    db.session.add(course)
+    db.session.flush()
+    provision_course(course)
+
+    created_at = _datetime_param(now)
+    teacher_count = int(voters * TEACHER_RATIO)
+
+    if job:
+        job.progress(5, message='正在生成小组与成员')
+    _insert_chunks(Role.__table__, ('course_id', 'name', 'created_at'), (
+        (course.id, role_name, created_at) for role_name in ROLE_NAMES
+    ))
+    role_ids = _ids(Role, course.id)
+
+    _insert_chunks(Group.__table__, ('course_id', 'name', 'status', 'created_at'), (
+        (course.id, f'第{index}小组', 0, created_at) for index in range(1, groups + 1)
+    ))
+    group_ids = _ids(Group, course.id)
+
+    # 每个小组的第一名成员为组长，其余随机分配职务
+    _insert_chunks(Member.__table__, ('group_id', 'name', 'company', 'role_id', 'created_at'), (
+        (
+            group_ids[index % groups],
+            _random_name(rng),
+            rng.choice(COMPANIES),
+            role_ids[0] if index < groups else rng.choice(role_ids[1:]),
+            created_at,
+        )
+        for index in range(members)
+    ))
+
+    if job:
+        job.progress(20, message='正在生成评价人')
+    _insert_chunks(Voter.__table__, ('course_id', 'name', 'phone', 'weight', 'created_at'), (
+        (
+            course.id,
+            _random_name(rng) + ('老师' if index < teacher_count else ''),
+            f'199{index:08d}',
+            TEACHER_WEIGHT if index < teacher_count else 1,
+            created_at,
+        )
+        for index in range(voters)
+    ))
+    voter_rows = db.session.query(Voter.id, Voter.weight).filter_by(course_id=course.id).order_by(Voter.id).all()
+
+    if job:
+        job.progress(35, message='正在生成投票')
+    _insert_chunks(
+        Vote.__table__,
+        ('course_id', 'group_id', 'voter_id', 'vote_type', 'vote_weight', 'created_at'),
+        _vote_rows(rng, course.id, group_ids, voter_rows, votes, started_at, duration_minutes)
+    )
+
+    if job:
+        job.progress(80, message='正在汇总得分')
+    timeline.rebuild_rollups(course.id)
+    ledger.rebase_course(course.id, 'generate')
+    db.session.commit()
+
+    return {
+        'course': course.to_dict(),
+        'counts': {'groups': groups, 'members': members, 'voters': voters, 'votes': votes},
+        'elapsed_seconds': round(time.perf_counter() - begin, 2),
+    }
+
+
+def _vote_rows(rng, course_id, group_ids, voter_rows, votes, started_at, duration_minutes):
+    """按时间分布生成投票：各小组依次展示，投票集中在展示后的几分钟内并逐渐衰减"""
+    if not votes:
+        return iter(())
+
+    generator = np.random.default_rng(rng.getrandbits(64))
+    group_count = len(group_ids)
+    voter_count = len(voter_rows)
+    slot_seconds = duration_minutes * 60 / max(1, group_count)
+
+    # 投票数平均分配到各小组，每组从评价人中无放回抽样，保证 (group_id, voter_id) 唯一
+    per_group = np.full(group_count, votes // group_count)
+    per_group[:votes % group_count] += 1
+    group_index = np.repeat(np.arange(group_count), per_group)
+    voter_index = np.concatenate([
+        generator.choice(voter_count, size=count, replace=False) for count in per_group
+    ])
+
+    # 各小组的受欢迎程度不同，决定点赞比例
+    like_ratios = generator.beta(6, 2, size=group_count)
+    vote_types = np.where(generator.random(votes) < like_ratios[group_index], 1, -1)
+
+    voter_ids = np.array([voter_id for voter_id, _ in voter_rows])
+    weights = np.array([weight or 1 for _, weight in voter_rows])
+    delays = np.minimum(generator.exponential(90, size=votes), slot_seconds * 3)
+    seconds = (group_index * slot_seconds + delays).astype(np.int64)
+
+    # 投票时间精确到秒，相同时刻只转换一次
+    unique_seconds, inverse = np.unique(seconds, return_inverse=True)
+    timestamps = [_datetime_param(started_at + timedelta(seconds=int(second))) for second in unique_seconds]
+
+    return zip(
+        itertools.repeat(course_id),
+        np.asarray(group_ids)[group_index].tolist(),
+        voter_ids[voter_index].tolist(),
+        vote_types.tolist(),
+        weights[voter_index].tolist(),
+        map(timestamps.__getitem__, inverse.tolist()),
+    )
+
+
+def main(argv=None):
+    """命令行入口：在 backend 目录下执行 python -m src.services.datagen"""
+    parser = argparse.ArgumentParser(description='生成用于压测的大规模课程数据')
+    parser.add_argument('--name', help='课程名称，默认按时间生成')
+    parser.add_argument('--groups', type=int, default=DEFAULT_COUNTS['groups'])
+    parser.add_argument('--members', type=int, default=DEFAULT_COUNTS['members'])
+    parser.add_argument('--voters', type=int, default=DEFAULT_COUNTS['voters'])
+    parser.add_argument('--votes', type=int, default=DEFAULT_COUNTS['votes'])
+    parser.add_argument('--duration', type=int, default=DEFAULT_DURATION_MINUTES, help='活动持续分钟数')
+    parser.add_argument('--seed', type=int, help='随机种子，便于重复生成相同数据')
+    args = parser.parse_args(argv)
+
+    # 避免 main.py 解析本命令的参数
+    sys.argv = sys.argv[:1]
+    from src.main import app
+
+    with app.app_context():
+        try:
+            result = generate_course(
+                name=args.name, groups=args.groups, members=args.members, voters=args.voters,
+                votes=args.votes, duration_minutes=args.duration, seed=args.seed
+            )
+        except DataGenerationError as e:
+            parser.error(str(e))
+        # 通知运行中的服务刷新课程列表缓存
+        bump_generation()
+
+    print(f"已生成课程「{result['course']['name']}」(ID {result['course']['id']})，耗时 {result['elapsed_seconds']} 秒")
+
+
+if __name__ == '__main__':
+    main()
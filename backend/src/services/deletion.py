@@ -0,0 +1,60 @@
+from src.models.evaluation import (
+    db, Course, Group, Role, Member, Voter, Vote, GroupPhoto, VoteRollup, GroupTally, VoteEvent, TallySnapshot
+)
+from src.services import timeline, ledger
+from src.services.shards import has_course_storage
+from src.services.uploads import group_upload_filenames
+
+# 直接按课程ID删除的表，按依赖顺序排列（子表在前）
+COURSE_TABLES = (Vote, VoteRollup, GroupTally, VoteEvent, TallySnapshot, Voter, Group, Role)
+
+# 按小组ID删除的表；投票流水保留，删除投票前先记录删除流水
+GROUP_TABLES = (Member, GroupPhoto, Vote, VoteRollup, GroupTally)
+
+
+def delete_course_rows(course_id):
+    """以集合删除语句删除课程及其全部数据，返回需要在提交后清理的上传文件名
+
+    新库由 ON DELETE CASCADE 外键保证一致性；这里按依赖顺序显式删除，旧库的外键未重建时同样适用，
+    且不会把小组、投票等数据逐行加载到会话中。
+    """
+    group_ids = db.select(Group.id).where(Group.course_id == course_id)
+    filenames = group_upload_filenames(group_ids)
+
+    if has_course_storage(course_id):
+        # 课程数据在独立文件中，提交后由 release_course_storage 删除整个文件
+        Course.query.filter_by(id=course_id).delete(synchronize_session=False)
+        ledger.get_tally_store().reset(course_id)
+        return filenames
+
+    for model in (Member, GroupPhoto):
+        model.query.filter(model.group_id.in_(group_ids)).delete(synchronize_session=False)
+    for model in COURSE_TABLES:
+        model.query.filter(model.course_id == course_id).delete(synchronize_session=False)
+    Course.query.filter_by(id=course_id).delete(synchronize_session=False)
+    ledger.get_tally_store().reset(course_id)
+    return filenames
+
+
+def delete_group_rows(group_id):
+    """删除小组及其成员、照片、投票与统计，返回需要在提交后清理的上传文件名"""
+    filenames = group_upload_filenames([group_id])
+    ledger.record_votes_deleted(Vote.group_id == group_id, reason='group')
+    for model in GROUP_TABLES:
+        model.query.filter(model.group_id == group_id).delete(synchronize_session=False)
+    Group.query.filter_by(id=group_id).delete(synchronize_session=False)
+    return filenames
+
+
+def delete_voter_rows(voter_id):
+    """删除评价人及其投票，并从得分趋势汇总中扣除这些投票"""
+    votes = db.session.query(
+        Vote.course_id, Vote.group_id, Vote.created_at, Vote.vote_type, Vote.vote_weight
+    ).filter_by(voter_id=voter_id).all()
+    for course_id, group_id, created_at, vote_type, vote_weight in votes:
+        timeline.apply_vote_delta(course_id, group_id, created_at, vote_type, vote_weight, sign=-1)
+    ledger.record_votes_deleted(Vote.voter_id == voter_id, reason='voter')
+
+    Vote.query.filter_by(voter_id=voter_id).delete(synchronize_session=False)
+    Voter.query.filter_by(id=voter_id).delete(synchronize_session=False)
+    return len(votes)
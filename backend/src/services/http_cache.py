@@ -0,0 +1,132 @@
+import gzip
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request
+
+from src.models.evaluation import db, dialect_insert, CacheGeneration
+
+GLOBAL_KEY = 'global'
+# 未指定课程的请求读取的是当前激活课程，任何课程的写操作都会使其失效
+ACTIVE_KEY = 'active'
+
+# 其他工作进程的写操作最多延迟多少秒后被本进程感知
+GENERATION_CACHE_TTL = 1.0
+
+# 小于该字节数的响应不压缩
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+
+_lock = threading.Lock()
+
+
+def course_key(course_id):
+    return f'course:{course_id}'
+
+
+def _generation_cache():
+    """当前应用缓存的版本号与读取时间（按需创建）"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('cache_generations')
+    if cache is None:
+        with _lock:
+            cache = app.extensions.get('cache_generations')
+            if cache is None:
+                cache = app.extensions['cache_generations'] = {'loaded_at': 0.0, 'values': {}}
+    return cache
+
+
+def _increment(keys):
+    """递增版本号，返回数据库中递增后的值"""
+    statement = dialect_insert(CacheGeneration.__table__).values([{'key': key, 'generation': 1} for key in keys])
+    statement = statement.on_conflict_do_update(
+        index_elements=['key'],
+        set_={'generation': CacheGeneration.generation + 1}
+    ).returning(CacheGeneration.key, CacheGeneration.generation)
+    generations = dict(db.session.execute(statement).all())
+    db.session.commit()
+    return generations
+
+
+def bump_generation(course_id=None):
+    """写操作完成后递增版本号；无法确定课程时递增全局版本
+
+    本进程缓存的版本号取数据库返回的值，而不是在缓存上加一：其他工作进程同时递增时，
+    加一得到的版本号会与其他进程的不同数据重复，导致错误的304和计分缓存命中。
+    """
+    keys = [course_key(course_id), ACTIVE_KEY] if course_id else [GLOBAL_KEY]
+    generations = _increment(keys)
+    cache = _generation_cache()
+    with _lock:
+        cache['values'] = dict(cache['values'], **generations)
+
+
+def _generations():
+    now = time.monotonic()
+    cache = _generation_cache()
+    with _lock:
+        if now - cache['loaded_at'] <= current_app.config.get('GENERATION_CACHE_TTL', GENERATION_CACHE_TTL):
+            return cache['values']
+
+    values = dict(db.session.query(CacheGeneration.key, CacheGeneration.generation).all())
+    with _lock:
+        cache['values'] = values
+        cache['loaded_at'] = now
+    return values
+
+
+def course_generation(course_id):
+    """返回课程数据的当前版本，用于进程内结果缓存的失效判断"""
+    values = _generations()
+    return values.get(GLOBAL_KEY, 0), values.get(course_key(course_id), 0)
+
+
+def current_etag(scope):
+    """按请求的课程生成ETag"""
+    requested = (request.args.get('course_id') or '').strip()
+    key = course_key(requested) if requested else ACTIVE_KEY
+    values = _generations()
+    return f'{scope}-{values.get(GLOBAL_KEY, 0)}-{values.get(key, 0)}'
+
+
+def etag_cached(scope):
+    """读接口装饰器：数据未变化时直接返回304，不执行查询"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            etag = current_etag(scope)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def gzip_response(response):
+    """客户端支持时压缩较大的JSON响应"""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.mimetype != 'application/json'
+        or 'Content-Encoding' in response.headers
+        or 'gzip' not in (request.headers.get('Accept-Encoding') or '').lower()
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+
+    response.set_data(gzip.compress(data, GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
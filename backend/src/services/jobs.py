@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.models.evaluation import db, Job
+from src.services.http_cache import bump_generation
+from src.services.shards import use_course
+
+DEFAULT_JOB_WORKERS = 2
+
+# 推送进度的最小间隔（秒），避免频繁广播
+PROGRESS_INTERVAL = 0.5
+
+# 超过该时长仍处于排队或执行状态的任务视为已中断（如服务重启）
+JOB_STALE_SECONDS = 60 * 60
+
+# 任务进度通过该事件推送到管理员房间
+JOB_EVENT = 'job_progress'
+ADMIN_ROOM = 'admin'
+
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+_runner_lock = threading.Lock()
+
+
+class JobContext:
+    """传给任务函数的上下文，用于汇报进度
+
+    任务函数通常在一个数据库事务中完成全部写入，SQLite下其他连接此时无法写库，
+    因此执行过程中的进度只保存在本进程内存中并通过Socket.IO推送，状态变化时才写入jobs表。
+    """
+
+    def __init__(self, runner, job):
+        self.runner = runner
+        self.job_id = job.id
+        self.course_id = job.course_id
+        self.state = job.to_dict()
+        self._last_emit = 0.0
+
+    def progress(self, done, total=None, message=None):
+        """汇报进度：done/total 或直接传入0-100的百分比"""
+        percent = int(done * 100 / total) if total else int(done)
+        self.state['progress'] = max(0, min(99, percent))
+        if message:
+            self.state['message'] = message
+        self.state['updated_at'] = datetime.utcnow().isoformat()
+
+        now = time.monotonic()
+        if now - self._last_emit >= PROGRESS_INTERVAL:
+            self._last_emit = now
+            self.runner.notify(self.state)
+
+
+class JobRunner:
+    """进程内的后台任务队列，使用线程池执行耗时的管理操作"""
+
+    def __init__(self, app, max_workers=DEFAULT_JOB_WORKERS):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='evaluation-job')
+        self._lock = threading.Lock()
+        self._running = {}
+
+    def submit(self, kind, func, *args, title=None, course_id=None, **kwargs):
+        """登记任务并放入线程池，立即返回任务记录；func 的第一个参数为 JobContext"""
+        job = Job(id=uuid.uuid4().hex, kind=kind, title=title, course_id=course_id, status='pending', message='排队中')
+        db.session.add(job)
+        db.session.commit()
+
+        context = JobContext(self, job)
+        with self._lock:
+            self._running[job.id] = context
+        self.notify(context.state)
+        self.executor.submit(self._run, context, func, args, kwargs)
+        return job
+
+    def status(self, job_id):
+        """优先返回本进程内执行中任务的实时进度，否则读取jobs表"""
+        with self._lock:
+            context = self._running.get(job_id)
+            if context:
+                return dict(context.state)
+
+        job = Job.query.get(job_id)
+        return job.to_dict() if job else None
+
+    def notify(self, payload):
+        socketio = self.app.extensions.get('socketio')
+        if socketio is None:
+            return
+        try:
+            socketio.emit(JOB_EVENT, payload, to=ADMIN_ROOM)
+        except Exception as e:
+            self.app.logger.warning('推送任务进度失败: %s', e)
+
+    def _update(self, context, **values):
+        values['updated_at'] = datetime.utcnow()
+        Job.query.filter_by(id=context.job_id).update(values, synchronize_session=False)
+        db.session.commit()
+        context.state.update({
+            key: (value.isoformat() if isinstance(value, datetime) else value)
+            for key, value in values.items() if key != 'result'
+        })
+        if 'result' in values:
+            context.state['result'] = json.loads(values['result']) if values['result'] else None
+        self.notify(context.state)
+
+    def _run(self, context, func, args, kwargs):
+        with self.app.app_context():
+            use_course(context.course_id)
+            try:
+                self._update(context, status='running', message='执行中')
+                try:
+                    result = func(context, *args, **kwargs)
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.exception('后台任务 %s 执行失败', context.job_id)
+                    self._update(context, status='failed', message='任务失败', error=str(e) or e.__class__.__name__,
+                                 finished_at=datetime.utcnow())
+                    return
+
+                # 任务不经过请求的 after_request，需要自行使相关缓存失效
+                bump_generation(context.course_id)
+                message = result.get('message') if isinstance(result, dict) else None
+                self._update(context, status='succeeded', progress=100, message=message or '任务完成',
+                             result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                             finished_at=datetime.utcnow())
+            except Exception:
+                self.app.logger.exception('更新后台任务 %s 状态失败', context.job_id)
+            finally:
+                with self._lock:
+                    self._running.pop(context.job_id, None)
+                db.session.remove()
+
+
+def expire_stale_jobs():
+    """将长时间未结束的任务标记为已中断"""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    count = Job.query.filter(
+        Job.status.notin_(FINISHED_STATUSES), Job.updated_at < cutoff
+    ).update({
+        'status': 'failed', 'message': '任务已中断', 'error': '服务重启或任务超时', 'finished_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def get_job_runner():
+    """获取当前应用的任务队列（按配置懒加载）"""
+    app = current_app._get_current_object()
+    runner = app.extensions.get('job_runner')
+    if runner is None:
+        with _runner_lock:
+            runner = app.extensions.get('job_runner')
+            if runner is None:
+                expire_stale_jobs()
+                runner = JobRunner(app, max_workers=app.config.get('JOB_WORKERS', DEFAULT_JOB_WORKERS))
+                app.extensions['job_runner'] = runner
+    return runner
@@ -0,0 +1,258 @@
+import json
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, func, literal
+
+from src.models.evaluation import db, dialect_insert, Course, Vote, VoteEvent, TallySnapshot
+from src.services.shards import course_scope
+
+# 定时写快照的间隔（秒）
+DEFAULT_SNAPSHOT_INTERVAL = 60
+
+EVENT_CREATE = 'create'
+EVENT_UPDATE = 'update'
+EVENT_DELETE = 'delete'
+# 批量写入或清除投票（生成测试数据、归档、恢复）后，按 votes 表重新计算基线
+EVENT_REBASE = 'rebase'
+
+_store_lock = threading.Lock()
+
+
+def _deltas(vote_type, vote_weight, sign=1):
+    likes = vote_weight if vote_type == 1 else 0
+    dislikes = vote_weight if vote_type == -1 else 0
+    return sign * likes, sign * dislikes, sign
+
+
+def _record_from_votes(condition, action, actor, reason=None):
+    """以 INSERT ... SELECT 按投票行追加流水，无需先把投票读出"""
+    sign = -1 if action == EVENT_DELETE else 1
+    likes = case((Vote.vote_type == 1, Vote.vote_weight), else_=0)
+    dislikes = case((Vote.vote_type == -1, Vote.vote_weight), else_=0)
+    select_votes = db.select(
+        Vote.course_id, Vote.group_id, Vote.id, Vote.voter_id, literal(action), Vote.vote_type, Vote.vote_weight,
+        likes * sign, dislikes * sign, literal(sign), literal(actor), literal(reason), literal(datetime.utcnow()),
+    ).where(condition)
+    result = db.session.execute(VoteEvent.__table__.insert().from_select(
+        ['course_id', 'group_id', 'vote_id', 'voter_id', 'action', 'vote_type', 'vote_weight',
+         'likes_delta', 'dislikes_delta', 'count_delta', 'actor', 'reason', 'created_at'],
+        select_votes,
+    ))
+    return result.rowcount
+
+
+def record_vote_created(group_id, voter_id, actor='voter'):
+    """投票写入后追加新增流水"""
+    return _record_from_votes((Vote.group_id == group_id) & (Vote.voter_id == voter_id), EVENT_CREATE, actor)
+
+
+def record_votes_created(voter_id, group_ids, actor='voter'):
+    """评价人一次提交多个小组的投票后，以一条语句追加全部新增流水"""
+    return _record_from_votes((Vote.voter_id == voter_id) & Vote.group_id.in_(group_ids), EVENT_CREATE, actor)
+
+
+def record_votes_deleted(condition, actor='admin', reason=None):
+    """删除投票前追加删除流水，condition 为 votes 表上的筛选条件"""
+    return _record_from_votes(condition, EVENT_DELETE, actor, reason)
+
+
+def record_vote_changed(vote, old_type, old_weight, actor='admin'):
+    """投票被修改后追加流水，增量为新值减旧值"""
+    if old_type == vote.vote_type and old_weight == vote.vote_weight:
+        return None
+    new_likes, new_dislikes, _ = _deltas(vote.vote_type, vote.vote_weight)
+    old_likes, old_dislikes, _ = _deltas(old_type, old_weight)
+    event = VoteEvent(
+        course_id=vote.course_id, group_id=vote.group_id, vote_id=vote.id, voter_id=vote.voter_id,
+        action=EVENT_UPDATE, vote_type=vote.vote_type, vote_weight=vote.vote_weight,
+        likes_delta=new_likes - old_likes, dislikes_delta=new_dislikes - old_dislikes, count_delta=0,
+        actor=actor, reason=f'原值 {old_type}×{old_weight}',
+    )
+    db.session.add(event)
+    return event
+
+
+def _vote_tallies(course_id):
+    """直接从 votes 表统计课程各小组的赞、踩与票数"""
+    rows = db.session.query(
+        Vote.group_id,
+        func.coalesce(func.sum(case((Vote.vote_type == 1, Vote.vote_weight), else_=0)), 0),
+        func.coalesce(func.sum(case((Vote.vote_type == -1, Vote.vote_weight), else_=0)), 0),
+        func.count(Vote.id),
+    ).filter(Vote.course_id == course_id).group_by(Vote.group_id).all()
+    return {group_id: [int(likes), int(dislikes), int(count)] for group_id, likes, dislikes, count in rows}
+
+
+def _write_snapshot(course_id, last_event_id, tallies):
+    statement = dialect_insert(TallySnapshot.__table__).values(
+        course_id=course_id,
+        last_event_id=last_event_id,
+        tallies=json.dumps({str(group_id): values for group_id, values in tallies.items()}, separators=(',', ':')),
+        created_at=datetime.utcnow(),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['course_id'],
+        set_={
+            'last_event_id': statement.excluded.last_event_id,
+            'tallies': statement.excluded.tallies,
+            'created_at': statement.excluded.created_at,
+        },
+        # 并发写快照时不回退到更旧的流水位置
+        where=TallySnapshot.last_event_id <= statement.excluded.last_event_id,
+    )
+    db.session.execute(statement)
+
+
+def rebase_course(course_id, reason):
+    """批量改动投票后重建基线：追加一条 rebase 流水，并以 votes 表的当前统计写入快照
+
+    rebase 流水本身先写入，在SQLite中同时取得写锁，统计与快照位置因此与其后的流水严格衔接；
+    其他工作进程回放到这条流水时会改为重新加载快照。
+    """
+    event = VoteEvent(course_id=course_id, action=EVENT_REBASE, actor='system', reason=reason)
+    db.session.add(event)
+    db.session.flush()
+    tallies = _vote_tallies(course_id)
+    _write_snapshot(course_id, event.id, tallies)
+    get_tally_store().reset(course_id)
+    return event.id
+
+
+class TallyStore:
+    """进程内的小组统计：以快照为起点，读取时回放快照之后的流水追上最新状态
+
+    其他工作进程写入的流水在下次读取时同样会被回放；遇到 rebase 流水时重新加载快照。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._courses = {}
+
+    def reset(self, course_id):
+        with self._lock:
+            self._courses.pop(course_id, None)
+
+    def tallies(self, course_id):
+        """返回 {小组ID: [赞, 踩, 票数]} 的副本"""
+        with self._lock:
+            state = self._courses.get(course_id)
+            state = {'event_id': state['event_id'], 'tallies': dict(state['tallies'])} if state else None
+
+        if state is None:
+            state = self._load(course_id)
+        state = self._replay(course_id, state)
+
+        with self._lock:
+            current = self._courses.get(course_id)
+            if current is None or current['event_id'] <= state['event_id']:
+                self._courses[course_id] = state
+        return {group_id: list(values) for group_id, values in state['tallies'].items()}
+
+    def _load(self, course_id):
+        snapshot = db.session.get(TallySnapshot, course_id)
+        if snapshot is None:
+            # 尚无快照的课程（升级前的数据）只需完整统计一次
+            rebase_course(course_id, 'baseline')
+            db.session.commit()
+            snapshot = db.session.get(TallySnapshot, course_id)
+        tallies = {int(group_id): tuple(values) for group_id, values in json.loads(snapshot.tallies or '{}').items()}
+        return {'event_id': snapshot.last_event_id, 'tallies': tallies}
+
+    def _replay(self, course_id, state):
+        rows = db.session.query(
+            VoteEvent.group_id,
+            func.sum(VoteEvent.likes_delta),
+            func.sum(VoteEvent.dislikes_delta),
+            func.sum(VoteEvent.count_delta),
+            func.max(VoteEvent.id),
+            func.max(case((VoteEvent.action == EVENT_REBASE, VoteEvent.id))),
+        ).filter(
+            VoteEvent.course_id == course_id, VoteEvent.id > state['event_id']
+        ).group_by(VoteEvent.group_id).all()
+
+        if any(rebase_id for *_, rebase_id in rows):
+            # 期间发生过批量重建，从新的快照重新开始
+            return self._replay(course_id, self._load(course_id))
+
+        tallies = state['tallies']
+        event_id = state['event_id']
+        for group_id, likes, dislikes, count, max_id, _ in rows:
+            event_id = max(event_id, max_id)
+            if group_id is None:
+                continue
+            old = tallies.get(group_id, (0, 0, 0))
+            tallies[group_id] = (old[0] + int(likes), old[1] + int(dislikes), old[2] + int(count))
+        return {'event_id': event_id, 'tallies': tallies}
+
+    def snapshot(self, course_id):
+        """把回放后的统计写为课程的新快照，返回快照位置"""
+        self.tallies(course_id)
+        with self._lock:
+            state = self._courses[course_id]
+            event_id, tallies = state['event_id'], dict(state['tallies'])
+        _write_snapshot(course_id, event_id, tallies)
+        db.session.commit()
+        return event_id
+
+
+def get_tally_store():
+    """获取当前应用的小组统计（按需创建）"""
+    app = current_app._get_current_object()
+    store = app.extensions.get('tally_store')
+    if store is None:
+        with _store_lock:
+            store = app.extensions.get('tally_store')
+            if store is None:
+                store = TallyStore()
+                app.extensions['tally_store'] = store
+    return store
+
+
+def group_stats(group, tallies=None):
+    """小组投票统计，与 Group.get_vote_stats 的结果一致，但不读取投票明细
+
+    批量输出时传入 tallies（课程的 get_tally_store().tallies），并预先加载 Group.tally，整个列表不再逐组查询。
+    """
+    if tallies is None:
+        tallies = get_tally_store().tallies(group.course_id)
+    likes, dislikes, _ = tallies.get(group.id, (0, 0, 0))
+    # 已归档课程的投票明细被替换为最终统计
+    tally = group.tally
+    if tally:
+        likes += tally.likes
+        dislikes += tally.dislikes
+    return {'likes': likes, 'dislikes': dislikes, 'total': likes - dislikes}
+
+
+def snapshot_courses():
+    """为快照之后有新流水（或尚无快照）的课程写入新快照，返回写入的课程数"""
+    store = get_tally_store()
+    written = 0
+    for (course_id,) in db.session.query(Course.id).all():
+        with course_scope(course_id):
+            position = db.session.query(TallySnapshot.last_event_id).filter_by(course_id=course_id).scalar()
+            latest = db.session.query(func.max(VoteEvent.id)).filter(VoteEvent.course_id == course_id).scalar() or 0
+            if position is not None and latest <= position:
+                continue
+            store.snapshot(course_id)
+            written += 1
+    return written
+
+
+def recover_tallies():
+    """启动时恢复各课程统计：加载最新快照并只回放其后的流水，随后写入新快照"""
+    return snapshot_courses()
+
+
+def list_events(course_id, group_id=None, vote_id=None, before=None, limit=50):
+    """按流水号倒序查询课程的投票流水"""
+    query = VoteEvent.query.filter(VoteEvent.course_id == course_id)
+    if group_id:
+        query = query.filter(VoteEvent.group_id == group_id)
+    if vote_id:
+        query = query.filter(VoteEvent.vote_id == vote_id)
+    if before:
+        query = query.filter(VoteEvent.id < before)
+    return query.order_by(VoteEvent.id.desc()).limit(limit).all()
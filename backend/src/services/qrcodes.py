@@ -0,0 +1,236 @@
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import qrcode
+from flask import current_app
+from PIL import Image, ImageDraw, ImageFont
+
+# 进程内缓存的二维码数量，按链接缓存，最近最少使用的先淘汰
+DEFAULT_CACHE_ENTRIES = 1024
+
+# 渲染二维码的进程数，0表示在请求线程中渲染
+DEFAULT_QR_WORKERS = min(4, os.cpu_count() or 1)
+
+# 打印页按A4纸、150dpi排版，每页3列4行
+PAGE_SIZE = (1240, 1754)
+PAGE_DPI = 150
+PAGE_MARGIN = 70
+SHEET_COLUMNS = 3
+SHEET_ROWS = 4
+TITLE_FONT_SIZE = 44
+LABEL_FONT_SIZE = 34
+
+# 依次查找支持中文的字体，都不存在时使用 Pillow 内置字体（中文显示为方框）
+CJK_FONT_CANDIDATES = (
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/wqy-microhei/wqy-microhei.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    '/System/Library/Fonts/STHeiti Medium.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+)
+
+SHEET_FORMATS = ('pdf', 'png')
+
+_cache_lock = threading.Lock()
+_pool_lock = threading.Lock()
+
+
+def render_qrcode(url):
+    """生成链接的二维码PNG；在渲染进程中执行，只依赖参数"""
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10,
+        border=2,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """按链接缓存二维码PNG，小组的二维码只取决于链接，生成后可反复使用"""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+
+    def get(self, url):
+        with self._lock:
+            png = self._images.get(url)
+            if png is not None:
+                self._images.move_to_end(url)
+            return png
+
+    def put(self, url, png):
+        with self._lock:
+            self._images[url] = png
+            self._images.move_to_end(url)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+
+
+def get_qrcode_cache():
+    """获取当前应用的二维码缓存"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('qrcode_cache')
+    if cache is None:
+        with _cache_lock:
+            cache = app.extensions.get('qrcode_cache')
+            if cache is None:
+                cache = QRCodeCache(app.config.get('QR_CACHE_ENTRIES', DEFAULT_CACHE_ENTRIES))
+                app.extensions['qrcode_cache'] = cache
+    return cache
+
+
+def get_render_pool():
+    """获取当前应用的二维码渲染进程池，未启用时返回None
+
+    使用 fork 启动工作进程：spawn 会在每个工作进程中重新执行 main.py 的应用初始化。
+    """
+    app = current_app._get_current_object()
+    workers = app.config.get('QR_WORKERS', DEFAULT_QR_WORKERS)
+    if workers <= 0:
+        return None
+    pool = app.extensions.get('qrcode_pool')
+    if pool is None:
+        with _pool_lock:
+            pool = app.extensions.get('qrcode_pool')
+            if pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork') if 'fork' in methods else None
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                app.extensions['qrcode_pool'] = pool
+    return pool
+
+
+def _discard_pool(pool):
+    app = current_app._get_current_object()
+    with _pool_lock:
+        if app.extensions.get('qrcode_pool') is pool:
+            app.extensions.pop('qrcode_pool')
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def qrcode_png(url):
+    """单个二维码，优先取缓存"""
+    cache = get_qrcode_cache()
+    png = cache.get(url)
+    if png is None:
+        png = render_qrcode(url)
+        cache.put(url, png)
+    return png
+
+
+def qrcode_pngs(urls):
+    """批量获取二维码，缓存未命中的在进程池中并行渲染；进程池不可用时退回当前线程"""
+    cache = get_qrcode_cache()
+    images = {url: cache.get(url) for url in urls}
+    missing = [url for url, png in images.items() if png is None]
+
+    pool = get_render_pool() if len(missing) > 1 else None
+    rendered = None
+    if pool is not None:
+        workers = current_app.config.get('QR_WORKERS', DEFAULT_QR_WORKERS)
+        chunksize = max(1, len(missing) // (workers * 4))
+        try:
+            rendered = list(pool.map(render_qrcode, missing, chunksize=chunksize))
+        except (BrokenProcessPool, OSError) as e:
+            current_app.logger.warning('二维码渲染进程不可用，改为在当前线程渲染: %s', e)
+            _discard_pool(pool)
+    if rendered is None:
+        rendered = [render_qrcode(url) for url in missing]
+
+    for url, png in zip(missing, rendered):
+        cache.put(url, png)
+        images[url] = png
+    return [images[url] for url in urls]
+
+
+def load_font(size):
+    """加载支持中文的字体，可由 QR_SHEET_FONT 指定字体文件"""
+    configured = current_app.config.get('QR_SHEET_FONT')
+    for path in ((configured,) if configured else ()) + CJK_FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow 10.1 之前的内置字体不能指定字号
+        return ImageFont.load_default()
+
+
+def _fit_text(draw, text, font, width):
+    """超出宽度的名称截断并加省略号"""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + '…', font=font) > width:
+        text = text[:-1]
+    return text + '…'
+
+
+def render_sheet_pages(title, items):
+    """把 (名称, 二维码PNG) 排版为打印页，返回灰度页面图片列表"""
+    title_font = load_font(TITLE_FONT_SIZE)
+    label_font = load_font(LABEL_FONT_SIZE)
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    page_count = max(1, (len(items) + per_page - 1) // per_page)
+
+    width, height = PAGE_SIZE
+    header = TITLE_FONT_SIZE * 2
+    cell_width = (width - PAGE_MARGIN * 2) // SHEET_COLUMNS
+    cell_height = (height - PAGE_MARGIN * 2 - header) // SHEET_ROWS
+    label_height = int(LABEL_FONT_SIZE * 1.6)
+    qr_size = min(cell_width, cell_height - label_height) - 30
+
+    pages = []
+    for page_index in range(page_count):
+        page = Image.new('L', PAGE_SIZE, 255)
+        draw = ImageDraw.Draw(page)
+        heading = f'{title}（{page_index + 1}/{page_count}）' if page_count > 1 else title
+        draw.text((width // 2, PAGE_MARGIN), _fit_text(draw, heading, title_font, width - PAGE_MARGIN * 2),
+                  font=title_font, fill=0, anchor='mt')
+
+        for slot, (label, png) in enumerate(items[page_index * per_page:(page_index + 1) * per_page]):
+            left = PAGE_MARGIN + (slot % SHEET_COLUMNS) * cell_width
+            top = PAGE_MARGIN + header + (slot // SHEET_COLUMNS) * cell_height
+            with Image.open(BytesIO(png)) as image:
+                image = image.convert('L').resize((qr_size, qr_size), Image.NEAREST)
+            page.paste(image, (left + (cell_width - qr_size) // 2, top))
+            draw.text((left + cell_width // 2, top + qr_size + 8),
+                      _fit_text(draw, label, label_font, cell_width - 20),
+                      font=label_font, fill=0, anchor='mt')
+        pages.append(page)
+    return pages
+
+
+def encode_pages(pages, sheet_format, page_number=None):
+    """PDF包含全部页面；PNG每次输出一页，page_number从1开始
+
+    页面转为黑白二值图输出，打印效果不变，文件大小与编码耗时约为灰度图的二十分之一。
+    """
+    buffer = BytesIO()
+    if sheet_format == 'pdf':
+        pages = [page.convert('1', dither=Image.Dither.NONE) for page in pages]
+        pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:], resolution=PAGE_DPI)
+    else:
+        page = pages[(page_number or 1) - 1].convert('1', dither=Image.Dither.NONE)
+        page.save(buffer, format='PNG', dpi=(PAGE_DPI, PAGE_DPI))
+    return buffer.getvalue()
@@ -0,0 +1,217 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+# 公共接口的默认限流参数：
+#   ip_rate/ip_burst             按客户端IP的令牌补充速率(个/秒)与桶容量
+#   identity_rate/identity_burst 按手机号/评价人的令牌补充速率与桶容量
+#   concurrency                  该类接口同时处理的请求上限
+#   write                        是否计入公共写队列
+# 活动现场的手机往往共用同一出口IP，因此IP维度较宽松，身份维度较严格
+DEFAULT_RATE_LIMITS = {
+    'verify': {'ip_rate': 20.0, 'ip_burst': 100, 'identity_rate': 0.2, 'identity_burst': 5,
+               'concurrency': 8, 'write': True},
+    'vote': {'ip_rate': 20.0, 'ip_burst': 100, 'identity_rate': 0.2, 'identity_burst': 5,
+             'concurrency': 8, 'write': True},
+    'qrcode': {'ip_rate': 2.0, 'ip_burst': 30, 'concurrency': 4, 'write': False},
+}
+
+# 公共写接口同时在处理的请求总数上限，超过后直接拒绝，保证后台与大屏请求有空闲线程
+DEFAULT_WRITE_QUEUE_LIMIT = 12
+
+# 并发已满时最多等待的秒数
+DEFAULT_QUEUE_TIMEOUT = 0.1
+
+# 单个维度最多保留的令牌桶数量，超过后清理已回满的空闲桶
+MAX_BUCKETS = 20000
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def consume(self, now):
+        """尝试取出一个令牌，成功返回0，否则返回需要等待的秒数"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60
+
+    def is_idle(self, now):
+        return self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class BucketTable:
+    """按键维护的一组令牌桶"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def consume(self, key):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= MAX_BUCKETS:
+                    self._evict_idle(now)
+                bucket = self.buckets[key] = TokenBucket(self.rate, self.capacity, now)
+            return bucket.consume(now)
+
+    def _evict_idle(self, now):
+        for key in [key for key, bucket in self.buckets.items() if bucket.is_idle(now)]:
+            del self.buckets[key]
+
+
+class AdmissionController:
+    """公共接口的准入控制：令牌桶限流、分类并发上限与写队列过载保护"""
+
+    def __init__(self, limits, write_queue_limit, queue_timeout):
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self.ip_buckets = {}
+        self.identity_buckets = {}
+        self.gates = {}
+        for endpoint_class, options in limits.items():
+            if options.get('ip_rate'):
+                self.ip_buckets[endpoint_class] = BucketTable(options['ip_rate'], options['ip_burst'])
+            if options.get('identity_rate'):
+                self.identity_buckets[endpoint_class] = BucketTable(options['identity_rate'], options['identity_burst'])
+            if options.get('concurrency'):
+                self.gates[endpoint_class] = threading.BoundedSemaphore(options['concurrency'])
+        self.write_gate = threading.BoundedSemaphore(write_queue_limit)
+
+    def check_rate(self, endpoint_class, client_ip, identity=None):
+        """检查令牌桶，返回需要等待的秒数，0表示放行"""
+        retry_after = 0
+        ip_buckets = self.ip_buckets.get(endpoint_class)
+        if ip_buckets is not None and client_ip:
+            retry_after = ip_buckets.consume(client_ip)
+        identity_buckets = self.identity_buckets.get(endpoint_class)
+        if not retry_after and identity_buckets is not None and identity:
+            retry_after = identity_buckets.consume(identity)
+        return retry_after
+
+    def acquire(self, endpoint_class):
+        """占用并发名额，返回已占用的信号量列表；名额不足时返回None"""
+        acquired = []
+        semaphores = []
+        if self.limits.get(endpoint_class, {}).get('write'):
+            semaphores.append(self.write_gate)
+        if endpoint_class in self.gates:
+            semaphores.append(self.gates[endpoint_class])
+
+        for semaphore in semaphores:
+            if not semaphore.acquire(timeout=self.queue_timeout):
+                self.release(acquired)
+                return None
+            acquired.append(semaphore)
+        return acquired
+
+    @staticmethod
+    def release(acquired):
+        for semaphore in reversed(acquired):
+            semaphore.release()
+
+
+def get_admission_controller():
+    """获取当前应用的准入控制器（按配置懒加载）"""
+    app = current_app._get_current_object()
+    controller = app.extensions.get('admission_control')
+    if controller is None:
+        limits = {key: dict(value) for key, value in DEFAULT_RATE_LIMITS.items()}
+        for key, value in (app.config.get('RATE_LIMITS') or {}).items():
+            limits.setdefault(key, {}).update(value)
+        controller = AdmissionController(
+            limits,
+            app.config.get('RATE_LIMIT_WRITE_QUEUE', DEFAULT_WRITE_QUEUE_LIMIT),
+            app.config.get('RATE_LIMIT_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT),
+        )
+        app.extensions['admission_control'] = controller
+    return controller
+
+
+def get_client_ip():
+    """获取客户端IP
+
+    不直接读取 X-Forwarded-For：客户端可以任意伪造该请求头，每次请求都得到新的令牌桶。
+    部署在反向代理之后时由 TRUSTED_PROXIES 配置代理层数，main.py 据此启用 ProxyFix 改写 remote_addr。
+    """
+    return request.remote_addr or ''
+
+
+def too_many_requests(retry_after):
+    response = jsonify({'error': '请求过于频繁，请稍后再试'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+@contextmanager
+def admitted(endpoint_class, identity=None):
+    """准入检查：放行时产出0并在退出时归还并发名额，被拒绝时产出需要等待的秒数
+
+    HTTP 接口通过 rate_limited 使用；Socket 事件没有请求JSON，直接传入评价人标识。
+    """
+    if not current_app.config.get('RATE_LIMIT_ENABLED', True):
+        yield 0
+        return
+
+    controller = get_admission_controller()
+    retry_after = controller.check_rate(endpoint_class, get_client_ip(), identity)
+    if retry_after:
+        yield retry_after
+        return
+
+    acquired = controller.acquire(endpoint_class)
+    if acquired is None:
+        yield 1
+        return
+
+    try:
+        yield 0
+    finally:
+        controller.release(acquired)
+
+
+def rate_limited(endpoint_class, identity_field=None, identity_from=None):
+    """公共接口限流装饰器
+
+    identity_field 为请求JSON中标识评价人的字段；标识需要从字段值推导时（如从投票令牌中取评价人ID），
+    改为传入 identity_from，它接收请求JSON并返回标识，无法识别时返回None。
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            identity = None
+            if identity_field or identity_from:
+                data = request.get_json(silent=True)
+                data = data if isinstance(data, dict) else {}
+                if identity_from:
+                    identity = identity_from(data)
+                else:
+                    identity = str(data.get(identity_field) or '').strip() or None
+
+            with admitted(endpoint_class, identity) as retry_after:
+                if retry_after:
+                    return too_many_requests(retry_after)
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,160 @@
+import os
+import threading
+from collections import defaultdict
+
+from flask import current_app, request
+from flask_socketio import join_room, leave_room
+
+from src.models.evaluation import db, Group
+from src.services.shards import course_of_row, course_scope
+from src.services.streams import publish_vote_stats
+
+# 房间类型：同一客户端在每种类型下最多只在一个房间中
+GROUP_ROOM = 'group'
+COURSE_ROOM = 'course'
+
+_registry_lock = threading.Lock()
+
+
+def room_name(kind, target_id):
+    """房间名沿用 group_<id> 的格式"""
+    return f'{kind}_{target_id}'
+
+
+class RoomRegistry:
+    """记录本进程内每个Socket连接所在的房间
+
+    Socket.IO 的 join_room 只会叠加房间，客户端切换小组后旧房间的广播仍会送达。
+    这里按房间类型保存客户端当前所在的房间，加入新房间时先离开同类型的旧房间，断开连接时统一清理。
+    多进程部署时每个进程只记录连接到自己的客户端。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memberships = {}
+        self._members = defaultdict(set)
+        # 小组所属课程，供广播时定位课程房间，避免每次查询数据库
+        self._group_courses = {}
+
+    def join(self, sid, kind, room):
+        """登记客户端加入房间，返回需要离开的同类型旧房间"""
+        with self._lock:
+            rooms = self._memberships.setdefault(sid, {})
+            previous = rooms.get(kind)
+            if previous == room:
+                return None
+            if previous:
+                self._remove(previous, sid)
+            rooms[kind] = room
+            self._members[room].add(sid)
+            return previous
+
+    def leave(self, sid, kind):
+        """登记客户端离开某类型的房间，返回离开的房间"""
+        with self._lock:
+            rooms = self._memberships.get(sid) or {}
+            room = rooms.pop(kind, None)
+            if room:
+                self._remove(room, sid)
+            if not rooms:
+                self._memberships.pop(sid, None)
+            return room
+
+    def discard(self, sid):
+        """连接断开时移除客户端的全部房间"""
+        with self._lock:
+            rooms = self._memberships.pop(sid, None) or {}
+            for room in rooms.values():
+                self._remove(room, sid)
+            return list(rooms.values())
+
+    def course_of_group(self, group_id, refresh=False):
+        """返回小组所属课程；refresh 为真时重新查询，用于确认小组仍然存在"""
+        with self._lock:
+            if not refresh and group_id in self._group_courses:
+                return self._group_courses[group_id]
+
+        with course_scope(course_of_row(group_id)):
+            group = db.session.get(Group, group_id)
+            course_id = group.course_id if group else None
+        with self._lock:
+            if course_id:
+                self._group_courses[group_id] = course_id
+            else:
+                self._group_courses.pop(group_id, None)
+        return course_id
+
+    def snapshot(self):
+        """各房间当前的客户端数量"""
+        with self._lock:
+            rooms = [
+                {'room': room, 'kind': room.rsplit('_', 1)[0], 'clients': len(sids)}
+                for room, sids in self._members.items()
+            ]
+            clients = len(self._memberships)
+        rooms.sort(key=lambda item: (item['kind'], -item['clients'], item['room']))
+        return {'worker': os.getpid(), 'clients': clients, 'rooms': rooms}
+
+    def _remove(self, room, sid):
+        sids = self._members.get(room)
+        if sids is None:
+            return
+        sids.discard(sid)
+        if not sids:
+            del self._members[room]
+
+
+def get_room_registry():
+    """获取当前应用的房间登记表"""
+    app = current_app._get_current_object()
+    registry = app.extensions.get('room_registry')
+    if registry is None:
+        with _registry_lock:
+            registry = app.extensions.get('room_registry')
+            if registry is None:
+                registry = RoomRegistry()
+                app.extensions['room_registry'] = registry
+    return registry
+
+
+def broadcast_vote_stats(course_id, stats_by_group):
+    """由服务端推送投票后的统计：每个小组房间一条 vote_updated，课程房间合并为一条 ranking_changed
+
+    同时推送给课程的SSE订阅者。未启用 Socket.IO（如测试）时不发送Socket事件；推送失败只记录日志，不影响已提交的投票。
+    """
+    app = current_app._get_current_object()
+    publish_vote_stats(course_id, stats_by_group)
+    socketio = app.extensions.get('socketio')
+    if socketio is None or not stats_by_group:
+        return
+    try:
+        for group_id, stats in stats_by_group.items():
+            socketio.emit('vote_updated', {'group_id': group_id, 'stats': stats},
+                          to=room_name(GROUP_ROOM, group_id))
+        socketio.emit('ranking_changed', {'course_id': course_id, 'group_ids': list(stats_by_group)},
+                      to=room_name(COURSE_ROOM, course_id))
+    except Exception as e:
+        app.logger.warning('推送投票统计失败: %s', e)
+
+
+def join_exclusive(kind, target_id):
+    """在Socket事件中调用：当前客户端加入房间，并离开同类型的旧房间"""
+    room = room_name(kind, target_id)
+    previous = get_room_registry().join(request.sid, kind, room)
+    if previous:
+        leave_room(previous)
+    join_room(room)
+    return room
+
+
+def leave_kind(kind):
+    """在Socket事件中调用：当前客户端离开某类型的房间"""
+    room = get_room_registry().leave(request.sid, kind)
+    if room:
+        leave_room(room)
+    return room
+
+
+def release_client():
+    """连接断开时清理登记信息（Socket.IO 自身会移除断开连接的房间成员）"""
+    return get_room_registry().discard(request.sid)
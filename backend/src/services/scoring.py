@@ -0,0 +1,264 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+from src.models.evaluation import db, Group, GroupTally, Vote
+from src.services.http_cache import course_generation
+
+DEFAULT_STRATEGY = 'net'
+
+# 评价人权重高于该值时归入老师组（README建议老师权重10、同学权重1）
+TEACHER_WEIGHT_THRESHOLD = 1
+
+# 分组策略中老师组与同学组的占比
+DEFAULT_POOL_WEIGHTS = {'teacher': 0.5, 'student': 0.5}
+
+# 截尾平均时两端各去掉的比例
+DEFAULT_TRIM_RATIO = 0.1
+
+# 每个应用缓存的 (课程, 策略) 结果数量
+CACHE_SIZE = 64
+
+STRATEGIES = {}
+
+_lock = threading.Lock()
+
+
+class ScoringError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def strategy(name):
+    """注册计分策略：函数接收 VoteArrays，返回每个小组得分的数组"""
+    def decorator(func):
+        STRATEGIES[name] = func
+        return func
+    return decorator
+
+
+class VoteArrays:
+    """一门课程全部投票的列式数组，小组按 group_ids 顺序编号为 0..n-1"""
+
+    def __init__(self, group_ids, rows, tallies):
+        self.group_ids = np.asarray(group_ids, dtype=np.int64)
+        data = np.asarray(rows, dtype=np.int64).reshape(-1, 3)
+
+        # group_ids 已按升序排列，用二分查找把小组ID映射为数组下标
+        data = data[np.isin(data[:, 0], self.group_ids)]
+        self.group_index = np.searchsorted(self.group_ids, data[:, 0])
+        self.vote_type = data[:, 1]
+        self.vote_weight = data[:, 2]
+        self.values = self.vote_type * self.vote_weight
+
+        size = len(group_ids)
+        self.likes = self._sum(np.where(self.vote_type == 1, self.vote_weight, 0))
+        self.dislikes = self._sum(np.where(self.vote_type == -1, self.vote_weight, 0))
+        self.vote_count = np.bincount(self.group_index, minlength=size)
+
+        # 已归档课程的投票明细被替换为各小组汇总
+        self.tally_likes = np.zeros(size, dtype=np.int64)
+        self.tally_dislikes = np.zeros(size, dtype=np.int64)
+        self.tally_count = np.zeros(size, dtype=np.int64)
+        index = {group_id: position for position, group_id in enumerate(group_ids)}
+        for group_id, likes, dislikes, vote_count in tallies:
+            if group_id in index:
+                position = index[group_id]
+                self.tally_likes[position] = likes
+                self.tally_dislikes[position] = dislikes
+                self.tally_count[position] = vote_count
+
+    def _sum(self, values):
+        return np.bincount(self.group_index, weights=values, minlength=len(self.group_ids)).astype(np.int64)
+
+    @property
+    def total_likes(self):
+        return self.likes + self.tally_likes
+
+    @property
+    def total_dislikes(self):
+        return self.dislikes + self.tally_dislikes
+
+    @property
+    def total_count(self):
+        return self.vote_count + self.tally_count
+
+    def tally_average(self):
+        """仅有汇总数据时按平均每票得分近似"""
+        net = (self.tally_likes - self.tally_dislikes).astype(float)
+        return np.divide(net, self.tally_count, out=np.zeros(len(self.group_ids)), where=self.tally_count > 0)
+
+
+def load_vote_arrays(course_id):
+    """一次查询读取课程的全部投票，转换为NumPy数组"""
+    group_ids = [group_id for (group_id,) in db.session.query(Group.id).filter_by(course_id=course_id).order_by(Group.id)]
+    # vote_weight 是投票时评价人权重的快照，分组计分直接据此区分老师与同学，无需关联评价人表
+    # 使用Core连接执行，跳过ORM的结果行处理
+    result = db.session.connection(bind_arguments={'mapper': Vote}).execute(
+        db.select(Vote.group_id, Vote.vote_type, Vote.vote_weight).where(Vote.course_id == course_id)
+    )
+    # 逐值展开后由 fromiter 直接构造数组，避免 np.array 逐行探测 Row 对象
+    rows = np.fromiter(itertools.chain.from_iterable(result), dtype=np.int64)
+    tallies = db.session.query(
+        GroupTally.group_id, GroupTally.likes, GroupTally.dislikes, GroupTally.vote_count
+    ).filter_by(course_id=course_id).all()
+    return VoteArrays(group_ids, rows, tallies)
+
+
+def _group_mean(arrays, values, mask=None):
+    """按小组求平均值，没有投票的小组为0"""
+    size = len(arrays.group_ids)
+    group_index = arrays.group_index if mask is None else arrays.group_index[mask]
+    values = values if mask is None else values[mask]
+    sums = np.bincount(group_index, weights=values, minlength=size)
+    counts = np.bincount(group_index, minlength=size)
+    return np.divide(sums, counts, out=np.zeros(size), where=counts > 0), counts
+
+
+@strategy('net')
+def net_score(arrays):
+    """加权赞数减加权踩数（默认）"""
+    return arrays.total_likes - arrays.total_dislikes
+
+
+@strategy('normalized')
+def normalized_score(arrays):
+    """按参与投票的人数归一化，消除各小组投票人数不同的影响"""
+    net = (arrays.total_likes - arrays.total_dislikes).astype(float)
+    counts = arrays.total_count
+    return np.divide(net, counts, out=np.zeros(len(arrays.group_ids)), where=counts > 0)
+
+
+@strategy('pools')
+def pooled_score(arrays):
+    """老师组与同学组分别计算平均赞踩，再按配置的占比合并（满分100）"""
+    pool_weights = current_app.config.get('SCORING_POOL_WEIGHTS', DEFAULT_POOL_WEIGHTS)
+    is_teacher = arrays.vote_weight > TEACHER_WEIGHT_THRESHOLD
+    size = len(arrays.group_ids)
+
+    combined = np.zeros(size)
+    weight_sum = np.zeros(size)
+    for pool, mask in (('teacher', is_teacher), ('student', ~is_teacher)):
+        means, counts = _group_mean(arrays, arrays.vote_type.astype(float), mask)
+        share = float(pool_weights.get(pool, 0))
+        combined += np.where(counts > 0, means * share, 0)
+        weight_sum += np.where(counts > 0, share, 0)
+
+    scores = np.divide(combined, weight_sum, out=arrays.tally_average(), where=weight_sum > 0)
+    return scores * 100
+
+
+@strategy('trimmed')
+def trimmed_score(arrays):
+    """去掉每个小组两端一定比例的投票后求加权平均，降低极端权重的影响"""
+    ratio = float(current_app.config.get('SCORING_TRIM_RATIO', DEFAULT_TRIM_RATIO))
+    size = len(arrays.group_ids)
+    if not len(arrays.values):
+        return arrays.tally_average()
+
+    # 按 (小组, 得分) 排序后，计算每票在本组中的名次
+    order = np.lexsort((arrays.values, arrays.group_index))
+    sorted_groups = arrays.group_index[order]
+    counts = np.bincount(sorted_groups, minlength=size)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ranks = np.arange(len(order)) - starts[sorted_groups]
+
+    trim = np.floor(counts * ratio).astype(np.int64)
+    keep = (ranks >= trim[sorted_groups]) & (ranks < (counts - trim)[sorted_groups])
+    sums = np.bincount(sorted_groups[keep], weights=arrays.values[order][keep], minlength=size)
+    kept = np.bincount(sorted_groups[keep], minlength=size)
+    return np.divide(sums, kept, out=arrays.tally_average(), where=kept > 0)
+
+
+def _plain(value):
+    """NumPy标量转换为可序列化的Python数值，小数保留4位"""
+    value = value.item()
+    return round(value, 4) if isinstance(value, float) else value
+
+
+def resolve_strategy(name=None):
+    name = (name or current_app.config.get('SCORING_STRATEGY') or DEFAULT_STRATEGY).strip()
+    if name not in STRATEGIES:
+        raise ScoringError(f"不支持的计分策略，可选：{', '.join(sorted(STRATEGIES))}")
+    return name
+
+
+def get_score_cache():
+    """获取当前应用的计分结果缓存（按需创建）"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('score_cache')
+    if cache is None:
+        with _lock:
+            cache = app.extensions.get('score_cache')
+            if cache is None:
+                cache = app.extensions['score_cache'] = OrderedDict()
+    return cache
+
+
+def compute_scores(course_id, strategy_name=None):
+    """计算课程各小组的统计与得分，按课程数据版本缓存"""
+    strategy_name = resolve_strategy(strategy_name)
+    cache_key = (course_id, strategy_name)
+    generation = course_generation(course_id)
+    cache = get_score_cache()
+
+    with _lock:
+        cached = cache.get(cache_key)
+        if cached and cached[0] == generation:
+            cache.move_to_end(cache_key)
+            return cached[1]
+
+    arrays = load_vote_arrays(course_id)
+    scores = STRATEGIES[strategy_name](arrays)
+    result = {
+        int(group_id): {
+            'likes': int(likes),
+            'dislikes': int(dislikes),
+            'vote_count': int(vote_count),
+            'score': _plain(score),
+        }
+        for group_id, likes, dislikes, vote_count, score in zip(
+            arrays.group_ids, arrays.total_likes, arrays.total_dislikes, arrays.total_count, scores
+        )
+    }
+
+    with _lock:
+        cache[cache_key] = (generation, result)
+        cache.move_to_end(cache_key)
+        while len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+    return result
+
+
+def build_ranking(course_id, strategy_name=None):
+    """课程排名：各小组统计与得分按总分从高到低排列"""
+    strategy_name = resolve_strategy(strategy_name)
+    scores = compute_scores(course_id, strategy_name)
+    groups = db.session.query(Group.id, Group.name, Group.logo).filter_by(course_id=course_id).all()
+    ranking_data = []
+
+    for group_id, name, logo in groups:
+        stats = scores.get(group_id, {'likes': 0, 'dislikes': 0, 'vote_count': 0, 'score': 0})
+        ranking_data.append({
+            'id': group_id,
+            'name': name,
+            'logo': logo,
+            'likes': stats['likes'],
+            'dislikes': stats['dislikes'],
+            'vote_count': stats['vote_count'],
+            'total_score': stats['score'],
+            'strategy': strategy_name
+        })
+
+    # 按总分排序
+    ranking_data.sort(key=lambda x: x['total_score'], reverse=True)
+
+    # 添加排名
+    for i, item in enumerate(ranking_data):
+        item['rank'] = i + 1
+    return ranking_data
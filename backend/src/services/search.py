@@ -0,0 +1,71 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager, joinedload
+
+from src.models.evaluation import Group, Member, Role, Voter
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_pagination(args):
+    """解析分页参数，返回(页码, 每页条数)"""
+    try:
+        page = max(1, int(args.get('page') or 1))
+        page_size = int(args.get('page_size') or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError('无效的分页参数')
+    return page, min(max(1, page_size), MAX_PAGE_SIZE)
+
+
+def prefix_match(column, prefix):
+    """前缀匹配写成区间条件，可直接利用B树索引（LIKE在SQLite中默认无法使用索引）"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+def paginate(query, page, page_size):
+    total = query.order_by(None).count()
+    items = query.offset((page - 1) * page_size).limit(page_size).all()
+    return {
+        'items': [item.to_dict() for item in items],
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+    }
+
+
+def search_voters(course_id, keyword, page, page_size):
+    """按姓名或手机号前缀分页检索评价人。纯数字视为手机号，单一区间条件可让查询只走一个索引"""
+    query = Voter.query.filter(Voter.course_id == course_id)
+    if keyword.isdigit():
+        return paginate(query.filter(prefix_match(Voter.phone, keyword)).order_by(Voter.phone), page, page_size)
+    if keyword:
+        query = query.filter(prefix_match(Voter.name, keyword))
+    return paginate(query.order_by(Voter.name, Voter.id), page, page_size)
+
+
+def search_members(course_id, keyword, page, page_size, role_id=None, group_id=None):
+    """按姓名、公司或职务名称前缀分页检索课程成员"""
+    query = (
+        Member.query
+        .join(Group, Group.id == Member.group_id)
+        .filter(Group.course_id == course_id)
+        .options(contains_eager(Member.group), joinedload(Member.role))
+    )
+
+    if role_id:
+        query = query.filter(Member.role_id == role_id)
+    if group_id:
+        query = query.filter(Member.group_id == group_id)
+
+    if keyword:
+        conditions = [prefix_match(Member.name, keyword), prefix_match(Member.company, keyword)]
+        role_ids = [
+            matched_id for (matched_id,) in
+            Role.query.with_entities(Role.id).filter(Role.course_id == course_id, prefix_match(Role.name, keyword))
+        ]
+        if role_ids:
+            conditions.append(Member.role_id.in_(role_ids))
+        query = query.filter(or_(*conditions))
+
+    return paginate(query.order_by(Member.name, Member.id), page, page_size)
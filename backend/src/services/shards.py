@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from flask import current_app, g
+from sqlalchemy import MetaData, create_engine
+
+from src.models.evaluation import db, upgrade_schema
+
+DEFAULT_SHARD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'courses')
+
+# 空闲超过该时长（秒）的课程库连接池被关闭，下次访问时重新打开
+DEFAULT_IDLE_SECONDS = 300
+
+# 保存在课程库中的表，其余表（课程目录、后台任务、缓存版本等）只在主库中
+SHARD_TABLES = frozenset({
+    'roles', 'groups', 'members', 'voters', 'votes', 'group_photos',
+    'vote_rollups', 'group_tallies', 'vote_events', 'tally_snapshots',
+})
+
+# 每个课程库的自增ID从 课程ID × ID_SPAN 开始，各库之间的小组、评价人、投票ID互不重复，
+# 仅凭ID（如二维码中的小组ID）即可定位所在课程
+ID_SPAN = 10 ** 8
+
+_metadata = None
+
+
+def shard_metadata():
+    """课程库的表结构：课程数据表加一份课程表（只保存本课程一行，供外键级联使用），ID列使用AUTOINCREMENT"""
+    global _metadata
+    if _metadata is None:
+        metadata = MetaData()
+        for name in ('courses', *sorted(SHARD_TABLES)):
+            table = db.metadata.tables[name].to_metadata(metadata)
+            if list(table.primary_key.columns.keys()) == ['id']:
+                table.dialect_options['sqlite']['autoincrement'] = True
+        _metadata = metadata
+    return _metadata
+
+
+def course_of_row(row_id):
+    """由课程库中的行ID推算所属课程，主库中的行返回None"""
+    try:
+        row_id = int(row_id)
+    except (TypeError, ValueError):
+        return None
+    return row_id // ID_SPAN if row_id >= ID_SPAN else None
+
+
+class ShardManager:
+    """管理各课程的独立SQLite文件：按需打开并复用连接池，空闲时关闭
+
+    enabled 只决定新建课程是否使用独立文件；已有的课程文件无论是否启用都会被路由访问。
+    """
+
+    tables = SHARD_TABLES
+
+    def __init__(self, directory=DEFAULT_SHARD_DIR, enabled=False, idle_seconds=DEFAULT_IDLE_SECONDS):
+        self.directory = directory
+        self.enabled = enabled
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._engines = {}
+        self._last_used = {}
+        self._known = {}
+
+    def path(self, course_id):
+        return os.path.join(self.directory, f'course_{course_id}.db')
+
+    def url(self, course_id, mode='rw'):
+        """课程库的连接地址；默认以 rw 模式打开，文件已被删除时连接报错，而不是悄悄新建一个空库"""
+        return f'sqlite:///file:{quote(self.path(course_id))}?mode={mode}&uri=true'
+
+    def has_shard(self, course_id):
+        known = self._known.get(course_id)
+        if known is None:
+            known = os.path.exists(self.path(course_id))
+            # 启用分库时其他工作进程可能随时新建课程文件，不缓存“不存在”的结果
+            if known or not self.enabled:
+                self._known[course_id] = known
+        elif known and not os.path.exists(self.path(course_id)):
+            # 课程已被其他工作进程删除：关闭本进程的连接池，不再使用仍打开着已删除文件的连接
+            self.forget(course_id)
+            known = False
+        return known
+
+    def forget(self, course_id):
+        """丢弃本进程中课程库的连接池与缓存状态，不删除文件"""
+        with self._lock:
+            engine = self._engines.pop(course_id, None)
+            self._last_used.pop(course_id, None)
+            self._known.pop(course_id, None)
+        if engine is not None:
+            engine.dispose()
+
+    def course_ids(self):
+        """已有独立文件的课程ID"""
+        if not os.path.isdir(self.directory):
+            return []
+        course_ids = []
+        for filename in os.listdir(self.directory):
+            stem, _, extension = filename.partition('.')
+            if extension == 'db' and stem.startswith('course_') and stem[7:].isdigit():
+                course_ids.append(int(stem[7:]))
+        return sorted(course_ids)
+
+    def engine(self, course_id):
+        """获取课程库的引擎，首次访问时打开并补齐表结构"""
+        with self._lock:
+            engine = self._engines.get(course_id)
+            if engine is None:
+                engine = create_engine(self.url(course_id))
+                upgrade_schema(engine, shard_metadata())
+                self._engines[course_id] = engine
+            self._last_used[course_id] = time.monotonic()
+            return engine
+
+    def create(self, course):
+        """为新课程建立独立文件：建表、设置ID起点，并写入课程行"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.drop(course.id)
+
+        metadata = shard_metadata()
+        engine = create_engine(self.url(course.id, 'rwc'))
+        metadata.create_all(engine)
+        start = course.id * ID_SPAN
+        with engine.begin() as connection:
+            connection.execute(metadata.tables['courses'].insert().values(
+                id=course.id, name=course.name, description=course.description, is_active=False,
+                created_at=course.created_at,
+            ))
+            connection.exec_driver_sql(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)',
+                [(table.name, start) for table in metadata.sorted_tables
+                 if table.name in SHARD_TABLES and table.dialect_options['sqlite']['autoincrement']],
+            )
+        engine.dispose()
+        with self._lock:
+            self._engines[course.id] = create_engine(self.url(course.id))
+            self._last_used[course.id] = time.monotonic()
+            self._known[course.id] = True
+        return self.path(course.id)
+
+    def sync_course(self, course):
+        """课程名称、简介变化后同步到课程库中的课程行"""
+        if not self.has_shard(course.id):
+            return
+        table = shard_metadata().tables['courses']
+        with self.engine(course.id).begin() as connection:
+            connection.execute(table.update().where(table.c.id == course.id).values(
+                name=course.name, description=course.description
+            ))
+
+    def drop(self, course_id):
+        """关闭并删除课程库文件"""
+        self.forget(course_id)
+        path = self.path(course_id)
+        for suffix in ('', '-journal', '-wal', '-shm'):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def close_idle(self):
+        """关闭空闲的课程库连接池，返回关闭的数量"""
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [course_id for course_id, used in self._last_used.items() if used < cutoff]
+            engines = [self._engines.pop(course_id) for course_id in idle]
+            for course_id in idle:
+                del self._last_used[course_id]
+        for engine in engines:
+            # 正在使用的连接归还时才会关闭
+            engine.dispose()
+        return len(engines)
+
+    def snapshot(self):
+        with self._lock:
+            open_ids = sorted(self._engines)
+        return {
+            'enabled': self.enabled,
+            'directory': self.directory,
+            'courses': self.course_ids(),
+            'open': open_ids,
+        }
+
+
+def init_shards(app):
+    """启动时登记课程分库；未启用时仍会访问已存在的课程文件"""
+    manager = ShardManager(
+        directory=app.config.get('COURSE_SHARD_DIR') or DEFAULT_SHARD_DIR,
+        enabled=bool(app.config.get('COURSE_SHARDS')),
+        idle_seconds=app.config.get('COURSE_SHARD_IDLE_SECONDS', DEFAULT_IDLE_SECONDS),
+    )
+    app.extensions['course_shards'] = manager
+    return manager
+
+
+def get_shards():
+    """获取当前应用的课程分库管理器，未初始化时返回None"""
+    return current_app.extensions.get('course_shards')
+
+
+def use_course(course_id):
+    """之后的课程数据读写使用该课程所在的数据库"""
+    g.shard_course_id = course_id
+
+
+def use_row(row_id):
+    """按小组、评价人、投票等行ID定位所在课程的数据库"""
+    g.shard_course_id = course_of_row(row_id)
+
+
+@contextmanager
+def course_scope(course_id):
+    """临时切换到指定课程的数据库"""
+    previous = g.get('shard_course_id')
+    g.shard_course_id = course_id
+    try:
+        yield
+    finally:
+        g.shard_course_id = previous
+
+
+def each_storage():
+    """依次切换到主库和每个课程库，用于需要遍历全部数据的操作（如清理上传文件）"""
+    shards = get_shards()
+    previous = g.get('shard_course_id')
+    try:
+        for course_id in (None, *(shards.course_ids() if shards else ())):
+            g.shard_course_id = course_id
+            yield course_id
+    finally:
+        g.shard_course_id = previous
+
+
+def has_course_storage(course_id):
+    shards = get_shards()
+    return bool(shards and shards.has_shard(course_id))
+
+
+def provision_course(course, force=False):
+    """新课程写入主库后调用：启用分库（或 force）时为其建立独立文件，并切换到该课程"""
+    shards = get_shards()
+    if shards is not None and (shards.enabled or force):
+        shards.create(course)
+    use_course(course.id)
+
+
+def release_course_storage(course_id):
+    """课程删除并提交后调用，删除课程库文件"""
+    shards = get_shards()
+    if shards is not None and shards.has_shard(course_id):
+        shards.drop(course_id)
+
+
+def storage_path(course_id):
+    """课程数据所在的SQLite文件路径"""
+    if has_course_storage(course_id):
+        return get_shards().path(course_id)
+    return db.engine.url.database
+
+
+def sync_course_storage(course):
+    """课程信息修改并提交后调用，同步课程库中的课程行"""
+    shards = get_shards()
+    if shards is not None:
+        shards.sync_course(course)
@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import socketio
+
+# 消息在中转表中保留的秒数，超过后由发布方顺带清理
+MESSAGE_RETENTION_SECONDS = 60
+
+# 监听方轮询新消息的间隔（秒）
+POLL_INTERVAL = 0.05
+
+
+class SQLiteManager(socketio.PubSubManager):
+    """基于SQLite文件的Socket.IO消息队列，供同一主机上的多个工作进程共享广播，无需额外依赖
+
+    使用方式：message_queue 地址形如 sqlite:////absolute/path/socketio.db
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None,
+                 poll_interval=POLL_INTERVAL, retention=MESSAGE_RETENTION_SECONDS):
+        if not url.startswith('sqlite:///'):
+            raise ValueError('SQLite消息队列地址需以 sqlite:/// 开头')
+        self.path = url[len('sqlite:///'):]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        self._publish_count = 0
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._setup()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _setup(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS socketio_messages ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, '
+            'payload TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+
+    def _publish(self, data):
+        connection = self._connect()
+        now = time.time()
+        connection.execute(
+            'INSERT INTO socketio_messages (channel, payload, created_at) VALUES (?, ?, ?)',
+            (self.channel, json.dumps(data), now)
+        )
+        self._publish_count += 1
+        if self._publish_count % 200 == 0:
+            connection.execute('DELETE FROM socketio_messages WHERE created_at < ?', (now - self.retention,))
+
+    def _listen(self):
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        last_id = connection.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_messages').fetchone()[0]
+
+        while True:
+            rows = connection.execute(
+                'SELECT id, payload FROM socketio_messages WHERE channel = ? AND id > ? ORDER BY id',
+                (self.channel, last_id)
+            ).fetchall()
+
+            for message_id, payload in rows:
+                last_id = message_id
+                yield payload
+
+            if not rows:
+                self.server.sleep(self.poll_interval)
+
+
+def build_socketio_options(url):
+    """根据消息队列地址生成SocketIO初始化参数，未配置时为单进程模式"""
+    if not url:
+        return {}
+    if url.startswith('sqlite:'):
+        return {'client_manager': SQLiteManager(url)}
+    # redis://、kafka://、zmq+、amqp:// 等由 python-socketio 内置的队列实现处理
+    return {'message_queue': url}
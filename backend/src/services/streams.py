@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import current_app
+
+from src.services.http_cache import course_generation
+from src.services.scoring import build_ranking
+from src.services.shards import course_scope
+
+# 没有新事件时发送心跳注释的间隔（秒），避免代理或浏览器断开空闲连接
+DEFAULT_HEARTBEAT = 15
+
+# 每个课程保留的最近事件数，客户端断线重连时据此补发
+DEFAULT_BACKLOG = 256
+
+# 检查课程数据版本的间隔（秒）：其他工作进程的投票与管理操作最多延迟这么久推送新排名
+DEFAULT_POLL_INTERVAL = 1.0
+
+# 浏览器断线后等待多久重连（毫秒）
+RETRY_MS = 3000
+
+_hub_lock = threading.Lock()
+
+
+class CourseChannel:
+    """一个课程的事件序列：每个事件只编码一次，所有订阅者发送同一份字节"""
+
+    def __init__(self, backlog):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=backlog)
+        self.seq = 0
+        self.subscribers = 0
+        # 同一时刻连接的客户端共用一次排名计算
+        self.ranking_lock = threading.Lock()
+        self.ranking = None
+        self.generation = None
+
+    def events_after(self, seq):
+        """返回序号大于 seq 的事件，调用方需持有 condition"""
+        pending = []
+        for event in reversed(self.events):
+            if event[0] <= seq:
+                break
+            pending.append(event)
+        pending.reverse()
+        return pending
+
+    def oldest_seq(self):
+        return self.events[0][0] if self.events else self.seq + 1
+
+
+class StreamHub:
+    """课程实时数据的进程内发布订阅
+
+    投票写入后立即发布小组统计（tally）；后台线程按课程数据版本检查有订阅者的课程，
+    变化时计算一次排名（ranking）发布给全部订阅者，因此其他工作进程的写入与管理操作同样会被推送。
+    事件ID为 <进程标识>-<序号>，同一进程内可按 Last-Event-ID 补发错过的事件，否则重新发送当前排名。
+    """
+
+    def __init__(self, app, backlog=DEFAULT_BACKLOG, heartbeat=DEFAULT_HEARTBEAT, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.app = app
+        self.backlog = backlog
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.epoch = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._pump = None
+
+    def channel(self, course_id, create=True):
+        with self._lock:
+            channel = self._channels.get(course_id)
+            if channel is None and create:
+                channel = self._channels[course_id] = CourseChannel(self.backlog)
+            return channel
+
+    def publish(self, course_id, event, data, create=True):
+        """编码并追加事件，唤醒该课程的订阅者，返回 (序号, 字节)；课程没有频道且 create 为假时忽略"""
+        channel = self.channel(course_id, create)
+        if channel is None:
+            return None
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        with channel.condition:
+            channel.seq += 1
+            chunk = f'id: {self.epoch}-{channel.seq}\nevent: {event}\ndata: {payload}\n\n'.encode('utf-8')
+            channel.events.append((channel.seq, chunk))
+            channel.condition.notify_all()
+            return channel.seq, chunk
+
+    def refresh_ranking(self, course_id, channel=None):
+        """课程数据版本变化后计算并发布排名，返回最近的排名事件；调用方需在应用上下文中并已选择课程数据库"""
+        channel = channel or self.channel(course_id)
+        generation = course_generation(course_id)
+        with channel.ranking_lock:
+            if channel.ranking is None or channel.generation != generation:
+                channel.ranking = self.publish(course_id, 'ranking', build_ranking(course_id))
+                channel.generation = generation
+            return channel.ranking
+
+    def subscribe(self, course_id, last_event_id=None):
+        """返回订阅者的事件生成器；能按 Last-Event-ID 续传时补发错过的事件，否则先发送当前排名"""
+        channel = self.channel(course_id)
+        resume = self._parse_event_id(last_event_id)
+        with channel.condition:
+            resumable = resume is not None and channel.oldest_seq() - 1 <= resume <= channel.seq
+        if resumable:
+            return self._stream(channel, resume, None)
+        return self._stream(channel, *self.refresh_ranking(course_id, channel))
+
+    def _parse_event_id(self, value):
+        epoch, _, seq = (value or '').strip().partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _stream(self, channel, last_seq, initial):
+        with channel.condition:
+            channel.subscribers += 1
+        self._ensure_pump()
+        try:
+            yield f'retry: {RETRY_MS}\n\n'.encode('utf-8')
+            if initial:
+                yield initial
+            while True:
+                with channel.condition:
+                    if channel.seq <= last_seq:
+                        channel.condition.wait(self.heartbeat)
+                    pending = channel.events_after(last_seq)
+                    # 订阅者落后超过保留的事件数时，从最近的排名重新开始
+                    if pending and pending[0][0] > last_seq + 1 and channel.ranking:
+                        pending = [channel.ranking] + [event for event in pending if event[0] > channel.ranking[0]]
+                if not pending:
+                    yield b': heartbeat\n\n'
+                    continue
+                for seq, chunk in pending:
+                    yield chunk
+                last_seq = pending[-1][0]
+        finally:
+            with channel.condition:
+                channel.subscribers -= 1
+
+    def _watched_courses(self):
+        """有订阅者的课程，调用方需持有 _lock"""
+        return [course_id for course_id, channel in self._channels.items() if channel.subscribers > 0]
+
+    def _ensure_pump(self):
+        with self._lock:
+            if self._pump is None:
+                self._pump = threading.Thread(target=self._run_pump, name='course-stream-pump', daemon=True)
+                self._pump.start()
+
+    def _run_pump(self):
+        """后台线程：为有订阅者的课程检查数据版本，没有订阅者时退出"""
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                courses = self._watched_courses()
+                if not courses:
+                    self._pump = None
+                    return
+            with self.app.app_context():
+                for course_id in courses:
+                    try:
+                        with course_scope(course_id):
+                            self.refresh_ranking(course_id)
+                    except Exception as e:
+                        self.app.logger.warning('推送课程排名失败: %s', e)
+
+
+def get_stream_hub():
+    """获取当前应用的课程事件中心"""
+    app = current_app._get_current_object()
+    hub = app.extensions.get('course_streams')
+    if hub is None:
+        with _hub_lock:
+            hub = app.extensions.get('course_streams')
+            if hub is None:
+                hub = StreamHub(
+                    app,
+                    heartbeat=app.config.get('STREAM_HEARTBEAT', DEFAULT_HEARTBEAT),
+                    poll_interval=app.config.get('STREAM_POLL_INTERVAL', DEFAULT_POLL_INTERVAL),
+                )
+                app.extensions['course_streams'] = hub
+    return hub
+
+
+def publish_vote_stats(course_id, stats_by_group):
+    """投票写入后立即向课程的订阅者推送各小组统计；尚无人订阅的课程不创建频道"""
+    hub = current_app.extensions.get('course_streams')
+    if hub is None:
+        return
+    for group_id, stats in stats_by_group.items():
+        if hub.publish(course_id, 'tally', dict(stats, group_id=group_id), create=False) is None:
+            return
@@ -0,0 +1,173 @@
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func
+
+from src.models.evaluation import db, dialect_insert, Group, Vote, VoteRollup
+
+# 未指定分辨率时，单个小组曲线的目标最大点数
+DEFAULT_MAX_POINTS = 200
+
+
+def to_minute(value):
+    """将UTC时间转换为分钟序号"""
+    value = value or datetime.utcnow()
+    return int(value.replace(tzinfo=timezone.utc).timestamp()) // 60
+
+
+def minute_to_iso(minute):
+    return datetime.fromtimestamp(minute * 60, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def apply_vote_delta(course_id, group_id, created_at, vote_type, vote_weight, sign=1):
+    """将一条投票的变化累加到所在分钟的汇总行，sign为-1时表示撤销"""
+    likes = vote_weight if vote_type == 1 else 0
+    dislikes = vote_weight if vote_type == -1 else 0
+
+    statement = dialect_insert(VoteRollup.__table__).values(
+        course_id=course_id,
+        group_id=group_id,
+        minute=to_minute(created_at),
+        likes=sign * likes,
+        dislikes=sign * dislikes,
+        vote_count=sign,
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=['group_id', 'minute'],
+        set_={
+            'likes': VoteRollup.likes + statement.excluded.likes,
+            'dislikes': VoteRollup.dislikes + statement.excluded.dislikes,
+            'vote_count': VoteRollup.vote_count + statement.excluded.vote_count,
+        },
+    )
+    db.session.execute(statement)
+
+
+def apply_votes_created(course_id, created_at, votes):
+    """同一时刻写入的多张投票以一条多行语句累加到汇总行，votes 为 (小组ID, 投票类型, 权重)，每个小组至多一张"""
+    if not votes:
+        return
+    minute = to_minute(created_at)
+    statement = dialect_insert(VoteRollup.__table__).values([
+        {
+            'course_id': course_id,
+            'group_id': group_id,
+            'minute': minute,
+            'likes': vote_weight if vote_type == 1 else 0,
+            'dislikes': vote_weight if vote_type == -1 else 0,
+            'vote_count': 1,
+        }
+        for group_id, vote_type, vote_weight in votes
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=['group_id', 'minute'],
+        set_={
+            'likes': VoteRollup.likes + statement.excluded.likes,
+            'dislikes': VoteRollup.dislikes + statement.excluded.dislikes,
+            'vote_count': VoteRollup.vote_count + statement.excluded.vote_count,
+        },
+    )
+    db.session.execute(statement)
+
+
+def apply_vote_change(vote, old_type, old_weight):
+    """投票被修改后，撤销旧值并计入新值"""
+    if old_type == vote.vote_type and old_weight == vote.vote_weight:
+        return
+    apply_vote_delta(vote.course_id, vote.group_id, vote.created_at, old_type, old_weight, sign=-1)
+    apply_vote_delta(vote.course_id, vote.group_id, vote.created_at, vote.vote_type, vote.vote_weight)
+
+
+def _minute_expression():
+    """按数据库方言生成 votes.created_at 的分钟序号表达式"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.floor(func.extract('epoch', Vote.created_at) / 60)
+    return func.cast(func.strftime('%s', Vote.created_at), db.Integer) // 60
+
+
+def rebuild_rollups(course_id):
+    """根据 votes.created_at 重建课程的分钟汇总"""
+    minute = _minute_expression().label('minute')
+
+    def weighted(vote_type):
+        return func.coalesce(func.sum(case((Vote.vote_type == vote_type, Vote.vote_weight), else_=0)), 0)
+
+    select_votes = (
+        db.select(
+            Vote.course_id,
+            Vote.group_id,
+            minute,
+            weighted(1),
+            weighted(-1),
+            func.count(Vote.id),
+        )
+        .where(Vote.course_id == course_id)
+        .group_by(Vote.course_id, Vote.group_id, minute)
+    )
+
+    VoteRollup.query.filter_by(course_id=course_id).delete(synchronize_session=False)
+    db.session.execute(
+        VoteRollup.__table__.insert().from_select(
+            ['course_id', 'group_id', 'minute', 'likes', 'dislikes', 'vote_count'],
+            select_votes,
+        )
+    )
+    return VoteRollup.query.filter_by(course_id=course_id).count()
+
+
+def resolve_resolution(course_id, resolution=None, max_points=DEFAULT_MAX_POINTS):
+    """确定降采样分辨率（分钟），未指定时按时间跨度自动选择"""
+    if resolution:
+        return max(1, int(resolution))
+
+    first_minute, last_minute = db.session.query(
+        func.min(VoteRollup.minute), func.max(VoteRollup.minute)
+    ).filter(VoteRollup.course_id == course_id).one()
+
+    if first_minute is None:
+        return 1
+    span = last_minute - first_minute + 1
+    return max(1, math.ceil(span / max(1, max_points)))
+
+
+def build_timeline(course_id, resolution=1, group_id=None):
+    """按分辨率聚合汇总行，返回每个小组的得分曲线"""
+    bucket = ((VoteRollup.minute // resolution) * resolution).label('bucket')
+    query = db.session.query(
+        VoteRollup.group_id,
+        bucket,
+        func.sum(VoteRollup.likes),
+        func.sum(VoteRollup.dislikes),
+        func.sum(VoteRollup.vote_count),
+    ).filter(VoteRollup.course_id == course_id)
+
+    if group_id:
+        query = query.filter(VoteRollup.group_id == group_id)
+
+    rows = query.group_by(VoteRollup.group_id, bucket).order_by(VoteRollup.group_id, bucket).all()
+
+    groups_query = Group.query.filter_by(course_id=course_id)
+    if group_id:
+        groups_query = groups_query.filter_by(id=group_id)
+
+    series = {
+        group.id: {'id': group.id, 'name': group.name, 'points': []}
+        for group in groups_query.order_by(Group.id).all()
+    }
+
+    cumulative = {}
+    for row_group_id, row_bucket, likes, dislikes, vote_count in rows:
+        if row_group_id not in series or not vote_count and not likes and not dislikes:
+            continue
+        total = (likes or 0) - (dislikes or 0)
+        cumulative[row_group_id] = cumulative.get(row_group_id, 0) + total
+        series[row_group_id]['points'].append({
+            'time': minute_to_iso(row_bucket),
+            'likes': likes or 0,
+            'dislikes': dislikes or 0,
+            'total': total,
+            'cumulative_total': cumulative[row_group_id],
+            'votes': vote_count or 0,
+        })
+
+    return list(series.values())
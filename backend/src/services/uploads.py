@@ -0,0 +1,384 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from src.models.evaluation import db, Group, GroupPhoto, UploadSession
+from src.services.shards import each_storage
+
+UPLOAD_URL_PREFIX = '/uploads/'
+DEFAULT_UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads')
+
+# 未被引用的文件至少保留的秒数，避免清理掉刚上传、尚未保存到小组的logo
+GC_GRACE_SECONDS = 60 * 60
+
+TEMP_PREFIX = '.upload-'
+CHUNK_SIZE = 64 * 1024
+
+# 照片上传的默认限制：单个文件大小、单次选择的文件数、单个分片请求的大小
+DEFAULT_PHOTO_MAX_BYTES = 20 * 1024 * 1024
+DEFAULT_BATCH_FILES = 50
+DEFAULT_MAX_CHUNK_BYTES = 8 * 1024 * 1024
+# 建议客户端使用的分片大小，网络较差时失败重传的代价较小
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+
+# 超过该时长（秒）未继续的分片上传会话在清理上传文件时一并删除
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# 各上传会话在本进程中的哈希状态：{会话ID: (已计算的字节数, sha256)}
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def ensure_upload_dir():
+    """确保上传目录存在，可由 UPLOAD_DIR 配置改为其他目录（如测试使用的临时目录）"""
+    upload_path = current_app.config.get('UPLOAD_DIR') or DEFAULT_UPLOAD_DIR
+    if not os.path.exists(upload_path):
+        os.makedirs(upload_path)
+    return upload_path
+
+
+def _extension(original_name):
+    filename = secure_filename(original_name or '')
+    if '.' not in filename:
+        return ''
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def _limit_message(name, max_bytes):
+    return f'文件「{name}」超过 {max_bytes / (1024 * 1024):g}MB 的大小限制'
+
+
+def store_upload(file_storage, max_bytes=None):
+    """按内容哈希保存上传文件，相同内容只存一份，返回文件名；超过 max_bytes 时抛出 UploadError"""
+    upload_path = ensure_upload_dir()
+    temp_path = os.path.join(upload_path, f'{TEMP_PREFIX}{uuid.uuid4().hex}')
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(temp_path, 'wb') as output:
+            while True:
+                chunk = file_storage.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadError(_limit_message(file_storage.filename, max_bytes), 413)
+                digest.update(chunk)
+                output.write(chunk)
+
+        return _store_hashed(temp_path, digest, file_storage.filename)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _store_hashed(temp_path, digest, original_name):
+    """把已算好哈希的临时文件移动为内容寻址的文件，返回文件名"""
+    extension = _extension(original_name)
+    filename = f'{digest.hexdigest()}.{extension}' if extension else digest.hexdigest()
+    file_path = os.path.join(os.path.dirname(temp_path), filename)
+
+    if os.path.exists(file_path):
+        # 内容已存在，刷新修改时间以免被垃圾回收误删
+        os.utime(file_path)
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, file_path)
+    return filename
+
+
+def spool_upload(file_storage):
+    """将上传流转存为上传目录中的临时文件，供请求结束后的后台任务处理"""
+    path = os.path.join(ensure_upload_dir(), f'{TEMP_PREFIX}{uuid.uuid4().hex}')
+    file_storage.save(path)
+    return path
+
+
+def open_spooled_upload(path, original_name):
+    """以 FileStorage 形式重新打开转存的临时文件"""
+    return FileStorage(stream=open(path, 'rb'), filename=original_name)
+
+
+def discard_spooled_uploads(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def filename_from_url(url):
+    """从 /uploads/xxx 形式的地址中提取文件名，非上传文件返回None"""
+    if not url or not url.startswith(UPLOAD_URL_PREFIX):
+        return None
+    return url[len(UPLOAD_URL_PREFIX):] or None
+
+
+def referenced_filenames(candidates=None):
+    """获取仍被引用的上传文件名（包括各课程库）
+
+    传入 candidates 时只检查这些文件名，每个库的查询数不随文件数增加。
+    """
+    if candidates is not None:
+        candidates = set(candidates)
+        if not candidates:
+            return set()
+
+    referenced = set()
+    for _ in each_storage():
+        photos_query = db.session.query(GroupPhoto.filename).distinct()
+        groups_query = db.session.query(Group.logo, Group.photos)
+        if candidates is not None:
+            photos_query = photos_query.filter(GroupPhoto.filename.in_(candidates))
+            groups_query = groups_query.filter(
+                Group.logo.in_([f'{UPLOAD_URL_PREFIX}{name}' for name in candidates]) | (Group.photos.isnot(None) & (Group.photos != '[]'))
+            )
+        referenced.update(filename for (filename,) in photos_query)
+
+        for logo, photos in groups_query.all():
+            name = filename_from_url(logo)
+            if name:
+                referenced.add(name)
+            # 兼容旧版存储在 groups.photos 中的JSON照片列表
+            if photos:
+                try:
+                    urls = json.loads(photos)
+                except Exception:
+                    urls = []
+                for url in urls if isinstance(urls, list) else []:
+                    name = filename_from_url(url) if isinstance(url, str) else None
+                    if name:
+                        referenced.add(name)
+
+    return referenced if candidates is None else referenced & candidates
+
+
+def release_uploads(filenames):
+    """在引用删除并提交后调用，删除已无引用的文件
+
+    与垃圾回收使用相同的引用范围（包括旧版JSON照片列表），并同样保留最近写入的文件：
+    相同内容只存一份，刚由并发上传保存或刚上传尚未保存到小组的logo可能正是同一个文件，留给之后的垃圾回收处理。
+    """
+    upload_path = ensure_upload_dir()
+    candidates = {os.path.basename(name) for name in filenames if name}
+    if not candidates:
+        return 0
+
+    referenced = referenced_filenames(candidates)
+    cutoff = time.time() - current_app.config.get('UPLOAD_GC_GRACE_SECONDS', GC_GRACE_SECONDS)
+    removed = 0
+    for filename in candidates - referenced:
+        file_path = os.path.join(upload_path, filename)
+        try:
+            if os.stat(file_path).st_mtime > cutoff:
+                continue
+            os.remove(file_path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+    return removed
+
+
+def group_upload_filenames(group_ids):
+    """收集小组引用的全部上传文件名（照片与logo），group_ids 可以是ID列表或子查询"""
+    filenames = {
+        filename for (filename,) in
+        db.session.query(GroupPhoto.filename).filter(GroupPhoto.group_id.in_(group_ids)).distinct()
+    }
+    for (logo,) in db.session.query(Group.logo).filter(Group.id.in_(group_ids), Group.logo.isnot(None)):
+        name = filename_from_url(logo)
+        if name:
+            filenames.add(name)
+    return filenames
+
+
+def collect_garbage(grace_seconds=GC_GRACE_SECONDS, session_ttl=UPLOAD_SESSION_TTL):
+    """清理上传目录中未被引用的文件，以及长时间未继续的分片上传"""
+    upload_path = ensure_upload_dir()
+    expired = expire_upload_sessions(session_ttl)
+    referenced = referenced_filenames()
+    # 仍在进行的分片上传，其临时文件可能已超过保留时长
+    referenced.update(
+        os.path.basename(session_path(upload_id)) for (upload_id,) in
+        db.session.query(UploadSession.id).filter(UploadSession.status == 'uploading')
+    )
+    cutoff = time.time() - grace_seconds
+    # 临时文件（后台任务转存的照片、正在保存的上传）不论传入的保留时长，都按会话有效期保留
+    temp_cutoff = time.time() - session_ttl
+    removed = 0
+    freed_bytes = 0
+    kept = 0
+
+    for entry in os.scandir(upload_path):
+        if not entry.is_file():
+            continue
+        if entry.name in referenced:
+            kept += 1
+            continue
+
+        stat = entry.stat()
+        if stat.st_mtime > (temp_cutoff if entry.name.startswith(TEMP_PREFIX) else cutoff):
+            kept += 1
+            continue
+
+        os.remove(entry.path)
+        removed += 1
+        freed_bytes += stat.st_size
+
+    return {'removed': removed, 'freed_bytes': freed_bytes, 'kept': kept, 'expired_uploads': expired}
+
+
+def session_path(upload_id):
+    """分片上传会话的临时文件"""
+    return os.path.join(ensure_upload_dir(), f'{TEMP_PREFIX}{upload_id}')
+
+
+def create_upload_sessions(group, files, max_bytes=DEFAULT_PHOTO_MAX_BYTES, max_files=DEFAULT_BATCH_FILES):
+    """为一批照片建立分片上传会话，files 为 (原始文件名, 字节数) 列表"""
+    if not files:
+        raise UploadError('没有选择文件')
+    if len(files) > max_files:
+        raise UploadError(f'单次最多上传 {max_files} 个文件')
+
+    sessions = []
+    for original_name, size in files:
+        if size <= 0:
+            raise UploadError(f'文件「{original_name}」为空')
+        if size > max_bytes:
+            raise UploadError(_limit_message(original_name, max_bytes), 413)
+        sessions.append(UploadSession(
+            id=uuid.uuid4().hex, group_id=group.id, course_id=group.course_id,
+            original_name=original_name, size=size, received=0, status='uploading'
+        ))
+
+    for upload in sessions:
+        open(session_path(upload.id), 'wb').close()
+        with _hashers_lock:
+            _hashers[upload.id] = (0, hashlib.sha256())
+    db.session.add_all(sessions)
+    db.session.commit()
+    return sessions
+
+
+def write_chunk(upload, offset, stream):
+    """把分片写入会话临时文件的 offset 处，边写边更新哈希，返回已接收的字节数
+
+    只接受从已接收位置开始的分片；写入中断时丢弃该分片已写的部分，客户端从 received 处重传即可。
+    多个工作进程写同一会话时以 received 列上的条件更新判定先后，本进程没有连续的哈希状态时在完成时重新计算。
+    """
+    path = session_path(upload.id)
+    if not os.path.exists(path):
+        raise UploadError('上传已失效，请重新上传', 410)
+
+    with _hashers_lock:
+        position, hasher = _hashers.pop(upload.id, (None, None))
+    if position != offset:
+        hasher = None
+
+    remaining = upload.size - offset
+    written = 0
+    with open(path, 'r+b') as output:
+        output.seek(offset)
+        output.truncate()
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > remaining:
+                    raise UploadError('分片超出了文件大小', 413)
+                output.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+        except Exception:
+            output.truncate(offset)
+            raise
+
+    received = offset + written
+    updated = UploadSession.query.filter_by(id=upload.id, received=offset).update(
+        {'received': received, 'updated_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+    if not updated:
+        raise UploadError('该位置的分片已由其他请求写入，请查询进度后续传', 409)
+
+    if hasher is not None:
+        with _hashers_lock:
+            _hashers[upload.id] = (received, hasher)
+    return received
+
+
+def finish_upload(upload):
+    """最后一个分片写入后调用：按内容哈希保存文件并写入小组照片，调用方需已切换到小组所在课程的数据库"""
+    path = session_path(upload.id)
+    if not os.path.exists(path):
+        raise UploadError('上传已失效，请重新上传', 410)
+
+    with _hashers_lock:
+        position, hasher = _hashers.pop(upload.id, (None, None))
+    if position != upload.size:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+
+    group = db.session.get(Group, upload.group_id)
+    if group is None:
+        cancel_upload(upload)
+        raise UploadError('小组不存在', 404)
+
+    filename = _store_hashed(path, hasher, upload.original_name)
+    photo = GroupPhoto.query.filter_by(group_id=group.id, filename=filename).first()
+    if photo is None:
+        photo = GroupPhoto(group_id=group.id, filename=filename, original_name=upload.original_name)
+        db.session.add(photo)
+        db.session.flush()
+
+    upload.status = 'completed'
+    upload.filename = filename
+    upload.photo_id = photo.id
+    upload.updated_at = datetime.utcnow()
+    db.session.commit()
+    return photo
+
+
+def cancel_upload(upload):
+    """取消分片上传，删除会话与临时文件"""
+    with _hashers_lock:
+        _hashers.pop(upload.id, None)
+    path = session_path(upload.id)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.delete(upload)
+    db.session.commit()
+
+
+def expire_upload_sessions(ttl=UPLOAD_SESSION_TTL):
+    """删除超过 ttl 秒未更新的上传会话及其临时文件，返回删除的数量"""
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for upload in expired:
+        with _hashers_lock:
+            _hashers.pop(upload.id, None)
+        path = session_path(upload.id)
+        if os.path.exists(path):
+            os.remove(path)
+        db.session.delete(upload)
+    if expired:
+        db.session.commit()
+    return len(expired)
@@ -0,0 +1,210 @@
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+
+from src.models.evaluation import db, Group, Voter, Vote
+from src.services import ledger, timeline
+
+# 一次批量投票最多包含的小组数
+VOTE_BATCH_MAX_GROUPS = 50
+
+# 携带相同幂等键重试、但投票类型与已记录的不同时返回409
+REPLAY_MISMATCH_MESSAGE = '您已经投过票了，重试的投票与之前提交的不一致'
+
+
+class VoteError(Exception):
+    def __init__(self, message, status_code=400, group_ids=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.group_ids = group_ids
+
+    def to_dict(self):
+        payload = {'error': self.message}
+        if self.group_ids:
+            payload['group_ids'] = self.group_ids
+        return payload
+
+
+# 客户端把空值序列化成字符串时得到的内容，不能作为幂等键，否则不同的投票会共用同一个键
+EMPTY_KEY_VALUES = frozenset({'null', 'undefined', 'none'})
+
+
+def parse_idempotency_key(*values):
+    """客户端重试时携带相同的幂等键，可安全地重复提交；依次取第一个有效的值（如请求头、请求JSON）"""
+    for value in values:
+        key = (value if isinstance(value, str) else '').strip()[:64]
+        if key and key.lower() not in EMPTY_KEY_VALUES:
+            return key
+    return None
+
+
+def verify_identity(name, phone, group_id):
+    """按姓名与手机号验证评价人，并确认其可以为该小组投票，返回评价人
+
+    HTTP 接口与 Socket 事件共用；调用方需先按小组选择课程所在的数据库。
+    """
+    group = Group.query.get(group_id)
+    if not group:
+        raise VoteError('小组不存在', 404)
+
+    voter = Voter.query.filter_by(name=(name or '').strip(), phone=(phone or '').strip(),
+                                  course_id=group.course_id).first()
+    if not voter:
+        raise VoteError('用户信息验证失败')
+
+    if group.status == 1:
+        raise VoteError('该小组评价已结束')
+
+    # 检查是否已投票
+    if voter.has_voted_for_group(group_id):
+        raise VoteError('您已经为该小组投过票了')
+    return voter
+
+
+def cast_vote(voter, group_id, vote_type, idempotency_key=None):
+    """写入一张投票，voter 为投票令牌的内容，返回 (小组所属课程, 是否新写入, 统计)
+
+    单次往返写入投票记录，由唯一约束判定是否已投票；调用方需先按小组选择课程所在的数据库。
+    """
+    if vote_type not in (1, -1):
+        raise VoteError('无效的投票类型')
+
+    group = Group.query.get(group_id)
+    if not group:
+        raise VoteError('小组不存在', 404)
+
+    if voter['course_id'] != group.course_id:
+        raise VoteError('评价人与小组不在同一课程中')
+
+    if group.status == 1:
+        raise VoteError('该小组评价已结束')
+
+    voted_at = datetime.utcnow()
+    try:
+        inserted = Vote.insert_ignore_conflict(
+            course_id=group.course_id,
+            group_id=group.id,
+            voter_id=voter['voter_id'],
+            vote_type=vote_type,
+            vote_weight=voter['weight'],
+            idempotency_key=idempotency_key,
+            created_at=voted_at
+        )
+    except IntegrityError:
+        # 令牌签发后评价人已被删除
+        db.session.rollback()
+        raise VoteError('评价人不存在，请重新验证', 401)
+
+    if not inserted:
+        db.session.rollback()
+        existing = Vote.query.filter_by(group_id=group.id, voter_id=voter['voter_id']).first() if idempotency_key else None
+        if not existing or existing.idempotency_key != idempotency_key:
+            raise VoteError('您已经投过票了')
+        if existing.vote_type != vote_type:
+            # 同一幂等键只能重试原来的投票，不能借此改票，也不能把改票报告为成功
+            raise VoteError(REPLAY_MISMATCH_MESSAGE, 409)
+    else:
+        timeline.apply_vote_delta(group.course_id, group.id, voted_at, vote_type, voter['weight'])
+        ledger.record_vote_created(group.id, voter['voter_id'])
+        db.session.commit()
+
+    # 获取更新后的统计数据（快照加流水回放，不读取投票明细）
+    return group.course_id, inserted, ledger.group_stats(group)
+
+
+def cast_votes(voter, entries, idempotency_key=None):
+    """评价人一次为同一课程的多个小组投票，返回 [(小组ID, 是否新写入, 统计)]
+
+    小组状态与已有投票各用一条查询校验，任一小组不可投票时整批不写入；全部投票在一个事务中写入。
+    调用方需先选择令牌中课程所在的数据库。
+    """
+    if not isinstance(entries, list) or not entries:
+        raise VoteError('请提供投票列表')
+    if len(entries) > VOTE_BATCH_MAX_GROUPS:
+        raise VoteError(f'一次最多提交 {VOTE_BATCH_MAX_GROUPS} 个小组的投票')
+
+    vote_types = {}
+    for entry in entries:
+        group_id = entry.get('group_id') if isinstance(entry, dict) else None
+        vote_type = entry.get('vote_type') if isinstance(entry, dict) else None
+        if not isinstance(group_id, int) or isinstance(group_id, bool):
+            raise VoteError('小组ID无效')
+        if vote_type not in (1, -1):
+            raise VoteError('无效的投票类型')
+        if group_id in vote_types:
+            raise VoteError('同一小组只能投一票')
+        vote_types[group_id] = vote_type
+
+    group_ids = list(vote_types)
+    course_id = voter['course_id']
+
+    def load_groups():
+        return {
+            group.id: group
+            for group in Group.query.options(selectinload(Group.tally)).filter(Group.id.in_(group_ids))
+        }
+
+    groups = load_groups()
+    missing = [group_id for group_id in group_ids if group_id not in groups]
+    if missing:
+        raise VoteError('小组不存在', 404, missing)
+    foreign = [group_id for group_id in group_ids if groups[group_id].course_id != course_id]
+    if foreign:
+        raise VoteError('评价人与小组不在同一课程中', 400, foreign)
+    locked = [group_id for group_id in group_ids if groups[group_id].status == 1]
+    if locked:
+        raise VoteError('该小组评价已结束', 400, locked)
+
+    # 已投过的小组：幂等键相同视为客户端重试，不同则整批拒绝
+    existing = {
+        group_id: (key, existing_type) for group_id, key, existing_type in
+        db.session.query(Vote.group_id, Vote.idempotency_key, Vote.vote_type)
+        .filter(Vote.voter_id == voter['voter_id'], Vote.group_id.in_(group_ids))
+    }
+    voted = [group_id for group_id, (key, _) in existing.items() if not idempotency_key or key != idempotency_key]
+    if voted:
+        raise VoteError('您已经投过票了', 400, voted)
+    changed = [group_id for group_id, (_, existing_type) in existing.items() if existing_type != vote_types[group_id]]
+    if changed:
+        raise VoteError(REPLAY_MISMATCH_MESSAGE, 409, changed)
+
+    created = [group_id for group_id in group_ids if group_id not in existing]
+    if created:
+        voted_at = datetime.utcnow()
+        rows = [
+            {
+                'course_id': course_id,
+                'group_id': group_id,
+                'voter_id': voter['voter_id'],
+                'vote_type': vote_types[group_id],
+                'vote_weight': voter['weight'],
+                'idempotency_key': idempotency_key,
+                'created_at': voted_at,
+            }
+            for group_id in created
+        ]
+        try:
+            inserted = Vote.insert_many_ignore_conflict(rows)
+        except IntegrityError:
+            # 令牌签发后评价人已被删除
+            db.session.rollback()
+            raise VoteError('评价人不存在，请重新验证', 401)
+        if inserted != len(created):
+            # 校验之后有并发请求写入了其中的小组
+            db.session.rollback()
+            raise VoteError('您已经投过票了')
+        timeline.apply_votes_created(
+            course_id, voted_at, [(group_id, vote_types[group_id], voter['weight']) for group_id in created]
+        )
+        ledger.record_votes_created(voter['voter_id'], created)
+        db.session.commit()
+        # 提交后对象已过期，一次重新加载全部小组，避免逐组刷新
+        groups = load_groups()
+
+    tallies = ledger.get_tally_store().tallies(course_id)
+    return [
+        (group_id, group_id in created, ledger.group_stats(groups[group_id], tallies))
+        for group_id in group_ids
+    ]
@@ -1,209 +1,11 @@
-// 全局变量
-let socket;
-let currentGroup = null;
-let groups = [];
+// 后台管理：打开后台管理页时由 common.js 按需加载
 let roles = [];
 let rolesCourseId = null;
 let adminGroups = [];
 let adminGroupsCourseId = null;
 let voters = [];
-let currentVoter = null;
-let photoCarouselInterval;
-let currentPhotoSlide = 0;
-let manualFullscreen = false;
-let fullscreenTargetPageId = null;
-
-let courses = [];
-let currentCourseId = null;
-let currentCourse = null;
-let activeCourseId = null;
-let activeCourse = null;
-
-const ADMIN_TOKEN_STORAGE_KEY = 'evaluationAdminToken';
-let adminToken = localStorage.getItem(ADMIN_TOKEN_STORAGE_KEY) || '';
-let adminAuthPromptVisible = false;
-
-const DISPLAY_STAGE_BASE_WIDTH = 1600;
-const DISPLAY_STAGE_BASE_HEIGHT = 900;
-
-// API基础URL
-const API_BASE = '/api';
-
-// 初始化应用
-document.addEventListener('DOMContentLoaded', function() {
-    initializeApp();
-});
-
-// 初始化应用
-function initializeApp() {
-    setupNavigation();
-    setupSocketConnection();
-    setupEventListeners();
-    loadInitialData();
-    updateAdminAuthUI();
-
-    // 检查URL参数，如果有小组参数则显示手机端页面
-    const urlParams = new URLSearchParams(window.location.search);
-    const groupId = urlParams.get('g') || urlParams.get('group');
-    if (groupId) {
-        showMobilePage(groupId);
-    }
-}
-
-// 设置导航
-function setupNavigation() {
-    const navButtons = document.querySelectorAll('.nav-btn');
-    navButtons.forEach(btn => {
-        if (btn.id === 'fullscreenToggle') {
-            return;
-        }
-
-        if (btn.id === 'adminLogoutBtn') {
-            btn.addEventListener('click', handleAdminLogout);
-            return;
-        }
-
-        btn.addEventListener('click', function() {
-            const targetPage = this.dataset.targetPage || this.id.replace('Btn', 'Page');
-
-            if (targetPage === 'adminPage' && !ensureAdminAuthenticated()) {
-                return;
-            }
-
-            showPage(targetPage);
-            setActiveNavButton(this.id);
-        });
-    });
-}
-
-function setActiveNavButton(buttonId) {
-    const navButtons = document.querySelectorAll('.nav-btn');
-    navButtons.forEach(btn => {
-        if (btn.id === 'fullscreenToggle') {
-            btn.classList.remove('active');
-            return;
-        }
-        btn.classList.toggle('active', btn.id === buttonId);
-    });
-}
-
-function getAdminToken() {
-    return adminToken || '';
-}
-
-function updateAdminAuthUI() {
-    const adminLogoutBtn = document.getElementById('adminLogoutBtn');
-    if (adminLogoutBtn) {
-        const isAuthenticated = Boolean(getAdminToken());
-        adminLogoutBtn.classList.toggle('hidden', !isAuthenticated);
-    }
-}
-
-function setAdminToken(token) {
-    adminToken = token || '';
-    if (adminToken) {
-        localStorage.setItem(ADMIN_TOKEN_STORAGE_KEY, adminToken);
-    } else {
-        localStorage.removeItem(ADMIN_TOKEN_STORAGE_KEY);
-    }
-    updateAdminAuthUI();
-}
-
-function clearAdminToken() {
-    setAdminToken('');
-}
-
-function ensureAdminAuthenticated() {
-    if (getAdminToken()) {
-        return true;
-    }
-    showAdminLoginModal();
-    return false;
-}
-
-function getActiveCourseId() {
-    return activeCourseId;
-}
-
-function getCurrentCourseId() {
-    return currentCourseId || activeCourseId;
-}
-
-function findCourseById(id) {
-    if (!id) return null;
-    const numericId = typeof id === 'string' ? parseInt(id, 10) : id;
-    return courses.find(course => course.id === numericId) || null;
-}
-
-function setActiveCourseData(course) {
-    activeCourse = course || null;
-    activeCourseId = course ? course.id : null;
-    updateCourseDisplays();
-}
-
-function setCurrentCourseData(course) {
-    currentCourse = course || null;
-    currentCourseId = course ? course.id : null;
-    updateCourseDisplays();
-    updateAdminCourseSelector();
-}
-
-function buildCourseUrl(path, courseId) {
-    const targetId = courseId ?? getCurrentCourseId();
-    if (!targetId) {
-        return path;
-    }
-
-    const separator = path.includes('?') ? '&' : '?';
-    return `${path}${separator}course_id=${encodeURIComponent(targetId)}`;
-}
-
-function buildActiveCourseUrl(path) {
-    const activeId = getActiveCourseId();
-    if (!activeId) {
-        return path;
-    }
-    return buildCourseUrl(path, activeId);
-}
-
-function withCourseId(payload, courseId) {
-    const targetId = courseId ?? getCurrentCourseId();
-    if (!targetId) {
-        return { ...payload };
-    }
-    return { ...payload, course_id: targetId };
-}
-
-function appendCourseIdToFormData(formData, courseId) {
-    const targetId = courseId ?? getCurrentCourseId();
-    if (!targetId) {
-        return formData;
-    }
-    if (!formData.has('course_id')) {
-        formData.append('course_id', targetId);
-    }
-    return formData;
-}
-
-function updateCourseDisplays() {
-    const courseName = (activeCourse && activeCourse.name) || '未设置课程';
-
-    const navCourseEl = document.getElementById('navCourseName');
-    if (navCourseEl) {
-        navCourseEl.textContent = courseName;
-    }
-
-    const rankingCourseEl = document.getElementById('rankingCourseBadge');
-    if (rankingCourseEl) {
-        rankingCourseEl.textContent = courseName;
-    }
-
-    if (courseName) {
-        document.title = `${courseName} - 小组评价系统`;
-    } else {
-        document.title = '小组评价系统';
-    }
-}
+let voterSearch = { q: '', page: 1, total: 0 };
+let voterSearchTimer = null;
 
 function updateAdminCourseSelector() {
     const selector = document.getElementById('adminCourseSelector');
@@ -252,1181 +54,173 @@ function updateAdminCourseSelector() {
     }
 }
 
-function showAdminLoginModal() {
-    const modal = document.getElementById('adminLoginModal');
-    const passwordInput = document.getElementById('adminPassword');
-    const errorEl = document.getElementById('adminLoginError');
-
-    if (errorEl) {
-        errorEl.textContent = '';
-    }
-
-    if (passwordInput) {
-        passwordInput.value = '';
-        passwordInput.classList.remove('has-value');
-        passwordInput.focus();
-    }
-
-    if (modal) {
-        modal.classList.add('active');
-        modal.setAttribute('aria-hidden', 'false');
-    }
-
-    adminAuthPromptVisible = true;
-}
-
-function hideAdminLoginModal() {
-    const modal = document.getElementById('adminLoginModal');
-    if (modal) {
-        modal.classList.remove('active');
-        modal.setAttribute('aria-hidden', 'true');
+// 管理员加入后台任务进度推送房间
+function joinAdminRoom() {
+    if (socket && socket.connected && getAdminToken()) {
+        socket.emit('join_admin', { token: getAdminToken() });
     }
-    adminAuthPromptVisible = false;
 }
 
-async function handleAdminLoginSubmit(event) {
-    event.preventDefault();
-
-    const usernameInput = document.getElementById('adminUsername');
-    const passwordInput = document.getElementById('adminPassword');
-    const errorEl = document.getElementById('adminLoginError');
-    const submitBtn = event.target.querySelector('button[type="submit"]');
-
-    const username = usernameInput ? usernameInput.value.trim() : '';
-    const password = passwordInput ? passwordInput.value : '';
-
-    if (!password) {
-        if (errorEl) {
-            errorEl.textContent = '请输入管理员密码';
-        }
-        if (passwordInput) {
-            passwordInput.focus();
-        }
-        return;
-    }
-
-    if (errorEl) {
-        errorEl.textContent = '';
-    }
+const JOB_POLL_INTERVAL = 2000;
+const jobWaiters = new Map();
 
-    if (submitBtn) {
-        submitBtn.disabled = true;
-    }
+function handleJobProgress(job) {
+    const waiter = jobWaiters.get(job.id);
+    if (!waiter) return;
 
-    try {
-        await loginAdmin(username, password);
-        hideAdminLoginModal();
-        showMessage('登录成功', 'success');
-        setActiveNavButton('adminBtn');
-        showPage('adminPage');
-    } catch (error) {
-        if (errorEl) {
-            errorEl.textContent = error.message || '登录失败，请重试';
-        }
-        if (passwordInput) {
-            passwordInput.focus();
-        }
-    } finally {
-        if (submitBtn) {
-            submitBtn.disabled = false;
-        }
+    if (waiter.onProgress) {
+        waiter.onProgress(job);
     }
-}
-
-async function loginAdmin(username, password) {
-    const response = await fetch(API_BASE + '/admin/login', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ username, password })
-    });
-
-    const resultText = await response.text();
-    let result = {};
-    if (resultText) {
-        try {
-            result = JSON.parse(resultText);
-        } catch (error) {
-            console.warn('解析登录响应失败:', error);
+    if (job.status === 'succeeded' || job.status === 'failed') {
+        clearInterval(waiter.timer);
+        jobWaiters.delete(job.id);
+        if (job.status === 'succeeded') {
+            waiter.resolve(job);
+        } else {
+            waiter.reject(new Error(job.error || '任务失败'));
         }
     }
-
-    if (!response.ok || !result.token) {
-        const message = result.error || '账号或密码错误';
-        const error = new Error(message);
-        error.status = response.status;
-        throw error;
-    }
-
-    setAdminToken(result.token);
-    adminAuthPromptVisible = false;
-    return result;
 }
 
-async function requestAdminLogout() {
-    const token = getAdminToken();
-    if (!token) {
-        return;
-    }
-
-    const response = await authorizedFetch(API_BASE + '/admin/logout', {
-        method: 'POST'
-    });
-
-    if (!response.ok && response.status !== 401) {
-        let message = '退出登录失败';
-        const responseText = await response.text().catch(() => '');
-        if (responseText) {
+// 等待后台任务完成：优先使用Socket.IO推送，同时定期查询状态作为兜底
+function waitForJob(job, onProgress) {
+    return new Promise((resolve, reject) => {
+        const waiter = { resolve, reject, onProgress, timer: null };
+        waiter.timer = setInterval(async () => {
             try {
-                const data = JSON.parse(responseText);
-                message = data.error || data.message || message;
-            } catch (parseError) {
-                console.warn('解析退出响应失败:', parseError);
+                handleJobProgress(await apiCall(`/jobs/${job.id}`));
+            } catch (error) {
+                console.error('查询任务状态失败:', error);
             }
-        }
-
-        const error = new Error(message);
-        error.status = response.status;
-        throw error;
-    }
-}
-
-function finalizeAdminLogout(message = '已退出登录', messageType = 'success') {
-    const adminPage = document.getElementById('adminPage');
-    const wasAdminActive = adminPage && adminPage.classList.contains('active');
-
-    adminAuthPromptVisible = false;
-    clearAdminToken();
-
-    if (wasAdminActive) {
-        showPage('displayPage');
-        setActiveNavButton('displayBtn');
-    }
-
-    if (message) {
-        showMessage(message, messageType);
-    }
-}
-
-async function handleAdminLogout(event) {
-    if (event) {
-        event.preventDefault();
-    }
-
-    const trigger = event ? event.currentTarget : null;
-    if (trigger) {
-        trigger.disabled = true;
-    }
-
-    let feedbackMessage = '已退出登录';
-    let feedbackType = 'success';
-
-    try {
-        await requestAdminLogout();
-    } catch (error) {
-        if (!error.status || error.status !== 401) {
-            console.error('退出登录失败:', error);
-            feedbackMessage = error.message || '退出登录失败，请稍后重试';
-            feedbackType = 'error';
-        }
-    } finally {
-        if (trigger) {
-            trigger.disabled = false;
-        }
-    }
-
-    finalizeAdminLogout(feedbackMessage, feedbackType);
-}
-
-function handleAdminUnauthorized() {
-    const hadToken = Boolean(getAdminToken());
-    clearAdminToken();
-
-    const adminPage = document.getElementById('adminPage');
-    const isAdminActive = adminPage && adminPage.classList.contains('active');
-
-    if (!isAdminActive) {
-        adminAuthPromptVisible = false;
-        return;
-    }
-
-    if (!adminAuthPromptVisible && hadToken) {
-        showMessage('登录已过期，请重新登录', 'error');
-        showAdminLoginModal();
-    }
-
-    setActiveNavButton('adminBtn');
-}
-
-// 显示页面
-function showPage(pageId) {
-    const pages = document.querySelectorAll('.page');
-    pages.forEach(page => page.classList.remove('active'));
-    
-    const targetPage = document.getElementById(pageId);
-    if (targetPage) {
-        targetPage.classList.add('active');
-        
-        // 根据页面执行特定初始化
-        switch(pageId) {
-            case 'adminPage':
-                loadAdminData();
-                break;
-            case 'rankingPage':
-                loadRankingData();
-                break;
-            case 'displayPage':
-                loadDisplayData();
-                break;
-        }
-    }
-}
-
-// 设置WebSocket连接
-function setupSocketConnection() {
-    socket = io();
-    
-    socket.on('connect', function() {
-        console.log('WebSocket连接成功');
-    });
-    
-    socket.on('vote_updated', function(data) {
-        if (currentGroup && data.group_id === currentGroup.id) {
-            updateVoteStats(data.stats);
-        }
-    });
-    
-    socket.on('disconnect', function() {
-        console.log('WebSocket连接断开');
+        }, JOB_POLL_INTERVAL);
+        jobWaiters.set(job.id, waiter);
+        handleJobProgress(job);
     });
 }
 
-// 设置事件监听器
-function setupEventListeners() {
-    // 模态框关闭
-    const modal = document.getElementById('modal');
-    const closeBtn = document.querySelector('.close');
-
-    if (closeBtn) {
-        closeBtn.addEventListener('click', function() {
-            modal.classList.remove('active');
-        });
-    }
-
-    window.addEventListener('click', function(event) {
-        if (event.target === modal) {
-            modal.classList.remove('active');
-        }
-    });
-
+// 设置后台管理按钮事件
+function setupAdminButtonEvents() {
     // 后台管理标签切换
     const adminTabs = document.querySelectorAll('.admin-tab');
-    adminTabs.forEach(tab => {
-        tab.addEventListener('click', function() {
-            const targetTab = this.dataset.tab;
-            switchAdminTab(targetTab);
-            
-            adminTabs.forEach(t => t.classList.remove('active'));
-            this.classList.add('active');
-        });
-    });
-    
-    // 手机端表单提交
-    const verifyForm = document.getElementById('verifyForm');
-    if (verifyForm) {
-        verifyForm.addEventListener('submit', handleVerifySubmit);
-    }
-
-    // 大屏评价二维码交互
-    const evaluationQrWrapper = document.getElementById('evaluationQrWrapper');
-    if (evaluationQrWrapper) {
-        const handleOpenMobile = (event) => {
-            event.preventDefault();
-            openMobilePage();
-        };
-
-        evaluationQrWrapper.addEventListener('click', handleOpenMobile);
-        evaluationQrWrapper.addEventListener('keydown', (event) => {
-            if (event.key === 'Enter' || event.key === ' ' || event.key === 'Spacebar') {
-                event.preventDefault();
-                openMobilePage();
-            }
-        });
-    }
-
-    const photoPrevBtn = document.getElementById('photoPrevBtn');
-    if (photoPrevBtn) {
-        photoPrevBtn.addEventListener('click', showPreviousPhoto);
-    }
-
-    const photoNextBtn = document.getElementById('photoNextBtn');
-    if (photoNextBtn) {
-        photoNextBtn.addEventListener('click', showNextPhoto);
-    }
-
-    // 投票按钮
-    const likeBtn = document.getElementById('likeBtn');
-    const dislikeBtn = document.getElementById('dislikeBtn');
-    
-    if (likeBtn) likeBtn.addEventListener('click', () => submitVote(1));
-    if (dislikeBtn) dislikeBtn.addEventListener('click', () => submitVote(-1));
-    
-    // 返回按钮
-    const backToVerifyBtn = document.getElementById('backToVerifyBtn');
-    if (backToVerifyBtn) {
-        backToVerifyBtn.addEventListener('click', function() {
-            showMobileStep('verifyStep');
-            currentVoter = null;
-        });
-    }
-
-    const fullscreenToggle = document.getElementById('fullscreenToggle');
-    if (fullscreenToggle) {
-        fullscreenToggle.addEventListener('click', enterFullscreenMode);
-    }
-
-    const exitFullscreenBtn = document.getElementById('exitFullscreenBtn');
-    if (exitFullscreenBtn) {
-        exitFullscreenBtn.addEventListener('click', exitFullscreenMode);
-    }
-
-    document.addEventListener('fullscreenchange', handleFullscreenChange);
-    document.addEventListener('keydown', handleFullscreenKeydown);
-
-    window.addEventListener('resize', handleWindowResize);
-
-    const adminLoginForm = document.getElementById('adminLoginForm');
-    if (adminLoginForm) {
-        adminLoginForm.addEventListener('submit', handleAdminLoginSubmit);
-        initializeAdminLoginInputStyles(adminLoginForm);
-    }
-
-    const adminLoginModal = document.getElementById('adminLoginModal');
-    if (adminLoginModal) {
-        adminLoginModal.addEventListener('click', (event) => {
-            if (event.target === adminLoginModal) {
-                hideAdminLoginModal();
-            }
-        });
-    }
-
-    const adminLoginCloseBtn = document.getElementById('adminLoginCloseBtn');
-    if (adminLoginCloseBtn) {
-        adminLoginCloseBtn.addEventListener('click', hideAdminLoginModal);
-    }
-
-    const adminLoginCancelBtn = document.getElementById('adminLoginCancelBtn');
-    if (adminLoginCancelBtn) {
-        adminLoginCancelBtn.addEventListener('click', hideAdminLoginModal);
-    }
-
-    const adminCourseSelector = document.getElementById('adminCourseSelector');
-    if (adminCourseSelector) {
-        adminCourseSelector.addEventListener('change', handleAdminCourseChange);
-    }
-
-    const adminActivateCourseBtn = document.getElementById('adminActivateCourseBtn');
-    if (adminActivateCourseBtn) {
-        adminActivateCourseBtn.addEventListener('click', handleAdminActivateCourse);
-    }
-
-    // 后台管理按钮事件绑定
-    setupAdminButtonEvents();
-}
-
-function initializeAdminLoginInputStyles(form) {
-    const loginInputs = form.querySelectorAll('input');
-    loginInputs.forEach((input) => {
-        const toggleValueClass = () => {
-            if (input.value && input.value.trim() !== '') {
-                input.classList.add('has-value');
-            } else {
-                input.classList.remove('has-value');
-            }
-        };
-
-        toggleValueClass();
-        input.addEventListener('input', toggleValueClass);
-        input.addEventListener('blur', toggleValueClass);
-    });
-}
-
-function prepareFullscreenTargetPage() {
-    const activePage = document.querySelector('.page.active');
-
-    if (activePage && (activePage.id === 'displayPage' || activePage.id === 'rankingPage')) {
-        fullscreenTargetPageId = activePage.id;
-        return activePage;
-    }
-
-    fullscreenTargetPageId = 'displayPage';
-    showPage('displayPage');
-    setActiveNavButton('displayBtn');
-    return document.getElementById('displayPage');
-}
-
-async function enterFullscreenMode() {
-    const targetPage = prepareFullscreenTargetPage();
-    if (!targetPage) {
-        return;
-    }
-
-    if (document.fullscreenElement || manualFullscreen) {
-        activateFullscreenUI();
-        return;
-    }
-
-    const targetElement = document.documentElement;
-
-    if (targetElement && targetElement.requestFullscreen) {
-        try {
-            await targetElement.requestFullscreen();
-        } catch (error) {
-            console.warn('启动全屏失败:', error);
-            manualFullscreen = true;
-            activateFullscreenUI();
-        }
-    } else {
-        manualFullscreen = true;
-        activateFullscreenUI();
-    }
-}
-
-async function exitFullscreenMode() {
-    if (manualFullscreen) {
-        manualFullscreen = false;
-        deactivateFullscreenUI();
-        fullscreenTargetPageId = null;
-        return;
-    }
-
-    if (document.fullscreenElement) {
-        try {
-            await document.exitFullscreen();
-        } catch (error) {
-            console.warn('退出全屏失败:', error);
-            deactivateFullscreenUI();
-            fullscreenTargetPageId = null;
-        }
-    } else {
-        deactivateFullscreenUI();
-        fullscreenTargetPageId = null;
-    }
-}
-
-function handleFullscreenChange() {
-    const isActive = Boolean(document.fullscreenElement);
-
-    if (isActive) {
-        activateFullscreenUI();
-    } else if (!manualFullscreen) {
-        deactivateFullscreenUI();
-    }
-
-    if (!isActive) {
-        manualFullscreen = false;
-        fullscreenTargetPageId = null;
-    }
-}
-
-function handleFullscreenKeydown(event) {
-    if (event.key === 'Escape' && manualFullscreen) {
-        manualFullscreen = false;
-        deactivateFullscreenUI();
-    }
-}
-
-function handleWindowResize() {
-    if (document.body.classList.contains('fullscreen-mode')) {
-        updateDisplayScale();
-    }
-}
-
-function activateFullscreenUI() {
-    document.body.classList.add('fullscreen-mode');
-    if (fullscreenTargetPageId) {
-        document.body.setAttribute('data-fullscreen-page', fullscreenTargetPageId);
-    } else {
-        document.body.removeAttribute('data-fullscreen-page');
-    }
-    updateDisplayScale();
-}
-
-function deactivateFullscreenUI() {
-    document.body.classList.remove('fullscreen-mode');
-    document.body.removeAttribute('data-fullscreen-page');
-    updateDisplayScale();
-}
-
-function updateDisplayScale() {
-    const stage = document.querySelector('#displayPage .display-stage');
-    if (!stage) {
-        return;
-    }
-
-    const inFullscreen = document.body.classList.contains('fullscreen-mode') && fullscreenTargetPageId === 'displayPage';
-
-    if (inFullscreen) {
-        const scaleX = window.innerWidth / DISPLAY_STAGE_BASE_WIDTH;
-        const scaleY = window.innerHeight / DISPLAY_STAGE_BASE_HEIGHT;
-        const scale = Math.min(scaleX, scaleY);
-
-        stage.style.transform = `scale(${scale})`;
-        stage.style.width = `${DISPLAY_STAGE_BASE_WIDTH}px`;
-        stage.style.height = `${DISPLAY_STAGE_BASE_HEIGHT}px`;
-        stage.classList.add('scaled');
-    } else {
-        stage.style.transform = '';
-        stage.style.width = '';
-        stage.style.height = '';
-        stage.classList.remove('scaled');
-    }
-}
-
-// 设置后台管理按钮事件
-function setupAdminButtonEvents() {
-    const addCourseBtn = document.getElementById('addCourseBtn');
-    if (addCourseBtn) {
-        addCourseBtn.addEventListener('click', showAddCourseModal);
-    }
-
-    // 添加小组按钮
-    const addGroupBtn = document.getElementById('addGroupBtn');
-    if (addGroupBtn) {
-        addGroupBtn.addEventListener('click', showAddGroupModal);
-    }
-    
-    // 添加评价人按钮
-    const addVoterBtn = document.getElementById('addVoterBtn');
-    if (addVoterBtn) {
-        addVoterBtn.addEventListener('click', showAddVoterModal);
-    }
-    
-    // 添加职务按钮
-    const addRoleBtn = document.getElementById('addRoleBtn');
-    if (addRoleBtn) {
-        addRoleBtn.addEventListener('click', showAddRoleModal);
-    }
-    
-    // 下载模板按钮
-    const downloadTemplateBtn = document.getElementById('downloadTemplateBtn');
-    if (downloadTemplateBtn) {
-        downloadTemplateBtn.addEventListener('click', downloadVotersTemplate);
-    }
-    
-    // 批量导入按钮
-    const importVotersBtn = document.getElementById('importVotersBtn');
-    if (importVotersBtn) {
-        importVotersBtn.addEventListener('click', showImportVotersModal);
-    }
-    
-    // 文件选择事件
-    const fileInput = document.getElementById('fileInput');
-    if (fileInput) {
-        fileInput.addEventListener('change', handleFileImport);
-    }
-}
-
-async function loadCourses() {
-    try {
-        const data = await apiCall('/courses');
-        courses = Array.isArray(data) ? data : [];
-    } catch (error) {
-        console.error('加载课程失败:', error);
-        courses = [];
-    }
-
-    if (!courses.length) {
-        setActiveCourseData(null);
-        setCurrentCourseData(null);
-        renderAdminCoursesList();
-        return courses;
-    }
-
-    const active = courses.find(course => course.is_active) || courses[0];
-    setActiveCourseData(active);
-
-    const desiredCurrentId = currentCourseId;
-    const current = desiredCurrentId ? findCourseById(desiredCurrentId) : null;
-    setCurrentCourseData(current || active);
-
-    renderAdminCoursesList();
-
-    return courses;
-}
-
-// 加载初始数据
-async function loadInitialData() {
-    try {
-        await loadCourses();
-
-        const displayCourseId = getActiveCourseId();
-        const managementCourseId = getCurrentCourseId();
-
-        const initialTasks = [];
-
-        initialTasks.push(loadGroups(displayCourseId));
-        initialTasks.push(loadRoles(managementCourseId));
-
-        if (getAdminToken()) {
-            initialTasks.push(loadVoters({ silent: true, courseId: managementCourseId }));
-        } else {
-            voters = [];
-        }
-
-        await Promise.all(initialTasks);
-
-        if (groups.length > 0) {
-            selectGroup(groups[0]);
-        }
-    } catch (error) {
-        console.error('加载初始数据失败:', error);
-        showMessage('加载数据失败，请刷新页面重试', 'error');
-    }
-}
-
-async function loadDisplayData() {
-    const previousGroupId = currentGroup ? currentGroup.id : null;
-
-    try {
-        await loadGroups(getActiveCourseId());
-
-        if (groups.length === 0) {
-            currentGroup = null;
-            const membersList = document.getElementById('membersList');
-            if (membersList) {
-                membersList.innerHTML = '<p style="text-align: center; color: #B0C4DE;">暂无小组数据</p>';
-            }
-            updateGroupDisplay();
-            return;
-        }
-
-        const matchedGroup = previousGroupId ? groups.find(group => group.id === previousGroupId) : null;
-        if (matchedGroup) {
-            selectGroup(matchedGroup);
-        } else {
-            selectGroup(groups[0]);
-        }
-    } catch (error) {
-        console.error('刷新大屏数据失败:', error);
-        showMessage('刷新大屏数据失败', 'error');
-    }
-}
-
-function authorizedFetch(url, options = {}) {
-    const headers = new Headers(options.headers || {});
-    const token = getAdminToken();
-
-    if (token) {
-        headers.set('Authorization', `Bearer ${token}`);
-    }
-
-    return fetch(url, { ...options, headers });
-}
-
-// API调用函数
-async function apiCall(url, options = {}) {
-    const isFormData = options.body instanceof FormData;
-    const headers = new Headers(options.headers || {});
-
-    if (!isFormData && !headers.has('Content-Type')) {
-        headers.set('Content-Type', 'application/json');
-    }
-
-    try {
-        const response = await authorizedFetch(API_BASE + url, {
-            ...options,
-            headers
-        });
-
-        if (!response.ok) {
-            let errorData = {};
-            try {
-                errorData = await response.json();
-            } catch (parseError) {
-                errorData = {};
-            }
-
-            if (response.status === 401) {
-                handleAdminUnauthorized();
-            }
-
-            const error = new Error(errorData.error || `HTTP ${response.status}`);
-            error.status = response.status;
-            throw error;
-        }
-
-        if (response.status === 204) {
-            return null;
-        }
-
-        const contentType = response.headers.get('content-type');
-        if (contentType && contentType.includes('application/json')) {
-            const text = await response.text();
-            return text ? JSON.parse(text) : null;
-        }
-
-        return await response.json();
-    } catch (error) {
-        if (error.status !== 401) {
-            console.error('API调用失败:', error);
-        }
-        throw error;
-    }
-}
-
-// 加载小组数据
-async function loadGroups(courseId, options = {}) {
-    const targetCourseId = courseId ?? getCurrentCourseId() ?? getActiveCourseId();
-    const url = buildCourseUrl('/groups', targetCourseId);
-    groups = await apiCall(url);
-    if (!options.skipRenderTabs) {
-        renderGroupTabs();
-    }
-    return groups;
-}
-
-// 加载职务数据
-async function loadRoles(courseId) {
-    const targetCourseId = courseId ?? getCurrentCourseId();
-    const url = buildCourseUrl('/roles', targetCourseId);
-    roles = await apiCall(url);
-    rolesCourseId = targetCourseId;
-    return roles;
-}
-
-// 加载评价人数据
-async function loadVoters(options = {}) {
-    try {
-        const url = buildCourseUrl('/voters', options.courseId);
-        voters = await apiCall(url);
-        return voters;
-    } catch (error) {
-        if (error.status === 401) {
-            voters = [];
-            if (!options.silent) {
-                throw error;
-            }
-            return voters;
-        }
-
-        if (!options.silent) {
-            throw error;
-        }
-
-        console.error('加载评价人失败:', error);
-        voters = [];
-        return voters;
-    }
-}
-
-// 渲染小组标签
-function renderGroupTabs() {
-    const tabsContainer = document.getElementById('groupTabs');
-    if (!tabsContainer) return;
-    
-    tabsContainer.innerHTML = '';
-    
-    groups.forEach(group => {
-        const tab = document.createElement('button');
-        tab.className = 'group-tab';
-        tab.textContent = group.name;
-        tab.addEventListener('click', () => selectGroup(group));
-        tabsContainer.appendChild(tab);
-    });
-}
-
-// 选择小组
-function selectGroup(group) {
-    currentGroup = group;
-    
-    // 更新标签状态
-    const tabs = document.querySelectorAll('.group-tab');
-    tabs.forEach((tab, index) => {
-        tab.classList.toggle('active', groups[index] === group);
-    });
-    
-    // 更新显示内容
-    updateGroupDisplay();
-    loadGroupMembers();
-    
-    // 加入WebSocket房间
-    if (socket) {
-        socket.emit('join_group', { group_id: group.id });
-    }
-}
-
-// 更新小组显示
-function updateGroupDisplay() {
-    const shareLinkElement = document.getElementById('evaluationShareLink');
-    let mobileUrl = null;
-    if (currentGroup) {
-        mobileUrl = buildMobileEvaluationUrl(currentGroup.id);
-        if (shareLinkElement) {
-            shareLinkElement.textContent = mobileUrl;
-            shareLinkElement.href = mobileUrl;
-        }
-    } else if (shareLinkElement) {
-        shareLinkElement.textContent = '请选择小组';
-        shareLinkElement.href = '#';
-    }
-
-    updateEvaluationQrCode(currentGroup, mobileUrl);
-
-    if (!currentGroup) return;
-
-    const groupName = document.getElementById('groupName');
-    const groupLogo = document.getElementById('groupLogo');
-
-    if (groupName) groupName.textContent = currentGroup.name;
-    if (groupLogo) {
-        if (currentGroup.logo) {
-            groupLogo.src = currentGroup.logo;
-            groupLogo.style.display = 'block';
-        } else {
-            groupLogo.style.display = 'none';
-        }
-    }
-
-    // 更新投票统计
-    updateVoteStats(currentGroup ? currentGroup.vote_stats : null);
-
-    // 更新照片轮播
-    updatePhotoCarousel();
-}
-
-function updateEvaluationQrCode(group, mobileUrl) {
-    const qrContainer = document.getElementById('evaluationQrCode');
-    if (!qrContainer) return;
-
-    if (!group) {
-        qrContainer.innerHTML = '<div class="qr-placeholder">请选择小组</div>';
-        return;
-    }
-
-    const targetMobileUrl = mobileUrl || buildMobileEvaluationUrl(group.id);
-    const qrImageUrl = `${buildGroupQrCodeImageUrl(group.id)}?t=${Date.now()}`;
-
-    const qrImage = document.createElement('img');
-    qrImage.src = qrImageUrl;
-    qrImage.alt = `小组${group.name || ''}评价二维码`;
-    qrImage.loading = 'lazy';
-    qrImage.decoding = 'async';
-
-    qrImage.addEventListener('error', (error) => {
-        console.error('二维码加载失败', error);
-        qrContainer.innerHTML = '<div class="qr-placeholder">二维码加载失败</div>';
-    });
-
-    qrImage.addEventListener('load', () => {
-        // 将二维码图片加载成功后，确保显示正确的移动端链接
-        const shareLinkElement = document.getElementById('evaluationShareLink');
-        if (shareLinkElement) {
-            shareLinkElement.textContent = targetMobileUrl;
-            shareLinkElement.href = targetMobileUrl;
-        }
-    });
-
-    qrContainer.innerHTML = '';
-    qrContainer.appendChild(qrImage);
-}
-
-// 更新投票统计
-function updateVoteStats(stats) {
-    // 如果没有传入stats参数，尝试从currentGroup获取
-    if (!stats && currentGroup && currentGroup.vote_stats) {
-        stats = currentGroup.vote_stats;
-    }
-    
-    // 如果仍然没有stats，使用默认值
-    if (!stats) {
-        stats = { likes: 0, dislikes: 0 };
-    }
-    
-    const totalScore = document.getElementById('totalScore');
-    
-    // 计算总计分：赞的分数总和 - 踩的分数总和
-    const score = (stats.likes || 0) - (stats.dislikes || 0);
-    if (totalScore) totalScore.textContent = score;
-    
-    // 添加动画效果
-    if (totalScore) {
-        totalScore.style.transform = 'scale(1.1)';
-        setTimeout(() => {
-            totalScore.style.transform = 'scale(1)';
-        }, 200);
-    }
-}
-
-// 加载小组成员
-async function loadGroupMembers() {
-    if (!currentGroup) return;
-    
-    try {
-        const members = await apiCall(`/groups/${currentGroup.id}/members`);
-        renderMembersList(members);
-    } catch (error) {
-        console.error('加载成员失败:', error);
-        const membersList = document.getElementById('membersList');
-        if (membersList) {
-            membersList.innerHTML = '<p style="text-align: center; color: #B0C4DE;">加载成员失败</p>';
-        }
-    }
-}
-
-// 渲染成员列表
-function renderMembersList(members) {
-    const membersList = document.getElementById('membersList');
-    if (!membersList) return;
-
-    const safeMembers = Array.isArray(members) ? members : [];
-    let memberCards = [];
-
-    if (safeMembers.length === 0) {
-        memberCards.push(`
-            <div class="member-card member-card-placeholder">
-                <div class="member-card-name">暂无成员</div>
-                <div class="member-card-meta">等待添加</div>
-            </div>
-        `);
-    } else {
-        memberCards = safeMembers.map(member => {
-            const metaParts = [member.role_name || '未知职务'];
-            if (member.company) {
-                metaParts.push(member.company);
-            }
-
-            return `
-                <div class="member-card">
-                    <div class="member-card-name">${member.name}</div>
-                    <div class="member-card-meta">${metaParts.join(' ｜ ')}</div>
-                </div>
-            `;
-        });
-    }
-
-    const placeholdersNeeded = Math.max(0, 15 - memberCards.length);
-    const placeholders = Array.from({ length: placeholdersNeeded }).map(() => `
-        <div class="member-card member-card-placeholder">
-            <div class="member-card-name"></div>
-            <div class="member-card-meta"></div>
-        </div>
-    `);
-
-    membersList.innerHTML = [...memberCards, ...placeholders].join('');
-}
-
-// 更新照片轮播
-function updatePhotoCarousel() {
-    const photoSlides = document.getElementById('photoSlides');
-    const carouselDots = document.getElementById('carouselDots');
-    const prevButton = document.getElementById('photoPrevBtn');
-    const nextButton = document.getElementById('photoNextBtn');
-
-    if (!photoSlides || !carouselDots || !currentGroup) return;
-
-    // 清除现有轮播
-    if (photoCarouselInterval) {
-        clearInterval(photoCarouselInterval);
-    }
-
-    const photos = currentGroup.photos || [];
-
-    if (prevButton) {
-        prevButton.disabled = photos.length <= 1;
-        prevButton.style.display = photos.length === 0 ? 'none' : 'flex';
-    }
-
-    if (nextButton) {
-        nextButton.disabled = photos.length <= 1;
-        nextButton.style.display = photos.length === 0 ? 'none' : 'flex';
-    }
-
-    if (photos.length === 0) {
-        currentPhotoSlide = 0;
-        photoSlides.innerHTML = '<div class="photo-slide"><div style="display: flex; align-items: center; justify-content: center; height: 100%; color: #B0C4DE;">暂无照片</div></div>';
-        carouselDots.innerHTML = '';
-        return;
-    }
-
-    // 渲染照片
-    photoSlides.innerHTML = '';
-    carouselDots.innerHTML = '';
-
-    photos.forEach((photo, index) => {
-        const slide = document.createElement('div');
-        slide.className = 'photo-slide';
-        slide.innerHTML = `<img src="${photo}" alt="小组照片${index + 1}">`;
-        photoSlides.appendChild(slide);
-
-        const dot = document.createElement('div');
-        dot.className = `carousel-dot ${index === 0 ? 'active' : ''}`;
-        dot.addEventListener('click', () => showPhotoSlide(index));
-        carouselDots.appendChild(dot);
-    });
-
-    currentPhotoSlide = 0;
-    showPhotoSlide(currentPhotoSlide);
-
-    // 自动轮播
-    photoCarouselInterval = setInterval(() => {
-        currentPhotoSlide = (currentPhotoSlide + 1) % photos.length;
-        showPhotoSlide(currentPhotoSlide);
-    }, 4000);
-}
-
-// 显示指定照片
-function showPhotoSlide(index) {
-    const photoSlides = document.getElementById('photoSlides');
-    const dots = document.querySelectorAll('.carousel-dot');
-
-    if (photoSlides) {
-        photoSlides.style.transform = `translateX(-${index * 100}%)`;
-    }
-
-    dots.forEach((dot, i) => {
-        dot.classList.toggle('active', i === index);
-    });
-
-    currentPhotoSlide = index;
-}
-
-function showPreviousPhoto() {
-    const photoSlides = document.getElementById('photoSlides');
-    if (!photoSlides || photoSlides.children.length === 0) return;
-
-    const totalSlides = photoSlides.children.length;
-    const targetIndex = (currentPhotoSlide - 1 + totalSlides) % totalSlides;
-    showPhotoSlide(targetIndex);
-}
-
-function showNextPhoto() {
-    const photoSlides = document.getElementById('photoSlides');
-    if (!photoSlides || photoSlides.children.length === 0) return;
-
-    const totalSlides = photoSlides.children.length;
-    const targetIndex = (currentPhotoSlide + 1) % totalSlides;
-    showPhotoSlide(targetIndex);
-}
-
-// 打开手机端评价页面
-function buildMobileEvaluationUrl(groupId) {
-    return `${window.location.origin}/m?g=${groupId}`;
-}
+    adminTabs.forEach(tab => {
+        tab.addEventListener('click', function() {
+            const targetTab = this.dataset.tab;
+            switchAdminTab(targetTab);
+            
+            adminTabs.forEach(t => t.classList.remove('active'));
+            this.classList.add('active');
+        });
+    });
 
-function buildGroupQrCodeImageUrl(groupId) {
-    return `${API_BASE}/groups/${groupId}/qrcode`;
-}
+    const adminCourseSelector = document.getElementById('adminCourseSelector');
+    if (adminCourseSelector) {
+        adminCourseSelector.addEventListener('change', handleAdminCourseChange);
+    }
 
-function openMobilePage() {
-    if (!currentGroup) {
-        showMessage('请先选择一个小组', 'error');
-        return;
+    const adminActivateCourseBtn = document.getElementById('adminActivateCourseBtn');
+    if (adminActivateCourseBtn) {
+        adminActivateCourseBtn.addEventListener('click', handleAdminActivateCourse);
     }
 
-    const mobileUrl = buildMobileEvaluationUrl(currentGroup.id);
-    window.open(mobileUrl, '_blank');
-}
+    const addCourseBtn = document.getElementById('addCourseBtn');
+    if (addCourseBtn) {
+        addCourseBtn.addEventListener('click', showAddCourseModal);
+    }
 
-// 显示手机端页面
-function showMobilePage(groupId) {
-    const group = groups.find(g => g.id == groupId);
-    if (!group) {
-        showMessage('小组不存在', 'error');
-        return;
+    // 添加小组按钮
+    const addGroupBtn = document.getElementById('addGroupBtn');
+    if (addGroupBtn) {
+        addGroupBtn.addEventListener('click', showAddGroupModal);
     }
     
-    currentGroup = group;
-    showPage('mobilePage');
-    
-    // 隐藏导航栏
-    const navbar = document.querySelector('.navbar');
-    if (navbar) navbar.style.display = 'none';
-    
-    // 更新小组名称
-    const voteGroupName = document.getElementById('voteGroupName');
-    if (voteGroupName) voteGroupName.textContent = `${group.name} - 评价`;
-}
+    // 打印二维码按钮
+    const printQrcodesBtn = document.getElementById('printQrcodesBtn');
+    if (printQrcodesBtn) {
+        printQrcodesBtn.addEventListener('click', downloadQrcodeSheet);
+    }
 
-// 显示手机端步骤
-function showMobileStep(stepId) {
-    const steps = document.querySelectorAll('.mobile-step');
-    steps.forEach(step => step.classList.remove('active'));
+    // 添加评价人按钮
+    const addVoterBtn = document.getElementById('addVoterBtn');
+    if (addVoterBtn) {
+        addVoterBtn.addEventListener('click', showAddVoterModal);
+    }
     
-    const targetStep = document.getElementById(stepId);
-    if (targetStep) {
-        targetStep.classList.add('active');
+    // 添加职务按钮
+    const addRoleBtn = document.getElementById('addRoleBtn');
+    if (addRoleBtn) {
+        addRoleBtn.addEventListener('click', showAddRoleModal);
     }
-}
-
-// 处理身份验证提交
-async function handleVerifySubmit(event) {
-    event.preventDefault();
     
-    const name = document.getElementById('voterName').value.trim();
-    const phone = document.getElementById('voterPhone').value.trim();
+    // 下载模板按钮
+    const downloadTemplateBtn = document.getElementById('downloadTemplateBtn');
+    if (downloadTemplateBtn) {
+        downloadTemplateBtn.addEventListener('click', downloadVotersTemplate);
+    }
+
+    // 评价人检索
+    const voterSearchInput = document.getElementById('voterSearchInput');
+    if (voterSearchInput) {
+        voterSearchInput.addEventListener('input', handleVoterSearchInput);
+    }
     
-    if (!name || !phone) {
-        showMessage('请填写完整信息', 'error');
-        return;
+    // 批量导入按钮
+    const importVotersBtn = document.getElementById('importVotersBtn');
+    if (importVotersBtn) {
+        importVotersBtn.addEventListener('click', showImportVotersModal);
     }
     
-    try {
-        const result = await apiCall('/verify-voter', {
-            method: 'POST',
-            body: JSON.stringify({
-                name: name,
-                phone: phone,
-                group_id: currentGroup.id
-            })
-        });
-        
-        currentVoter = result;
-        
-        // 更新投票页面信息
-        const voterInfo = document.getElementById('voterInfo');
-        if (voterInfo) {
-            voterInfo.textContent = `${result.name}，您的投票权重为 ${result.weight}`;
-        }
-        
-        showMobileStep('voteStep');
-        
-    } catch (error) {
-        showMessage(error.message, 'error');
+    // 文件选择事件
+    const fileInput = document.getElementById('fileInput');
+    if (fileInput) {
+        fileInput.addEventListener('change', handleFileImport);
     }
 }
 
-// 提交投票
-async function submitVote(voteType) {
-    if (!currentVoter || !currentGroup) return;
-    
+// 加载职务数据
+async function loadRoles(courseId) {
+    const targetCourseId = courseId ?? getCurrentCourseId();
+    const url = buildCourseUrl('/roles', targetCourseId);
+    roles = await apiCall(url);
+    rolesCourseId = targetCourseId;
+    return roles;
+}
+
+const VOTER_PAGE_SIZE = 50;
+
+// 加载评价人数据（按当前检索条件分页）
+async function loadVoters(options = {}) {
     try {
-        const result = await apiCall('/vote', {
-            method: 'POST',
-            body: JSON.stringify({
-                voter_id: currentVoter.voter_id,
-                group_id: currentGroup.id,
-                vote_type: voteType
-            })
+        const params = new URLSearchParams({
+            q: voterSearch.q,
+            page: voterSearch.page,
+            page_size: VOTER_PAGE_SIZE
         });
-        
-        showMessage(result.message, 'success');
-        showMobileStep('completeStep');
-        
-        // 通过WebSocket广播更新
-        if (socket) {
-            socket.emit('vote_update', {
-                group_id: currentGroup.id,
-                stats: result.stats
-            });
-        }
-        
+        const result = await apiCall(buildCourseUrl(`/voters/search?${params.toString()}`, options.courseId));
+        voters = result.items || [];
+        voterSearch.total = result.total || 0;
+        return voters;
     } catch (error) {
-        showMessage(error.message, 'error');
+        if (error.status === 401) {
+            voters = [];
+            if (!options.silent) {
+                throw error;
+            }
+            return voters;
+        }
+
+        if (!options.silent) {
+            throw error;
+        }
+
+        console.error('加载评价人失败:', error);
+        voters = [];
+        return voters;
     }
 }
 
 // 后台管理相关函数
 async function loadAdminData(options = {}) {
+    joinAdminRoom();
     if (!options.skipCourses) {
         await loadCourses();
     }
@@ -1513,13 +307,45 @@ function updateVoteGroupFilter(groups) {
 // 加载后台评价人管理
 async function loadAdminVoters() {
     try {
-        const voters = await apiCall(buildCourseUrl('/voters', getCurrentCourseId()));
+        await loadVoters({ courseId: getCurrentCourseId() });
+        if (voters.length === 0 && voterSearch.page > 1) {
+            voterSearch.page = Math.max(1, Math.ceil(voterSearch.total / VOTER_PAGE_SIZE));
+            await loadVoters({ courseId: getCurrentCourseId() });
+        }
         renderAdminVoters(voters);
+        renderVotersPagination();
     } catch (error) {
         console.error('加载评价人失败:', error);
     }
 }
 
+// 评价人检索输入（防抖）
+function handleVoterSearchInput(event) {
+    clearTimeout(voterSearchTimer);
+    voterSearchTimer = setTimeout(() => {
+        voterSearch.q = event.target.value.trim();
+        voterSearch.page = 1;
+        loadAdminVoters();
+    }, 300);
+}
+
+function changeVotersPage(page) {
+    voterSearch.page = page;
+    loadAdminVoters();
+}
+
+function renderVotersPagination() {
+    const pagination = document.getElementById('votersPagination');
+    if (!pagination) return;
+
+    const totalPages = Math.max(1, Math.ceil(voterSearch.total / VOTER_PAGE_SIZE));
+    pagination.innerHTML = `
+        <button class="btn btn-secondary" ${voterSearch.page <= 1 ? 'disabled' : ''} onclick="changeVotersPage(${voterSearch.page - 1})">上一页</button>
+        <span>第 ${voterSearch.page} / ${totalPages} 页，共 ${voterSearch.total} 人</span>
+        <button class="btn btn-secondary" ${voterSearch.page >= totalPages ? 'disabled' : ''} onclick="changeVotersPage(${voterSearch.page + 1})">下一页</button>
+    `;
+}
+
 function renderAdminVoters(voters) {
     const votersList = document.getElementById('votersList');
     if (!votersList) return;
@@ -1611,6 +437,7 @@ function renderAdminCoursesList() {
                 <button class="btn btn-secondary" onclick="setManagementCourse(${course.id})">管理数据</button>
                 ${course.is_active ? '' : `<button class="btn btn-info" onclick="activateCourseFromList(${course.id})">设为大屏</button>`}
                 <button class="btn btn-secondary" onclick="showEditCourseModal(${course.id})">编辑</button>
+                <button class="btn btn-secondary" onclick="showCloneCourseModal(${course.id})">复制</button>
                 <button class="btn btn-danger" onclick="deleteCourse(${course.id})">删除</button>
             </div>
         `;
@@ -1655,7 +482,8 @@ async function activateCourseRequest(courseId) {
         currentCourseId = courseId;
         await loadCourses();
         await loadAdminData({ skipCourses: true });
-        await Promise.all([loadDisplayData(), loadRankingData()]);
+        // 排名页每次打开时都会重新加载，这里只需刷新大屏
+        await loadDisplayData();
         const course = findCourseById(courseId);
         showMessage(`已切换「${course ? course.name : '所选'}」为大屏课程`, 'success');
     } catch (error) {
@@ -1786,137 +614,89 @@ async function handleEditCourse(courseId, event) {
     }
 }
 
-async function deleteCourse(courseId) {
+function showCloneCourseModal(courseId) {
     const course = findCourseById(courseId);
-    const courseName = course ? course.name : '该课程';
-
-    if (!confirm(`确定要删除「${courseName}」吗？此操作无法撤销。`)) {
+    if (!course) {
+        showMessage('课程不存在', 'error');
         return;
     }
 
-    try {
-        await apiCall(`/courses/${courseId}`, { method: 'DELETE' });
-        await loadCourses();
-        await loadAdminData({ skipCourses: true });
-        showMessage('课程已删除', 'success');
-    } catch (error) {
-        showMessage('删除课程失败: ' + error.message, 'error');
-    }
-}
+    const content = `
+        <h3>复制课程</h3>
+        <form id="cloneCourseForm">
+            <div class="form-group">
+                <label for="cloneCourseName">新课程名称</label>
+                <input type="text" id="cloneCourseName" name="name" value="${escapeHtml(course.name)}（新）" required>
+            </div>
+            <div class="form-group">
+                <label><input type="checkbox" name="members" checked> 复制小组成员</label>
+                <label><input type="checkbox" name="media" checked> 复制小组logo与风采照片</label>
+                <label><input type="checkbox" name="voters" checked> 复制评价人</label>
+            </div>
+            <div class="form-actions">
+                <button type="submit">复制</button>
+                <button type="button" onclick="closeModal()">取消</button>
+            </div>
+        </form>
+    `;
+    showModal(content);
 
-// 排名相关函数
-async function loadRankingData() {
-    try {
-        const ranking = await apiCall(buildActiveCourseUrl('/ranking'));
-        renderRanking(ranking);
-    } catch (error) {
-        console.error('加载排名失败:', error);
-        showMessage('加载排名失败', 'error');
+    const form = document.getElementById('cloneCourseForm');
+    if (form) {
+        form.addEventListener('submit', function(event) {
+            event.preventDefault();
+            handleCloneCourse(courseId, event);
+        });
     }
 }
 
-function renderRanking(ranking) {
-    const rankingDisplay = document.getElementById('rankingDisplay');
-    if (!rankingDisplay) return;
-    
-    rankingDisplay.innerHTML = '';
-    
-    if (ranking.length === 0) {
-        rankingDisplay.innerHTML = '<p style="color: #B0C4DE;">暂无排名数据</p>';
-        return;
-    }
-    
-    ranking.forEach(item => {
-        const rankingItem = document.createElement('div');
-        rankingItem.className = `ranking-item rank-${item.rank} fade-in`;
-
-        let order = item.rank;
-        if (item.rank === 1) {
-            order = 2;
-        } else if (item.rank === 2) {
-            order = 1;
-        } else if (item.rank === 3) {
-            order = 3;
-        }
-        rankingItem.style.order = order;
-        
-        let crown = '';
-        if (item.rank === 1) crown = '<div class="ranking-crown">👑</div>';
-        else if (item.rank === 2) crown = '<div class="ranking-crown">🥈</div>';
-        else if (item.rank === 3) crown = '<div class="ranking-crown">🥉</div>';
-
-        rankingItem.innerHTML = `
-            ${crown}
-            <div class="ranking-content">
-                <div class="ranking-name">${item.name.substring(0, 6)}</div>
-                <div class="ranking-score">${item.total_score}分</div>
-            </div>
-            <div class="ranking-position">
-                <span class="ranking-position-prefix">第</span>
-                <span class="ranking-position-number">${item.rank}</span>
-                <span class="ranking-position-suffix">名</span>
-            </div>
-        `;
+async function handleCloneCourse(courseId, event) {
+    const form = event.target;
+    const data = {
+        name: form.elements.name.value,
+        members: form.elements.members.checked,
+        media: form.elements.media.checked,
+        voters: form.elements.voters.checked
+    };
 
-        rankingDisplay.appendChild(rankingItem);
-    });
-}
+    try {
+        const course = await apiCall(`/courses/${courseId}/clone`, {
+            method: 'POST',
+            body: JSON.stringify(data)
+        });
 
-// 工具函数
-function showMessage(message, type = 'info') {
-    // 创建消息提示
-    const messageEl = document.createElement('div');
-    messageEl.className = `message message-${type}`;
-    messageEl.textContent = message;
-    messageEl.style.cssText = `
-        position: fixed;
-        top: 20px;
-        right: 20px;
-        padding: 1rem 2rem;
-        border-radius: 10px;
-        color: white;
-        font-weight: bold;
-        z-index: 3000;
-        animation: slideIn 0.3s ease-out;
-    `;
-    
-    switch(type) {
-        case 'success':
-            messageEl.style.background = 'linear-gradient(135deg, #4CAF50, #45a049)';
-            break;
-        case 'error':
-            messageEl.style.background = 'linear-gradient(135deg, #f44336, #d32f2f)';
-            break;
-        default:
-            messageEl.style.background = 'linear-gradient(135deg, #2196F3, #1976D2)';
+        currentCourseId = course.id;
+        await loadCourses();
+        await loadAdminData({ skipCourses: true });
+
+        closeModal();
+        const counts = course.counts || {};
+        showMessage(`已复制课程：${counts.groups || 0} 个小组、${counts.members || 0} 名成员、${counts.voters || 0} 名评价人`, 'success');
+    } catch (error) {
+        showMessage('复制课程失败: ' + error.message, 'error');
     }
-    
-    document.body.appendChild(messageEl);
-    
-    setTimeout(() => {
-        messageEl.remove();
-    }, 3000);
 }
 
-function showModal(content) {
-    const modal = document.getElementById('modal');
-    const modalBody = document.getElementById('modalBody');
+async function deleteCourse(courseId) {
+    const course = findCourseById(courseId);
+    const courseName = course ? course.name : '该课程';
 
-    modalBody.innerHTML = content;
-    modal.classList.add('active');
-    
-    // 添加关闭按钮事件
-    const closeBtn = modal.querySelector('.close');
-    if (closeBtn) {
-        closeBtn.onclick = closeModal;
+    if (!confirm(`确定要删除「${courseName}」吗？此操作无法撤销。`)) {
+        return;
     }
-    
-    // 点击模态框外部关闭
-    modal.onclick = function(event) {
-        if (event.target === modal) {
-            closeModal();
+
+    try {
+        const response = await apiCall(`/courses/${courseId}?async=1`, { method: 'DELETE' });
+        if (response && response.job) {
+            showMessage('正在删除课程，请稍候...', 'info');
+            await waitForJob(response.job);
         }
-    };
+        await loadCourses();
+        await loadAdminData({ skipCourses: true });
+        showMessage('课程已删除', 'success');
+    } catch (error) {
+        showMessage('删除课程失败: ' + error.message, 'error');
+    }
 }
 
 function initializeLogoUpload({
@@ -2141,14 +921,6 @@ function formatMemberLine(member) {
     return `${member.name}, ${company}, ${roleName}`.trim();
 }
 
-function escapeHtml(text) {
-    if (text === undefined || text === null) return '';
-    return text
-        .replace(/&/g, '&amp;')
-        .replace(/</g, '&lt;')
-        .replace(/>/g, '&gt;');
-}
-
 async function ensureRolesLoaded(courseId) {
     const targetCourseId = courseId ?? getCurrentCourseId();
     if (!roles || roles.length === 0 || rolesCourseId !== targetCourseId) {
@@ -2330,6 +1102,7 @@ async function manageGroupPhotos(groupId) {
                         <input type="file" id="groupPhotosInput" name="photos" accept="image/*" multiple required>
                     </div>
                     <p class="form-helper">支持同时选择多张图片，建议上传清晰度较高的横图。</p>
+                    <p class="form-helper" id="groupPhotosProgress"></p>
                     <div class="form-actions">
                         <button type="submit">上传</button>
                         <button type="button" onclick="closeModal()">关闭</button>
@@ -2355,25 +1128,42 @@ async function manageGroupPhotos(groupId) {
                     return;
                 }
 
-                const formData = new FormData();
-                files.forEach(file => formData.append('photos', file));
+                const submitButton = uploadForm.querySelector('button[type="submit"]');
+                const progress = document.getElementById('groupPhotosProgress');
+                submitButton.disabled = true;
 
                 try {
-                    const response = await authorizedFetch(`${API_BASE}/groups/${groupId}/photos`, {
+                    const batch = await apiCall(`/groups/${groupId}/photos/uploads`, {
                         method: 'POST',
-                        body: formData
+                        body: JSON.stringify({ files: files.map(file => ({ name: file.name, size: file.size })) })
                     });
-                    const result = await response.json();
 
-                    if (!response.ok) {
-                        throw new Error(result.error || '上传失败');
+                    let uploaded = 0;
+                    const failures = [];
+                    for (let index = 0; index < files.length; index += 1) {
+                        const file = files[index];
+                        try {
+                            await uploadPhotoInChunks(batch.uploads[index], file, batch.chunk_size, received => {
+                                const percent = file.size ? Math.floor(received * 100 / file.size) : 100;
+                                progress.textContent = `正在上传第 ${index + 1}/${files.length} 张：${percent}%`;
+                            });
+                            uploaded += 1;
+                        } catch (error) {
+                            failures.push(`${file.name}：${error.message}`);
+                        }
                     }
 
-                    showMessage(result.message || '上传成功', 'success');
+                    if (failures.length) {
+                        showMessage(`成功上传 ${uploaded} 张照片，失败 ${failures.length} 张（${failures.join('；')}）`, 'error');
+                    } else {
+                        showMessage(`成功上传 ${uploaded} 张照片`, 'success');
+                    }
                     await refreshGroupData(groupId);
                     manageGroupPhotos(groupId);
                 } catch (error) {
                     showMessage(error.message, 'error');
+                    submitButton.disabled = false;
+                    progress.textContent = '';
                 }
             });
         }
@@ -2382,6 +1172,58 @@ async function manageGroupPhotos(groupId) {
     }
 }
 
+const PHOTO_UPLOAD_RETRIES = 5;
+
+// 按分片上传一张照片：每个分片单独请求，网络中断后从服务器已接收的位置继续
+async function uploadPhotoInChunks(upload, file, chunkSize, onProgress) {
+    let offset = upload.received || 0;
+    let retries = 0;
+
+    while (true) {
+        let response;
+        let result = {};
+        try {
+            response = await authorizedFetch(`${API_BASE}/photo-uploads/${upload.id}?offset=${offset}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: file.slice(offset, offset + chunkSize)
+            });
+            result = await response.json();
+        } catch (error) {
+            if (retries >= PHOTO_UPLOAD_RETRIES) {
+                throw new Error('网络中断，上传失败');
+            }
+            retries += 1;
+            await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+            // 分片可能已写入，重新查询已接收的位置
+            try {
+                offset = (await apiCall(`/photo-uploads/${upload.id}`)).received;
+            } catch (statusError) {
+                // 仍无法连接时按原位置重试，位置不一致会返回409并带上正确位置
+            }
+            continue;
+        }
+
+        if (response.status === 409 && typeof result.received === 'number') {
+            offset = result.received;
+            continue;
+        }
+        if (!response.ok) {
+            if (response.status === 401) {
+                handleAdminUnauthorized();
+            }
+            throw new Error(result.error || '上传失败');
+        }
+
+        retries = 0;
+        offset = result.received;
+        onProgress(offset);
+        if (result.status === 'completed') {
+            return result;
+        }
+    }
+}
+
 function renderGroupPhotosList(photos, groupId) {
     if (!photos || photos.length === 0) {
         return '<p style="text-align: center; color: #B0C4DE;">暂无风采图片</p>';
@@ -2865,14 +1707,6 @@ function showAddRoleModal() {
     document.getElementById('addRoleForm').addEventListener('submit', handleAddRole);
 }
 
-// 关闭模态框
-function closeModal() {
-    const modal = document.getElementById('modal');
-    if (modal) {
-        modal.classList.remove('active');
-    }
-}
-
 // 处理添加小组
 async function handleAddGroup(event) {
     event.preventDefault();
@@ -2945,6 +1779,39 @@ async function handleAddRole(event) {
     }
 }
 
+// 下载当前课程全部小组的二维码打印页（PDF）
+async function downloadQrcodeSheet() {
+    const courseId = getCurrentCourseId();
+    if (!courseId) {
+        showMessage('请先选择课程', 'error');
+        return;
+    }
+
+    try {
+        const response = await authorizedFetch(`${API_BASE}/courses/${courseId}/qrcodes?format=pdf`);
+
+        if (!response.ok) {
+            if (response.status === 401) {
+                handleAdminUnauthorized();
+            }
+            throw new Error('生成二维码失败，请稍后重试');
+        }
+
+        const blob = await response.blob();
+        const url = URL.createObjectURL(blob);
+        const link = document.createElement('a');
+        const course = findCourseById(courseId);
+        link.href = url;
+        link.download = `${course ? course.name : '课程'}-小组二维码.pdf`;
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+        URL.revokeObjectURL(url);
+    } catch (error) {
+        showMessage(error.message || '生成二维码失败', 'error');
+    }
+}
+
 // 下载评价人导入模板
 async function downloadVotersTemplate() {
     try {
@@ -3024,17 +1891,32 @@ async function handleFileImport(event) {
         const formData = new FormData();
         formData.append('file', file);
         formData.append('course_id', getCurrentCourseId() || '');
+        formData.append('async', '1');
 
         const response = await authorizedFetch(API_BASE + '/voters/import', {
             method: 'POST',
             body: formData
         });
         
-        const result = await response.json();
+        let result = await response.json();
+        let succeeded = response.ok;
+        if (response.status === 202 && result.job) {
+            try {
+                const job = await waitForJob(result.job, progress => {
+                    if (progressDiv) {
+                        progressDiv.innerHTML = `<p>${progress.message || '正在导入，请稍候...'}（${progress.progress || 0}%）</p>`;
+                    }
+                });
+                result = job.result;
+            } catch (jobError) {
+                result = { error: jobError.message };
+                succeeded = false;
+            }
+        }
         
         if (progressDiv) progressDiv.style.display = 'none';
         
-        if (response.ok) {
+        if (succeeded) {
             let resultHtml = `
                 <div class="import-success">
                     <h4>导入结果</h4>
@@ -3096,8 +1978,11 @@ async function handleFileImport(event) {
     event.target.value = '';
 }
 
-// 设置初始化按钮事件
-document.addEventListener('DOMContentLoaded', function() {
+// 后台管理脚本按需加载，加载时页面已就绪，直接绑定事件
+function initializeAdmin() {
+    setupAdminButtonEvents();
+
+    // 初始化数据按钮
     const initDataBtn = document.getElementById('initDataBtn');
     if (initDataBtn) {
         initDataBtn.addEventListener('click', initializeData);
@@ -3113,22 +1998,11 @@ document.addEventListener('DOMContentLoaded', function() {
     if (voteGroupFilter) {
         voteGroupFilter.addEventListener('change', loadVotesData);
     }
-});
 
-// 页面加载完成后的额外设置
-window.addEventListener('load', function() {
-    // 如果是手机端访问，调整样式
-    if (window.innerWidth <= 768) {
-        document.body.classList.add('mobile-device');
+    if (socket) {
+        socket.on('job_progress', handleJobProgress);
+        socket.on('connect', joinAdminRoom);
     }
-    
-    // 监听窗口大小变化
-    window.addEventListener('resize', function() {
-        if (window.innerWidth <= 768) {
-            document.body.classList.add('mobile-device');
-        } else {
-            document.body.classList.remove('mobile-device');
-        }
-    });
-});
+}
 
+initializeAdmin();
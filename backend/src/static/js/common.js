@@ -0,0 +1,926 @@
+// 全局变量
+let socket;
+let currentGroup = null;
+let groups = [];
+let manualFullscreen = false;
+let fullscreenTargetPageId = null;
+
+let courses = [];
+let currentCourseId = null;
+let currentCourse = null;
+let activeCourseId = null;
+let activeCourse = null;
+
+const ADMIN_TOKEN_STORAGE_KEY = 'evaluationAdminToken';
+let adminToken = localStorage.getItem(ADMIN_TOKEN_STORAGE_KEY) || '';
+let adminAuthPromptVisible = false;
+
+const DISPLAY_STAGE_BASE_WIDTH = 1600;
+const DISPLAY_STAGE_BASE_HEIGHT = 900;
+
+// API基础URL
+const API_BASE = '/api';
+
+// 按需加载的页面脚本：服务端在页面中写入 ASSET_BUNDLES（打包后带内容指纹的地址），未打包时直接加载源文件
+const bundlePromises = {};
+const readyBundles = new Set();
+
+function loadBundle(name) {
+    if (!bundlePromises[name]) {
+        bundlePromises[name] = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = (window.ASSET_BUNDLES || {})[name] || `js/${name}.js`;
+            script.onload = () => {
+                readyBundles.add(name);
+                resolve();
+            };
+            script.onerror = () => {
+                delete bundlePromises[name];
+                script.remove();
+                reject(new Error('页面脚本加载失败'));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return bundlePromises[name];
+}
+
+// 初始化应用
+document.addEventListener('DOMContentLoaded', function() {
+    initializeApp();
+});
+
+// 初始化应用
+function initializeApp() {
+    // 检查URL参数，如果有小组参数则转到手机端评价页面
+    const urlParams = new URLSearchParams(window.location.search);
+    const groupId = urlParams.get('g') || urlParams.get('group');
+    if (groupId) {
+        window.location.replace(buildMobileEvaluationUrl(groupId));
+        return;
+    }
+
+    setupNavigation();
+    setupSocketConnection();
+    setupEventListeners();
+    loadInitialData();
+    updateAdminAuthUI();
+}
+
+// 设置导航
+function setupNavigation() {
+    const navButtons = document.querySelectorAll('.nav-btn');
+    navButtons.forEach(btn => {
+        if (btn.id === 'fullscreenToggle') {
+            return;
+        }
+
+        if (btn.id === 'adminLogoutBtn') {
+            btn.addEventListener('click', handleAdminLogout);
+            return;
+        }
+
+        btn.addEventListener('click', function() {
+            const targetPage = this.dataset.targetPage || this.id.replace('Btn', 'Page');
+
+            if (targetPage === 'adminPage' && !ensureAdminAuthenticated()) {
+                return;
+            }
+
+            showPage(targetPage);
+            setActiveNavButton(this.id);
+        });
+    });
+}
+
+function setActiveNavButton(buttonId) {
+    const navButtons = document.querySelectorAll('.nav-btn');
+    navButtons.forEach(btn => {
+        if (btn.id === 'fullscreenToggle') {
+            btn.classList.remove('active');
+            return;
+        }
+        btn.classList.toggle('active', btn.id === buttonId);
+    });
+}
+
+function getAdminToken() {
+    return adminToken || '';
+}
+
+function updateAdminAuthUI() {
+    const adminLogoutBtn = document.getElementById('adminLogoutBtn');
+    if (adminLogoutBtn) {
+        const isAuthenticated = Boolean(getAdminToken());
+        adminLogoutBtn.classList.toggle('hidden', !isAuthenticated);
+    }
+}
+
+function setAdminToken(token) {
+    adminToken = token || '';
+    if (adminToken) {
+        localStorage.setItem(ADMIN_TOKEN_STORAGE_KEY, adminToken);
+    } else {
+        localStorage.removeItem(ADMIN_TOKEN_STORAGE_KEY);
+    }
+    updateAdminAuthUI();
+}
+
+function clearAdminToken() {
+    setAdminToken('');
+}
+
+function ensureAdminAuthenticated() {
+    if (getAdminToken()) {
+        return true;
+    }
+    showAdminLoginModal();
+    return false;
+}
+
+function getActiveCourseId() {
+    return activeCourseId;
+}
+
+function getCurrentCourseId() {
+    return currentCourseId || activeCourseId;
+}
+
+function findCourseById(id) {
+    if (!id) return null;
+    const numericId = typeof id === 'string' ? parseInt(id, 10) : id;
+    return courses.find(course => course.id === numericId) || null;
+}
+
+function setActiveCourseData(course) {
+    activeCourse = course || null;
+    activeCourseId = course ? course.id : null;
+    updateCourseDisplays();
+    syncRankingRoom();
+}
+
+function setCurrentCourseData(course) {
+    currentCourse = course || null;
+    currentCourseId = course ? course.id : null;
+    updateCourseDisplays();
+    refreshAdminCourseViews();
+}
+
+// 后台管理脚本加载后才需要同步课程选择器与课程列表
+function refreshAdminCourseViews() {
+    if (readyBundles.has('admin')) {
+        updateAdminCourseSelector();
+        renderAdminCoursesList();
+    }
+}
+
+function buildCourseUrl(path, courseId) {
+    const targetId = courseId ?? getCurrentCourseId();
+    if (!targetId) {
+        return path;
+    }
+
+    const separator = path.includes('?') ? '&' : '?';
+    return `${path}${separator}course_id=${encodeURIComponent(targetId)}`;
+}
+
+function buildActiveCourseUrl(path) {
+    const activeId = getActiveCourseId();
+    if (!activeId) {
+        return path;
+    }
+    return buildCourseUrl(path, activeId);
+}
+
+function withCourseId(payload, courseId) {
+    const targetId = courseId ?? getCurrentCourseId();
+    if (!targetId) {
+        return { ...payload };
+    }
+    return { ...payload, course_id: targetId };
+}
+
+function appendCourseIdToFormData(formData, courseId) {
+    const targetId = courseId ?? getCurrentCourseId();
+    if (!targetId) {
+        return formData;
+    }
+    if (!formData.has('course_id')) {
+        formData.append('course_id', targetId);
+    }
+    return formData;
+}
+
+function updateCourseDisplays() {
+    const courseName = (activeCourse && activeCourse.name) || '未设置课程';
+
+    const navCourseEl = document.getElementById('navCourseName');
+    if (navCourseEl) {
+        navCourseEl.textContent = courseName;
+    }
+
+    const rankingCourseEl = document.getElementById('rankingCourseBadge');
+    if (rankingCourseEl) {
+        rankingCourseEl.textContent = courseName;
+    }
+
+    if (courseName) {
+        document.title = `${courseName} - 小组评价系统`;
+    } else {
+        document.title = '小组评价系统';
+    }
+}
+
+function showAdminLoginModal() {
+    const modal = document.getElementById('adminLoginModal');
+    const passwordInput = document.getElementById('adminPassword');
+    const errorEl = document.getElementById('adminLoginError');
+
+    if (errorEl) {
+        errorEl.textContent = '';
+    }
+
+    if (passwordInput) {
+        passwordInput.value = '';
+        passwordInput.classList.remove('has-value');
+        passwordInput.focus();
+    }
+
+    if (modal) {
+        modal.classList.add('active');
+        modal.setAttribute('aria-hidden', 'false');
+    }
+
+    adminAuthPromptVisible = true;
+}
+
+function hideAdminLoginModal() {
+    const modal = document.getElementById('adminLoginModal');
+    if (modal) {
+        modal.classList.remove('active');
+        modal.setAttribute('aria-hidden', 'true');
+    }
+    adminAuthPromptVisible = false;
+}
+
+async function handleAdminLoginSubmit(event) {
+    event.preventDefault();
+
+    const usernameInput = document.getElementById('adminUsername');
+    const passwordInput = document.getElementById('adminPassword');
+    const errorEl = document.getElementById('adminLoginError');
+    const submitBtn = event.target.querySelector('button[type="submit"]');
+
+    const username = usernameInput ? usernameInput.value.trim() : '';
+    const password = passwordInput ? passwordInput.value : '';
+
+    if (!password) {
+        if (errorEl) {
+            errorEl.textContent = '请输入管理员密码';
+        }
+        if (passwordInput) {
+            passwordInput.focus();
+        }
+        return;
+    }
+
+    if (errorEl) {
+        errorEl.textContent = '';
+    }
+
+    if (submitBtn) {
+        submitBtn.disabled = true;
+    }
+
+    try {
+        await loginAdmin(username, password);
+        hideAdminLoginModal();
+        showMessage('登录成功', 'success');
+        setActiveNavButton('adminBtn');
+        showPage('adminPage');
+    } catch (error) {
+        if (errorEl) {
+            errorEl.textContent = error.message || '登录失败，请重试';
+        }
+        if (passwordInput) {
+            passwordInput.focus();
+        }
+    } finally {
+        if (submitBtn) {
+            submitBtn.disabled = false;
+        }
+    }
+}
+
+async function loginAdmin(username, password) {
+    const response = await fetch(API_BASE + '/admin/login', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ username, password })
+    });
+
+    const resultText = await response.text();
+    let result = {};
+    if (resultText) {
+        try {
+            result = JSON.parse(resultText);
+        } catch (error) {
+            console.warn('解析登录响应失败:', error);
+        }
+    }
+
+    if (!response.ok || !result.token) {
+        const message = result.error || '账号或密码错误';
+        const error = new Error(message);
+        error.status = response.status;
+        throw error;
+    }
+
+    setAdminToken(result.token);
+    adminAuthPromptVisible = false;
+    return result;
+}
+
+async function requestAdminLogout() {
+    const token = getAdminToken();
+    if (!token) {
+        return;
+    }
+
+    const response = await authorizedFetch(API_BASE + '/admin/logout', {
+        method: 'POST'
+    });
+
+    if (!response.ok && response.status !== 401) {
+        let message = '退出登录失败';
+        const responseText = await response.text().catch(() => '');
+        if (responseText) {
+            try {
+                const data = JSON.parse(responseText);
+                message = data.error || data.message || message;
+            } catch (parseError) {
+                console.warn('解析退出响应失败:', parseError);
+            }
+        }
+
+        const error = new Error(message);
+        error.status = response.status;
+        throw error;
+    }
+}
+
+function finalizeAdminLogout(message = '已退出登录', messageType = 'success') {
+    const adminPage = document.getElementById('adminPage');
+    const wasAdminActive = adminPage && adminPage.classList.contains('active');
+
+    adminAuthPromptVisible = false;
+    clearAdminToken();
+
+    if (wasAdminActive) {
+        showPage('displayPage');
+        setActiveNavButton('displayBtn');
+    }
+
+    if (message) {
+        showMessage(message, messageType);
+    }
+}
+
+async function handleAdminLogout(event) {
+    if (event) {
+        event.preventDefault();
+    }
+
+    const trigger = event ? event.currentTarget : null;
+    if (trigger) {
+        trigger.disabled = true;
+    }
+
+    let feedbackMessage = '已退出登录';
+    let feedbackType = 'success';
+
+    try {
+        await requestAdminLogout();
+    } catch (error) {
+        if (!error.status || error.status !== 401) {
+            console.error('退出登录失败:', error);
+            feedbackMessage = error.message || '退出登录失败，请稍后重试';
+            feedbackType = 'error';
+        }
+    } finally {
+        if (trigger) {
+            trigger.disabled = false;
+        }
+    }
+
+    finalizeAdminLogout(feedbackMessage, feedbackType);
+}
+
+function handleAdminUnauthorized() {
+    const hadToken = Boolean(getAdminToken());
+    clearAdminToken();
+
+    const adminPage = document.getElementById('adminPage');
+    const isAdminActive = adminPage && adminPage.classList.contains('active');
+
+    if (!isAdminActive) {
+        adminAuthPromptVisible = false;
+        return;
+    }
+
+    if (!adminAuthPromptVisible && hadToken) {
+        showMessage('登录已过期，请重新登录', 'error');
+        showAdminLoginModal();
+    }
+
+    setActiveNavButton('adminBtn');
+}
+
+// 显示页面
+function showPage(pageId) {
+    const pages = document.querySelectorAll('.page');
+    pages.forEach(page => page.classList.remove('active'));
+    
+    const targetPage = document.getElementById(pageId);
+    if (targetPage) {
+        targetPage.classList.add('active');
+        
+        // 根据页面执行特定初始化；后台管理和排名页的脚本在首次打开时加载
+        switch(pageId) {
+            case 'adminPage':
+                loadBundle('admin')
+                    .then(() => loadAdminData())
+                    .catch(error => showMessage(error.message, 'error'));
+                break;
+            case 'rankingPage':
+                loadBundle('ranking')
+                    .then(() => loadRankingData())
+                    .catch(error => showMessage(error.message, 'error'));
+                break;
+            case 'displayPage':
+                loadDisplayData();
+                break;
+        }
+    }
+
+    syncRankingRoom();
+}
+
+// 设置WebSocket连接
+function setupSocketConnection() {
+    socket = io();
+    
+    socket.on('connect', function() {
+        console.log('WebSocket连接成功');
+        syncSocketRooms();
+    });
+    
+    socket.on('vote_updated', function(data) {
+        if (currentGroup && data.group_id === currentGroup.id) {
+            updateVoteStats(data.stats);
+        }
+    });
+    
+    socket.on('disconnect', function() {
+        console.log('WebSocket连接断开');
+    });
+}
+
+// 同步当前应加入的Socket房间（重连后服务端不保留房间）
+function syncSocketRooms() {
+    if (!socket || !socket.connected) return;
+
+    if (currentGroup) {
+        socket.emit('join_group', { group_id: currentGroup.id });
+    } else {
+        socket.emit('leave_group');
+    }
+    syncRankingRoom();
+}
+
+// 只有排名页可见时才订阅课程的得分变化
+function syncRankingRoom() {
+    if (!socket || !socket.connected) return;
+
+    const rankingPage = document.getElementById('rankingPage');
+    if (rankingPage && rankingPage.classList.contains('active') && getActiveCourseId()) {
+        socket.emit('join_course', { course_id: getActiveCourseId() });
+    } else {
+        socket.emit('leave_course');
+    }
+}
+
+// 设置事件监听器
+function setupEventListeners() {
+    setupDisplayEvents();
+
+    // 模态框关闭
+    const modal = document.getElementById('modal');
+    const closeBtn = document.querySelector('.close');
+
+    if (closeBtn) {
+        closeBtn.addEventListener('click', function() {
+            modal.classList.remove('active');
+        });
+    }
+
+    window.addEventListener('click', function(event) {
+        if (event.target === modal) {
+            modal.classList.remove('active');
+        }
+    });
+
+    const fullscreenToggle = document.getElementById('fullscreenToggle');
+    if (fullscreenToggle) {
+        fullscreenToggle.addEventListener('click', enterFullscreenMode);
+    }
+
+    const exitFullscreenBtn = document.getElementById('exitFullscreenBtn');
+    if (exitFullscreenBtn) {
+        exitFullscreenBtn.addEventListener('click', exitFullscreenMode);
+    }
+
+    document.addEventListener('fullscreenchange', handleFullscreenChange);
+    document.addEventListener('keydown', handleFullscreenKeydown);
+
+    window.addEventListener('resize', handleWindowResize);
+
+    const adminLoginForm = document.getElementById('adminLoginForm');
+    if (adminLoginForm) {
+        adminLoginForm.addEventListener('submit', handleAdminLoginSubmit);
+        initializeAdminLoginInputStyles(adminLoginForm);
+    }
+
+    const adminLoginModal = document.getElementById('adminLoginModal');
+    if (adminLoginModal) {
+        adminLoginModal.addEventListener('click', (event) => {
+            if (event.target === adminLoginModal) {
+                hideAdminLoginModal();
+            }
+        });
+    }
+
+    const adminLoginCloseBtn = document.getElementById('adminLoginCloseBtn');
+    if (adminLoginCloseBtn) {
+        adminLoginCloseBtn.addEventListener('click', hideAdminLoginModal);
+    }
+
+    const adminLoginCancelBtn = document.getElementById('adminLoginCancelBtn');
+    if (adminLoginCancelBtn) {
+        adminLoginCancelBtn.addEventListener('click', hideAdminLoginModal);
+    }
+}
+
+function initializeAdminLoginInputStyles(form) {
+    const loginInputs = form.querySelectorAll('input');
+    loginInputs.forEach((input) => {
+        const toggleValueClass = () => {
+            if (input.value && input.value.trim() !== '') {
+                input.classList.add('has-value');
+            } else {
+                input.classList.remove('has-value');
+            }
+        };
+
+        toggleValueClass();
+        input.addEventListener('input', toggleValueClass);
+        input.addEventListener('blur', toggleValueClass);
+    });
+}
+
+function prepareFullscreenTargetPage() {
+    const activePage = document.querySelector('.page.active');
+
+    if (activePage && (activePage.id === 'displayPage' || activePage.id === 'rankingPage')) {
+        fullscreenTargetPageId = activePage.id;
+        return activePage;
+    }
+
+    fullscreenTargetPageId = 'displayPage';
+    showPage('displayPage');
+    setActiveNavButton('displayBtn');
+    return document.getElementById('displayPage');
+}
+
+async function enterFullscreenMode() {
+    const targetPage = prepareFullscreenTargetPage();
+    if (!targetPage) {
+        return;
+    }
+
+    if (document.fullscreenElement || manualFullscreen) {
+        activateFullscreenUI();
+        return;
+    }
+
+    const targetElement = document.documentElement;
+
+    if (targetElement && targetElement.requestFullscreen) {
+        try {
+            await targetElement.requestFullscreen();
+        } catch (error) {
+            console.warn('启动全屏失败:', error);
+            manualFullscreen = true;
+            activateFullscreenUI();
+        }
+    } else {
+        manualFullscreen = true;
+        activateFullscreenUI();
+    }
+}
+
+async function exitFullscreenMode() {
+    if (manualFullscreen) {
+        manualFullscreen = false;
+        deactivateFullscreenUI();
+        fullscreenTargetPageId = null;
+        return;
+    }
+
+    if (document.fullscreenElement) {
+        try {
+            await document.exitFullscreen();
+        } catch (error) {
+            console.warn('退出全屏失败:', error);
+            deactivateFullscreenUI();
+            fullscreenTargetPageId = null;
+        }
+    } else {
+        deactivateFullscreenUI();
+        fullscreenTargetPageId = null;
+    }
+}
+
+function handleFullscreenChange() {
+    const isActive = Boolean(document.fullscreenElement);
+
+    if (isActive) {
+        activateFullscreenUI();
+    } else if (!manualFullscreen) {
+        deactivateFullscreenUI();
+    }
+
+    if (!isActive) {
+        manualFullscreen = false;
+        fullscreenTargetPageId = null;
+    }
+}
+
+function handleFullscreenKeydown(event) {
+    if (event.key === 'Escape' && manualFullscreen) {
+        manualFullscreen = false;
+        deactivateFullscreenUI();
+    }
+}
+
+function handleWindowResize() {
+    if (document.body.classList.contains('fullscreen-mode')) {
+        updateDisplayScale();
+    }
+}
+
+function activateFullscreenUI() {
+    document.body.classList.add('fullscreen-mode');
+    if (fullscreenTargetPageId) {
+        document.body.setAttribute('data-fullscreen-page', fullscreenTargetPageId);
+    } else {
+        document.body.removeAttribute('data-fullscreen-page');
+    }
+    updateDisplayScale();
+}
+
+function deactivateFullscreenUI() {
+    document.body.classList.remove('fullscreen-mode');
+    document.body.removeAttribute('data-fullscreen-page');
+    updateDisplayScale();
+}
+
+function updateDisplayScale() {
+    const stage = document.querySelector('#displayPage .display-stage');
+    if (!stage) {
+        return;
+    }
+
+    const inFullscreen = document.body.classList.contains('fullscreen-mode') && fullscreenTargetPageId === 'displayPage';
+
+    if (inFullscreen) {
+        const scaleX = window.innerWidth / DISPLAY_STAGE_BASE_WIDTH;
+        const scaleY = window.innerHeight / DISPLAY_STAGE_BASE_HEIGHT;
+        const scale = Math.min(scaleX, scaleY);
+
+        stage.style.transform = `scale(${scale})`;
+        stage.style.width = `${DISPLAY_STAGE_BASE_WIDTH}px`;
+        stage.style.height = `${DISPLAY_STAGE_BASE_HEIGHT}px`;
+        stage.classList.add('scaled');
+    } else {
+        stage.style.transform = '';
+        stage.style.width = '';
+        stage.style.height = '';
+        stage.classList.remove('scaled');
+    }
+}
+
+async function loadCourses() {
+    try {
+        const data = await apiCall('/courses');
+        courses = Array.isArray(data) ? data : [];
+    } catch (error) {
+        console.error('加载课程失败:', error);
+        courses = [];
+    }
+
+    if (!courses.length) {
+        setActiveCourseData(null);
+        setCurrentCourseData(null);
+        return courses;
+    }
+
+    const active = courses.find(course => course.is_active) || courses[0];
+    setActiveCourseData(active);
+
+    const desiredCurrentId = currentCourseId;
+    const current = desiredCurrentId ? findCourseById(desiredCurrentId) : null;
+    setCurrentCourseData(current || active);
+
+    return courses;
+}
+
+// 加载初始数据
+async function loadInitialData() {
+    try {
+        await loadCourses();
+
+        // 职务、评价人等管理数据在打开后台管理时由 admin 脚本加载
+        await loadGroups(getActiveCourseId());
+
+        if (groups.length > 0) {
+            selectGroup(groups[0]);
+        }
+    } catch (error) {
+        console.error('加载初始数据失败:', error);
+        showMessage('加载数据失败，请刷新页面重试', 'error');
+    }
+}
+
+function authorizedFetch(url, options = {}) {
+    const headers = new Headers(options.headers || {});
+    const token = getAdminToken();
+
+    if (token) {
+        headers.set('Authorization', `Bearer ${token}`);
+    }
+
+    return fetch(url, { ...options, headers });
+}
+
+// API调用函数
+async function apiCall(url, options = {}) {
+    const isFormData = options.body instanceof FormData;
+    const headers = new Headers(options.headers || {});
+
+    if (!isFormData && !headers.has('Content-Type')) {
+        headers.set('Content-Type', 'application/json');
+    }
+
+    try {
+        const response = await authorizedFetch(API_BASE + url, {
+            ...options,
+            headers
+        });
+
+        if (!response.ok) {
+            let errorData = {};
+            try {
+                errorData = await response.json();
+            } catch (parseError) {
+                errorData = {};
+            }
+
+            if (response.status === 401) {
+                handleAdminUnauthorized();
+            }
+
+            const error = new Error(errorData.error || `HTTP ${response.status}`);
+            error.status = response.status;
+            throw error;
+        }
+
+        if (response.status === 204) {
+            return null;
+        }
+
+        const contentType = response.headers.get('content-type');
+        if (contentType && contentType.includes('application/json')) {
+            const text = await response.text();
+            return text ? JSON.parse(text) : null;
+        }
+
+        return await response.json();
+    } catch (error) {
+        if (error.status !== 401) {
+            console.error('API调用失败:', error);
+        }
+        throw error;
+    }
+}
+
+// 加载小组数据
+async function loadGroups(courseId, options = {}) {
+    const targetCourseId = courseId ?? getCurrentCourseId() ?? getActiveCourseId();
+    const url = buildCourseUrl('/groups', targetCourseId);
+    groups = await apiCall(url);
+    if (!options.skipRenderTabs) {
+        renderGroupTabs();
+    }
+    return groups;
+}
+
+// 工具函数
+function showMessage(message, type = 'info') {
+    // 创建消息提示
+    const messageEl = document.createElement('div');
+    messageEl.className = `message message-${type}`;
+    messageEl.textContent = message;
+    messageEl.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        padding: 1rem 2rem;
+        border-radius: 10px;
+        color: white;
+        font-weight: bold;
+        z-index: 3000;
+        animation: slideIn 0.3s ease-out;
+    `;
+    
+    switch(type) {
+        case 'success':
+            messageEl.style.background = 'linear-gradient(135deg, #4CAF50, #45a049)';
+            break;
+        case 'error':
+            messageEl.style.background = 'linear-gradient(135deg, #f44336, #d32f2f)';
+            break;
+        default:
+            messageEl.style.background = 'linear-gradient(135deg, #2196F3, #1976D2)';
+    }
+    
+    document.body.appendChild(messageEl);
+    
+    setTimeout(() => {
+        messageEl.remove();
+    }, 3000);
+}
+
+function showModal(content) {
+    const modal = document.getElementById('modal');
+    const modalBody = document.getElementById('modalBody');
+
+    modalBody.innerHTML = content;
+    modal.classList.add('active');
+    
+    // 添加关闭按钮事件
+    const closeBtn = modal.querySelector('.close');
+    if (closeBtn) {
+        closeBtn.onclick = closeModal;
+    }
+    
+    // 点击模态框外部关闭
+    modal.onclick = function(event) {
+        if (event.target === modal) {
+            closeModal();
+        }
+    };
+}
+
+function escapeHtml(text) {
+    if (text === undefined || text === null) return '';
+    return text
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;');
+}
+
+// 关闭模态框
+function closeModal() {
+    const modal = document.getElementById('modal');
+    if (modal) {
+        modal.classList.remove('active');
+    }
+}
+
+// 页面加载完成后的额外设置
+window.addEventListener('load', function() {
+    // 如果是手机端访问，调整样式
+    if (window.innerWidth <= 768) {
+        document.body.classList.add('mobile-device');
+    }
+    
+    // 监听窗口大小变化
+    window.addEventListener('resize', function() {
+        if (window.innerWidth <= 768) {
+            document.body.classList.add('mobile-device');
+        } else {
+            document.body.classList.remove('mobile-device');
+        }
+    });
+});
@@ -0,0 +1,372 @@
+// 大屏展示：小组切换、成员列表、投票统计与照片轮播
+let photoCarouselInterval;
+let currentPhotoSlide = 0;
+
+// 设置大屏交互事件
+function setupDisplayEvents() {
+    // 大屏评价二维码交互
+    const evaluationQrWrapper = document.getElementById('evaluationQrWrapper');
+    if (evaluationQrWrapper) {
+        const handleOpenMobile = (event) => {
+            event.preventDefault();
+            openMobilePage();
+        };
+
+        evaluationQrWrapper.addEventListener('click', handleOpenMobile);
+        evaluationQrWrapper.addEventListener('keydown', (event) => {
+            if (event.key === 'Enter' || event.key === ' ' || event.key === 'Spacebar') {
+                event.preventDefault();
+                openMobilePage();
+            }
+        });
+    }
+
+    const photoPrevBtn = document.getElementById('photoPrevBtn');
+    if (photoPrevBtn) {
+        photoPrevBtn.addEventListener('click', showPreviousPhoto);
+    }
+
+    const photoNextBtn = document.getElementById('photoNextBtn');
+    if (photoNextBtn) {
+        photoNextBtn.addEventListener('click', showNextPhoto);
+    }
+}
+
+async function loadDisplayData() {
+    const previousGroupId = currentGroup ? currentGroup.id : null;
+
+    try {
+        await loadGroups(getActiveCourseId());
+
+        if (groups.length === 0) {
+            currentGroup = null;
+            if (socket && socket.connected) {
+                socket.emit('leave_group');
+            }
+            const membersList = document.getElementById('membersList');
+            if (membersList) {
+                membersList.innerHTML = '<p style="text-align: center; color: #B0C4DE;">暂无小组数据</p>';
+            }
+            updateGroupDisplay();
+            return;
+        }
+
+        const matchedGroup = previousGroupId ? groups.find(group => group.id === previousGroupId) : null;
+        if (matchedGroup) {
+            selectGroup(matchedGroup);
+        } else {
+            selectGroup(groups[0]);
+        }
+    } catch (error) {
+        console.error('刷新大屏数据失败:', error);
+        showMessage('刷新大屏数据失败', 'error');
+    }
+}
+
+// 渲染小组标签
+function renderGroupTabs() {
+    const tabsContainer = document.getElementById('groupTabs');
+    if (!tabsContainer) return;
+    
+    tabsContainer.innerHTML = '';
+    
+    groups.forEach(group => {
+        const tab = document.createElement('button');
+        tab.className = 'group-tab';
+        tab.textContent = group.name;
+        tab.addEventListener('click', () => selectGroup(group));
+        tabsContainer.appendChild(tab);
+    });
+}
+
+// 选择小组
+function selectGroup(group) {
+    currentGroup = group;
+    
+    // 更新标签状态
+    const tabs = document.querySelectorAll('.group-tab');
+    tabs.forEach((tab, index) => {
+        tab.classList.toggle('active', groups[index] === group);
+    });
+    
+    // 更新显示内容
+    updateGroupDisplay();
+    loadGroupMembers();
+    
+    // 加入WebSocket房间（服务端会自动离开之前的小组房间）
+    if (socket) {
+        socket.emit('join_group', { group_id: group.id });
+    }
+}
+
+// 更新小组显示
+function updateGroupDisplay() {
+    const shareLinkElement = document.getElementById('evaluationShareLink');
+    let mobileUrl = null;
+    if (currentGroup) {
+        mobileUrl = buildMobileEvaluationUrl(currentGroup.id);
+        if (shareLinkElement) {
+            shareLinkElement.textContent = mobileUrl;
+            shareLinkElement.href = mobileUrl;
+        }
+    } else if (shareLinkElement) {
+        shareLinkElement.textContent = '请选择小组';
+        shareLinkElement.href = '#';
+    }
+
+    updateEvaluationQrCode(currentGroup, mobileUrl);
+
+    if (!currentGroup) return;
+
+    const groupName = document.getElementById('groupName');
+    const groupLogo = document.getElementById('groupLogo');
+
+    if (groupName) groupName.textContent = currentGroup.name;
+    if (groupLogo) {
+        if (currentGroup.logo) {
+            groupLogo.src = currentGroup.logo;
+            groupLogo.style.display = 'block';
+        } else {
+            groupLogo.style.display = 'none';
+        }
+    }
+
+    // 更新投票统计
+    updateVoteStats(currentGroup ? currentGroup.vote_stats : null);
+
+    // 更新照片轮播
+    updatePhotoCarousel();
+}
+
+function updateEvaluationQrCode(group, mobileUrl) {
+    const qrContainer = document.getElementById('evaluationQrCode');
+    if (!qrContainer) return;
+
+    if (!group) {
+        qrContainer.innerHTML = '<div class="qr-placeholder">请选择小组</div>';
+        return;
+    }
+
+    const targetMobileUrl = mobileUrl || buildMobileEvaluationUrl(group.id);
+    const qrImageUrl = `${buildGroupQrCodeImageUrl(group.id)}?t=${Date.now()}`;
+
+    const qrImage = document.createElement('img');
+    qrImage.src = qrImageUrl;
+    qrImage.alt = `小组${group.name || ''}评价二维码`;
+    qrImage.loading = 'lazy';
+    qrImage.decoding = 'async';
+
+    qrImage.addEventListener('error', (error) => {
+        console.error('二维码加载失败', error);
+        qrContainer.innerHTML = '<div class="qr-placeholder">二维码加载失败</div>';
+    });
+
+    qrImage.addEventListener('load', () => {
+        // 将二维码图片加载成功后，确保显示正确的移动端链接
+        const shareLinkElement = document.getElementById('evaluationShareLink');
+        if (shareLinkElement) {
+            shareLinkElement.textContent = targetMobileUrl;
+            shareLinkElement.href = targetMobileUrl;
+        }
+    });
+
+    qrContainer.innerHTML = '';
+    qrContainer.appendChild(qrImage);
+}
+
+// 更新投票统计
+function updateVoteStats(stats) {
+    // 如果没有传入stats参数，尝试从currentGroup获取
+    if (!stats && currentGroup && currentGroup.vote_stats) {
+        stats = currentGroup.vote_stats;
+    }
+    
+    // 如果仍然没有stats，使用默认值
+    if (!stats) {
+        stats = { likes: 0, dislikes: 0 };
+    }
+    
+    const totalScore = document.getElementById('totalScore');
+    
+    // 计算总计分：赞的分数总和 - 踩的分数总和
+    const score = (stats.likes || 0) - (stats.dislikes || 0);
+    if (totalScore) totalScore.textContent = score;
+    
+    // 添加动画效果
+    if (totalScore) {
+        totalScore.style.transform = 'scale(1.1)';
+        setTimeout(() => {
+            totalScore.style.transform = 'scale(1)';
+        }, 200);
+    }
+}
+
+// 加载小组成员
+async function loadGroupMembers() {
+    if (!currentGroup) return;
+    
+    try {
+        const members = await apiCall(`/groups/${currentGroup.id}/members`);
+        renderMembersList(members);
+    } catch (error) {
+        console.error('加载成员失败:', error);
+        const membersList = document.getElementById('membersList');
+        if (membersList) {
+            membersList.innerHTML = '<p style="text-align: center; color: #B0C4DE;">加载成员失败</p>';
+        }
+    }
+}
+
+// 渲染成员列表
+function renderMembersList(members) {
+    const membersList = document.getElementById('membersList');
+    if (!membersList) return;
+
+    const safeMembers = Array.isArray(members) ? members : [];
+    let memberCards = [];
+
+    if (safeMembers.length === 0) {
+        memberCards.push(`
+            <div class="member-card member-card-placeholder">
+                <div class="member-card-name">暂无成员</div>
+                <div class="member-card-meta">等待添加</div>
+            </div>
+        `);
+    } else {
+        memberCards = safeMembers.map(member => {
+            const metaParts = [member.role_name || '未知职务'];
+            if (member.company) {
+                metaParts.push(member.company);
+            }
+
+            return `
+                <div class="member-card">
+                    <div class="member-card-name">${member.name}</div>
+                    <div class="member-card-meta">${metaParts.join(' ｜ ')}</div>
+                </div>
+            `;
+        });
+    }
+
+    const placeholdersNeeded = Math.max(0, 15 - memberCards.length);
+    const placeholders = Array.from({ length: placeholdersNeeded }).map(() => `
+        <div class="member-card member-card-placeholder">
+            <div class="member-card-name"></div>
+            <div class="member-card-meta"></div>
+        </div>
+    `);
+
+    membersList.innerHTML = [...memberCards, ...placeholders].join('');
+}
+
+// 更新照片轮播
+function updatePhotoCarousel() {
+    const photoSlides = document.getElementById('photoSlides');
+    const carouselDots = document.getElementById('carouselDots');
+    const prevButton = document.getElementById('photoPrevBtn');
+    const nextButton = document.getElementById('photoNextBtn');
+
+    if (!photoSlides || !carouselDots || !currentGroup) return;
+
+    // 清除现有轮播
+    if (photoCarouselInterval) {
+        clearInterval(photoCarouselInterval);
+    }
+
+    const photos = currentGroup.photos || [];
+
+    if (prevButton) {
+        prevButton.disabled = photos.length <= 1;
+        prevButton.style.display = photos.length === 0 ? 'none' : 'flex';
+    }
+
+    if (nextButton) {
+        nextButton.disabled = photos.length <= 1;
+        nextButton.style.display = photos.length === 0 ? 'none' : 'flex';
+    }
+
+    if (photos.length === 0) {
+        currentPhotoSlide = 0;
+        photoSlides.innerHTML = '<div class="photo-slide"><div style="display: flex; align-items: center; justify-content: center; height: 100%; color: #B0C4DE;">暂无照片</div></div>';
+        carouselDots.innerHTML = '';
+        return;
+    }
+
+    // 渲染照片
+    photoSlides.innerHTML = '';
+    carouselDots.innerHTML = '';
+
+    photos.forEach((photo, index) => {
+        const slide = document.createElement('div');
+        slide.className = 'photo-slide';
+        slide.innerHTML = `<img src="${photo}" alt="小组照片${index + 1}">`;
+        photoSlides.appendChild(slide);
+
+        const dot = document.createElement('div');
+        dot.className = `carousel-dot ${index === 0 ? 'active' : ''}`;
+        dot.addEventListener('click', () => showPhotoSlide(index));
+        carouselDots.appendChild(dot);
+    });
+
+    currentPhotoSlide = 0;
+    showPhotoSlide(currentPhotoSlide);
+
+    // 自动轮播
+    photoCarouselInterval = setInterval(() => {
+        currentPhotoSlide = (currentPhotoSlide + 1) % photos.length;
+        showPhotoSlide(currentPhotoSlide);
+    }, 4000);
+}
+
+// 显示指定照片
+function showPhotoSlide(index) {
+    const photoSlides = document.getElementById('photoSlides');
+    const dots = document.querySelectorAll('.carousel-dot');
+
+    if (photoSlides) {
+        photoSlides.style.transform = `translateX(-${index * 100}%)`;
+    }
+
+    dots.forEach((dot, i) => {
+        dot.classList.toggle('active', i === index);
+    });
+
+    currentPhotoSlide = index;
+}
+
+function showPreviousPhoto() {
+    const photoSlides = document.getElementById('photoSlides');
+    if (!photoSlides || photoSlides.children.length === 0) return;
+
+    const totalSlides = photoSlides.children.length;
+    const targetIndex = (currentPhotoSlide - 1 + totalSlides) % totalSlides;
+    showPhotoSlide(targetIndex);
+}
+
+function showNextPhoto() {
+    const photoSlides = document.getElementById('photoSlides');
+    if (!photoSlides || photoSlides.children.length === 0) return;
+
+    const totalSlides = photoSlides.children.length;
+    const targetIndex = (currentPhotoSlide + 1) % totalSlides;
+    showPhotoSlide(targetIndex);
+}
+
+// 打开手机端评价页面
+function buildMobileEvaluationUrl(groupId) {
+    return `${window.location.origin}/m?g=${groupId}`;
+}
+
+function buildGroupQrCodeImageUrl(groupId) {
+    return `${API_BASE}/groups/${groupId}/qrcode`;
+}
+
+function openMobilePage() {
+    if (!currentGroup) {
+        showMessage('请先选择一个小组', 'error');
+        return;
+    }
+
+    const mobileUrl = buildMobileEvaluationUrl(currentGroup.id);
+    window.open(mobileUrl, '_blank');
+}
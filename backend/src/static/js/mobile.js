@@ -0,0 +1,238 @@
+// 手机端评价页
+// 全局变量
+const API_BASE = '/api';
+let currentGroup = null;
+let currentVoter = null;
+let currentVoteKey = null;
+let socket = null;
+
+// 等待Socket确认的毫秒数，超时后改用HTTP接口
+const SOCKET_ACK_TIMEOUT = 5000;
+
+// 初始化
+document.addEventListener('DOMContentLoaded', function() {
+    initializeMobilePage();
+    setupEventListeners();
+});
+
+// 初始化手机端页面
+async function initializeMobilePage() {
+    try {
+        // 从URL获取小组ID
+        const urlParams = new URLSearchParams(window.location.search);
+        const groupId = urlParams.get('g') || urlParams.get('group');
+
+        if (!groupId) {
+            showStep('errorStep');
+            return;
+        }
+
+        // 加载小组信息（仅包含评价所需的字段）
+        const response = await fetch(`${API_BASE}/groups/${encodeURIComponent(groupId)}/mobile`);
+        if (!response.ok && response.status !== 404) throw new Error('无法加载小组信息');
+
+        currentGroup = response.ok ? await response.json() : null;
+
+        if (!currentGroup) {
+            showStep('errorStep');
+            document.getElementById('errorContent').textContent = '指定的小组不存在';
+            return;
+        }
+
+        // 检查小组状态
+        if (currentGroup.status === 1) {
+            showStep('errorStep');
+            document.getElementById('errorContent').textContent = '该小组的评价已结束';
+            return;
+        }
+
+        // 更新页面标题
+        document.getElementById('groupTitle').textContent = `${currentGroup.name} - 评价`;
+        document.getElementById('voteGroupTitle').textContent = `${currentGroup.name} - 评价`;
+
+        // 初始化WebSocket连接
+        initializeSocket();
+
+        // 显示验证步骤
+        showStep('verifyStep');
+
+    } catch (error) {
+        console.error('初始化失败:', error);
+        showStep('errorStep');
+        document.getElementById('errorContent').textContent = '系统初始化失败，请稍后重试';
+    }
+}
+
+// 初始化WebSocket连接
+function initializeSocket() {
+    socket = io();
+
+    socket.on('connect', function() {
+        console.log('WebSocket连接成功');
+        if (currentGroup) {
+            socket.emit('join_group', { group_id: currentGroup.id });
+        }
+    });
+
+    socket.on('vote_updated', function(data) {
+        console.log('收到投票更新:', data);
+    });
+}
+
+// 设置事件监听器
+function setupEventListeners() {
+    // 验证表单提交
+    document.getElementById('verifyForm').addEventListener('submit', handleVerifySubmit);
+
+    // 投票按钮
+    document.getElementById('likeBtn').addEventListener('click', () => submitVote(1));
+    document.getElementById('dislikeBtn').addEventListener('click', () => submitVote(-1));
+
+    // 返回按钮
+    document.getElementById('backToVerifyBtn').addEventListener('click', function() {
+        showStep('verifyStep');
+        currentVoter = null;
+        currentVoteKey = null;
+        document.getElementById('verifyForm').reset();
+        hideError();
+    });
+}
+
+// 显示指定步骤
+function showStep(stepId) {
+    const steps = document.querySelectorAll('.mobile-step');
+    steps.forEach(step => step.classList.remove('active'));
+
+    const targetStep = document.getElementById(stepId);
+    if (targetStep) {
+        targetStep.classList.add('active');
+    }
+}
+
+// 处理身份验证提交
+async function handleVerifySubmit(event) {
+    event.preventDefault();
+
+    const name = document.getElementById('voterName').value.trim();
+    const phone = document.getElementById('voterPhone').value.trim();
+
+    if (!name || !phone) {
+        showError('请填写完整信息');
+        return;
+    }
+
+    try {
+        const response = await callVoterApi('verify_voter', '/verify-voter', {
+            name: name,
+            phone: phone,
+            group_id: currentGroup.id
+        });
+
+        const result = response.data;
+
+        if (!response.ok) {
+            throw new Error(result.error || '验证失败');
+        }
+
+        currentVoter = result;
+        // 每次验证后开始一次新的投票，之后该次投票的所有重试（包括Socket超时后改用HTTP）都使用同一个幂等键
+        currentVoteKey = generateIdempotencyKey();
+
+        // 更新投票页面信息
+        document.getElementById('voterInfo').textContent = 
+            `${result.name}，您的投票权重为 ${result.weight}`;
+
+        hideError();
+        showStep('voteStep');
+
+    } catch (error) {
+        showError(error.message);
+    }
+}
+
+// 提交投票
+async function submitVote(voteType) {
+    if (!currentVoter || !currentGroup) return;
+    if (!currentVoteKey) {
+        currentVoteKey = generateIdempotencyKey();
+    }
+
+    try {
+        // Socket与HTTP携带同一个幂等键：经Socket已写入但确认超时时，改用HTTP的重试返回原结果，不会重复计票
+        const response = await callVoterApi('cast_vote', '/vote', {
+            voter_token: currentVoter.voter_token,
+            group_id: currentGroup.id,
+            vote_type: voteType,
+            idempotency_key: currentVoteKey
+        }, currentVoteKey ? { 'Idempotency-Key': currentVoteKey } : {});
+
+        const result = response.data;
+
+        if (response.status === 401) {
+            // 投票令牌过期，需要重新验证身份
+            currentVoter = null;
+            showStep('verifyStep');
+        }
+
+        if (!response.ok) {
+            throw new Error(result.error || '投票失败');
+        }
+
+        showStep('completeStep');
+
+    } catch (error) {
+        showError(error.message);
+    }
+}
+
+// 优先通过已建立的Socket连接发送，未连接或确认超时时改用HTTP接口；返回 { ok, status, data, viaSocket }
+async function callVoterApi(event, path, payload, headers = {}) {
+    const ack = await emitWithAck(event, payload);
+    if (ack) {
+        return { ok: !ack.error, status: ack.status || 200, data: ack, viaSocket: true };
+    }
+
+    const response = await fetch(`${API_BASE}${path}`, {
+        method: 'POST',
+        headers: Object.assign({ 'Content-Type': 'application/json' }, headers),
+        body: JSON.stringify(payload)
+    });
+    return { ok: response.ok, status: response.status, data: await response.json(), viaSocket: false };
+}
+
+// 发送Socket事件并等待服务端确认，未连接或超时时返回null
+function emitWithAck(event, payload) {
+    if (!socket || !socket.connected) {
+        return Promise.resolve(null);
+    }
+    return new Promise(resolve => {
+        socket.timeout(SOCKET_ACK_TIMEOUT).emit(event, payload, (error, response) => {
+            resolve(error ? null : response);
+        });
+    });
+}
+
+// 生成投票幂等键
+function generateIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+// 显示错误信息
+function showError(message) {
+    const errorDiv = document.getElementById('errorMessage');
+    if (errorDiv) {
+        errorDiv.textContent = message;
+        errorDiv.style.display = 'block';
+    }
+}
+
+// 隐藏错误信息
+function hideError() {
+    const errorDiv = document.getElementById('errorMessage');
+    if (errorDiv) {
+        errorDiv.style.display = 'none';
+    }
+}
@@ -0,0 +1,79 @@
+// 排名页：首次打开排名页时由 common.js 按需加载
+let rankingRefreshTimer = null;
+
+// 排名页收到得分变化通知后，合并该时间段内的多次变化再刷新
+const RANKING_REFRESH_DELAY = 1000;
+
+function scheduleRankingRefresh(data) {
+    if (!data || data.course_id !== getActiveCourseId() || rankingRefreshTimer) return;
+
+    rankingRefreshTimer = setTimeout(() => {
+        rankingRefreshTimer = null;
+        const rankingPage = document.getElementById('rankingPage');
+        if (rankingPage && rankingPage.classList.contains('active')) {
+            loadRankingData();
+        }
+    }, RANKING_REFRESH_DELAY);
+}
+
+// 排名相关函数
+async function loadRankingData() {
+    try {
+        const ranking = await apiCall(buildActiveCourseUrl('/ranking'));
+        renderRanking(ranking);
+    } catch (error) {
+        console.error('加载排名失败:', error);
+        showMessage('加载排名失败', 'error');
+    }
+}
+
+function renderRanking(ranking) {
+    const rankingDisplay = document.getElementById('rankingDisplay');
+    if (!rankingDisplay) return;
+    
+    rankingDisplay.innerHTML = '';
+    
+    if (ranking.length === 0) {
+        rankingDisplay.innerHTML = '<p style="color: #B0C4DE;">暂无排名数据</p>';
+        return;
+    }
+    
+    ranking.forEach(item => {
+        const rankingItem = document.createElement('div');
+        rankingItem.className = `ranking-item rank-${item.rank} fade-in`;
+
+        let order = item.rank;
+        if (item.rank === 1) {
+            order = 2;
+        } else if (item.rank === 2) {
+            order = 1;
+        } else if (item.rank === 3) {
+            order = 3;
+        }
+        rankingItem.style.order = order;
+        
+        let crown = '';
+        if (item.rank === 1) crown = '<div class="ranking-crown">👑</div>';
+        else if (item.rank === 2) crown = '<div class="ranking-crown">🥈</div>';
+        else if (item.rank === 3) crown = '<div class="ranking-crown">🥉</div>';
+
+        rankingItem.innerHTML = `
+            ${crown}
+            <div class="ranking-content">
+                <div class="ranking-name">${item.name.substring(0, 6)}</div>
+                <div class="ranking-score">${item.total_score}分</div>
+            </div>
+            <div class="ranking-position">
+                <span class="ranking-position-prefix">第</span>
+                <span class="ranking-position-number">${item.rank}</span>
+                <span class="ranking-position-suffix">名</span>
+            </div>
+        `;
+
+        rankingDisplay.appendChild(rankingItem);
+    });
+}
+
+if (socket) {
+    socket.on('ranking_changed', scheduleRankingRefresh);
+}
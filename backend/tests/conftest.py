@@ -0,0 +1,247 @@
+import gc
+import os
+import sys
+import threading
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from src.models.evaluation import db, upgrade_schema, Group, GroupPhoto, Member, Role, Voter, Vote  # noqa: E402
+from src.routes.evaluation import evaluation_bp, generate_admin_token  # noqa: E402
+from src.services.datagen import generate_course  # noqa: E402
+from src.services.shards import init_shards, use_course  # noqa: E402
+
+# 预置课程的规模：同一接口在两种规模下执行的SQL语句数必须相同
+SIZES = {
+    'small': {'groups': 4, 'members': 16, 'voters': 20, 'votes': 60},
+    'large': {'groups': 60, 'members': 480, 'voters': 400, 'votes': 12000},
+}
+
+# 机器较慢时可放宽耗时预算，如 EVALUATION_TEST_LATENCY_SCALE=3
+LATENCY_SCALE = float(os.environ.get('EVALUATION_TEST_LATENCY_SCALE', '1') or 1)
+
+ADMIN_PASSWORD = 'test-password'
+
+
+class QueryCounter:
+    """统计期间当前线程在所有引擎（主库与各课程库）上执行的SQL语句
+
+    请求提交的后台任务在任务线程中执行，不计入请求本身的语句数。
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.thread_id = threading.get_ident()
+
+    def _record(self, connection, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread_id:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+def create_test_app(directory, **config):
+    """按 main.py 的方式组装只含 API 蓝图的应用，数据库、上传与归档目录都放在临时目录中"""
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='test-secret',
+        ADMIN_USERNAME='super',
+        ADMIN_PASSWORD=ADMIN_PASSWORD,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(directory, 'app.db')}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        UPLOAD_DIR=os.path.join(directory, 'uploads'),
+        ARCHIVE_DIR=os.path.join(directory, 'archives'),
+        COURSE_SHARD_DIR=os.path.join(directory, 'courses'),
+        RATE_LIMIT_ENABLED=False,
+        # 每次请求都重新读取数据版本，语句数不随请求间隔变化
+        GENERATION_CACHE_TTL=0,
+        JOB_WORKERS=1,
+    )
+    app.config.update(config)
+    app.register_blueprint(evaluation_bp, url_prefix='/api')
+    db.init_app(app)
+    init_shards(app)
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+    return app
+
+
+def course_snapshot(app, course_id, votes=True):
+    """课程数据按名称与手机号整理后的内容，不含自增ID，用于比较复制、归档恢复前后的数据"""
+    with app.app_context():
+        use_course(course_id)
+        roles = {role.id: role.name for role in Role.query.filter_by(course_id=course_id)}
+        groups = {group.id: group for group in Group.query.filter_by(course_id=course_id)}
+        voters = {voter.id: voter for voter in Voter.query.filter_by(course_id=course_id)}
+        snapshot = {
+            'roles': sorted(roles.values()),
+            'groups': sorted(
+                (group.name, group.logo, tuple(sorted(photo.filename for photo in group.group_photos)))
+                for group in groups.values()
+            ),
+            'members': sorted(
+                (groups[member.group_id].name, member.name, member.company, roles.get(member.role_id))
+                for member in Member.query.filter(Member.group_id.in_(groups))
+            ),
+            'voters': sorted((voter.name, voter.phone, voter.weight) for voter in voters.values()),
+        }
+        if votes:
+            snapshot['votes'] = sorted(
+                (groups[vote.group_id].name, voters[vote.voter_id].phone, vote.vote_type, vote.vote_weight)
+                for vote in Vote.query.filter_by(course_id=course_id)
+            )
+        return snapshot
+
+
+class World:
+    """预置课程及测试用例共用的辅助请求（不计入SQL统计）"""
+
+    def __init__(self, app, size):
+        self.app = app
+        self.size = size
+        self.client = app.test_client()
+        with app.app_context():
+            self.headers = {'Authorization': f"Bearer {generate_admin_token('super')}"}
+        self._serial = 0
+
+        with app.app_context():
+            counts = SIZES[size]
+            result = generate_course(name=f'{size}课程', seed=1, **counts)
+            self.course_id = result['course']['id']
+            # 每个小组一张风采照片，覆盖照片列表的加载
+            db.session.add_all(
+                GroupPhoto(group_id=group.id, filename=f'seed-{group.id}.jpg', original_name='seed.jpg')
+                for group in Group.query.filter_by(course_id=self.course_id)
+            )
+            db.session.commit()
+
+        self.api('post', f'/api/courses/{self.course_id}/activate')
+        groups = self.api('get', f'/api/groups?course_id={self.course_id}')
+        self.group_ids = [group['id'] for group in groups]
+        self.group_id = self.group_ids[0]
+        self.role_id = self.api('get', f'/api/roles?course_id={self.course_id}')[0]['id']
+        self.voter = self.api('get', f'/api/voters?course_id={self.course_id}')[0]
+        self.vote_id = self.api('get', f'/api/votes?course_id={self.course_id}&group_id={self.group_id}')[0]['id']
+        self.member_id = self.api('get', f'/api/groups/{self.group_id}/members')[0]['id']
+
+    def unique(self, prefix):
+        self._serial += 1
+        return f'{prefix}{self._serial}'
+
+    def api(self, method, path, **kwargs):
+        kwargs.setdefault('headers', self.headers)
+        response = getattr(self.client, method)(path, **kwargs)
+        assert response.status_code < 400, (method, path, response.status_code, response.get_data(as_text=True))
+        return response.get_json()
+
+    def new_course(self, groups=2):
+        course = self.api('post', '/api/courses', json={'name': self.unique('临时课程')})
+        for _ in range(groups):
+            self.new_group(course['id'])
+        return course['id']
+
+    def new_group(self, course_id=None):
+        return self.api('post', '/api/groups', json={
+            'name': self.unique('临时小组'), 'course_id': course_id or self.course_id
+        })['id']
+
+    def new_voter(self):
+        phone = f'139{self._serial + 10000000:08d}'
+        return self.api('post', '/api/voters', json={
+            'name': self.unique('临时评价人'), 'phone': phone, 'course_id': self.course_id
+        })
+
+    def voter_token(self, voter, group_id=None):
+        """评价人通过身份验证，返回投票令牌"""
+        return self.api('post', '/api/verify-voter', json={
+            'name': voter['name'], 'phone': voter['phone'], 'group_id': group_id or self.group_id
+        })['voter_token']
+
+    def wait_job(self, job_id, timeout=30):
+        """等待后台任务结束，返回任务状态"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.api('get', f'/api/jobs/{job_id}')
+            if job['status'] in ('succeeded', 'failed'):
+                return job
+            assert time.monotonic() < deadline, f'后台任务未在 {timeout} 秒内结束: {job}'
+            time.sleep(0.02)
+
+    def new_member(self, group_id):
+        return self.api('post', f'/api/groups/{group_id}/members', json={
+            'name': self.unique('成员'), 'company': '公司', 'role_id': self.role_id
+        })['id']
+
+    def measure(self, method, path, **kwargs):
+        """执行一次请求，返回 (响应, 语句统计, 耗时毫秒)
+
+        GET 请求先预热一次，统计进程内缓存（计分结果、统计快照等）就绪后的稳定状态。
+        """
+        kwargs.setdefault('headers', self.headers)
+        if method == 'get':
+            getattr(self.client, method)(path, **kwargs)
+        # 计时期间暂停垃圾回收，避免把之前用例积累的回收停顿计入本次耗时
+        gc.disable()
+        try:
+            with QueryCounter() as counter:
+                begin = time.perf_counter()
+                response = getattr(self.client, method)(path, **kwargs)
+                elapsed = (time.perf_counter() - begin) * 1000
+        finally:
+            gc.enable()
+        return response, counter, elapsed
+
+
+@pytest.fixture(scope='session')
+def worlds(tmp_path_factory):
+    return {
+        size: World(create_test_app(str(tmp_path_factory.mktemp(size))), size)
+        for size in SIZES
+    }
+
+
+@pytest.fixture
+def make_world(tmp_path):
+    """按指定配置新建独立的小规模课程，如 make_world(RATE_LIMIT_ENABLED=True)"""
+    def make(**config):
+        return World(create_test_app(str(tmp_path), **config), 'small')
+    return make
+
+
+@pytest.fixture
+def world(make_world):
+    """每个用例独立的小规模课程，供会修改数据的行为测试使用"""
+    return make_world()
+
+
+_timings = []
+
+
+@pytest.fixture(scope='session')
+def timings():
+    return _timings
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _timings:
+        return
+    terminalreporter.section('endpoint timings (ms, slowest first)')
+    for name, size, statements, elapsed in sorted(_timings, key=lambda item: -item[3])[:15]:
+        terminalreporter.write_line(f'{elapsed:8.1f}  {statements:4d} SQL  {size:<5}  {name}')
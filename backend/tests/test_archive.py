@@ -0,0 +1,62 @@
+"""课程归档：归档后投票明细移出数据库但排名不变，从归档恢复后得到相同的数据"""
+import os
+
+import pytest
+
+from conftest import course_snapshot
+from src.models.evaluation import Vote
+from src.services.shards import use_course
+
+
+def ranking_of(world, course_id):
+    return [
+        (group['name'], group['likes'], group['dislikes'], group['total_score'])
+        for group in world.api('get', f'/api/ranking?course_id={course_id}')
+    ]
+
+
+def vote_count(world, course_id):
+    with world.app.app_context():
+        use_course(course_id)
+        return Vote.query.filter_by(course_id=course_id).count()
+
+
+@pytest.mark.parametrize('shards', [False, True], ids=['same-database', 'course-shards'])
+def test_archive_then_restore_in_place(make_world, shards):
+    world = make_world(COURSE_SHARDS=shards)
+    course_id = world.course_id
+    # 启用分库时预置课程保存在独立文件中
+    assert os.path.exists(os.path.join(world.app.config['COURSE_SHARD_DIR'], f'course_{course_id}.db')) == shards
+    before = course_snapshot(world.app, course_id)
+    ranking = ranking_of(world, course_id)
+    assert before['votes']
+
+    archived = world.api('post', f'/api/courses/{course_id}/archive')
+    assert archived['vote_count'] == len(before['votes'])
+    assert vote_count(world, course_id) == 0
+    # 归档后以最终统计代替投票明细，排名不变
+    assert ranking_of(world, course_id) == ranking
+
+    restored = world.api('post', '/api/archives/restore', json={'filename': archived['filename']})
+    assert restored['in_place'] is True
+    assert course_snapshot(world.app, course_id) == before
+    assert ranking_of(world, course_id) == ranking
+
+
+def test_restore_deleted_course_creates_new_course(world):
+    before = course_snapshot(world.app, world.course_id)
+    ranking = ranking_of(world, world.course_id)
+    archived = world.api('post', f'/api/courses/{world.course_id}/archive')
+    world.api('delete', f'/api/courses/{world.course_id}')
+
+    restored = world.api('post', '/api/archives/restore', json={'filename': archived['filename']})
+    assert restored['in_place'] is False
+    course_id = restored['course']['id']
+    assert course_snapshot(world.app, course_id) == before
+    assert ranking_of(world, course_id) == ranking
+
+
+def test_archiving_twice_is_rejected(world):
+    world.api('post', f'/api/courses/{world.course_id}/archive')
+    response = world.client.post(f'/api/courses/{world.course_id}/archive', headers=world.headers)
+    assert response.status_code == 400
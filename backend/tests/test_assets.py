@@ -0,0 +1,109 @@
+"""前端脚本打包：压缩不改变脚本行为，文件名随内容变化，页面改为加载打包后的文件"""
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from src.services.assets import (
+    BUNDLES, DIST_DIR, LAZY_BUNDLES, MANIFEST_NAME, STATIC_DIR, build_bundles, minify_js, rewrite_page,
+)
+
+NODE = shutil.which('node')
+needs_node = pytest.mark.skipif(NODE is None, reason='需要 node 执行脚本')
+
+SNIPPET = r'''
+// 行注释
+const text = "a // 不是注释 /* 也不是 */";
+const pattern = /\/+[a-z]*/g;
+let total = 10
+let half = total / 2 / 1
+const label = `合计 ${total - -1} 项 // ${'x'}`;
+/* 多行
+   注释 */
+function pick(value) {
+    return value
+        ? 'yes'
+        : 'no'
+}
+let counter = 0
+counter++
++counter
+console.log(JSON.stringify([text, '/a//b'.replace(pattern, '-'), half, label, pick(total), counter]))
+'''
+
+
+def run_node(source):
+    return subprocess.run([NODE, '-e', source], capture_output=True, text=True, check=True).stdout
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    """复制一份静态目录，打包输出不写入源码树"""
+    target = tmp_path / 'static'
+    shutil.copytree(os.path.join(STATIC_DIR, 'js'), target / 'js')
+    for page in ('index.html', 'mobile.html'):
+        shutil.copy(os.path.join(STATIC_DIR, page), target / page)
+    return str(target)
+
+
+def test_minify_strips_comments_and_keeps_literals():
+    minified = minify_js(SNIPPET)
+    assert '行注释' not in minified and '多行' not in minified
+    assert '"a // 不是注释 /* 也不是 */"' in minified
+    assert r'/\/+[a-z]*/g' in minified
+    assert "`合计 ${total - -1} 项 // ${'x'}`" in minified
+    assert len(minified) < len(SNIPPET)
+
+
+@needs_node
+def test_minified_snippet_behaves_the_same():
+    assert run_node(minify_js(SNIPPET)) == run_node(SNIPPET)
+
+
+@needs_node
+@pytest.mark.parametrize('name', sorted(BUNDLES))
+def test_minified_bundles_are_valid_scripts(tmp_path, name):
+    for source in BUNDLES[name]:
+        with open(os.path.join(STATIC_DIR, source), encoding='utf-8') as handle:
+            path = tmp_path / os.path.basename(source)
+            path.write_text(minify_js(handle.read()), encoding='utf-8')
+        subprocess.run([NODE, '--check', str(path)], capture_output=True, text=True, check=True)
+
+
+def test_build_names_files_by_content(static_dir):
+    manifest = build_bundles(static_dir)
+    assert sorted(manifest) == sorted(BUNDLES)
+    with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as handle:
+        assert json.load(handle) == manifest
+    assert build_bundles(static_dir) == manifest
+
+    # 修改源文件后只有对应的包换名，旧版本被清理
+    with open(os.path.join(static_dir, 'js', 'mobile.js'), 'a', encoding='utf-8') as handle:
+        handle.write('\nwindow.changed = true;\n')
+    rebuilt = build_bundles(static_dir)
+    assert rebuilt['mobile'] != manifest['mobile']
+    assert {name: path for name, path in rebuilt.items() if name != 'mobile'} == \
+        {name: path for name, path in manifest.items() if name != 'mobile'}
+    assert not os.path.exists(os.path.join(static_dir, manifest['mobile']))
+    assert os.path.exists(os.path.join(static_dir, rebuilt['mobile']))
+
+
+def test_pages_load_built_bundles(static_dir):
+    manifest = build_bundles(static_dir)
+    with open(os.path.join(static_dir, 'index.html'), encoding='utf-8') as handle:
+        index = rewrite_page(handle.read(), manifest)
+    assert f'<script src="{manifest["common"]}"></script>' in index
+    assert f'<script src="{manifest["display"]}"></script>' in index
+    assert 'src="js/' not in index
+    lazy = {name: manifest[name] for name in LAZY_BUNDLES}
+    assert f'window.ASSET_BUNDLES = {json.dumps(lazy, sort_keys=True)};' in index
+
+    with open(os.path.join(static_dir, 'mobile.html'), encoding='utf-8') as handle:
+        source = handle.read()
+    mobile = rewrite_page(source, manifest)
+    assert f'<script src="{manifest["mobile"]}"></script>' in mobile
+    assert 'ASSET_BUNDLES' not in mobile
+    # 没有打包结果时页面保持原样，直接加载源文件
+    assert rewrite_page(source, None) == source
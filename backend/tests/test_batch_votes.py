@@ -0,0 +1,82 @@
+"""批量投票：一次提交多个小组，任一小组不可投票时整批不写入"""
+import pytest
+
+from src.models.evaluation import Vote
+from src.services.voting import VOTE_BATCH_MAX_GROUPS
+
+
+def voter_votes(world, voter_id):
+    with world.app.app_context():
+        return {vote.group_id: (vote.vote_type, vote.vote_weight) for vote in Vote.query.filter_by(voter_id=voter_id)}
+
+
+def post_batch(world, token, votes):
+    return world.client.post('/api/vote/batch', json={'voter_token': token, 'votes': votes})
+
+
+def test_batch_writes_every_group(world):
+    voter = world.new_voter()
+    votes = [{'group_id': group_id, 'vote_type': (-1) ** index} for index, group_id in enumerate(world.group_ids)]
+    response = post_batch(world, world.voter_token(voter), votes)
+    assert response.status_code == 200
+
+    results = response.get_json()['votes']
+    assert [result['group_id'] for result in results] == world.group_ids
+    assert voter_votes(world, voter['id']) == {
+        vote['group_id']: (vote['vote_type'], voter['weight']) for vote in votes
+    }
+    for result in results:
+        assert result['created']
+        assert result['stats'] == world.api('get', f"/api/groups/{result['group_id']}/stats")
+
+
+@pytest.mark.parametrize('votes', [
+    [],
+    'not-a-list',
+    [{'group_id': '1', 'vote_type': 1}],
+    [{'group_id': True, 'vote_type': 1}],
+    [{'group_id': 1, 'vote_type': 0}],
+    [{'group_id': 1, 'vote_type': 1}, {'group_id': 1, 'vote_type': -1}],
+    [{'group_id': group_id, 'vote_type': 1} for group_id in range(1, VOTE_BATCH_MAX_GROUPS + 2)],
+])
+def test_invalid_batches_are_rejected(world, votes):
+    voter = world.new_voter()
+    response = post_batch(world, world.voter_token(voter), votes)
+    assert response.status_code == 400
+    assert voter_votes(world, voter['id']) == {}
+
+
+def test_one_closed_group_rejects_the_whole_batch(world):
+    closed = world.group_ids[1]
+    world.api('put', f'/api/groups/{closed}', json={'status': 1})
+    voter = world.new_voter()
+
+    response = post_batch(world, world.voter_token(voter), [
+        {'group_id': group_id, 'vote_type': 1} for group_id in world.group_ids
+    ])
+    assert response.status_code == 400
+    assert response.get_json()['group_ids'] == [closed]
+    assert voter_votes(world, voter['id']) == {}
+
+
+def test_groups_already_voted_reject_the_whole_batch(world):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+    world.api('post', '/api/vote', json={'voter_token': token, 'group_id': world.group_id, 'vote_type': 1})
+
+    response = post_batch(world, token, [{'group_id': group_id, 'vote_type': 1} for group_id in world.group_ids])
+    assert response.status_code == 400
+    assert response.get_json()['group_ids'] == [world.group_id]
+    assert list(voter_votes(world, voter['id'])) == [world.group_id]
+
+
+def test_missing_and_foreign_groups_are_listed(world):
+    other_course = world.new_course(groups=1)
+    foreign = world.api('get', f'/api/groups?course_id={other_course}')[0]['id']
+    token = world.voter_token(world.new_voter())
+
+    response = post_batch(world, token, [{'group_id': world.group_id, 'vote_type': 1}, {'group_id': foreign, 'vote_type': 1}])
+    assert response.status_code == 400 and response.get_json()['group_ids'] == [foreign]
+
+    response = post_batch(world, token, [{'group_id': 999999, 'vote_type': 1}])
+    assert response.status_code == 404 and response.get_json()['group_ids'] == [999999]
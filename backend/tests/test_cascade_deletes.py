@@ -0,0 +1,65 @@
+"""级联删除：删除课程、小组或评价人时，依赖它们的数据一并删除，不留孤立行"""
+from sqlalchemy import text
+
+from src.models.evaluation import (
+    db, Course, Group, Member, Role, Voter, Vote, GroupPhoto, VoteRollup, GroupTally, TallySnapshot
+)
+
+COURSE_MODELS = (Group, Role, Voter, Vote, VoteRollup, GroupTally, TallySnapshot)
+
+
+def count_course_rows(world, course_id):
+    with world.app.app_context():
+        counts = {model.__tablename__: model.query.filter_by(course_id=course_id).count() for model in COURSE_MODELS}
+        group_ids = db.select(Group.id).where(Group.course_id == course_id)
+        counts['members'] = Member.query.filter(Member.group_id.in_(group_ids)).count()
+        return counts
+
+
+def count_group_rows(world, group_id):
+    with world.app.app_context():
+        return {model.__tablename__: model.query.filter_by(group_id=group_id).count()
+                for model in (Member, GroupPhoto, Vote, VoteRollup, GroupTally)}
+
+
+def test_delete_course_removes_all_course_data(world):
+    before = count_course_rows(world, world.course_id)
+    assert before['groups'] and before['votes'] and before['members'] and before['voters']
+
+    world.api('delete', f'/api/courses/{world.course_id}')
+    assert all(count == 0 for count in count_course_rows(world, world.course_id).values())
+    with world.app.app_context():
+        assert db.session.get(Course, world.course_id) is None
+
+
+def test_delete_group_removes_its_rows_only(world):
+    other_group = world.group_ids[1]
+    other_before = count_group_rows(world, other_group)
+    assert count_group_rows(world, world.group_id)['votes'] > 0
+
+    world.api('delete', f'/api/groups/{world.group_id}')
+    assert all(count == 0 for count in count_group_rows(world, world.group_id).values())
+    assert count_group_rows(world, other_group) == other_before
+
+
+def test_delete_voter_removes_votes_and_updates_stats(world):
+    voter_id = world.voter['id']
+    with world.app.app_context():
+        voted_groups = [group_id for (group_id,) in db.session.query(Vote.group_id).filter_by(voter_id=voter_id)]
+    assert voted_groups
+    group_id = voted_groups[0]
+    before = world.api('get', f'/api/groups/{group_id}/stats')
+
+    world.api('delete', f'/api/voters/{voter_id}')
+    with world.app.app_context():
+        assert Vote.query.filter_by(voter_id=voter_id).count() == 0
+    after = world.api('get', f'/api/groups/{group_id}/stats')
+    assert after['likes'] + after['dislikes'] < before['likes'] + before['dislikes']
+
+
+def test_database_foreign_keys_cascade(world):
+    """不经过应用代码直接删除课程行，外键的 ON DELETE CASCADE 同样清理全部数据"""
+    with world.app.app_context():
+        db.session.execute(text('DELETE FROM courses WHERE id = :id'), {'id': world.course_id})
+        db.session.commit()
+    assert all(count == 0 for count in count_course_rows(world, world.course_id).values())
@@ -0,0 +1,110 @@
+"""分片上传：按 received 续传，完成后与整体上传得到同一文件，超限与错位的分片被拒绝"""
+import os
+from io import BytesIO
+
+import pytest
+
+from src.services import uploads
+from src.services.uploads import TEMP_PREFIX
+
+PHOTO = b'\xff\xd8\xff\xe0' + bytes(range(256)) * 40
+CHUNK = 4096
+
+
+def temp_path(world, upload_id):
+    return os.path.join(world.app.config['UPLOAD_DIR'], f'{TEMP_PREFIX}{upload_id}')
+
+
+def start_upload(world, files=None, group_id=None):
+    return world.api('post', f'/api/groups/{group_id or world.group_id}/photos/uploads', json={
+        'files': files or [{'name': 'photo.jpg', 'size': len(PHOTO)}]
+    })
+
+
+def put_chunk(world, upload_id, offset, content):
+    return world.client.put(
+        f'/api/photo-uploads/{upload_id}?offset={offset}', headers=world.headers,
+        data=content, content_type='application/octet-stream',
+    )
+
+
+def upload_in_chunks(world, upload_id, content=PHOTO, start=0, forget_hash=False):
+    for offset in range(start, len(content), CHUNK):
+        if forget_hash:
+            # 模拟分片落到不同的工作进程，本进程没有连续的哈希状态
+            uploads._hashers.clear()
+        response = put_chunk(world, upload_id, offset, content[offset:offset + CHUNK])
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def whole_upload_filename(world):
+    response = world.client.post('/api/upload', headers=world.headers, data={'file': (BytesIO(PHOTO), 'whole.jpg')},
+                                 content_type='multipart/form-data')
+    return response.get_json()['file_path'].rsplit('/', 1)[-1]
+
+
+@pytest.mark.parametrize('forget_hash', [False, True])
+def test_chunks_produce_same_file_as_whole_upload(world, forget_hash):
+    upload = start_upload(world)['uploads'][0]
+    result = upload_in_chunks(world, upload['id'], forget_hash=forget_hash)
+
+    assert result['status'] == 'completed' and result['received'] == len(PHOTO)
+    assert result['filename'] == whole_upload_filename(world)
+    assert not os.path.exists(temp_path(world, upload['id']))
+    with open(os.path.join(world.app.config['UPLOAD_DIR'], result['filename']), 'rb') as stored:
+        assert stored.read() == PHOTO
+
+    photos = world.api('get', f'/api/groups/{world.group_id}/photos')
+    assert result['photo']['id'] in [photo['id'] for photo in photos]
+    # 完成后重发最后一个分片只返回已完成的状态
+    again = put_chunk(world, upload['id'], len(PHOTO) - CHUNK, PHOTO[-CHUNK:])
+    assert again.status_code == 200 and again.get_json()['photo_id'] == result['photo_id']
+
+
+def test_resume_from_received_after_mismatch(world):
+    upload = start_upload(world)['uploads'][0]
+    assert put_chunk(world, upload['id'], 0, PHOTO[:CHUNK]).status_code == 200
+
+    skipped = put_chunk(world, upload['id'], 2 * CHUNK, PHOTO[2 * CHUNK:3 * CHUNK])
+    assert skipped.status_code == 409
+    assert skipped.get_json()['received'] == CHUNK
+
+    progress = world.api('get', f"/api/photo-uploads/{upload['id']}")
+    assert progress['received'] == CHUNK
+    result = upload_in_chunks(world, upload['id'], start=progress['received'])
+    assert result['status'] == 'completed'
+
+
+def test_chunk_beyond_declared_size_is_rejected(world):
+    upload = start_upload(world, [{'name': 'photo.jpg', 'size': CHUNK}])['uploads'][0]
+    response = put_chunk(world, upload['id'], 0, PHOTO[:CHUNK + 1])
+    assert response.status_code == 413
+    assert world.api('get', f"/api/photo-uploads/{upload['id']}")['received'] == 0
+    assert os.path.getsize(temp_path(world, upload['id'])) == 0
+
+
+def test_session_limits(make_world):
+    world = make_world(PHOTO_MAX_BYTES=len(PHOTO), PHOTO_BATCH_FILES=2, PHOTO_MAX_CHUNK_BYTES=CHUNK)
+    url = f'/api/groups/{world.group_id}/photos/uploads'
+
+    too_large = world.client.post(url, headers=world.headers, json={'files': [{'name': 'a.jpg', 'size': len(PHOTO) + 1}]})
+    assert too_large.status_code == 413
+    too_many = world.client.post(url, headers=world.headers, json={'files': [{'name': 'a.jpg', 'size': 1}] * 3})
+    assert too_many.status_code == 400
+    wrong_type = world.client.post(url, headers=world.headers, json={'files': [{'name': 'a.exe', 'size': 1}]})
+    assert wrong_type.status_code == 400
+
+    upload = start_upload(world)
+    assert upload['chunk_size'] == CHUNK
+    assert put_chunk(world, upload['uploads'][0]['id'], 0, PHOTO[:CHUNK + 1]).status_code == 413
+
+
+def test_cancel_removes_session_and_temp_file(world):
+    upload = start_upload(world)['uploads'][0]
+    put_chunk(world, upload['id'], 0, PHOTO[:CHUNK])
+    world.api('delete', f"/api/photo-uploads/{upload['id']}")
+
+    assert not os.path.exists(temp_path(world, upload['id']))
+    assert world.client.get(f"/api/photo-uploads/{upload['id']}", headers=world.headers).status_code == 404
+    assert put_chunk(world, upload['id'], CHUNK, PHOTO[CHUNK:2 * CHUNK]).status_code == 404
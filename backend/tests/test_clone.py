@@ -0,0 +1,36 @@
+"""课程复制：新课程得到相同的职务、小组、成员与评价人，不复制投票"""
+import pytest
+
+from conftest import course_snapshot
+
+
+@pytest.mark.parametrize('shards', [False, True], ids=['same-database', 'course-shards'])
+def test_clone_copies_course_structure(make_world, shards):
+    world = make_world(COURSE_SHARDS=shards)
+    source = course_snapshot(world.app, world.course_id, votes=False)
+
+    clone = world.api('post', f'/api/courses/{world.course_id}/clone', json={'name': '第二期'})
+    assert clone['name'] == '第二期'
+    assert clone['counts']['groups'] == len(source['groups'])
+
+    copied = course_snapshot(world.app, clone['id'])
+    assert copied.pop('votes') == []
+    assert copied == source
+    # 新课程没有投票，统计从零开始
+    ranking = world.api('get', f"/api/ranking?course_id={clone['id']}")
+    assert {group['vote_count'] for group in ranking} == {0}
+
+
+def test_clone_options_skip_members_and_voters(world):
+    clone = world.api('post', f'/api/courses/{world.course_id}/clone', json={
+        'name': '只复制小组', 'members': False, 'voters': False, 'media': False
+    })
+    copied = course_snapshot(world.app, clone['id'], votes=False)
+    assert copied['members'] == [] and copied['voters'] == []
+    assert all(logo is None and photos == () for _, logo, photos in copied['groups'])
+
+
+def test_clone_rejects_duplicate_name(world):
+    name = world.api('get', '/api/courses')[0]['name']
+    response = world.client.post(f'/api/courses/{world.course_id}/clone', headers=world.headers, json={'name': name})
+    assert response.status_code == 400
@@ -0,0 +1,31 @@
+"""压测数据生成：HTTP接口只登记后台任务，生成的课程规模与参数一致"""
+from src.models.evaluation import Group, Vote, Voter
+from src.services.shards import use_course
+
+
+def test_generate_data_runs_as_background_job(world):
+    response = world.client.post('/api/generate-data', headers=world.headers, json={
+        'name': '生成课程', 'groups': 3, 'members': 6, 'voters': 5, 'votes': 12, 'seed': 7
+    })
+    assert response.status_code == 202
+    job = world.wait_job(response.get_json()['job']['id'])
+    assert job['status'] == 'succeeded', job
+
+    course_id = job['result']['course']['id']
+    assert job['result']['course']['name'] == '生成课程'
+    with world.app.app_context():
+        use_course(course_id)
+        assert Group.query.filter_by(course_id=course_id).count() == 3
+        assert Voter.query.filter_by(course_id=course_id).count() == 5
+        assert Vote.query.filter_by(course_id=course_id).count() == 12
+
+    # 新课程出现在课程列表中（任务结束时使缓存失效）
+    names = [course['name'] for course in world.api('get', '/api/courses')]
+    assert '生成课程' in names
+
+
+def test_generate_data_rejects_invalid_counts_before_queueing(world):
+    for payload in ({'groups': 'x'}, {'groups': 2, 'voters': 2, 'votes': 5}, {'votes': -1}):
+        response = world.client.post('/api/generate-data', headers=world.headers, json=payload)
+        assert response.status_code == 400, payload
+    assert [job for job in world.api('get', '/api/jobs') if job['kind'] == 'generate_data'] == []
@@ -0,0 +1,274 @@
+"""每个 API 接口的SQL语句数与耗时回归测试
+
+预置小、大两种规模的课程，对蓝图中的每个路由各请求一次：语句数不得超过预算，且两种规模下必须相同
+（列表接口逐行懒加载关联数据时，语句数会随数据量增长）；耗时超过预算同样视为回归。
+"""
+from io import BytesIO
+
+import openpyxl
+import pytest
+
+from conftest import ADMIN_PASSWORD, LATENCY_SCALE
+from src.models.evaluation import db, Job
+
+# 未单独指定时的耗时预算（毫秒，大规模课程）
+DEFAULT_LATENCY_MS = 250
+
+
+class Case:
+    """一个接口的测试请求：path 中的 {名称} 由预置数据和 setup 返回的参数填充"""
+
+    def __init__(self, endpoint, method, path, budget, latency_ms=DEFAULT_LATENCY_MS, status=200, setup=None,
+                 json=None, data=None, body=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.budget = budget
+        self.latency_ms = latency_ms
+        self.status = status
+        self.setup = setup
+        self.json = json
+        self.data = data
+        self.body = body
+
+    def request(self, world):
+        params = {
+            'course': world.course_id, 'group': world.group_id, 'role': world.role_id,
+            'voter': world.voter['id'], 'vote': world.vote_id, 'member': world.member_id,
+        }
+        if self.setup:
+            params.update(self.setup(world))
+
+        kwargs = {}
+        for key, value in (('json', self.json), ('data', self.data)):
+            if value is not None:
+                kwargs[key] = value(world, params) if callable(value) else value
+        if self.body is not None:
+            kwargs['data'] = self.body
+            kwargs['content_type'] = 'application/octet-stream'
+        return self.path.format(**params), kwargs
+
+
+def excel_file(rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['姓名', '手机号', '权重'])
+    for row in rows:
+        sheet.append(row)
+    output = BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def archived_course(world):
+    course_id = world.new_course()
+    filename = world.api('post', f'/api/courses/{course_id}/archive')['filename']
+    return {'target': course_id, 'filename': filename}
+
+
+def photo_upload(world, size=4):
+    uploads = world.api('post', f'/api/groups/{world.group_id}/photos/uploads', json={
+        'files': [{'name': f"{world.unique('分片')}.jpg", 'size': size}]
+    })['uploads']
+    return {'upload': uploads[0]['id']}
+
+
+def group_photo(world):
+    group_id = world.new_group()
+    photo = world.api('post', f'/api/groups/{group_id}/photos', data={
+        'photos': (BytesIO(world.unique('photo').encode()), 'a.jpg')
+    }, content_type='multipart/form-data')['photos'][0]
+    photos = world.api('get', f'/api/groups/{group_id}/photos')
+    return {'target': group_id, 'photo': next(item['id'] for item in photos if item['filename'] == photo['filename'])}
+
+
+def cast_vote(world):
+    voter = world.new_voter()
+    world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(voter), 'group_id': world.group_id, 'vote_type': 1
+    })
+    vote = world.api('get', f'/api/votes?course_id={world.course_id}&group_id={world.group_id}')
+    return {'target': next(item['id'] for item in vote if item['voter_id'] == voter['id'])}
+
+
+def finished_job(world):
+    with world.app.app_context():
+        job = Job(id=world.unique('job'), kind='test', title='测试任务', status='succeeded', progress=100)
+        db.session.add(job)
+        db.session.commit()
+        return {'job': job.id}
+
+
+CASES = [
+    # 管理员登录
+    Case('evaluation.admin_login', 'post', '/api/admin/login', 0,
+         json={'username': 'super', 'password': ADMIN_PASSWORD}),
+    Case('evaluation.admin_logout', 'post', '/api/admin/logout', 0),
+
+    # 课程
+    Case('evaluation.list_courses', 'get', '/api/courses', 3),
+    Case('evaluation.get_active_course_info', 'get', '/api/courses/active', 2),
+    Case('evaluation.create_course', 'post', '/api/courses', 4, status=201,
+         json=lambda world, params: {'name': world.unique('新课程')}),
+    Case('evaluation.update_course', 'put', '/api/courses/{course}', 4, json={'description': '课程说明'}),
+    Case('evaluation.activate_course', 'post', '/api/courses/{course}/activate', 4),
+    # 数据未变化时直接发送已编码的排名事件，不再计算
+    Case('evaluation.stream_course', 'get', '/api/courses/{course}/stream', 2),
+    # 二维码已缓存，耗时主要在排版与编码（大规模课程5页）
+    Case('evaluation.get_course_qrcode_sheet', 'get', '/api/courses/{course}/qrcodes', 2, latency_ms=500),
+    Case('evaluation.clone_course_data', 'post', '/api/courses/{course}/clone', 12, latency_ms=400, status=201,
+         json=lambda world, params: {'name': world.unique('复制课程')}),
+    Case('evaluation.archive_course_data', 'post', '/api/courses/{target}/archive', 23, latency_ms=400,
+         setup=lambda world: {'target': world.new_course()}),
+    Case('evaluation.delete_course', 'delete', '/api/courses/{target}', 17, status=204,
+         setup=lambda world: {'target': world.new_course()}),
+    Case('evaluation.get_archives', 'get', '/api/archives', 0),
+    Case('evaluation.download_archive', 'get', '/api/archives/{filename}', 0, setup=archived_course),
+    Case('evaluation.restore_course_archive', 'post', '/api/archives/restore', 14, latency_ms=400,
+         setup=archived_course, json=lambda world, params: {'filename': params['filename']}),
+    Case('evaluation.generate_data', 'post', '/api/generate-data', 4, status=202,
+         json={'groups': 5, 'members': 20, 'voters': 20, 'votes': 50, 'seed': 1}),
+    Case('evaluation.init_data', 'post', '/api/init-data', 21, setup=lambda world: {'target': world.new_course(groups=0)},
+         json=lambda world, params: {'course_id': params['target']}),
+
+    # 小组
+    Case('evaluation.get_groups', 'get', '/api/groups?course_id={course}', 6),
+    Case('evaluation.create_group', 'post', '/api/groups', 7, status=201,
+         json=lambda world, params: {'name': world.unique('新小组'), 'course_id': params['course']}),
+    Case('evaluation.update_group', 'put', '/api/groups/{target}', 7,
+         setup=lambda world: {'target': world.new_group()}, json={'name': '改名小组'}),
+    Case('evaluation.delete_group', 'delete', '/api/groups/{target}', 11, status=204,
+         setup=lambda world: {'target': world.new_group()}),
+    Case('evaluation.lock_group', 'post', '/api/groups/{group}/lock', 6, json={'lock': False}),
+    Case('evaluation.get_group_mobile_info', 'get', '/api/groups/{group}/mobile', 1),
+    Case('evaluation.get_group_qrcode', 'get', '/api/groups/{group}/qrcode', 1),
+    Case('evaluation.get_group_stats', 'get', '/api/groups/{group}/stats', 3),
+
+    # 成员与职务
+    Case('evaluation.get_group_members', 'get', '/api/groups/{group}/members', 2),
+    Case('evaluation.add_group_member', 'post', '/api/groups/{group}/members', 7, status=201,
+         json=lambda world, params: {'name': world.unique('成员'), 'company': '公司', 'role_id': params['role']}),
+    Case('evaluation.update_group_member', 'put', '/api/groups/{group}/members/{target}', 6,
+         setup=lambda world: {'target': world.new_member(world.group_id)}, json={'company': '新公司'}),
+    Case('evaluation.delete_group_member', 'delete', '/api/groups/{group}/members/{target}', 3, status=204,
+         setup=lambda world: {'target': world.new_member(world.group_id)}),
+    Case('evaluation.bulk_add_group_members', 'post', '/api/groups/{target}/members/bulk', 8,
+         setup=lambda world: {'target': world.new_group()},
+         json={'entries': '张三, 甲公司, 组长\n李四, 乙公司, 组员\n王五, 丙公司, 组员'}),
+    Case('evaluation.bulk_replace_group_members', 'put', '/api/groups/{target}/members/bulk', 7,
+         setup=lambda world: {'target': world.new_group()},
+         json={'entries': '张三, 甲公司, 组长\n李四, 乙公司, 组员'}),
+    Case('evaluation.search_course_members', 'get', '/api/members/search?course_id={course}&q=成员', 4),
+    Case('evaluation.get_roles', 'get', '/api/roles?course_id={course}', 3),
+    Case('evaluation.create_role', 'post', '/api/roles', 4, status=201,
+         json=lambda world, params: {'name': world.unique('职务'), 'course_id': params['course']}),
+    Case('evaluation.delete_role', 'delete', '/api/roles/{target}', 5, status=204,
+         setup=lambda world: {'target': world.api('post', '/api/roles', json={
+             'name': world.unique('职务'), 'course_id': world.course_id})['id']}),
+
+    # 照片与上传
+    Case('evaluation.get_group_photos', 'get', '/api/groups/{group}/photos', 1),
+    Case('evaluation.upload_group_photos', 'post', '/api/groups/{target}/photos', 4,
+         setup=lambda world: {'target': world.new_group()},
+         data=lambda world, params: {'photos': (BytesIO(world.unique('photo').encode()), 'a.jpg')}),
+    Case('evaluation.delete_group_photo', 'delete', '/api/groups/{target}/photos/{photo}', 5, setup=group_photo),
+    Case('evaluation.create_photo_uploads', 'post', '/api/groups/{group}/photos/uploads', 4, status=201,
+         json={'files': [{'name': 'a.jpg', 'size': 10}, {'name': 'b.png', 'size': 20}]}),
+    Case('evaluation.get_photo_upload', 'get', '/api/photo-uploads/{upload}', 1, setup=photo_upload),
+    Case('evaluation.upload_photo_chunk', 'put', '/api/photo-uploads/{upload}?offset=0', 11,
+         setup=lambda world: photo_upload(world, size=4), body=b'\xff\xd8\xff\xe0'),
+    Case('evaluation.cancel_photo_upload', 'delete', '/api/photo-uploads/{upload}', 2, setup=photo_upload),
+    Case('evaluation.upload_file', 'post', '/api/upload', 1,
+         data=lambda world, params: {'file': (BytesIO(world.unique('logo').encode()), 'logo.png')}),
+    Case('evaluation.collect_upload_garbage', 'post', '/api/uploads/gc', 5, json={'grace_seconds': 3600}),
+
+    # 评价人
+    Case('evaluation.get_voters', 'get', '/api/voters?course_id={course}', 2),
+    Case('evaluation.search_course_voters', 'get', '/api/voters/search?course_id={course}&q=1', 3),
+    Case('evaluation.create_voter', 'post', '/api/voters', 4, status=201,
+         json=lambda world, params: {'name': world.unique('评价人'), 'phone': world.unique('137'),
+                                     'course_id': params['course']}),
+    Case('evaluation.update_voter', 'put', '/api/voters/{target}', 4,
+         setup=lambda world: {'target': world.new_voter()['id']}, json={'weight': 3}),
+    Case('evaluation.delete_voter', 'delete', '/api/voters/{target}', 6, status=204,
+         setup=lambda world: {'target': world.new_voter()['id']}),
+    Case('evaluation.import_voters', 'post', '/api/voters/import', 5, latency_ms=400,
+         data=lambda world, params: {'course_id': str(params['course']), 'file': (excel_file([
+             [world.unique('导入'), world.unique('136'), 1], [world.unique('导入'), world.unique('136'), 2],
+         ]), 'voters.xlsx')}),
+    Case('evaluation.download_voters_template', 'get', '/api/voters/template', 0),
+
+    # 投票
+    Case('evaluation.verify_voter', 'post', '/api/verify-voter', 3,
+         setup=lambda world: {'target': world.new_voter()},
+         json=lambda world, params: {'name': params['target']['name'], 'phone': params['target']['phone'],
+                                     'group_id': params['group']}),
+    Case('evaluation.submit_vote', 'post', '/api/vote', 8,
+         setup=lambda world: {'target': world.voter_token(world.new_voter())},
+         json=lambda world, params: {'voter_token': params['target'], 'group_id': params['group'], 'vote_type': 1}),
+    Case('evaluation.submit_votes_batch', 'post', '/api/vote/batch', 10,
+         setup=lambda world: {'target': world.voter_token(world.new_voter())},
+         json=lambda world, params: {'voter_token': params['target'], 'votes': [
+             {'group_id': group_id, 'vote_type': 1} for group_id in world.group_ids[:3]
+         ]}),
+    # 大规模课程返回一万多条投票，耗时主要在序列化
+    Case('evaluation.get_votes', 'get', '/api/votes?course_id={course}', 2, latency_ms=1000),
+    Case('evaluation.update_vote', 'put', '/api/votes/{vote}', 9, json={'vote_weight': 2}),
+    Case('evaluation.delete_vote', 'delete', '/api/votes/{target}', 5, status=204, setup=cast_vote),
+    Case('evaluation.batch_update_votes', 'post', '/api/votes/batch-update', 6,
+         json=lambda world, params: {'updates': [{'id': params['vote'], 'vote_type': -1}]}),
+    Case('evaluation.get_vote_events', 'get', '/api/vote-events?course_id={course}', 2),
+    Case('evaluation.snapshot_vote_events', 'post', '/api/vote-events/snapshot', 5,
+         json=lambda world, params: {'course_id': params['course']}),
+
+    # 排名与趋势
+    Case('evaluation.get_ranking', 'get', '/api/ranking?course_id={course}', 4),
+    Case('evaluation.get_score_timeline', 'get', '/api/timeline?course_id={course}', 4),
+    Case('evaluation.rebuild_score_timeline', 'post', '/api/timeline/rebuild', 5, latency_ms=400,
+         json=lambda world, params: {'course_id': params['course']}),
+
+    # 运维
+    Case('evaluation.list_jobs', 'get', '/api/jobs', 1),
+    Case('evaluation.get_job', 'get', '/api/jobs/{job}', 1, setup=finished_job),
+    Case('evaluation.get_socket_rooms', 'get', '/api/socket/rooms', 0),
+    Case('evaluation.get_course_shards', 'get', '/api/storage/shards', 0),
+]
+
+
+def test_every_route_has_a_budget(worlds):
+    app = worlds['small'].app
+    routes = {
+        (rule.endpoint, method.lower())
+        for rule in app.url_map.iter_rules() if rule.endpoint.startswith('evaluation.')
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+    }
+    covered = {(case.endpoint, case.method) for case in CASES}
+    assert routes - covered == set(), '新增的接口需要在 CASES 中登记语句数预算'
+    assert covered - routes == set()
+
+
+@pytest.mark.parametrize('case', CASES, ids=lambda case: f'{case.method.upper()} {case.endpoint[11:]}')
+def test_endpoint_budget(case, worlds, timings):
+    counts = {}
+    for size, world in worlds.items():
+        path, kwargs = case.request(world)
+        adapter = world.app.url_map.bind('localhost')
+        assert adapter.match(path.split('?')[0], method=case.method.upper())[0] == case.endpoint
+
+        response, counter, elapsed = world.measure(case.method, path, **kwargs)
+        assert response.status_code == case.status, response.get_data(as_text=True)[:500]
+
+        if response.status_code == 202:
+            # 后台任务不计入请求的语句数，等待其结束，避免与之后的用例争用数据库
+            job = world.wait_job(response.get_json()['job']['id'])
+            assert job['status'] == 'succeeded', job
+
+        counts[size] = counter.count
+        timings.append((case.endpoint, size, counter.count, elapsed))
+        assert counter.count <= case.budget, (
+            f'{size}: {counter.count} 条SQL，超过预算 {case.budget}\n' + '\n'.join(counter.statements)
+        )
+        assert elapsed <= case.latency_ms * LATENCY_SCALE, f'{size}: 耗时 {elapsed:.0f}ms，超过 {case.latency_ms}ms'
+
+    assert counts['large'] == counts['small'], f'语句数随数据量增长：{counts}'
@@ -0,0 +1,59 @@
+"""课程数据版本ETag：数据未变化时返回304，写操作后失效，未写入数据的请求不使缓存失效"""
+from src.services import http_cache
+
+
+def etag_of(world, path):
+    response = world.client.get(path)
+    assert response.status_code == 200
+    return response.headers['ETag']
+
+
+def test_unchanged_data_returns_304(world):
+    path = f'/api/ranking?course_id={world.course_id}'
+    etag = etag_of(world, path)
+    response = world.client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_writes_invalidate_etag(world):
+    path = f'/api/groups?course_id={world.course_id}'
+    etag = etag_of(world, path)
+    world.api('put', f'/api/groups/{world.group_id}', json={'name': '改名小组'})
+
+    response = world.client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert '改名小组' in [group['name'] for group in response.get_json()]
+
+
+def test_only_new_votes_invalidate_etag(world):
+    path = f'/api/ranking?course_id={world.course_id}'
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+    payload = {'voter_token': token, 'group_id': world.group_id, 'vote_type': 1}
+
+    before = etag_of(world, path)
+    assert world.client.post('/api/vote', json=payload, headers={'Idempotency-Key': 'k1'}).status_code == 200
+    after_vote = etag_of(world, path)
+    assert after_vote != before
+
+    # 幂等重试与重复投票都没有写入数据
+    assert world.client.post('/api/vote', json=payload, headers={'Idempotency-Key': 'k1'}).status_code == 200
+    assert world.client.post('/api/vote', json=payload).status_code == 400
+    batch = {'voter_token': token, 'votes': [{'group_id': world.group_id, 'vote_type': 1}], 'idempotency_key': 'k1'}
+    assert world.client.post('/api/vote/batch', json=batch).status_code == 200
+    assert etag_of(world, path) == after_vote
+
+
+def test_bump_caches_the_stored_generation(world):
+    with world.app.app_context():
+        world.app.config['GENERATION_CACHE_TTL'] = 60
+        try:
+            before = http_cache.course_generation(world.course_id)[1]
+            # 模拟另一个工作进程先递增了一次
+            http_cache._increment([http_cache.course_key(world.course_id)])
+            http_cache.bump_generation(world.course_id)
+            assert http_cache.course_generation(world.course_id)[1] == before + 2
+        finally:
+            world.app.config['GENERATION_CACHE_TTL'] = 0
@@ -0,0 +1,52 @@
+"""后台任务：耗时的管理操作可改为后台执行，立即返回任务ID，结束后可查询结果"""
+import os
+from io import BytesIO
+
+from src.models.evaluation import GroupPhoto
+from src.services.uploads import TEMP_PREFIX
+
+
+def test_async_delete_course(world):
+    course_id = world.new_course()
+    response = world.client.delete(f'/api/courses/{course_id}', headers=world.headers, json={'async': True})
+    assert response.status_code == 202
+
+    job = world.wait_job(response.get_json()['job']['id'])
+    assert job['status'] == 'succeeded', job
+    assert job['progress'] == 100
+    assert job['result']['course_id'] == course_id
+    assert course_id not in [course['id'] for course in world.api('get', '/api/courses')]
+
+
+def test_async_photo_upload_stores_spooled_files(world):
+    response = world.client.post(
+        f'/api/groups/{world.group_id}/photos?async=1', headers=world.headers,
+        data={'photos': [(BytesIO(b'first-photo'), 'a.jpg'), (BytesIO(b'second-photo'), 'b.jpg')]},
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 202
+
+    job = world.wait_job(response.get_json()['job']['id'])
+    assert job['status'] == 'succeeded', job
+    with world.app.app_context():
+        names = {photo.original_name for photo in GroupPhoto.query.filter_by(group_id=world.group_id)}
+    assert {'a.jpg', 'b.jpg'} <= names
+    # 转存的临时文件在任务结束后删除
+    assert not [name for name in os.listdir(world.app.config['UPLOAD_DIR']) if name.startswith(TEMP_PREFIX)]
+
+
+def test_failed_job_reports_error(world):
+    response = world.client.post(
+        '/api/voters/import?async=1', headers=world.headers,
+        data={'file': (BytesIO(b'not an excel file'), 'voters.xlsx'), 'course_id': str(world.course_id)},
+        content_type='multipart/form-data',
+    )
+    assert response.status_code == 202
+
+    job = world.wait_job(response.get_json()['job']['id'])
+    assert job['status'] == 'failed'
+    assert job['error']
+
+
+def test_unknown_job_returns_404(world):
+    assert world.client.get('/api/jobs/missing', headers=world.headers).status_code == 404
@@ -0,0 +1,92 @@
+"""投票流水：从快照回放流水得到的统计与投票记录一致"""
+from src.models.evaluation import db, Vote
+from src.services.ledger import EVENT_CREATE, EVENT_DELETE, EVENT_UPDATE, TallyStore, _vote_tallies, get_tally_store
+from src.services.shards import course_scope
+
+
+def tallies_of(world, store=None):
+    """返回 (按流水回放的统计, 按投票记录直接统计的结果)"""
+    with world.app.app_context(), course_scope(world.course_id):
+        replayed = (store or get_tally_store()).tallies(world.course_id)
+        return replayed, _vote_tallies(world.course_id)
+
+
+def events_of(world, **params):
+    query = '&'.join(f'{key}={value}' for key, value in {'course_id': world.course_id, **params}.items())
+    return world.api('get', f'/api/vote-events?{query}')
+
+
+def change_votes(world):
+    """新增、修改、删除各一次投票，返回被修改与被删除的投票"""
+    voter = world.new_voter()
+    world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(voter), 'group_id': world.group_id, 'vote_type': 1
+    })
+    votes = world.api('get', f'/api/votes?course_id={world.course_id}&group_id={world.group_ids[1]}')
+    world.api('put', f"/api/votes/{votes[0]['id']}", json={'vote_type': -votes[0]['vote_type'], 'vote_weight': 3})
+    world.api('delete', f"/api/votes/{votes[1]['id']}")
+    return votes[0], votes[1]
+
+
+def test_replayed_tallies_match_votes(world):
+    tallies_of(world)
+    change_votes(world)
+    replayed, expected = tallies_of(world)
+    assert replayed == expected
+
+    # 新的进程从快照加载并回放全部流水，结果相同
+    fresh, _ = tallies_of(world, TallyStore())
+    assert fresh == expected
+
+
+def test_replay_starts_after_snapshot(world):
+    change_votes(world)
+    position = world.api('post', '/api/vote-events/snapshot', json={'course_id': world.course_id})['last_event_id']
+    assert position == events_of(world, limit=1)['events'][0]['id']
+
+    change_votes(world)
+    with world.app.app_context(), course_scope(world.course_id):
+        store = TallyStore()
+        state = store._load(world.course_id)
+        assert state['event_id'] == position
+        assert store._replay(world.course_id, state)['event_id'] > position
+    replayed, expected = tallies_of(world, TallyStore())
+    assert replayed == expected
+
+
+def test_events_record_each_change(world):
+    changed, deleted = change_votes(world)
+    events = events_of(world, limit=3)['events']
+    assert [event['action'] for event in events] == [EVENT_DELETE, EVENT_UPDATE, EVENT_CREATE]
+
+    delete, update, _ = events
+    assert delete['vote_id'] == deleted['id'] and delete['count_delta'] == -1
+    assert update['vote_id'] == changed['id'] and update['count_delta'] == 0
+    old_likes = changed['vote_weight'] if changed['vote_type'] == 1 else 0
+    new_likes = 3 if -changed['vote_type'] == 1 else 0
+    assert update['likes_delta'] == new_likes - old_likes
+
+    assert [event['id'] for event in events_of(world, vote_id=changed['id'])['events']] == [update['id']]
+
+
+def test_events_page_with_before(world):
+    change_votes(world)
+    first = events_of(world, limit=2)
+    assert len(first['events']) == 2 and first['next_before'] == first['events'][-1]['id']
+    second = events_of(world, limit=2, before=first['next_before'])
+    assert all(event['id'] < first['next_before'] for event in second['events'])
+
+
+def test_rebase_reloads_other_workers(world):
+    # 另一个工作进程持有的统计在读到 rebase 流水后重新加载快照
+    other = TallyStore()
+    tallies_of(world, other)
+    with world.app.app_context(), course_scope(world.course_id):
+        # 绕过流水直接删除投票，模拟批量改动
+        Vote.query.filter_by(group_id=world.group_id).delete()
+        db.session.commit()
+    world.api('post', '/api/vote-events/snapshot', json={'course_id': world.course_id, 'rebase': True})
+
+    replayed, expected = tallies_of(world, other)
+    assert world.group_id not in expected
+    assert replayed == expected
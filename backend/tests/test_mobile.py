@@ -0,0 +1,42 @@
+"""手机端启动数据：一次查询返回评价页所需的小组信息，可短时缓存，页面不依赖外部CDN"""
+import os
+import re
+
+from conftest import BACKEND_DIR, QueryCounter
+from src.routes.evaluation import MOBILE_INFO_MAX_AGE
+
+STATIC_DIR = os.path.join(BACKEND_DIR, 'src', 'static')
+
+
+def test_mobile_info_in_one_query(world):
+    with QueryCounter() as counter:
+        response = world.client.get(f'/api/groups/{world.group_id}/mobile')
+    assert response.status_code == 200
+    assert counter.count == 1
+
+    course = next(course for course in world.api('get', '/api/courses') if course['id'] == world.course_id)
+    group = next(group for group in world.api('get', f'/api/groups?course_id={world.course_id}')
+                 if group['id'] == world.group_id)
+    assert response.get_json() == {
+        'id': group['id'], 'name': group['name'], 'status': group['status'],
+        'course_id': world.course_id, 'course_name': course['name'],
+    }
+    assert response.headers['Cache-Control'] == f'public, max-age={MOBILE_INFO_MAX_AGE}'
+
+
+def test_mobile_info_follows_group_status(world):
+    world.api('put', f'/api/groups/{world.group_id}', json={'status': 1})
+    assert world.api('get', f'/api/groups/{world.group_id}/mobile')['status'] == 1
+
+
+def test_unknown_group_is_not_found(world):
+    assert world.client.get('/api/groups/999999/mobile').status_code == 404
+
+
+def test_pages_load_socket_client_locally():
+    assert os.path.exists(os.path.join(STATIC_DIR, 'vendor', 'socket.io.min.js'))
+    for page in ('index.html', 'mobile.html'):
+        with open(os.path.join(STATIC_DIR, page), encoding='utf-8') as source:
+            scripts = re.findall(r'<script[^>]+src="([^"]+)"', source.read())
+        assert 'vendor/socket.io.min.js' in scripts
+        assert not [src for src in scripts if src.startswith(('http:', 'https:', '//'))], (page, scripts)
@@ -0,0 +1,66 @@
+"""课程二维码打印页：每页固定数量的小组，PDF含全部页面，PNG逐页输出，二维码按链接缓存"""
+import math
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from src.services.qrcodes import PAGE_SIZE, SHEET_COLUMNS, SHEET_ROWS, get_qrcode_cache, qrcode_pngs, render_qrcode
+
+PER_PAGE = SHEET_COLUMNS * SHEET_ROWS
+
+
+def sheet(world, course_id, **params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return world.client.get(f'/api/courses/{course_id}/qrcodes?{query}', headers=world.headers)
+
+
+@pytest.fixture
+def big_course(world):
+    return world.new_course(groups=PER_PAGE + 1)
+
+
+def test_pdf_contains_every_page(world, big_course):
+    response = sheet(world, big_course)
+    assert response.status_code == 200 and response.mimetype == 'application/pdf'
+    assert response.headers['X-Total-Pages'] == str(math.ceil((PER_PAGE + 1) / PER_PAGE))
+    assert response.data.startswith(b'%PDF')
+    assert b'/Count 2' in response.data
+
+
+def test_png_pages(world, big_course):
+    for page in (1, 2):
+        response = sheet(world, big_course, format='png', page=page)
+        assert response.status_code == 200 and response.mimetype == 'image/png'
+        image = Image.open(BytesIO(response.data))
+        assert image.size == PAGE_SIZE and image.mode == '1'
+
+    assert sheet(world, big_course, format='png', page=3).status_code == 400
+
+
+@pytest.mark.parametrize('params', [{'format': 'svg'}, {'page': 'x'}])
+def test_invalid_parameters_are_rejected(world, params):
+    assert sheet(world, world.course_id, **params).status_code == 400
+
+
+def test_unknown_course_is_not_found(world):
+    assert sheet(world, 999999).status_code == 404
+
+
+def test_sheet_fills_the_qrcode_cache(world, big_course):
+    sheet(world, big_course)
+    groups = world.api('get', f'/api/groups?course_id={big_course}')
+    with world.app.app_context():
+        cache = get_qrcode_cache()
+        for group in groups:
+            assert cache.get(f"http://localhost/m?g={group['id']}") is not None
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_pool_and_thread_render_the_same_images(make_world, workers):
+    world = make_world(QR_WORKERS=workers)
+    urls = [f'http://example.com/mobile?group_id={group_id}' for group_id in range(5)]
+    with world.app.app_context():
+        assert qrcode_pngs(urls) == [render_qrcode(url) for url in urls]
+        # 第二次全部命中缓存
+        assert qrcode_pngs(urls[:2]) == [get_qrcode_cache().get(url) for url in urls[:2]]
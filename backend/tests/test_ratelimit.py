@@ -0,0 +1,87 @@
+"""公共接口的准入控制：按IP与评价人限流，超限返回429与 Retry-After"""
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from src.services.ratelimit import AdmissionController
+
+STRICT_LIMITS = {
+    'verify': {'ip_rate': 0.001, 'ip_burst': 3, 'identity_rate': 0.001, 'identity_burst': 2},
+    'vote': {'ip_rate': 0.001, 'ip_burst': 100, 'identity_rate': 0.001, 'identity_burst': 2},
+}
+
+
+@pytest.fixture
+def limited_world(make_world):
+    return make_world(RATE_LIMIT_ENABLED=True, RATE_LIMITS=STRICT_LIMITS)
+
+
+def verify(world, voter, **kwargs):
+    return world.client.post('/api/verify-voter', json={
+        'name': voter['name'], 'phone': voter['phone'], 'group_id': world.group_id
+    }, **kwargs)
+
+
+def test_identity_limit_returns_429_with_retry_after(limited_world):
+    voter = limited_world.new_voter()
+    assert [verify(limited_world, voter).status_code for _ in range(2)] == [200, 200]
+
+    response = verify(limited_world, voter)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['error'] == '请求过于频繁，请稍后再试'
+
+
+def test_forged_forwarded_for_does_not_get_a_new_bucket(limited_world):
+    voters = [limited_world.new_voter() for _ in range(4)]
+    codes = [
+        verify(limited_world, voter, headers={'X-Forwarded-For': f'10.0.0.{index}'}).status_code
+        for index, voter in enumerate(voters)
+    ]
+    assert codes == [200, 200, 200, 429]
+
+
+def test_forwarded_for_is_used_behind_trusted_proxy(limited_world):
+    app = limited_world.app
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+    voters = [limited_world.new_voter() for _ in range(4)]
+    codes = [
+        verify(limited_world, voter, headers={'X-Forwarded-For': f'10.0.0.{index}'}).status_code
+        for index, voter in enumerate(voters)
+    ]
+    assert codes == [200, 200, 200, 200]
+
+
+def test_new_tokens_do_not_reset_the_voter_limit(make_world):
+    world = make_world(RATE_LIMIT_ENABLED=True, RATE_LIMITS={'vote': STRICT_LIMITS['vote']})
+    voter = world.new_voter()
+    codes = []
+    for _ in range(3):
+        token = verify(world, voter).get_json()['voter_token']
+        # 小组不存在的投票不写入数据，只用来消耗令牌
+        codes.append(world.client.post('/api/vote', json={
+            'voter_token': token, 'group_id': 999999, 'vote_type': 1
+        }).status_code)
+    assert codes == [404, 404, 429]
+
+
+def test_concurrency_and_write_queue_limits():
+    controller = AdmissionController(
+        {'vote': {'concurrency': 1, 'write': True}, 'verify': {'concurrency': 5, 'write': True}},
+        write_queue_limit=2, queue_timeout=0,
+    )
+    first = controller.acquire('vote')
+    assert first is not None
+    # 同类接口的并发上限
+    assert controller.acquire('vote') is None
+    # 公共写队列的总上限
+    second = controller.acquire('verify')
+    assert second is not None
+    assert controller.acquire('verify') is None
+
+    controller.release(first)
+    assert controller.acquire('vote') is not None
+
+
+def test_disabled_limits_admit_everything(world):
+    voter = world.new_voter()
+    assert all(verify(world, voter).status_code == 200 for _ in range(10))
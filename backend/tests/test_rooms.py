@@ -0,0 +1,125 @@
+"""Socket房间：同一客户端每种类型只在一个房间中，切换小组后不再收到旧小组的广播"""
+import pytest
+from flask_socketio import SocketIO
+
+from conftest import World, create_test_app
+from src.services.rooms import (
+    COURSE_ROOM, GROUP_ROOM, RoomRegistry, get_room_registry, join_exclusive, leave_kind, release_client,
+)
+
+
+@pytest.fixture
+def socket_world(tmp_path):
+    """与 main.py 相同方式登记房间事件的应用"""
+    app = create_test_app(str(tmp_path))
+    socketio = SocketIO(app)
+
+    @socketio.on('join_group')
+    def handle_join_group(data):
+        join_exclusive(GROUP_ROOM, data['group_id'])
+
+    @socketio.on('join_course')
+    def handle_join_course(data):
+        join_exclusive(COURSE_ROOM, data['course_id'])
+
+    @socketio.on('leave_group')
+    def handle_leave_group(data=None):
+        leave_kind(GROUP_ROOM)
+
+    @socketio.on('disconnect')
+    def handle_disconnect():
+        release_client()
+
+    world = World(app, 'small')
+    world.socketio = socketio
+    return world
+
+
+def connect(world):
+    client = world.socketio.test_client(world.app, flask_test_client=world.client)
+    client.get_received()
+    return client
+
+
+def vote(world, group_id):
+    world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(world.new_voter(), group_id), 'group_id': group_id, 'vote_type': 1
+    })
+
+
+def received(client, name):
+    return [message['args'][0] for message in client.get_received() if message['name'] == name]
+
+
+def test_registry_keeps_one_room_per_kind():
+    registry = RoomRegistry()
+    assert registry.join('a', GROUP_ROOM, 'group_1') is None
+    assert registry.join('a', GROUP_ROOM, 'group_1') is None
+    assert registry.join('a', GROUP_ROOM, 'group_2') == 'group_1'
+    registry.join('a', COURSE_ROOM, 'course_1')
+    registry.join('b', GROUP_ROOM, 'group_2')
+
+    snapshot = registry.snapshot()
+    assert snapshot['clients'] == 2
+    assert {item['room']: item['clients'] for item in snapshot['rooms']} == {'group_2': 2, 'course_1': 1}
+
+    assert registry.leave('a', GROUP_ROOM) == 'group_2'
+    assert sorted(registry.discard('a')) == ['course_1']
+    assert registry.discard('a') == []
+    assert {item['room']: item['clients'] for item in registry.snapshot()['rooms']} == {'group_2': 1}
+
+
+def test_switching_groups_stops_old_broadcasts(socket_world):
+    world = socket_world
+    first, second = world.group_ids[:2]
+    client = connect(world)
+    client.emit('join_group', {'group_id': first})
+    client.emit('join_group', {'group_id': second})
+
+    vote(world, first)
+    assert received(client, 'vote_updated') == []
+
+    vote(world, second)
+    updates = received(client, 'vote_updated')
+    assert [update['group_id'] for update in updates] == [second]
+
+    client.emit('leave_group')
+    vote(world, second)
+    assert received(client, 'vote_updated') == []
+
+
+def test_course_room_gets_one_ranking_change_per_batch(socket_world):
+    world = socket_world
+    client = connect(world)
+    client.emit('join_course', {'course_id': world.course_id})
+
+    voter = world.new_voter()
+    world.api('post', '/api/vote/batch', json={
+        'voter_token': world.voter_token(voter),
+        'votes': [{'group_id': group_id, 'vote_type': 1} for group_id in world.group_ids[:2]],
+    })
+    changes = received(client, 'ranking_changed')
+    assert len(changes) == 1
+    assert sorted(changes[0]['group_ids']) == sorted(world.group_ids[:2])
+
+
+def test_disconnect_releases_rooms(socket_world):
+    world = socket_world
+    client = connect(world)
+    client.emit('join_group', {'group_id': world.group_id})
+    client.emit('join_course', {'course_id': world.course_id})
+    assert world.api('get', '/api/socket/rooms')['clients'] == 1
+
+    client.disconnect()
+    assert world.api('get', '/api/socket/rooms')['rooms'] == []
+
+
+def test_course_of_group_refreshes_deleted_groups(world):
+    group_id = world.new_group()
+    with world.app.app_context():
+        assert get_room_registry().course_of_group(group_id) == world.course_id
+    world.api('delete', f'/api/groups/{group_id}')
+    with world.app.app_context():
+        registry = get_room_registry()
+        assert registry.course_of_group(group_id) == world.course_id
+        assert registry.course_of_group(group_id, refresh=True) is None
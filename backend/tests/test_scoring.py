@@ -0,0 +1,105 @@
+"""计分策略：向量化计算的结果与逐票计算的参考实现一致"""
+import math
+from collections import defaultdict
+
+import pytest
+
+from conftest import World, create_test_app
+from src.models.evaluation import Vote
+from src.services.scoring import DEFAULT_POOL_WEIGHTS, DEFAULT_TRIM_RATIO, TEACHER_WEIGHT_THRESHOLD, get_score_cache
+
+
+def votes_by_group(world):
+    with world.app.app_context():
+        grouped = defaultdict(list)
+        for vote in Vote.query.filter_by(course_id=world.course_id):
+            grouped[vote.group_id].append((vote.vote_type, vote.vote_weight))
+        return grouped
+
+
+def reference_net(votes):
+    return sum(vote_type * weight for vote_type, weight in votes)
+
+
+def reference_normalized(votes):
+    return reference_net(votes) / len(votes) if votes else 0
+
+
+def reference_pools(votes):
+    combined = weight_sum = 0
+    for pool, is_teacher in (('teacher', True), ('student', False)):
+        types = [vote_type for vote_type, weight in votes if (weight > TEACHER_WEIGHT_THRESHOLD) == is_teacher]
+        if types:
+            combined += sum(types) / len(types) * DEFAULT_POOL_WEIGHTS[pool]
+            weight_sum += DEFAULT_POOL_WEIGHTS[pool]
+    return combined / weight_sum * 100 if weight_sum else 0
+
+
+def reference_trimmed(votes):
+    values = sorted(vote_type * weight for vote_type, weight in votes)
+    trim = math.floor(len(values) * DEFAULT_TRIM_RATIO)
+    kept = values[trim:len(values) - trim]
+    return sum(kept) / len(kept) if kept else 0
+
+
+REFERENCES = {
+    'net': reference_net,
+    'normalized': reference_normalized,
+    'pools': reference_pools,
+    'trimmed': reference_trimmed,
+}
+
+
+@pytest.mark.parametrize('strategy', sorted(REFERENCES))
+def test_strategy_matches_reference(world, strategy):
+    # 加入一位老师的投票，覆盖按权重分组的计分
+    teacher = world.api('post', '/api/voters', json={
+        'name': '测试老师', 'phone': '13900000000', 'weight': 10, 'course_id': world.course_id
+    })
+    world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(teacher), 'group_id': world.group_id, 'vote_type': -1
+    })
+    grouped = votes_by_group(world)
+    assert (-1, teacher['weight']) in grouped[world.group_id]
+    ranking = world.api('get', f'/api/ranking?course_id={world.course_id}&strategy={strategy}')
+
+    assert [item['rank'] for item in ranking] == list(range(1, len(ranking) + 1))
+    assert [item['total_score'] for item in ranking] == sorted((item['total_score'] for item in ranking), reverse=True)
+    for item in ranking:
+        votes = grouped.get(item['id'], [])
+        assert item['strategy'] == strategy
+        assert item['vote_count'] == len(votes)
+        assert item['likes'] == sum(weight for vote_type, weight in votes if vote_type == 1)
+        assert item['dislikes'] == sum(weight for vote_type, weight in votes if vote_type == -1)
+        assert item['total_score'] == pytest.approx(REFERENCES[strategy](votes), abs=1e-3)
+
+
+def test_scores_follow_new_votes(world):
+    voter = world.new_voter()
+    before = {item['id']: item for item in world.api('get', f'/api/ranking?course_id={world.course_id}')}
+    world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(voter), 'group_id': world.group_id, 'vote_type': 1
+    })
+    after = {item['id']: item for item in world.api('get', f'/api/ranking?course_id={world.course_id}')}
+    assert after[world.group_id]['total_score'] == before[world.group_id]['total_score'] + voter['weight']
+
+
+def test_unknown_strategy_is_rejected(world):
+    response = world.client.get(f'/api/ranking?course_id={world.course_id}&strategy=unknown')
+    assert response.status_code == 400
+    assert 'net' in response.get_json()['error']
+
+
+def test_apps_do_not_share_cached_scores(tmp_path):
+    # 两个应用中的课程ID与数据版本相同，缓存的结果不能串用
+    directories = [tmp_path / 'first', tmp_path / 'second']
+    for directory in directories:
+        directory.mkdir()
+    first, second = (World(create_test_app(str(directory)), 'small') for directory in directories)
+    assert first.course_id == second.course_id
+    first.api('get', f'/api/ranking?course_id={first.course_id}')
+
+    with first.app.app_context():
+        assert len(get_score_cache()) == 1
+    with second.app.app_context():
+        assert len(get_score_cache()) == 0
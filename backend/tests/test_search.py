@@ -0,0 +1,84 @@
+"""评价人与成员检索：前缀匹配的结果与逐条筛选一致，分页不重不漏，区间条件命中索引"""
+import pytest
+from sqlalchemy import text
+
+from src.models.evaluation import db, Voter
+from src.services.search import MAX_PAGE_SIZE, prefix_match
+
+
+def search(world, path, **params):
+    query = '&'.join(f'{key}={value}' for key, value in {'course_id': world.course_id, **params}.items())
+    return world.api('get', f'{path}?{query}')
+
+
+def all_pages(world, path, page_size, **params):
+    items, page = [], 1
+    while True:
+        result = search(world, path, page=page, page_size=page_size, **params)
+        items.extend(result['items'])
+        if page * page_size >= result['total']:
+            return items, result['total']
+        page += 1
+
+
+def test_voter_search_matches_prefix_filter(world):
+    voters = world.api('get', f'/api/voters?course_id={world.course_id}')
+    phone_prefix = voters[0]['phone'][:5]
+    name_prefix = voters[0]['name'][:1]
+
+    by_phone = search(world, '/api/voters/search', q=phone_prefix, page_size=MAX_PAGE_SIZE)
+    assert sorted(item['id'] for item in by_phone['items']) == sorted(
+        voter['id'] for voter in voters if voter['phone'].startswith(phone_prefix)
+    )
+    by_name = search(world, '/api/voters/search', q=name_prefix, page_size=MAX_PAGE_SIZE)
+    assert sorted(item['id'] for item in by_name['items']) == sorted(
+        voter['id'] for voter in voters if voter['name'].startswith(name_prefix)
+    )
+    assert search(world, '/api/voters/search', q='不存在的姓名')['total'] == 0
+
+
+def test_pages_cover_every_voter_once(world):
+    voters = world.api('get', f'/api/voters?course_id={world.course_id}')
+    items, total = all_pages(world, '/api/voters/search', page_size=3)
+    assert total == len(voters)
+    assert sorted(item['id'] for item in items) == sorted(voter['id'] for voter in voters)
+
+    capped = search(world, '/api/voters/search', page_size=MAX_PAGE_SIZE * 10)
+    assert capped['page_size'] == MAX_PAGE_SIZE
+
+
+def test_member_search_matches_name_company_and_role(world):
+    members = [
+        member
+        for group_id in world.group_ids
+        for member in world.api('get', f'/api/groups/{group_id}/members')
+    ]
+    sample = members[0]
+    for field in ('name', 'company', 'role_name'):
+        prefix = sample[field][:2]
+        found, _ = all_pages(world, '/api/members/search', page_size=5, q=prefix)
+        assert sorted(item['id'] for item in found) == sorted(
+            member['id'] for member in members
+            if any((member[key] or '').startswith(prefix) for key in ('name', 'company', 'role_name'))
+        )
+
+    in_group = search(world, '/api/members/search', group_id=world.group_id, page_size=MAX_PAGE_SIZE)
+    assert {item['group_id'] for item in in_group['items']} == {world.group_id}
+    with_role = search(world, '/api/members/search', role_id=sample['role_id'], page_size=MAX_PAGE_SIZE)
+    assert with_role['total'] == sum(1 for member in members if member['role_id'] == sample['role_id'])
+
+
+@pytest.mark.parametrize('params', [{'page': 'x'}, {'page_size': 'x'}])
+def test_invalid_pagination_is_rejected(world, params):
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    response = world.client.get(f'/api/voters/search?course_id={world.course_id}&{query}', headers=world.headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('column', ['phone', 'name'])
+def test_prefix_condition_uses_index(world, column):
+    with world.app.app_context():
+        query = Voter.query.filter(Voter.course_id == world.course_id, prefix_match(getattr(Voter, column), '139'))
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' '.join(row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')))
+    assert 'INDEX' in plan and 'SCAN voters' not in plan, plan
@@ -0,0 +1,83 @@
+"""课程分库：每个课程的数据保存在独立文件中，按行ID即可定位所在的课程库"""
+import os
+import sqlite3
+
+import pytest
+
+from conftest import World, create_test_app
+from src.services.shards import ID_SPAN, course_of_row, get_shards
+
+
+def shard_rows(world, course_id, table):
+    path = os.path.join(world.app.config['COURSE_SHARD_DIR'], f'course_{course_id}.db')
+    with sqlite3.connect(path) as connection:
+        return connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def main_rows(world, table):
+    path = world.app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+    with sqlite3.connect(path) as connection:
+        return connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+@pytest.fixture
+def sharded(make_world):
+    return make_world(COURSE_SHARDS=True)
+
+
+def test_course_of_row():
+    assert course_of_row(3 * ID_SPAN + 17) == 3
+    assert course_of_row(42) is None
+    assert course_of_row('not-an-id') is None
+
+
+def test_course_data_lives_in_its_own_file(sharded):
+    other_id = sharded.new_course(groups=3)
+    assert shard_rows(sharded, sharded.course_id, 'groups') == len(sharded.group_ids)
+    assert shard_rows(sharded, other_id, 'groups') == 3
+    assert main_rows(sharded, 'groups') == 0
+
+    # 各库的自增ID从 课程ID × ID_SPAN 开始，互不重复
+    groups = sharded.api('get', f'/api/groups?course_id={other_id}')
+    assert all(course_of_row(group['id']) == other_id for group in groups)
+    assert all(course_of_row(group_id) == sharded.course_id for group_id in sharded.group_ids)
+
+
+def test_requests_by_row_id_use_the_right_file(sharded):
+    other_id = sharded.new_course(groups=1)
+    other_group = sharded.api('get', f'/api/groups?course_id={other_id}')[0]['id']
+
+    # 只凭小组ID（如二维码中的链接）读写，不传课程ID
+    sharded.api('put', f'/api/groups/{other_group}', json={'name': '分库小组'})
+    assert sharded.api('get', f'/api/groups/{other_group}/stats')['likes'] == 0
+    voter = sharded.api('post', '/api/voters', json={'name': '分库评价人', 'phone': '13800000001', 'course_id': other_id})
+    token = sharded.voter_token(voter, other_group)
+    response = sharded.client.post('/api/vote', json={'voter_token': token, 'group_id': other_group, 'vote_type': 1})
+    assert response.status_code == 200
+
+    assert shard_rows(sharded, other_id, 'votes') == 1
+    assert sharded.api('get', f'/api/groups/{other_group}/stats')['likes'] == 1
+    assert [group['name'] for group in sharded.api('get', f'/api/groups?course_id={other_id}')] == ['分库小组']
+
+
+def test_deleting_a_course_removes_its_file(sharded):
+    other_id = sharded.new_course(groups=1)
+    path = os.path.join(sharded.app.config['COURSE_SHARD_DIR'], f'course_{other_id}.db')
+    assert os.path.exists(path)
+    sharded.api('delete', f'/api/courses/{other_id}')
+    assert not os.path.exists(path)
+
+
+def test_other_workers_stop_using_a_deleted_course_file(tmp_path):
+    """多进程部署：一个工作进程删除课程后，其他进程不再读写已删除的文件，也不会重新建出空文件"""
+    first = World(create_test_app(str(tmp_path), COURSE_SHARDS=True), 'small')
+    second = World(create_test_app(str(tmp_path), COURSE_SHARDS=True), 'small')
+    course_id = first.new_course(groups=2)
+    group_id = second.api('get', f'/api/groups?course_id={course_id}')[0]['id']
+
+    first.api('delete', f'/api/courses/{course_id}')
+    assert second.client.get(f'/api/groups/{group_id}/stats', headers=second.headers).status_code == 404
+    assert second.client.get(f'/api/groups?course_id={course_id}', headers=second.headers).status_code == 404
+    assert not os.path.exists(os.path.join(str(tmp_path), 'courses', f'course_{course_id}.db'))
+    with second.app.app_context():
+        assert course_id not in get_shards().snapshot()['open']
@@ -0,0 +1,77 @@
+"""Socket.IO消息队列：一个工作进程发出的广播经SQLite中转表送达其他工作进程"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.services.socket_queue import SQLiteManager, build_socketio_options
+
+
+class FakeServer:
+    """监听方只需要服务端的 sleep"""
+
+    @staticmethod
+    def sleep(seconds):
+        time.sleep(seconds)
+
+
+def start_listener(manager):
+    """在后台线程中读取中转表的新消息"""
+    manager.set_server(FakeServer())
+    received = queue.Queue()
+
+    def listen():
+        for payload in manager._listen():
+            received.put(json.loads(payload))
+
+    threading.Thread(target=listen, daemon=True).start()
+    # 等监听方记下启动时的消息位置
+    time.sleep(0.1)
+    return received
+
+
+def test_options_follow_queue_url(tmp_path):
+    assert build_socketio_options('') == {}
+    assert build_socketio_options('redis://localhost:6379/0') == {'message_queue': 'redis://localhost:6379/0'}
+    options = build_socketio_options(f"sqlite:///{tmp_path / 'queue.db'}")
+    assert isinstance(options['client_manager'], SQLiteManager)
+    with pytest.raises(ValueError):
+        SQLiteManager('redis://localhost')
+
+
+def test_messages_reach_other_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'queue.db'}"
+    publisher = SQLiteManager(url, write_only=True)
+    publisher.emit('vote_updated', {'group_id': 0}, namespace='/', room='group_0')
+
+    # 监听方只读取启动之后发布的消息
+    listener = SQLiteManager(url, poll_interval=0.01)
+    received = start_listener(listener)
+    publisher.emit('vote_updated', {'group_id': 1}, namespace='/', room='group_1')
+
+    message = received.get(timeout=5)
+    assert message['method'] == 'emit' and message['event'] == 'vote_updated'
+    assert message['data'] == {'group_id': 1} and message['room'] == 'group_1'
+    assert received.empty()
+
+
+def test_publisher_removes_expired_messages(tmp_path):
+    path = tmp_path / 'queue.db'
+    manager = SQLiteManager(f'sqlite:///{path}', write_only=True, retention=0)
+    for index in range(200):
+        manager.emit('vote_updated', {'group_id': index}, namespace='/', room='group_1')
+    count = sqlite3.connect(path).execute('SELECT COUNT(*) FROM socketio_messages').fetchone()[0]
+    assert count < 200
+
+
+def test_write_only_publisher_stores_messages(tmp_path):
+    path = tmp_path / 'queue.db'
+    manager = SQLiteManager(f'sqlite:///{path}', write_only=True)
+    manager.emit('ranking_changed', {'course_id': 1}, namespace='/', room='course_1')
+
+    rows = sqlite3.connect(path).execute('SELECT channel, payload FROM socketio_messages').fetchall()
+    assert len(rows) == 1 and rows[0][0] == 'flask-socketio'
+    assert 'ranking_changed' in rows[0][1]
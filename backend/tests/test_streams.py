@@ -0,0 +1,118 @@
+"""课程SSE推送：订阅即收到当前排名，投票后推送统计与新排名，断线后按 Last-Event-ID 补发"""
+import json
+
+import pytest
+
+
+@pytest.fixture
+def world(make_world):
+    return make_world(STREAM_HEARTBEAT=0.2, STREAM_POLL_INTERVAL=0.05)
+
+
+class Subscriber:
+    """逐个读取SSE事件，跳过心跳与重连间隔"""
+
+    def __init__(self, world, course_id=None, last_event_id=None):
+        headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+        self.response = world.client.get(f'/api/courses/{course_id or world.course_id}/stream', headers=headers)
+        self.chunks = iter(self.response.response)
+
+    def next_chunk(self):
+        return next(self.chunks).decode('utf-8')
+
+    def next_event(self, kind=None, attempts=50):
+        for _ in range(attempts):
+            chunk = self.next_chunk()
+            if chunk.startswith(':') or chunk.startswith('retry:'):
+                continue
+            fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+            event = {'id': fields['id'], 'event': fields['event'], 'data': json.loads(fields['data'])}
+            if kind is None or event['event'] == kind:
+                return event
+        raise AssertionError(f'未收到 {kind} 事件')
+
+    def close(self):
+        self.response.close()
+
+
+def vote(world):
+    return world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(world.new_voter()), 'group_id': world.group_id, 'vote_type': 1
+    })
+
+
+def test_subscription_starts_with_current_ranking(world):
+    subscriber = Subscriber(world)
+    try:
+        assert subscriber.response.mimetype == 'text/event-stream'
+        assert subscriber.response.headers['Cache-Control'] == 'no-cache'
+        assert subscriber.next_chunk().startswith('retry:')
+        event = subscriber.next_event()
+        assert event['event'] == 'ranking'
+        assert event['data'] == world.api('get', f'/api/ranking?course_id={world.course_id}')
+    finally:
+        subscriber.close()
+    assert world.app.extensions['course_streams'].channel(world.course_id).subscribers == 0
+
+
+def test_vote_pushes_tally_then_new_ranking(world):
+    subscriber = Subscriber(world)
+    try:
+        subscriber.next_event('ranking')
+        stats = vote(world)['stats']
+
+        tally = subscriber.next_event()
+        assert tally['event'] == 'tally'
+        assert tally['data'] == dict(stats, group_id=world.group_id)
+
+        ranking = subscriber.next_event('ranking')
+        assert ranking['data'] == world.api('get', f'/api/ranking?course_id={world.course_id}')
+    finally:
+        subscriber.close()
+
+
+def test_subscribers_share_the_same_events(world):
+    first, second = Subscriber(world), Subscriber(world)
+    try:
+        first.next_event('ranking')
+        second.next_event('ranking')
+        vote(world)
+        assert first.next_event('tally') == second.next_event('tally')
+    finally:
+        first.close()
+        second.close()
+
+
+def test_reconnect_resumes_after_last_event_id(world):
+    subscriber = Subscriber(world)
+    last_id = subscriber.next_event('ranking')['id']
+    subscriber.close()
+
+    vote(world)
+    resumed = Subscriber(world, last_event_id=last_id)
+    try:
+        # 能续传时不重发排名，直接补发错过的统计
+        assert resumed.next_event()['event'] == 'tally'
+    finally:
+        resumed.close()
+
+
+def test_unknown_event_id_restarts_from_ranking(world):
+    subscriber = Subscriber(world, last_event_id='other-5')
+    try:
+        assert subscriber.next_event()['event'] == 'ranking'
+    finally:
+        subscriber.close()
+
+
+def test_idle_stream_sends_heartbeats(world):
+    subscriber = Subscriber(world)
+    try:
+        subscriber.next_event('ranking')
+        assert subscriber.next_chunk() == ': heartbeat\n\n'
+    finally:
+        subscriber.close()
+
+
+def test_unknown_course_is_not_found(world):
+    assert world.client.get('/api/courses/999999/stream').status_code == 404
@@ -0,0 +1,59 @@
+"""得分趋势：增量维护的分钟汇总与按投票记录重建的结果一致"""
+
+
+def timeline_of(world, **params):
+    query = '&'.join(f'{key}={value}' for key, value in {'course_id': world.course_id, **params}.items())
+    return {group['id']: group['points'] for group in world.api('get', f'/api/timeline?{query}')['groups']}
+
+
+def final_totals(world):
+    return {group_id: points[-1]['cumulative_total'] if points else 0 for group_id, points in timeline_of(world).items()}
+
+
+def ranking_totals(world):
+    return {
+        item['id']: item['likes'] - item['dislikes']
+        for item in world.api('get', f'/api/ranking?course_id={world.course_id}')
+    }
+
+
+def change_votes(world):
+    """新增、修改、删除各一次投票"""
+    voter = world.new_voter()
+    world.api('post', '/api/vote', json={
+        'voter_token': world.voter_token(voter), 'group_id': world.group_id, 'vote_type': 1
+    })
+    votes = world.api('get', f'/api/votes?course_id={world.course_id}&group_id={world.group_ids[1]}')
+    world.api('put', f"/api/votes/{votes[0]['id']}", json={'vote_type': -votes[0]['vote_type'], 'vote_weight': 3})
+    world.api('delete', f"/api/votes/{votes[1]['id']}")
+
+
+def test_timeline_totals_match_ranking(world):
+    assert final_totals(world) == ranking_totals(world)
+    change_votes(world)
+    assert final_totals(world) == ranking_totals(world)
+
+
+def test_incremental_rollups_match_rebuild(world):
+    change_votes(world)
+    incremental = timeline_of(world, resolution=1)
+
+    result = world.api('post', '/api/timeline/rebuild', json={'course_id': world.course_id})
+    assert result['count'] > 0
+    assert timeline_of(world, resolution=1) == incremental
+
+
+def test_resolution_and_group_filter(world):
+    fine = timeline_of(world, resolution=1)
+    coarse = timeline_of(world, resolution=10 ** 6)
+    for group_id, points in coarse.items():
+        assert len(points) <= 1
+        assert sum(point['votes'] for point in points) == sum(point['votes'] for point in fine[group_id])
+
+    only = timeline_of(world, group_id=world.group_id)
+    assert list(only) == [world.group_id]
+
+
+def test_invalid_parameters_are_rejected(world):
+    response = world.client.get(f'/api/timeline?course_id={world.course_id}&resolution=abc', headers=world.headers)
+    assert response.status_code == 400
@@ -0,0 +1,101 @@
+"""按内容哈希保存的上传文件：相同内容只存一份，删除引用与垃圾回收只清理不再被引用的文件"""
+import os
+import time
+from io import BytesIO
+
+from src.models.evaluation import db, Group, GroupPhoto
+from src.services.uploads import TEMP_PREFIX, collect_garbage
+
+PHOTO = b'\xff\xd8\xff\xe0' + b'photo-bytes' * 100
+
+
+def upload_dir(world):
+    return world.app.config['UPLOAD_DIR']
+
+
+def make_old(path):
+    os.utime(path, (time.time() - 7 * 24 * 3600,) * 2)
+
+
+def upload_photo(world, group_id, content=PHOTO, name='photo.jpg'):
+    response = world.client.post(
+        f'/api/groups/{group_id}/photos', headers=world.headers,
+        data={'photos': (BytesIO(content), name)}, content_type='multipart/form-data',
+    )
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()['photos'][0]
+
+
+def delete_photo(world, group_id, filename):
+    with world.app.app_context():
+        photo_id = GroupPhoto.query.filter_by(group_id=group_id, filename=filename).one().id
+    world.api('delete', f'/api/groups/{group_id}/photos/{photo_id}')
+
+
+def test_same_content_is_stored_once(world):
+    first = world.client.post('/api/upload', headers=world.headers, data={'file': (BytesIO(PHOTO), 'a.jpg')},
+                              content_type='multipart/form-data').get_json()
+    second = world.client.post('/api/upload', headers=world.headers, data={'file': (BytesIO(PHOTO), 'b.jpg')},
+                               content_type='multipart/form-data').get_json()
+    assert first['file_path'] == second['file_path']
+    stored = [name for name in os.listdir(upload_dir(world)) if not name.startswith('.')]
+    assert stored == [first['file_path'].rsplit('/', 1)[1]]
+
+
+def test_shared_file_is_released_with_its_last_reference(make_world):
+    world = make_world(UPLOAD_GC_GRACE_SECONDS=0)
+    first = upload_photo(world, world.group_ids[0])
+    second = upload_photo(world, world.group_ids[1])
+    assert first['filename'] == second['filename']
+    path = os.path.join(upload_dir(world), first['filename'])
+
+    delete_photo(world, world.group_ids[0], first['filename'])
+    assert os.path.exists(path)
+    delete_photo(world, world.group_ids[1], second['filename'])
+    assert not os.path.exists(path)
+
+
+def test_release_keeps_recent_files_for_gc(world):
+    photo = upload_photo(world, world.group_id)
+    delete_photo(world, world.group_id, photo['filename'])
+    # 刚写入的文件可能正被并发上传或尚未保存的logo使用，留给垃圾回收
+    assert os.path.exists(os.path.join(upload_dir(world), photo['filename']))
+
+
+def test_gc_removes_only_unreferenced_old_files(world):
+    directory = upload_dir(world)
+    photo = upload_photo(world, world.group_id)
+    for name in ('orphan.jpg', 'legacy.jpg', 'logo.jpg', 'recent.jpg', f'{TEMP_PREFIX}spooled'):
+        open(os.path.join(directory, name), 'wb').close()
+    for name in ('orphan.jpg', 'legacy.jpg', 'logo.jpg', photo['filename']):
+        make_old(os.path.join(directory, name))
+
+    with world.app.app_context():
+        group = db.session.get(Group, world.group_id)
+        group.logo = '/uploads/logo.jpg'
+        # 旧版存储在 groups.photos 中的照片列表
+        group.set_photos(['/uploads/legacy.jpg'])
+        db.session.commit()
+
+        result = collect_garbage(grace_seconds=3600)
+
+    assert result['removed'] == 1
+    assert sorted(os.listdir(directory)) == sorted([
+        photo['filename'], 'legacy.jpg', 'logo.jpg', 'recent.jpg', f'{TEMP_PREFIX}spooled'
+    ])
+
+
+
+def test_gc_with_zero_grace_keeps_temp_files(world):
+    directory = upload_dir(world)
+    os.makedirs(directory, exist_ok=True)
+    spooled = os.path.join(directory, f'{TEMP_PREFIX}job')
+    stale = os.path.join(directory, f'{TEMP_PREFIX}stale')
+    for path in (spooled, stale):
+        open(path, 'wb').close()
+    os.utime(stale, (0, 0))
+
+    result = world.api('post', '/api/uploads/gc', json={'grace_seconds': 0})
+    assert result['removed'] == 1
+    assert os.path.exists(spooled)
+    assert not os.path.exists(stale)
@@ -0,0 +1,67 @@
+"""投票令牌：身份验证后签发，投票只认有效的令牌，令牌中的课程与权重决定投票归属"""
+import pytest
+
+from src.models.evaluation import Vote
+from src.routes import evaluation
+from src.routes.evaluation import generate_admin_token, verify_voter_token
+
+
+def vote(world, token, group_id=None, vote_type=1):
+    return world.client.post('/api/vote', json={
+        'voter_token': token, 'group_id': group_id or world.group_id, 'vote_type': vote_type
+    })
+
+
+def test_token_carries_voter_identity(world):
+    voter = world.new_voter()
+    session = world.api('post', '/api/verify-voter', json={
+        'name': voter['name'], 'phone': voter['phone'], 'group_id': world.group_id
+    })
+    assert session['voter_id'] == voter['id'] and session['expires_in'] == evaluation.VOTER_TOKEN_MAX_AGE
+
+    with world.app.app_context():
+        data = verify_voter_token(session['voter_token'])
+    assert data == {'voter_id': voter['id'], 'course_id': world.course_id, 'weight': voter['weight']}
+
+    assert vote(world, session['voter_token']).status_code == 200
+    with world.app.app_context():
+        stored = Vote.query.filter_by(group_id=world.group_id, voter_id=voter['id']).one()
+        assert stored.vote_weight == voter['weight'] and stored.course_id == world.course_id
+
+
+def test_wrong_identity_gets_no_token(world):
+    voter = world.new_voter()
+    response = world.client.post('/api/verify-voter', json={
+        'name': voter['name'], 'phone': '13000000000', 'group_id': world.group_id
+    })
+    assert response.status_code == 400
+    assert 'voter_token' not in response.get_json()
+
+
+@pytest.mark.parametrize('token', [None, '', 'not-a-token', 123])
+def test_vote_without_valid_token_is_rejected(world, token):
+    response = vote(world, token)
+    assert response.status_code == 401
+
+
+def test_tampered_and_admin_tokens_are_rejected(world):
+    token = world.voter_token(world.new_voter())
+    assert vote(world, token + 'x').status_code == 401
+    # 管理员令牌使用不同的签名用途，不能当作投票令牌
+    with world.app.app_context():
+        assert vote(world, generate_admin_token('super')).status_code == 401
+
+
+def test_expired_token_is_rejected(world, monkeypatch):
+    token = world.voter_token(world.new_voter())
+    monkeypatch.setattr(evaluation, 'VOTER_TOKEN_MAX_AGE', -1)
+    response = vote(world, token)
+    assert response.status_code == 401
+    assert response.get_json()['error'] == '身份验证已失效，请重新验证'
+
+
+def test_token_cannot_vote_in_another_course(world):
+    token = world.voter_token(world.new_voter())
+    other_course = world.new_course(groups=1)
+    other_group = world.api('get', f'/api/groups?course_id={other_course}')[0]['id']
+    assert vote(world, token, group_id=other_group).status_code == 400
@@ -0,0 +1,142 @@
+"""投票写入的幂等性：相同幂等键的重试只计一票，没有或不同的幂等键按重复投票拒绝"""
+import pytest
+
+from src.models.evaluation import Vote
+from src.routes.evaluation import verify_voter_token
+from src.services.shards import use_row
+from src.services.voting import cast_vote, parse_idempotency_key
+
+
+def vote_rows(world, voter_id, group_id):
+    with world.app.app_context():
+        return Vote.query.filter_by(voter_id=voter_id, group_id=group_id).all()
+
+
+def post_vote(world, token, vote_type=1, key=None, group_id=None):
+    headers = {'Idempotency-Key': key} if key else {}
+    return world.client.post('/api/vote', headers=headers, json={
+        'voter_token': token, 'group_id': group_id or world.group_id, 'vote_type': vote_type
+    })
+
+
+@pytest.mark.parametrize('value', [None, '', '  ', 'null', 'undefined', 'None', 123])
+def test_empty_idempotency_keys_are_ignored(value):
+    assert parse_idempotency_key(value) is None
+
+
+def test_idempotency_key_falls_back_to_later_values():
+    assert parse_idempotency_key('null', ' key-1 ') == 'key-1'
+    assert parse_idempotency_key('x' * 100) == 'x' * 64
+
+
+def test_replay_with_same_key_counts_once(world):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+
+    first = post_vote(world, token, key='attempt-1')
+    assert first.status_code == 200
+    replay = post_vote(world, token, key='attempt-1')
+    assert replay.status_code == 200
+    assert replay.get_json()['stats'] == first.get_json()['stats']
+
+    rows = vote_rows(world, voter['id'], world.group_id)
+    assert len(rows) == 1
+    assert rows[0].idempotency_key == 'attempt-1'
+
+
+def test_key_can_be_sent_in_body(world):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+    payload = {'voter_token': token, 'group_id': world.group_id, 'vote_type': 1, 'idempotency_key': 'body-key'}
+
+    assert world.client.post('/api/vote', json=payload).status_code == 200
+    # 请求头中的空值不覆盖请求JSON中的幂等键
+    assert world.client.post('/api/vote', json=payload, headers={'Idempotency-Key': 'null'}).status_code == 200
+    assert len(vote_rows(world, voter['id'], world.group_id)) == 1
+
+
+@pytest.mark.parametrize('first_key, second_key', [
+    (None, None),
+    ('attempt-1', 'attempt-2'),
+    ('attempt-1', None),
+    (None, 'attempt-1'),
+    ('null', 'null'),
+])
+def test_second_vote_without_matching_key_is_rejected(world, first_key, second_key):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+
+    assert post_vote(world, token, key=first_key).status_code == 200
+    second = post_vote(world, token, key=second_key)
+    assert second.status_code == 400
+    assert second.get_json()['error'] == '您已经投过票了'
+    assert len(vote_rows(world, voter['id'], world.group_id)) == 1
+
+
+def test_batch_replay_with_same_key_counts_once(world):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+    payload = {
+        'voter_token': token, 'idempotency_key': 'batch-1',
+        'votes': [{'group_id': group_id, 'vote_type': 1} for group_id in world.group_ids[:2]],
+    }
+
+    first = world.client.post('/api/vote/batch', json=payload)
+    assert first.status_code == 200
+    assert [vote['created'] for vote in first.get_json()['votes']] == [True, True]
+    replay = world.client.post('/api/vote/batch', json=payload)
+    assert replay.status_code == 200
+    assert [vote['created'] for vote in replay.get_json()['votes']] == [False, False]
+
+    for group_id in world.group_ids[:2]:
+        assert len(vote_rows(world, voter['id'], group_id)) == 1
+
+    payload['idempotency_key'] = 'batch-2'
+    again = world.client.post('/api/vote/batch', json=payload)
+    assert again.status_code == 400
+    assert sorted(again.get_json()['group_ids']) == sorted(world.group_ids[:2])
+
+
+def test_replay_with_different_vote_type_is_rejected(world):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+
+    assert post_vote(world, token, vote_type=1, key='attempt-1').status_code == 200
+    changed = post_vote(world, token, vote_type=-1, key='attempt-1')
+    assert changed.status_code == 409
+
+    rows = vote_rows(world, voter['id'], world.group_id)
+    assert [row.vote_type for row in rows] == [1]
+
+
+def test_batch_replay_with_different_vote_type_is_rejected(world):
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+    group_ids = world.group_ids[:2]
+    payload = {
+        'voter_token': token, 'idempotency_key': 'batch-1',
+        'votes': [{'group_id': group_id, 'vote_type': 1} for group_id in group_ids],
+    }
+    assert world.client.post('/api/vote/batch', json=payload).status_code == 200
+
+    payload['votes'][1]['vote_type'] = -1
+    changed = world.client.post('/api/vote/batch', json=payload)
+    assert changed.status_code == 409
+    assert changed.get_json()['group_ids'] == [group_ids[1]]
+    assert [row.vote_type for row in vote_rows(world, voter['id'], group_ids[1])] == [1]
+
+
+def test_http_retry_after_socket_vote_returns_original_result(world):
+    """Socket 事件与HTTP接口共用 cast_vote：经Socket写入后确认超时，手机端用同一幂等键改走HTTP"""
+    voter = world.new_voter()
+    token = world.voter_token(voter)
+    # 与 main.py 中 cast_vote 事件的处理相同
+    with world.app.test_request_context():
+        use_row(world.group_id)
+        _, created, stats = cast_vote(verify_voter_token(token), world.group_id, 1, parse_idempotency_key('attempt-1'))
+    assert created
+
+    retry = post_vote(world, token, key='attempt-1')
+    assert retry.status_code == 200
+    assert retry.get_json()['stats'] == stats
+    assert len(vote_rows(world, voter['id'], world.group_id)) == 1